@@ -0,0 +1,51 @@
+"""
+Sidar Project - Bağlam Anlık Görüntüsü
+Ajanın sistem istemine ve kullanıcı mesajına eklediği bağlam bölümlerini
+önbellekte tutar. Her bölüm bir sürüm fonksiyonu ve bir oluşturucu ile kaydedilir;
+alt sistemler durum değiştirdikçe sürüm sayaçlarını artırır (DocumentStore.version,
+CodeManager.version, ConversationMemory.state_version, GitHubManager.version).
+
+Sürüm değişmedikçe get() önceki metni — aynı str nesnesini — döndürür; böylece
+durum değişmeyen adımlar bayt bayt aynı bağlamı gönderir ve her adımda
+docs.status(), code.get_metrics() vb. çağrılmaz.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class ContextSnapshot:
+    """Ad → (sürüm fonksiyonu, oluşturucu) kayıtlı bağlam bölümleri."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sections: Dict[str, Tuple[Callable[[], Hashable], Callable[[], str]]] = {}
+        self._cache: Dict[str, Tuple[Hashable, str]] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "rebuilds": 0}
+
+    def register(self, name: str, version: Callable[[], Hashable], build: Callable[[], str]) -> None:
+        with self._lock:
+            self._sections[name] = (version, build)
+            self._cache.pop(name, None)
+
+    def get(self, name: str) -> str:
+        version_fn, build = self._sections[name]
+        version = version_fn()
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == version:
+                self.stats["hits"] += 1
+                return cached[1]
+        text = build()
+        with self._lock:
+            self._cache[name] = (version, text)
+            self.stats["rebuilds"] += 1
+        return text
+
+    def invalidate(self, name: str = "") -> None:
+        """Tek bir bölümü (veya tümünü) bir sonraki get() için yeniden oluşturulmaya zorlar."""
+        with self._lock:
+            if name:
+                self._cache.pop(name, None)
+            else:
+                self._cache.clear()
@@ -0,0 +1,82 @@
+"""
+Sidar Project - ReAct Mesaj Oluşturucu
+ReAct döngüsünün mesaj listesini yerinde (in-place) büyütür ve eski araç
+çıktılarını kısa referanslara indirger.
+
+Önceki düzende her adım `messages = messages + [...]` ile tüm listeyi kopyalıyor
+ve her araç çıktısını tam hâliyle sonraki tüm adımlarda yeniden gönderiyordu;
+10 adımlık bir döngüde hem kopyalama hem de gönderilen istem baytı karesel
+büyüyordu. Burada:
+
+  • Mesajlar tek bir listeye eklenir (kopya yok)
+  • Yalnızca en son `keep_full` araç çıktısı tam tutulur; daha eskiler
+    başlık + kısa önizleme + "gerekirse yeniden çağır" notuna indirgenir
+    (araç sonucu önbelleği sayesinde yeniden çağrı ucuzdur)
+  • Mesaj içeriklerinin UTF-8 bayt toplamı artımlı tutulur (adım başına metrik)
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+_TOOL_PREFIX = "[ARAÇ:"
+_RESULT_HEADER_RE = re.compile(r"\[ARAÇ:([^:\]\n]+):SONUÇ\]")
+
+
+def _size(message: Dict[str, str]) -> int:
+    return len(message["content"].encode("utf-8"))
+
+
+class ReActMessages:
+    """
+    base          : Turun başlangıç mesajları (geçmiş + bu turun kullanıcı mesajı); liste sahiplenilir
+    keep_full     : Tam hâliyle tutulacak en son araç çıktısı sayısı
+    preview_chars : İndirgenen çıktıdan korunacak önizleme uzunluğu
+    min_chars     : Bundan kısa çıktılar indirgenmez (referans zaten aynı boyutta olurdu)
+    """
+
+    def __init__(self, base: List[Dict[str, str]], keep_full: int = 2,
+                 preview_chars: int = 300, min_chars: int = 600) -> None:
+        self.messages = base
+        self.keep_full = max(1, keep_full)
+        self.preview_chars = preview_chars
+        self.min_chars = min_chars
+        self.turn_start = len(base) - 1      # bu turun kullanıcı mesajı; sonrası araç adımları
+        self.steps = 0
+        self.collapsed = 0
+        self.bytes = sum(_size(m) for m in base)
+        self._full: List[Tuple[int, int]] = []   # (mesaj indeksi, adım) — tam tutulan araç çıktıları
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    @property
+    def protected(self) -> int:
+        """Bütçeleyicinin düşürmemesi gereken kuyruk uzunluğu (bu turun mesajları)."""
+        return len(self.messages) - self.turn_start
+
+    def _append(self, role: str, content: str) -> int:
+        self.messages.append({"role": role, "content": content})
+        self.bytes += _size(self.messages[-1])
+        return len(self.messages) - 1
+
+    def add_step(self, assistant: str, feedback: str) -> None:
+        """Asistan yanıtını ve geri bildirimi (araç sonucu / sistem uyarısı) ekler."""
+        self.steps += 1
+        self._append("assistant", assistant)
+        idx = self._append("user", feedback)
+        if feedback.startswith(_TOOL_PREFIX) and len(feedback) >= self.min_chars:
+            self._full.append((idx, self.steps))
+            while len(self._full) > self.keep_full:
+                self._collapse(*self._full.pop(0))
+
+    def _collapse(self, idx: int, step: int) -> None:
+        content = self.messages[idx]["content"]
+        names = ", ".join(dict.fromkeys(_RESULT_HEADER_RE.findall(content))) or "araç"
+        body = content.split("===\n", 1)[1] if "===\n" in content else content
+        preview = body[: self.preview_chars].rstrip()
+        ref = (f"[ARAÇ:{names}:ÖZET] {step}. adımın çıktısı ({len(content)} karakter) kısaltıldı; "
+               f"tam içerik gerekirse aracı yeniden çağır.\n{preview}\n…")
+        old = _size(self.messages[idx])
+        self.messages[idx] = {"role": "user", "content": ref}
+        self.bytes += _size(self.messages[idx]) - old
+        self.collapsed += 1
@@ -3,19 +3,27 @@ Sidar Project - Ana Ajan
 ReAct (Reason + Act) döngüsü ile çalışan yazılım mühendisi AI asistanı (Asenkron + Pydantic Uyumlu).
 """
 
+import hashlib
 import logging
 import json
 import re
 import asyncio
 import time
-from typing import Optional, AsyncIterator, Dict
+from contextlib import aclosing
+from typing import Optional, AsyncIterator, Dict, List
 
 from pydantic import BaseModel, Field, ValidationError
 
 from config import Config
 from core.memory import ConversationMemory
 from core.llm_client import LLMClient
+from core.tokenizer import get_token_counter
 from core.rag import DocumentStore
+from core.retention import SessionRetention
+from core.context_budget import ContextBudgeter
+from core.tool_cache import ToolResultCache, parse_ttls
+from core.answer_cache import SemanticAnswerCache, WRITES_TO, dependencies
+from core import tracing
 from managers.code_manager import CodeManager
 from managers.system_health import SystemHealthManager
 from managers.github_manager import GitHubManager
@@ -24,6 +32,9 @@ from managers.web_search import WebSearchManager
 from managers.package_info import PackageInfoManager
 from agent.auto_handle import AutoHandle
 from agent.definitions import SIDAR_SYSTEM_PROMPT
+from agent.stream_parser import FinalAnswerStreamer
+from agent.react_messages import ReActMessages
+from agent.context_snapshot import ContextSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -32,27 +43,57 @@ logger = logging.getLogger(__name__)
 # LLM'in önceki araç sonuçlarını tutarlı parse edebilmesi için
 # tek bir şema kullanılır.
 # ─────────────────────────────────────────────
-_FMT_TOOL_OK = (
+_FMT_TOOL_RESULT = (
     "[ARAÇ:{name}:SONUÇ]\n"
     "===\n"
     "{result}\n"
     "===\n"
+)
+_TOOL_RULES = (
     "KURAL: Yukarıdaki değerleri AYNEN kullan. ASLA kendi bilginden değer uydurma.\n"
     "Eğer görev tamamlandıysa MUTLAKA şu formatta yanıt ver:\n"
     "{{\"thought\": \"analiz\", \"tool\": \"final_answer\", \"argument\": \"<Markdown özet>\"}}\n"
     "Devam gerekiyorsa sonraki aracı çağır."
 )
+_FMT_TOOL_OK = _FMT_TOOL_RESULT + _TOOL_RULES
 _FMT_TOOL_ERR = "[ARAÇ:{name}:HATA]\n{error}"  # araç hatası (bilinmeyen araç vb.)
 _FMT_SYS_ERR  = "[Sistem Hatası] {msg}"        # ayrıştırma / doğrulama hatası
+_FMT_TOOL_TIMEOUT = (                           # araç süre sınırını aştı
+    "⏱ Araç {seconds:.0f} saniyelik süre sınırını aştı ve yanıtı beklenmedi. "
+    "Yeniden çağırma; elindeki bilgilerle final_answer ver."
+)
+_FMT_WRITE_TIMEOUT_NOTE = (                     # yazan araç süre sınırını aştı
+    "\nDikkat: yazma işlemi arka planda yine de uygulanmış olabilir; "
+    "durumu varsayma, gerekirse dosyayı yeniden okuyarak doğrula."
+)
+
+
+class _ToolFailure(str):
+    """Başarısız araç sonucu: modele metin olarak iletilir, araç sonucu önbelleğine yazılmaz."""
+
+
+def _outcome(ok: bool, result: str) -> str:
+    """Yönetici (ok, sonuç) çiftini handler dönüşüne çevirir; başarısızlık işaretlenir."""
+    return result if ok else _ToolFailure(result)
 
 # ─────────────────────────────────────────────
 #  PYDANTIC VERİ MODELİ (YAPISAL ÇIKTI)
 # ─────────────────────────────────────────────
+class ToolStep(BaseModel):
+    """Paralel çağrı grubundaki tek bir araç çağrısı."""
+    tool: str = Field(description="Çalıştırılacak aracın tam adı.")
+    argument: str = Field(default="", description="Araca geçirilecek parametre (opsiyonel).")
+
+
 class ToolCall(BaseModel):
     """LLM'in ReAct döngüsünde üretmesi gereken JSON şeması."""
     thought: str = Field(description="Ajanın mevcut adımdaki analizi ve planı.")
-    tool: str = Field(description="Çalıştırılacak aracın tam adı (örn: final_answer, web_search).")
+    tool: str = Field(description="Çalıştırılacak aracın tam adı (örn: final_answer, web_search, parallel).")
     argument: str = Field(default="", description="Araca geçirilecek parametre (opsiyonel).")
+    calls: List[ToolStep] = Field(
+        default_factory=list,
+        description="tool='parallel' ise birbirinden bağımsız araç çağrıları (tek adımda çalıştırılır).",
+    )
 
 
 class SidarAgent:
@@ -63,9 +104,89 @@ class SidarAgent:
 
     VERSION = "2.6.1"  # GPU Hızlandırma + WSL2 Desteği + Uyumsuzluk Yamaları
 
+    # Yan etkisiz araçlar: "parallel" grubunda eşzamanlı çalıştırılabilir.
+    # Diğerleri (yazma, kod çalıştırma, belge ekleme/silme) sırayla ve bariyer olarak çalışır.
+    READ_ONLY_TOOLS = frozenset({
+        "list_dir", "read_file", "audit", "health", "get_config", "print_config_summary",
+        "github_commits", "github_info", "github_read", "github_list_files", "github_search_code",
+        "web_search", "fetch_url", "search_docs", "search_stackoverflow",
+        "pypi", "pypi_compare", "npm", "gh_releases", "gh_latest", "docs_search", "docs_list",
+    })
+    # Araç başına eşzamanlılık sınırı (tüm oturumlar arasında paylaşılır);
+    # listede olmayanlar REACT_TOOL_CONCURRENCY değerini kullanır
+    TOOL_CONCURRENCY: Dict[str, int] = {
+        "web_search": 2, "fetch_url": 2, "search_docs": 2, "search_stackoverflow": 2,
+        "github_read": 2, "github_list_files": 2, "github_search_code": 1,
+        "audit": 1, "health": 1,
+    }
+
     def __init__(self, cfg: Config = None) -> None:
         self.cfg = cfg or Config()
         self._lock = None  # Asenkron Lock, respond çağrıldığında yaratılacak
+        # Arka plan kayan özetleme görevi (aynı anda en fazla bir tane)
+        self._summary_task: Optional[asyncio.Task] = None
+        self.summary_stats: Dict[str, float] = {
+            "runs": 0,
+            "failures": 0,
+            "last_duration_s": 0.0,
+            "last_tokens_saved": 0,
+            "tokens_saved_total": 0,
+        }
+        # Kullanıcının ilk görünür metni görene kadar geçen süre (time-to-first-token)
+        self.response_stats: Dict[str, float] = {
+            "responses": 0,
+            "ttft_last_s": 0.0,
+            "ttft_avg_s": 0.0,
+            "ttft_max_s": 0.0,
+        }
+        # ReAct adımı başına Ollama prompt_eval_count (KV önbelleği dışında
+        # yeniden değerlendirilen istem token'ları) ve statik önek değişimleri
+        self.prompt_stats: Dict[str, float] = {
+            "steps": 0,
+            "prompt_eval_last": 0,
+            "prompt_eval_avg": 0.0,
+            "first_step_avg": 0.0,
+            "followup_step_avg": 0.0,
+            "prefix_changes": 0,
+        }
+        self._first_steps = 0
+        self._prefix_hash = ""
+        self._prefix_text: Optional[str] = None
+        # Bağlam bütçesi: adım başına kırpılan token ve düşürülen mesajlar
+        self.budget_stats: Dict[str, float] = {
+            "steps": 0,
+            "trimmed_steps": 0,
+            "trimmed_last": 0,
+            "trimmed_total": 0,
+            "dropped_messages_total": 0,
+            "prompt_tokens_last": 0,
+            "num_ctx": 0,
+        }
+        # Paralel araç grupları: kazanılan LLM tur sayısı ve grup süresi
+        self.tool_stats: Dict[str, float] = {
+            "batches": 0,
+            "batched_calls": 0,
+            "round_trips_saved": 0,
+            "last_batch_s": 0.0,
+        }
+        self._tool_sems: Dict[str, asyncio.Semaphore] = {}
+        # REACT_TIMEOUT: adım türüne göre zaman aşımı sayıları
+        #   llm: model çağrısı/akışı süreyi aştı, tool: araç süreyi aştı,
+        #   deadline: yeni adıma başlamadan süre doldu
+        self.timeout_stats: Dict[str, int] = {
+            "llm": 0,
+            "tool": 0,
+            "deadline": 0,
+            "partial_answers": 0,
+        }
+        # ReAct adımı başına gönderilen istem baytı (sistem + mesajlar, UTF-8)
+        self.payload_stats: Dict[str, float] = {
+            "steps": 0,
+            "bytes_last": 0,
+            "bytes_avg": 0.0,
+            "bytes_max": 0,
+            "collapsed_results_total": 0,
+        }
 
         # Alt sistemler — temel (Senkron/Yerel)
         self.security = SecurityManager(self.cfg.ACCESS_LEVEL, self.cfg.BASE_DIR)
@@ -78,13 +199,52 @@ class SidarAgent:
         self.health = SystemHealthManager(self.cfg.USE_GPU)
         self.github = GitHubManager(self.cfg.GITHUB_TOKEN, self.cfg.GITHUB_REPO)
         
+        # Token sayacı ReAct döngüsünün kullandığı modele göre seçilir
+        if self.cfg.AI_PROVIDER == "gemini":
+            _token_model = getattr(self.cfg, "GEMINI_MODEL", "")
+        else:
+            _token_model = getattr(self.cfg, "TEXT_MODEL", self.cfg.CODING_MODEL)
+        token_counter = get_token_counter(_token_model, getattr(self.cfg, "TOKENIZER_BACKEND", "auto"))
         self.memory = ConversationMemory(
             file_path=self.cfg.MEMORY_FILE,
             max_turns=self.cfg.MAX_MEMORY_TURNS,
             encryption_key=getattr(self.cfg, "MEMORY_ENCRYPTION_KEY", ""),
+            token_counter=token_counter,
         )
+        # ReAct mesaj listesini modelin bağlam penceresine sığdırır (num_ctx)
+        self.budgeter = ContextBudgeter.from_config(self.cfg, token_counter)
+        # Salt-okunur araç sonuçları (oturum başına, yazma araçlarıyla geçersiz kılınır)
+        self.tool_cache: Optional[ToolResultCache] = None
+        if getattr(self.cfg, "TOOL_CACHE_ENABLED", True):
+            self.tool_cache = ToolResultCache(
+                parse_ttls(getattr(self.cfg, "TOOL_CACHE_TTLS", "")),
+                max_entries=getattr(self.cfg, "TOOL_CACHE_MAX_ENTRIES", 256),
+            )
+        # Yazma araçlarının değiştirdiği durumların sürümleri (anlamsal yanıt önbelleği tazeliği)
+        self.state_epochs: Dict[str, int] = {"files": 0, "github": 0, "docs": 0}
         
+        self.retention = SessionRetention(
+            self.memory,
+            archive_after_days=getattr(self.cfg, "SESSION_ARCHIVE_AFTER_DAYS", 0),
+            max_age_days=getattr(self.cfg, "SESSION_MAX_AGE_DAYS", 0),
+            disk_budget_mb=getattr(self.cfg, "SESSION_DISK_BUDGET_MB", 0),
+            broken_max_age_days=getattr(self.cfg, "SESSION_BROKEN_MAX_AGE_DAYS", 7),
+        )
+
         self.llm = LLMClient(self.cfg.AI_PROVIDER, self.cfg)
+        tracing.tracer.configure(self.cfg)
+        # Oturumlar arası anlamsal yanıt önbelleği (benzer sorular ReAct döngüsüne girmez)
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if getattr(self.cfg, "ANSWER_CACHE_ENABLED", False):
+            self.answer_cache = SemanticAnswerCache(
+                self.llm,
+                embed_model=getattr(self.cfg, "ANSWER_CACHE_EMBED_MODEL", ""),
+                threshold=getattr(self.cfg, "ANSWER_CACHE_THRESHOLD", 0.9),
+                ttl_s=getattr(self.cfg, "ANSWER_CACHE_TTL", 3600),
+                max_entries=getattr(self.cfg, "ANSWER_CACHE_MAX_ENTRIES", 500),
+                min_chars=getattr(self.cfg, "ANSWER_CACHE_MIN_CHARS", 8),
+                tool_ttls=parse_ttls(getattr(self.cfg, "ANSWER_CACHE_TOOL_TTLS", "")),
+            )
 
         # Alt sistemler — yeni (Asenkron)
         self.web = WebSearchManager(self.cfg)
@@ -104,6 +264,20 @@ class SidarAgent:
             self.web, self.pkg, self.docs,
         )
 
+        # Bağlam bölümleri yalnızca ilgili alt sistemin sürüm sayacı değişince yeniden oluşturulur
+        self.context = ContextSnapshot()
+        self.context.register(
+            "system", lambda: (self.security.level_name, self.github.version),
+            lambda: SIDAR_SYSTEM_PROMPT + "\n\n" + self._build_static_context(),
+        )
+        self.context.register(
+            "static", lambda: (self.security.level_name, self.github.version), self._build_static_context,
+        )
+        self.context.register(
+            "runtime", lambda: (self.docs.version, self.code.version, self.memory.state_version),
+            self._build_runtime_state,
+        )
+
         logger.info(
             "SidarAgent v%s başlatıldı — sağlayıcı=%s model=%s erişim=%s (VECTOR MEMORY + ASYNC)",
             self.VERSION,
@@ -119,11 +293,26 @@ class SidarAgent:
     async def respond(self, user_input: str) -> AsyncIterator[str]:
         """
         Kullanıcı girdisini asenkron işle ve yanıtı STREAM olarak döndür.
+        İstek bir "respond" kök span'ı altında izlenir (TRACE_ENABLED).
         """
+        with tracing.start_span("respond", session=self.memory.active_session_id or "",
+                                input_chars=len(user_input)) as span:
+            answer_chars = 0
+            async with aclosing(self._respond(user_input)) as chunks:
+                async for chunk in chunks:
+                    if chunk.startswith("\x00CACHE:"):
+                        span.set(cache_hit=True)
+                    elif not chunk.startswith("\x00"):
+                        answer_chars += len(chunk)
+                    yield chunk
+            span.set(answer_chars=answer_chars)
+
+    async def _respond(self, user_input: str) -> AsyncIterator[str]:
         user_input = user_input.strip()
         if not user_input:
             yield "⚠ Boş girdi."
             return
+        started = time.monotonic()
 
         # Event loop içinde güvenli Lock oluşturma
         if self._lock is None:
@@ -139,52 +328,259 @@ class SidarAgent:
 
         # Lock serbest bırakıldı
         if handled:
+            self._record_first_token(time.monotonic() - started)
             yield quick_response
+            self._schedule_summarization()
             return
 
-        # Bellek eşiği dolmak üzereyse özetleme ve arşivleme tetikle
-        if self.memory.needs_summarization():
-            yield "\n[Sistem] Konuşma belleği arşivleniyor ve sıkıştırılıyor...\n"
-            await self._summarize_memory()
-
-        # ReAct döngüsünü akıştır
-        async for chunk in self._react_loop(user_input):
+        # Anlamsal yanıt önbelleği: benzer bir soru yakın zamanda yanıtlandıysa
+        # ve dayandığı durum değişmediyse ReAct döngüsü atlanır
+        cache = self.answer_cache
+        use_cache = cache is not None and cache.cacheable_question(user_input)
+        versions = self.answer_versions()
+        if use_cache:
+            hit = await cache.lookup(user_input, self._answer_namespace(), versions)
+            if hit is not None:
+                answer, similarity = hit
+                # UI'ya önbellek isabetini bildir (sentinel format: \x00CACHE:<benzerlik>\x00)
+                yield f"\x00CACHE:{similarity:.3f}\x00"
+                await asyncio.to_thread(self.memory.add, "assistant", answer)
+                self._record_first_token(time.monotonic() - started)
+                yield answer
+                self._schedule_summarization()
+                return
+
+        # ReAct döngüsünü akıştır (REACT_TIMEOUT isteğin başından itibaren sayılır)
+        first_visible = True
+        timeout_s = getattr(self.cfg, "REACT_TIMEOUT", 0)
+        deadline = None
+        if timeout_s > 0:
+            # loop.time() monoton saattir; kilit ve bellek yazımında geçen süre düşülür
+            deadline = asyncio.get_running_loop().time() + timeout_s - (time.monotonic() - started)
+        turn: Dict[str, object] = {"answer": None}
+        tools: List[str] = []
+        async for chunk in self._react_loop(user_input, deadline, turn):
+            if chunk.startswith("\x00TOOL:"):
+                tools.append(chunk[6:-1])
+            elif first_visible:
+                first_visible = False
+                self._record_first_token(time.monotonic() - started)
             yield chunk
 
+        # Yalnızca eksiksiz nihai yanıtlar saklanır (kısmi / zaman aşımı yanıtları değil)
+        if use_cache and turn["answer"]:
+            await cache.store(
+                user_input, self._answer_namespace(), turn["answer"],
+                deps=dependencies(tools, versions), tools=tools,
+                side_effects=any(t not in self.READ_ONLY_TOOLS for t in tools),
+            )
+
+        # Yanıt akıtıldıktan sonra: bellek eşiği dolmak üzereyse en eski
+        # turları arka planda özetle (kullanıcı yanıtı beklemez)
+        self._schedule_summarization()
+
+    def answer_versions(self) -> Dict[str, object]:
+        """Yanıt önbelleği kayıtlarının dayandığı durumların güncel sürümleri."""
+        ep = self.state_epochs
+        return {
+            "files": ep["files"],
+            "github": (self.github.version, ep["github"]),
+            "docs": (self.docs.version, ep["docs"]),
+        }
+
+    def _answer_namespace(self) -> str:
+        """Aynı soruya farklı sağlayıcı/model/erişim seviyesinde verilen yanıtlar ayrı tutulur."""
+        model = getattr(self.cfg, "GEMINI_MODEL", "") if self.cfg.AI_PROVIDER == "gemini" \
+            else getattr(self.cfg, "TEXT_MODEL", self.cfg.CODING_MODEL)
+        return f"{self.cfg.AI_PROVIDER}:{model}:{self.security.level_name}"
+
+    def _record_first_token(self, elapsed: float) -> None:
+        """İlk görünür metin gecikmesini response_stats'a işler."""
+        st = self.response_stats
+        st["responses"] += 1
+        st["ttft_last_s"] = round(elapsed, 4)
+        st["ttft_max_s"] = max(st["ttft_max_s"], st["ttft_last_s"])
+        st["ttft_avg_s"] = round(st["ttft_avg_s"] + (elapsed - st["ttft_avg_s"]) / st["responses"], 4)
+
+    def _note_prefix(self, system_prompt: str) -> None:
+        """Statik önek önceki turdakinden farklıysa sayar (KV önbelleği bozulur)."""
+        if system_prompt is self._prefix_text:   # önbellekteki aynı nesne: değişmemiş
+            return
+        self._prefix_text = system_prompt
+        digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        if self._prefix_hash and digest != self._prefix_hash:
+            self.prompt_stats["prefix_changes"] += 1
+        self._prefix_hash = digest
+
+    def _record_prompt_eval(self, step: int, prompt_tokens: int) -> None:
+        """Adımın prompt_eval_count değerini prompt_stats'a işler (ilk adım / sonraki adımlar ayrı)."""
+        st = self.prompt_stats
+        st["steps"] += 1
+        st["prompt_eval_last"] = prompt_tokens
+        st["prompt_eval_avg"] = round(st["prompt_eval_avg"] + (prompt_tokens - st["prompt_eval_avg"]) / st["steps"], 1)
+        if step == 0:
+            self._first_steps += 1
+            n, key = self._first_steps, "first_step_avg"
+        else:
+            n, key = st["steps"] - self._first_steps, "followup_step_avg"
+        st[key] = round(st[key] + (prompt_tokens - st[key]) / n, 1)
+
+    def _record_payload(self, sent_bytes: int, collapsed: int) -> None:
+        """Adımda gönderilen istem baytını ve yeni indirgenen araç çıktısı sayısını payload_stats'a işler."""
+        st = self.payload_stats
+        st["steps"] += 1
+        st["bytes_last"] = sent_bytes
+        st["bytes_avg"] = round(st["bytes_avg"] + (sent_bytes - st["bytes_avg"]) / st["steps"], 1)
+        st["bytes_max"] = max(st["bytes_max"], sent_bytes)
+        st["collapsed_results_total"] += collapsed
+
+    def _record_budget(self, step: int, report: Dict[str, int]) -> None:
+        """Bağlam bütçesi raporunu budget_stats'a işler; kırpma olduysa loglar."""
+        st = self.budget_stats
+        st["steps"] += 1
+        st["trimmed_last"] = report["trimmed"]
+        st["prompt_tokens_last"] = report["after"]
+        st["num_ctx"] = report["num_ctx"]
+        if report["trimmed"]:
+            st["trimmed_steps"] += 1
+            st["trimmed_total"] += report["trimmed"]
+            st["dropped_messages_total"] += report["dropped_messages"]
+            logger.info(
+                "Bağlam bütçesi (adım %d): %d → %d token (num_ctx=%d, %d kırpıldı, %d mesaj düşürüldü)",
+                step + 1, report["before"], report["after"], report["num_ctx"],
+                report["trimmed"], report["dropped_messages"],
+            )
+
     # ─────────────────────────────────────────────
     #  ReAct DÖNGÜSÜ (PYDANTIC PARSING)
     # ─────────────────────────────────────────────
 
-    async def _react_loop(self, user_input: str) -> AsyncIterator[str]:
+    async def _react_loop(self, user_input: str, deadline: Optional[float] = None,
+                          turn: Optional[Dict[str, object]] = None) -> AsyncIterator[str]:
         """
         LLM ile araç çağrısı döngüsü (Asenkron).
         Kullanıcıya yalnızca nihai yanıt metni döndürülür; ara JSON/araç
         çıktıları arka planda işlenir.
+
+        deadline: loop.time() cinsinden son an (None = sınırsız). LLM çağrısı ve
+        akışı bu ana kadar beklenir; araçlar, yanıt yazımı için pay bırakılarak
+        kalan süreden türetilen sınırla çalışır. Süre dolunca eldeki bilgilerle
+        kısmi bir yanıt üretilir.
+
+        turn: verilirse eksiksiz nihai yanıt turn["answer"] alanına yazılır
+        (yanıt önbelleği yalnızca bunları saklar).
         """
-        messages = self.memory.get_messages_for_llm()
-        context = self._build_context()
-        full_system = SIDAR_SYSTEM_PROMPT + "\n\n" + context
+        # İstem düzeni KV önbelleği için sabit önek + değişken kuyruk şeklindedir:
+        # sistem istemi ve statik bağlam adımlar/oturumlar arasında bayt bayt aynı
+        # kalır; sayaçlar, son dosya gibi değişken durum bu turun kullanıcı
+        # mesajının sonuna eklenir (turun tüm adımlarında aynı kalır).
+        full_system = self._static_system_prompt()
+        self._note_prefix(full_system)
+        # Mesajlar yerinde büyür; eski araç çıktıları kısa referanslara indirgenir
+        messages = ReActMessages(
+            self._attach_runtime_state(self.memory.get_messages_for_llm()),
+            keep_full=getattr(self.cfg, "REACT_KEEP_FULL_TOOL_RESULTS", 2),
+            preview_chars=getattr(self.cfg, "REACT_TOOL_PREVIEW_CHARS", 300),
+        )
+        system_bytes = len(full_system.encode("utf-8"))
+        collapsed_seen = 0
+        model = getattr(self.cfg, "TEXT_MODEL", self.cfg.CODING_MODEL)
+        budget_model = getattr(self.cfg, "GEMINI_MODEL", "") if self.cfg.AI_PROVIDER == "gemini" else model
 
         _last_tool: str = ""          # Son çağrılan araç adı
         _last_tool_result: str = ""   # Son araç sonucu (tekrar tespitinde kullanılır)
+        # Adım span'ı bir sonraki adımda kapanır; döngüden çıkılan son adımı kök span kapatır
+        step_span = tracing.NOOP_SPAN
 
         for step in range(self.cfg.MAX_REACT_STEPS):
+            step_span.end()
+            step_span = tracing.start_span("react.step", step=step)
+            if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+                self.timeout_stats["deadline"] += 1
+                yield await self._partial_answer(_last_tool, _last_tool_result)
+                return
+
             # 1. LLM Çağrısı (Async Stream)
             # ReAct döngüsü: düşünme/planlama/özetleme → TEXT_MODEL
             # Kod odaklı araçlara (execute_code, write_file, patch_file) CODING_MODEL
             # atanabilir; ancak döngü genelinde tutarlılık için TEXT_MODEL tercih edilir.
-            response_generator = await self.llm.chat(
-                messages=messages,
-                model=getattr(self.cfg, "TEXT_MODEL", self.cfg.CODING_MODEL),
-                system_prompt=full_system,
-                temperature=0.3,
-                stream=True
-            )
-
-            # LLM yanıtını biriktir
-            llm_response_accumulated = ""
-            async for chunk in response_generator:
-                llm_response_accumulated += chunk
+            fitted, report = self.budgeter.fit(full_system, messages.messages, budget_model,
+                                               protect=messages.protected)
+            self._record_budget(step, report)
+            sent = messages.bytes if not report["trimmed"] else sum(
+                len(m["content"].encode("utf-8")) for m in fitted)
+            self._record_payload(system_bytes + sent, messages.collapsed - collapsed_seen)
+            step_span.set(prompt_bytes=system_bytes + sent)
+            collapsed_seen = messages.collapsed
+            usage: list = []
+            try:
+                # Zamanlayıcı kuyruğu ve bağlantı kurulumu da süreye dahildir
+                async with asyncio.timeout_at(deadline):
+                    response_generator = await self.llm.chat(
+                        messages=fitted,
+                        model=model,
+                        system_prompt=full_system,
+                        temperature=0.3,
+                        stream=True,
+                        caller="react",
+                        usage_sink=usage,
+                    )
+            except TimeoutError:
+                self.timeout_stats["llm"] += 1
+                yield await self._partial_answer(_last_tool, _last_tool_result)
+                return
+
+            # LLM yanıtını biriktir; "tool": "final_answer" görülürse argument
+            # çözüldükçe kullanıcıya akıtılır (yanıtın bitmesi beklenmez)
+            # aclosing: istemci koparsa (SSE) akış hemen kapatılır ve zamanlayıcı slotu boşalır
+            # Süre sınırı yalnızca parça beklenirken uygulanır (yield'ler kapsam dışında kalır)
+            streamer = FinalAnswerStreamer()
+            _parts = []
+            timed_out = False
+            async with aclosing(response_generator):
+                while True:
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            chunk = await anext(response_generator)
+                    except StopAsyncIteration:
+                        break
+                    except TimeoutError:
+                        timed_out = True
+                        break
+                    _parts.append(chunk)
+                    visible = streamer.feed(chunk)
+                    if visible:
+                        yield visible
+            llm_response_accumulated = "".join(_parts)
+            if usage and usage[0].prompt_tokens is not None:
+                self._record_prompt_eval(step, usage[0].prompt_tokens)
+                step_span.set(prompt_tokens=usage[0].prompt_tokens)
+
+            if timed_out:
+                self.timeout_stats["llm"] += 1
+                step_span.set(outcome="timeout")
+                if streamer.streamed:
+                    # Yanıtın bir kısmı kullanıcıya ulaştı: kesildiği belirtilerek saklanır
+                    note = "\n\n… _(süre sınırı nedeniyle yanıt yarıda kesildi)_"
+                    self.timeout_stats["partial_answers"] += 1
+                    await asyncio.to_thread(self.memory.add, "assistant", streamer.argument + note)
+                    yield note
+                else:
+                    yield await self._partial_answer(_last_tool, _last_tool_result)
+                return
+
+            if streamer.streamed:
+                step_span.set(tool="final_answer", outcome="final")
+                # Kullanıcı yanıtı zaten gördü: akıtılan argument nihai yanıttır
+                # (sonradan gelen bozuk/eksik alanlar yeniden denemeye yol açmaz).
+                final_text = streamer.argument
+                if not final_text.strip():
+                    final_text = "✓ İşlem tamamlandı."
+                    yield final_text
+                elif turn is not None:
+                    turn["answer"] = final_text
+                await asyncio.to_thread(self.memory.add, "assistant", final_text)
+                return
 
             # 2. JSON Ayrıştırma ve Yapısal Doğrulama (Pydantic)
             try:
@@ -234,57 +630,69 @@ class SidarAgent:
                 
                 tool_name = action_data.tool
                 tool_arg = action_data.argument
+                step_span.set(tool=tool_name, outcome="final" if tool_name == "final_answer" else "tool")
 
                 if tool_name == "final_answer":
                     # Boş argument güvenlik ağı: JS'de falsy olduğu için UI "yanıt alınamadı" gösterir.
                     if not str(tool_arg).strip():
                         tool_arg = "✓ İşlem tamamlandı."
+                    elif turn is not None:
+                        turn["answer"] = str(tool_arg)
                     await asyncio.to_thread(self.memory.add, "assistant", tool_arg)
                     yield str(tool_arg)
                     return
 
+                # Paralel grupta tekrar tespiti çağrıların tamamına göre yapılır
+                calls = action_data.calls if tool_name == "parallel" else []
+                tool_key = "|".join(f"{c.tool}:{c.argument}" for c in calls) if calls else tool_name
+
                 # ── Tekrar tespiti: aynı araç art arda 2+ kez çağrılıyorsa
                 # modeli zorla final_answer ver.
-                if tool_name == _last_tool and _last_tool_result:
+                if tool_key == _last_tool and _last_tool_result:
                     loop_correction = (
                         f"[Sistem Uyarısı] '{tool_name}' aracı art arda çağrıldı — döngü tespit edildi.\n"
                         f"Bu araç zaten aşağıdaki sonucu döndürdü:\n===\n{_last_tool_result}\n===\n"
                         f"Artık MUTLAKA final_answer aracını kullanarak bu sonucu kullanıcıya ilet.\n"
                         f"Örnek: {{\"thought\": \"Sonuç mevcut.\", \"tool\": \"final_answer\", \"argument\": \"<özet>\"}}"
                     )
-                    messages = messages + [
-                        {"role": "assistant", "content": llm_response_accumulated},
-                        {"role": "user", "content": loop_correction},
-                    ]
+                    messages.add_step(llm_response_accumulated, loop_correction)
+                    step_span.set(outcome="loop")
+                    continue
+
+                if calls:
+                    # Bağımsız araçlar tek adımda çalıştırılır; sonuçlar tek mesajda döner
+                    limit = getattr(self.cfg, "REACT_MAX_PARALLEL_TOOLS", 4)
+                    for call in calls[:limit]:
+                        yield f"\x00TOOL:{call.tool}\x00"
+                    feedback = await self._run_tool_batch(calls, limit, self._tool_deadline(deadline))
+                    _last_tool = tool_key
+                    _last_tool_result = feedback[:2000]
+                    messages.add_step(llm_response_accumulated, feedback)
                     continue
 
                 # Araç çağrısını UI'ya bildir (sentinel format: \x00TOOL:<name>\x00)
                 yield f"\x00TOOL:{tool_name}\x00"
 
-                # Aracı asenkron çalıştır
-                tool_result = await self._execute_tool(tool_name, tool_arg)
+                # Aracı asenkron çalıştır (kalan süreden türetilen sınırla)
+                tool_result = await self._execute_tool_until(tool_name, tool_arg, self._tool_deadline(deadline))
 
                 if tool_result is None:
-                    messages = messages + [
-                         {"role": "assistant", "content": llm_response_accumulated},
-                         {"role": "user", "content": _FMT_TOOL_ERR.format(
-                             name=tool_name,
-                             error="Bu araç yok veya geçersiz bir işlem seçildi."
-                         )},
-                    ]
+                    step_span.set(outcome="unknown_tool")
+                    messages.add_step(llm_response_accumulated, _FMT_TOOL_ERR.format(
+                        name=tool_name,
+                        error="Bu araç yok veya geçersiz bir işlem seçildi.",
+                    ))
                     continue
 
                 # Son araç bilgisini güncelle (tekrar tespiti için)
                 _last_tool = tool_name
                 _last_tool_result = str(tool_result)[:2000]  # bellek tasarrufu
 
-                messages = messages + [
-                    {"role": "assistant", "content": llm_response_accumulated},
-                    {"role": "user", "content": _FMT_TOOL_OK.format(name=tool_name, result=tool_result)},
-                ]
+                messages.add_step(llm_response_accumulated, _FMT_TOOL_OK.format(name=tool_name, result=tool_result))
 
             except ValidationError as ve:
                 logger.warning("Pydantic doğrulama hatası:\n%s", ve)
+                step_span.set(outcome="json_retry")
                 error_feedback = _FMT_SYS_ERR.format(
                     msg=(
                         f"Ürettiğin JSON yapısı beklentilere uymuyor.\n"
@@ -293,12 +701,10 @@ class SidarAgent:
                         f'{{"thought": "düşüncen", "tool": "araç_adı", "argument": "argüman"}}'
                     )
                 )
-                messages = messages + [
-                    {"role": "assistant", "content": llm_response_accumulated},
-                    {"role": "user", "content": error_feedback},
-                ]
+                messages.add_step(llm_response_accumulated, error_feedback)
             except (ValueError, json.JSONDecodeError) as e:
                 logger.warning("JSON ayrıştırma hatası: %s", e)
+                step_span.set(outcome="json_retry")
                 error_feedback = _FMT_SYS_ERR.format(
                     msg=(
                         f"Yanıtın geçerli bir JSON formatında değil veya bozuk: {e}\n\n"
@@ -306,12 +712,10 @@ class SidarAgent:
                         f"sadece düz geçerli bir JSON objesi olarak ver."
                     )
                 )
-                messages = messages + [
-                    {"role": "assistant", "content": llm_response_accumulated},
-                    {"role": "user", "content": error_feedback},
-                ]
+                messages.add_step(llm_response_accumulated, error_feedback)
             except Exception as exc:
                  logger.exception("ReAct döngüsünde beklenmeyen hata: %s", exc)
+                 step_span.end("error", error=type(exc).__name__)
                  yield "Üzgünüm, yanıt üretirken beklenmeyen bir hata oluştu."
                  return
             
@@ -323,36 +727,36 @@ class SidarAgent:
 
     async def _tool_list_dir(self, a: str) -> str:
         # Dizin listeleme disk I/O içerir — event loop'u bloke etmemek için thread'e itilir
-        _, result = await asyncio.to_thread(self.code.list_directory, a or ".")
-        return result
+        ok, result = await asyncio.to_thread(self.code.list_directory, a or ".")
+        return _outcome(ok, result)
 
     async def _tool_read_file(self, a: str) -> str:
-        if not a: return "Dosya yolu belirtilmedi."
+        if not a: return _ToolFailure("Dosya yolu belirtilmedi.")
         # Disk okuma event loop'u bloke eder — thread'e itilir
         ok, result = await asyncio.to_thread(self.code.read_file, a)
         if ok: await asyncio.to_thread(self.memory.set_last_file, a)
-        return result
+        return _outcome(ok, result)
 
     async def _tool_write_file(self, a: str) -> str:
         parts = a.split("|||", 1)
         if len(parts) < 2: return "⚠ Hatalı format. Kullanım: path|||content"
         # Disk yazma event loop'u bloke eder — thread'e itilir
-        _, result = await asyncio.to_thread(self.code.write_file, parts[0].strip(), parts[1])
-        return result
+        ok, result = await asyncio.to_thread(self.code.write_file, parts[0].strip(), parts[1])
+        return _outcome(ok, result)
 
     async def _tool_patch_file(self, a: str) -> str:
         parts = a.split("|||")
         if len(parts) < 3: return "⚠ Hatalı patch formatı. Kullanım: path|||eski_kod|||yeni_kod"
         # Disk okuma+yazma event loop'u bloke eder — thread'e itilir
-        _, result = await asyncio.to_thread(self.code.patch_file, parts[0].strip(), parts[1], parts[2])
-        return result
+        ok, result = await asyncio.to_thread(self.code.patch_file, parts[0].strip(), parts[1], parts[2])
+        return _outcome(ok, result)
 
     async def _tool_execute_code(self, a: str) -> str:
         if not a: return "⚠ Çalıştırılacak kod belirtilmedi."
         # execute_code içinde time.sleep(0.5) döngüsü var — event loop'u dondurur.
         # asyncio.to_thread ile ayrı bir thread'de çalıştırılır; web sunucusu kilitlenmez.
-        _, result = await asyncio.to_thread(self.code.execute_code, a)
-        return result
+        ok, result = await asyncio.to_thread(self.code.execute_code, a)
+        return _outcome(ok, result)
 
     async def _tool_audit(self, a: str) -> str:
         # Tüm .py dosyalarını tararken ağır disk I/O yapılır — thread'e itilir
@@ -367,25 +771,25 @@ class SidarAgent:
     async def _tool_github_commits(self, a: str) -> str:
         try: n = int(a)
         except: n = 10
-        _, result = self.github.list_commits(n=n)
-        return result
+        ok, result = self.github.list_commits(n=n)
+        return _outcome(ok, result)
 
     async def _tool_github_info(self, _: str) -> str:
-        _, result = self.github.get_repo_info()
-        return result
+        ok, result = self.github.get_repo_info()
+        return _outcome(ok, result)
 
     async def _tool_github_read(self, a: str) -> str:
-        if not a: return "⚠ Okunacak GitHub dosya yolu belirtilmedi."
-        _, result = self.github.read_remote_file(a)
-        return result
+        if not a: return _ToolFailure("⚠ Okunacak GitHub dosya yolu belirtilmedi.")
+        ok, result = self.github.read_remote_file(a)
+        return _outcome(ok, result)
 
     async def _tool_github_list_files(self, a: str) -> str:
         """GitHub deposundaki dizin içeriğini listele. Argüman: 'path[|||branch]'"""
         parts = a.split("|||")
         path = parts[0].strip() if parts else ""
         branch = parts[1].strip() if len(parts) > 1 else None
-        _, result = self.github.list_files(path, branch)
-        return result
+        ok, result = self.github.list_files(path, branch)
+        return _outcome(ok, result)
 
     async def _tool_github_write(self, a: str) -> str:
         """GitHub'a dosya yaz/güncelle. Argüman: 'path|||content|||commit_message[|||branch]'"""
@@ -398,8 +802,8 @@ class SidarAgent:
         branch = parts[3].strip() if len(parts) > 3 else None
         if not self.github.is_available():
             return "⚠ GitHub token ayarlanmamış."
-        _, result = self.github.create_or_update_file(path, content, message, branch)
-        return result
+        ok, result = self.github.create_or_update_file(path, content, message, branch)
+        return _outcome(ok, result)
 
     async def _tool_github_create_branch(self, a: str) -> str:
         """GitHub'da yeni dal oluştur. Argüman: 'branch_adı[|||kaynak_branch]'"""
@@ -410,8 +814,8 @@ class SidarAgent:
         from_branch = parts[1].strip() if len(parts) > 1 else None
         if not self.github.is_available():
             return "⚠ GitHub token ayarlanmamış."
-        _, result = self.github.create_branch(branch_name, from_branch)
-        return result
+        ok, result = self.github.create_branch(branch_name, from_branch)
+        return _outcome(ok, result)
 
     async def _tool_github_create_pr(self, a: str) -> str:
         """GitHub Pull Request oluştur. Argüman: 'başlık|||açıklama|||head_branch[|||base_branch]'"""
@@ -424,73 +828,73 @@ class SidarAgent:
         base = parts[3].strip() if len(parts) > 3 else None
         if not self.github.is_available():
             return "⚠ GitHub token ayarlanmamış."
-        _, result = self.github.create_pull_request(title, body, head, base)
-        return result
+        ok, result = self.github.create_pull_request(title, body, head, base)
+        return _outcome(ok, result)
 
     async def _tool_github_search_code(self, a: str) -> str:
         """GitHub deposunda kod ara. Argüman: arama_sorgusu"""
         if not a:
-            return "⚠ Arama sorgusu belirtilmedi."
+            return _ToolFailure("⚠ Arama sorgusu belirtilmedi.")
         if not self.github.is_available():
-            return "⚠ GitHub token ayarlanmamış."
-        _, result = self.github.search_code(a)
-        return result
+            return _ToolFailure("⚠ GitHub token ayarlanmamış.")
+        ok, result = self.github.search_code(a)
+        return _outcome(ok, result)
 
     async def _tool_web_search(self, a: str) -> str:
-        if not a: return "⚠ Arama sorgusu belirtilmedi."
-        _, result = await self.web.search(a)
-        return result
+        if not a: return _ToolFailure("⚠ Arama sorgusu belirtilmedi.")
+        ok, result = await self.web.search(a)
+        return _outcome(ok, result)
 
     async def _tool_fetch_url(self, a: str) -> str:
-        if not a: return "⚠ URL belirtilmedi."
-        _, result = await self.web.fetch_url(a)
-        return result
+        if not a: return _ToolFailure("⚠ URL belirtilmedi.")
+        ok, result = await self.web.fetch_url(a)
+        return _outcome(ok, result)
 
     async def _tool_search_docs(self, a: str) -> str:
         parts = a.split(" ", 1)
         lib, topic = parts[0], (parts[1] if len(parts) > 1 else "")
-        _, result = await self.web.search_docs(lib, topic)
-        return result
+        ok, result = await self.web.search_docs(lib, topic)
+        return _outcome(ok, result)
 
     async def _tool_search_stackoverflow(self, a: str) -> str:
-        _, result = await self.web.search_stackoverflow(a)
-        return result
+        ok, result = await self.web.search_stackoverflow(a)
+        return _outcome(ok, result)
 
     async def _tool_pypi(self, a: str) -> str:
-        _, result = await self.pkg.pypi_info(a)
-        return result
+        ok, result = await self.pkg.pypi_info(a)
+        return _outcome(ok, result)
 
     async def _tool_pypi_compare(self, a: str) -> str:
         parts = a.split("|", 1)
-        if len(parts) < 2: return "⚠ Kullanım: paket|mevcut_sürüm"
-        _, result = await self.pkg.pypi_compare(parts[0].strip(), parts[1].strip())
-        return result
+        if len(parts) < 2: return _ToolFailure("⚠ Kullanım: paket|mevcut_sürüm")
+        ok, result = await self.pkg.pypi_compare(parts[0].strip(), parts[1].strip())
+        return _outcome(ok, result)
 
     async def _tool_npm(self, a: str) -> str:
-        _, result = await self.pkg.npm_info(a)
-        return result
+        ok, result = await self.pkg.npm_info(a)
+        return _outcome(ok, result)
 
     async def _tool_gh_releases(self, a: str) -> str:
-        _, result = await self.pkg.github_releases(a)
-        return result
+        ok, result = await self.pkg.github_releases(a)
+        return _outcome(ok, result)
 
     async def _tool_gh_latest(self, a: str) -> str:
-        _, result = await self.pkg.github_latest_release(a)
-        return result
+        ok, result = await self.pkg.github_latest_release(a)
+        return _outcome(ok, result)
 
     async def _tool_docs_search(self, a: str) -> str:
         # Opsiyonel mode: "sorgu|mode"  (mode: auto/vector/bm25/keyword)
         parts = a.split("|", 1)
         query = parts[0].strip()
         mode  = parts[1].strip() if len(parts) > 1 else "auto"
-        _, result = self.docs.search(query, mode=mode)
-        return result
+        ok, result = self.docs.search(query, mode=mode)
+        return _outcome(ok, result)
 
     async def _tool_docs_add(self, a: str) -> str:
         parts = a.split("|", 1)
         if len(parts) < 2: return "⚠ Kullanım: başlık|url"
-        _, result = await self.docs.add_document_from_url(parts[1].strip(), title=parts[0].strip())
-        return result
+        ok, result = await self.docs.add_document_from_url(parts[1].strip(), title=parts[0].strip())
+        return _outcome(ok, result)
 
     async def _tool_docs_list(self, _: str) -> str:
         return self.docs.list_documents()
@@ -580,6 +984,111 @@ class SidarAgent:
         ]
         return "\n".join(lines)
 
+    async def _run_tool_batch(self, calls: List[ToolStep], limit: int, until: Optional[float] = None) -> str:
+        """
+        'parallel' grubunu çalıştırır ve tüm sonuçları tek geri bildirim mesajında birleştirir.
+        Ardışık salt-okunur araçlar asyncio.gather ile eşzamanlı çalışır; yan etkili bir
+        araç bariyerdir (öncesi tamamlanır, kendisi tek başına çalışır), böylece
+        modelin verdiği sıra yazma → okuma bağımlılıklarında korunur.
+        """
+        started = time.monotonic()
+        batch = calls[:limit]
+        results: List[Optional[str]] = [None] * len(batch)
+        group: List[int] = []
+
+        async def flush() -> None:
+            outs = await asyncio.gather(
+                *(self._execute_tool_until(batch[i].tool, batch[i].argument, until, limited=True) for i in group),
+                return_exceptions=True,
+            )
+            for i, out in zip(group, outs):
+                if isinstance(out, Exception):
+                    logger.warning("Paralel araç hatası (%s): %s", batch[i].tool, out)
+                    out = f"Araç hatası: {out}"
+                results[i] = out
+            group.clear()
+
+        for i, call in enumerate(batch):
+            if call.tool in self.READ_ONLY_TOOLS:
+                group.append(i)
+                continue
+            await flush()
+            results[i] = await self._execute_tool_until(call.tool, call.argument, until)
+        await flush()
+
+        parts = []
+        for call, result in zip(batch, results):
+            if result is None:
+                parts.append(_FMT_TOOL_ERR.format(
+                    name=call.tool, error="Bu araç yok veya geçersiz bir işlem seçildi.") + "\n")
+            else:
+                parts.append(_FMT_TOOL_RESULT.format(name=call.tool, result=result))
+        if len(calls) > limit:
+            skipped = ", ".join(c.tool for c in calls[limit:])
+            parts.append(f"[Sistem Uyarısı] Bir adımda en fazla {limit} araç çalıştırılır; "
+                         f"atlananlar: {skipped}\n")
+
+        st = self.tool_stats
+        st["batches"] += 1
+        st["batched_calls"] += len(batch)
+        st["round_trips_saved"] += len(batch) - 1
+        st["last_batch_s"] = round(time.monotonic() - started, 3)
+        return "".join(parts) + _TOOL_RULES
+
+    # ─────────────────────────────────────────────
+    #  SÜRE SINIRI (REACT_TIMEOUT)
+    # ─────────────────────────────────────────────
+
+    def _tool_deadline(self, deadline: Optional[float]) -> Optional[float]:
+        """
+        Araçların bitmesi gereken an: kalan sürenin bir kısmı (en fazla
+        REACT_ANSWER_RESERVE saniye, en çok yarısı) modelin yanıtı yazması için ayrılır.
+        """
+        if deadline is None:
+            return None
+        remaining = deadline - asyncio.get_running_loop().time()
+        reserve = min(getattr(self.cfg, "REACT_ANSWER_RESERVE", 10.0), max(remaining, 0) / 2)
+        return deadline - reserve
+
+    async def _execute_tool_until(self, tool_name: str, tool_arg: str, until: Optional[float],
+                                  limited: bool = False) -> Optional[str]:
+        """
+        Aracı `until` anına kadar bekler; aşılırsa zaman aşımı sonucunu döndürür.
+        Not: asyncio.to_thread ile çalışan işler iptal edilemez, yalnızca beklenmez.
+        """
+        run = self._execute_tool_limited if limited else self._execute_tool
+        started = asyncio.get_running_loop().time()
+        try:
+            async with asyncio.timeout_at(until):
+                return await run(tool_name, tool_arg)
+        except TimeoutError:
+            self.timeout_stats["tool"] += 1
+            waited = asyncio.get_running_loop().time() - started
+            logger.warning("Araç süre sınırını aştı: %s (%.1f s)", tool_name, waited)
+            msg = _FMT_TOOL_TIMEOUT.format(seconds=waited)
+            return msg + _FMT_WRITE_TIMEOUT_NOTE if tool_name in WRITES_TO else msg
+
+    async def _partial_answer(self, last_tool: str, last_result: str) -> str:
+        """Süre dolduğunda eldeki son araç sonucuyla kısmi yanıt üretir ve belleğe yazar."""
+        self.timeout_stats["partial_answers"] += 1
+        text = (f"⏱ Bu istek için ayrılan süre ({getattr(self.cfg, 'REACT_TIMEOUT', 0)} s) doldu; "
+                f"yanıt tamamlanamadı.")
+        if last_result:
+            tools = ", ".join(dict.fromkeys(part.split(":", 1)[0] for part in last_tool.split("|")))
+            text += (f"\n\nŞu ana kadar toplanan son bilgi (`{tools}`):\n```\n{last_result[:1500]}\n```"
+                     f"\nDaha dar bir istekle veya daha sonra yeniden deneyebilirsin.")
+        await asyncio.to_thread(self.memory.add, "assistant", text)
+        return text
+
+    async def _execute_tool_limited(self, tool_name: str, tool_arg: str) -> Optional[str]:
+        """Aracı, araç başına eşzamanlılık sınırı altında çalıştırır."""
+        sem = self._tool_sems.get(tool_name)
+        if sem is None:
+            default = getattr(self.cfg, "REACT_TOOL_CONCURRENCY", 4)
+            sem = self._tool_sems[tool_name] = asyncio.Semaphore(self.TOOL_CONCURRENCY.get(tool_name, default))
+        async with sem:
+            return await self._execute_tool(tool_name, tool_arg)
+
     async def _execute_tool(self, tool_name: str, tool_arg: str) -> Optional[str]:
         """Dispatch tablosu aracılığıyla araç handler'ını çağırır."""
         tool_arg = str(tool_arg).strip()
@@ -617,7 +1126,48 @@ class SidarAgent:
             "print_config_summary":   self._tool_get_config,   # alias — gereksiz LLM turu önleme
         }
         handler = dispatch.get(tool_name)
-        return await handler(tool_arg) if handler else None
+        if handler is None:
+            return None
+        with tracing.start_span("tool", tool=tool_name, arg_chars=len(tool_arg)) as span:
+            cache = self.tool_cache
+            session = self.memory.active_session_id or ""
+            # Belge deposu araçdan bağımsız da değişebilir (AutoHandle, web yüklemesi): sürüme bağlanır
+            version = self.docs.version if tool_name in ("docs_search", "docs_list") else None
+            if cache is not None:
+                cached = cache.get(session, tool_name, tool_arg, version)
+                if cached is not None:
+                    if tool_name == "read_file":   # önbellekten okunsa da "son dosya" güncellenir
+                        await asyncio.to_thread(self.memory.set_last_file, tool_arg)
+                    span.set(cache_hit=True, result_bytes=len(str(cached).encode("utf-8")))
+                    return cached
+            if tool_name in WRITES_TO:
+                # Süre sınırı yalnızca bekleyişi iptal eder; to_thread yazımı yine de biter.
+                # Sürüm artışı ve önbellek temizliği iptalde de yapılır, geç biten yazım için tekrarlanır.
+                task = asyncio.ensure_future(handler(tool_arg))
+                try:
+                    result = await asyncio.shield(task)
+                finally:
+                    self._after_write(tool_name, tool_arg)
+                    if not task.done():
+                        task.add_done_callback(lambda _t: self._after_write(tool_name, tool_arg))
+                span.set(result_bytes=len(str(result).encode("utf-8")))
+                return result
+            result = await handler(tool_arg)
+            span.set(result_bytes=len(str(result).encode("utf-8")))
+            if cache is not None:
+                if cache.cacheable(tool_name):
+                    # Ağ hatası / bulunamayan dosya gibi başarısız sonuçlar saklanmaz
+                    if not isinstance(result, _ToolFailure):
+                        cache.put(session, tool_name, tool_arg, result, version)
+                else:
+                    cache.invalidate_after(tool_name, tool_arg)
+            return result
+
+    def _after_write(self, tool_name: str, tool_arg: str) -> None:
+        """Yazan aracın ardından durum sürümünü artırır ve ilgili önbellek kayıtlarını siler."""
+        self.state_epochs[WRITES_TO[tool_name]] += 1
+        if self.tool_cache is not None:
+            self.tool_cache.invalidate_after(tool_name, tool_arg)
 
     # ─────────────────────────────────────────────
     #  BAĞLAM OLUŞTURMA
@@ -625,9 +1175,28 @@ class SidarAgent:
 
     def _build_context(self) -> str:
         """
-        Tüm alt sistem durumlarını özetleyen bağlam dizesi.
-        Her LLM turunda system_prompt'a eklenir; model bu değerleri
-        ASLA tahmin etmemelidir — gerçek runtime değerler burada verilir.
+        Tüm alt sistem durumlarını özetleyen bağlam dizesi (statik + değişken).
+        Model bu değerleri ASLA tahmin etmemelidir — gerçek runtime değerler burada verilir.
+        """
+        return self.context.get("static") + "\n\n" + self.context.get("runtime")
+
+    def _static_system_prompt(self) -> str:
+        """Sistem istemi + statik bağlam: süreç boyunca değişmez (KV önbelleği öneki)."""
+        return self.context.get("system")
+
+    def _attach_runtime_state(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Değişken durumu son kullanıcı mesajının sonuna ekler (önek bozulmaz)."""
+        state = self.context.get("runtime")
+        if messages and messages[-1]["role"] == "user":
+            last = messages[-1]
+            return messages[:-1] + [{"role": "user", "content": f"{last['content']}\n\n{state}"}]
+        return messages + [{"role": "user", "content": state}]
+
+    def _build_static_context(self) -> str:
+        """
+        Yalnızca yapılandırmaya bağlı, çalışma boyunca değişmeyen bağlam.
+        Buraya sayaç, zaman veya dosya adı gibi değişken bir değer EKLENMEMELİDİR;
+        aksi halde her turda Ollama istemi baştan değerlendirir.
         """
         lines = []
 
@@ -653,6 +1222,11 @@ class SidarAgent:
         gh_status = f"Bağlı — {self.cfg.GITHUB_REPO}" if self.github.is_available() else "Bağlı değil"
         lines.append(f"  GitHub     : {gh_status}")
         lines.append(f"  WebSearch  : {'Aktif' if self.web.is_available() else 'Kurulu değil'}")
+        return "\n".join(lines)
+
+    def _build_runtime_state(self) -> str:
+        """Turdan tura değişen durum (belge/dosya sayaçları, son dosya)."""
+        lines = ["[Güncel Durum]"]
         lines.append(f"  RAG        : {self.docs.status()}")
 
         m = self.code.get_metrics()
@@ -668,22 +1242,41 @@ class SidarAgent:
     #  BELLEK ÖZETLEME VE VEKTÖR ARŞİVLEME (ASYNC)
     # ─────────────────────────────────────────────
 
+    def _schedule_summarization(self) -> None:
+        """Eşik aşıldıysa ve çalışan bir görev yoksa arka plan özetlemesini başlatır."""
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        if not self.memory.needs_summarization():
+            return
+        self._summary_task = asyncio.create_task(self._summarize_memory())
+
+    async def flush_background_tasks(self) -> None:
+        """Bekleyen arka plan özetlemesinin bitmesini bekler (CLI tek komut modu vb.)."""
+        if self._summary_task is not None and not self._summary_task.done():
+            await asyncio.gather(self._summary_task, return_exceptions=True)
+
     async def _summarize_memory(self) -> None:
         """
-        Konuşma geçmişini LLM ile özetler ve belleği sıkıştırır.
-        AYRICA: Eski konuşmaları 'Sonsuz Hafıza' için Vektör DB'ye (ChromaDB) gömer.
+        Kayan özetleme: yalnızca en eski MEMORY_SUMMARY_WINDOW turu mevcut
+        özetle birleştirip sıkıştırır; son MEMORY_KEEP_RECENT tur aynen kalır.
+        AYRICA: Sıkıştırılan turları 'Sonsuz Hafıza' için Vektör DB'ye (ChromaDB) gömer.
         """
-        history = self.memory.get_history()
-        if len(history) < 4:
+        started = time.monotonic()
+        session_id = self.memory.active_session_id
+        window = self.memory.get_summary_window(
+            max_turns=getattr(self.cfg, "MEMORY_SUMMARY_WINDOW", 10),
+            keep_recent=getattr(self.cfg, "MEMORY_KEEP_RECENT", 6),
+        )
+        if len(window) < 2:
             return
 
         # 1. VEKTÖR BELLEK (SONSUZ HAFIZA) KAYDI
-        # Kısa özetlemeye geçmeden önce, tüm detayları RAG sistemine kaydediyoruz
+        # Pencere özetlenmeden önce tüm detayları RAG sistemine kaydediyoruz
         full_turns_text = "\n\n".join(
             f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t.get('timestamp', time.time())))}] {t['role'].upper()}:\n{t['content']}"
-            for t in history
+            for t in window
         )
-        
+
         try:
             await asyncio.to_thread(
                 self.docs.add_document,
@@ -696,17 +1289,23 @@ class SidarAgent:
         except Exception as exc:
             logger.warning("Vektör belleğe kayıt başarısız: %s", exc)
 
-        # 2. KISA SÜRELİ BELLEK ÖZETLEMESİ
-        # LLM token tasarrufu için sadece ilk 400 karakterlik kısımları gönderiyoruz
-        turns_text_short = "\n".join(
-            f"{t['role'].upper()}: {t['content'][:400]}"
-            for t in history
+        # 2. KAYAN ÖZET
+        # Yalnızca pencere gönderildiği için tur başına daha geniş bir kesit sığar
+        turns_text = "\n".join(
+            f"{t['role'].upper()}: {t['content'][:1500]}"
+            for t in window
         )
+        previous = self.memory.get_summary()
         summarize_prompt = (
-            "Aşağıdaki konuşmayı kısa ve bilgilendirici şekilde özetle. "
-            "Teknik detayları, dosya adlarını ve kod kararlarını koru:\n\n"
-            + turns_text_short
+            "Aşağıdaki konuşma parçasını kısa ve bilgilendirici şekilde özetle. "
+            "Teknik detayları, dosya adlarını ve kod kararlarını koru."
         )
+        if previous:
+            summarize_prompt += (
+                " Mevcut özeti yeni parçayla birleştirerek TEK bir güncel özet yaz.\n\n"
+                f"[MEVCUT ÖZET]\n{previous}\n"
+            )
+        summarize_prompt += f"\n[YENİ KONUŞMA PARÇASI]\n{turns_text}"
         try:
             summary = await self.llm.chat(
                 messages=[{"role": "user", "content": summarize_prompt}],
@@ -714,10 +1313,23 @@ class SidarAgent:
                 temperature=0.1,
                 stream=False,
                 json_mode=False,
+                caller="summary",
+                priority="background",
+            )
+            saved = await asyncio.to_thread(
+                self.memory.apply_rolling_summary, str(summary), window, session_id
+            )
+            duration = time.monotonic() - started
+            self.summary_stats["runs"] += 1
+            self.summary_stats["last_duration_s"] = round(duration, 3)
+            self.summary_stats["last_tokens_saved"] = saved
+            self.summary_stats["tokens_saved_total"] += saved
+            logger.info(
+                "Bellek özetlendi: %d tur sıkıştırıldı, %d token kazanıldı (%.2fs).",
+                len(window), saved, duration,
             )
-            self.memory.apply_summary(str(summary))
-            logger.info("Bellek özetlendi (%d → 2 mesaj).", len(history))
         except Exception as exc:
+            self.summary_stats["failures"] += 1
             logger.warning("Bellek özetleme başarısız: %s", exc)
 
     # ─────────────────────────────────────────────
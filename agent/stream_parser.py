@@ -0,0 +1,248 @@
+"""
+Sidar Project - Artımlı ReAct Yanıt Ayrıştırıcısı
+LLM akışı sürerken {"thought", "tool", "argument"} JSON nesnesini parça parça
+ayrıştırır. "tool": "final_answer" görüldüğü anda "argument" dizesi çözüldükçe
+kullanıcıya akıtılabilir; yanıtın tamamlanması beklenmez.
+
+Yalnızca ilk üst düzey JSON nesnesi izlenir; iç içe değerler (nesne, dizi,
+sayı) atlanır. Nihai doğrulama yine tam metin üzerinden ToolCall ile yapılır.
+"""
+
+import re
+from typing import Optional
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Ayrıştırıcı durumları
+_BEFORE = 0        # ilk '{' bekleniyor
+_KEY = 1           # anahtar dizesi veya '}' bekleniyor
+_COLON = 2         # ':' bekleniyor
+_VALUE = 3         # değer bekleniyor
+_COMMA = 4         # ',' veya '}' bekleniyor
+_STRING = 5        # dize içinde (anahtar veya değer)
+_SKIP = 6          # dize olmayan değer atlanıyor
+_DONE = 7          # üst düzey nesne kapandı
+
+
+class FinalAnswerStreamer:
+    """
+    feed() ile gelen parçaları işler ve kullanıcıya gösterilebilecek yeni
+    final_answer metnini döndürür. "argument", "tool" alanından önce gelirse
+    tampon tutulur ve araç final_answer olarak doğrulanınca bir kerede verilir.
+    """
+
+    def __init__(self) -> None:
+        self._state = _BEFORE
+        self._in_key = False
+        self._key = ""
+        self._buf: list = []          # o an okunan dizenin parçaları
+        self._escape = ""             # yarım kalmış kaçış dizisi ("\\" veya "\\uXX")
+        self._high_surrogate: Optional[int] = None
+        self._skip_depth = 0
+        self._skip_in_string = False
+        self._skip_escape = False
+
+        self.tool: Optional[str] = None
+        self._argument: list = []
+        self._pending: list = []      # henüz verilmemiş argument parçaları
+        self.argument_complete = False
+        self._emitted = 0
+
+    # ─────────────────────────────────────────────
+    #  DURUM
+    # ─────────────────────────────────────────────
+
+    @property
+    def is_final(self) -> bool:
+        return self.tool == "final_answer"
+
+    @property
+    def done(self) -> bool:
+        """Üst düzey JSON nesnesi tamamen okundu."""
+        return self._state == _DONE
+
+    @property
+    def argument(self) -> str:
+        """Şu ana kadar çözülmüş argument metni."""
+        return "".join(self._argument)
+
+    @property
+    def streamed(self) -> str:
+        """Kullanıcıya şimdiye kadar verilmiş metin."""
+        return self.argument[:self._emitted]
+
+    # ─────────────────────────────────────────────
+    #  BESLEME
+    # ─────────────────────────────────────────────
+
+    def feed(self, chunk: str) -> str:
+        """Parçayı işler; final_answer ise yeni görünür metni döndürür (yoksa "")."""
+        i, n = 0, len(chunk)
+        while i < n and self._state != _DONE:
+            state = self._state
+            if state == _STRING:
+                i = self._read_string(chunk, i)
+                continue
+            if state == _SKIP:
+                i = self._skip_value(chunk, i)
+                continue
+
+            c = chunk[i]
+            i += 1
+            if c.isspace():
+                continue
+            if state == _BEFORE:
+                if c == "{":
+                    self._state = _KEY
+            elif state == _KEY:
+                if c == '"':
+                    self._begin_string(in_key=True)
+                elif c == "}":
+                    self._state = _DONE
+            elif state == _COLON:
+                if c == ":":
+                    self._state = _VALUE
+            elif state == _VALUE:
+                if c == '"':
+                    self._begin_string(in_key=False)
+                else:
+                    self._state = _SKIP
+                    self._skip_depth = 1 if c in "{[" else 0
+                    if c not in "{[":
+                        i -= 1  # sayı / true / null: ilk karakteri yeniden değerlendir
+            elif state == _COMMA:
+                if c == ",":
+                    self._state = _KEY
+                elif c == "}":
+                    self._state = _DONE
+        return self._flush()
+
+    def _flush(self) -> str:
+        if not self.is_final or not self._pending:
+            return ""
+        new = "".join(self._pending)
+        self._pending.clear()
+        self._emitted += len(new)
+        return new
+
+    def _begin_string(self, in_key: bool) -> None:
+        self._state = _STRING
+        self._in_key = in_key
+        self._buf = []
+
+    def _append(self, text: str) -> None:
+        if not text:
+            return
+        if not self._in_key and self._key == "argument":
+            self._argument.append(text)
+            self._pending.append(text)
+        else:
+            self._buf.append(text)
+
+    def _read_string(self, chunk: str, i: int) -> int:
+        n = len(chunk)
+        while i < n:
+            if self._escape:
+                i = self._read_escape(chunk, i)
+                continue
+            m = _STRING_SPECIAL.search(chunk, i)
+            end = m.start() if m else n
+            if end > i:
+                self._append_plain(chunk[i:end])
+            if m is None:
+                return n
+            if chunk[end] == "\\":
+                self._escape = "\\"
+                i = end + 1
+                continue
+            # Dize kapandı
+            self._end_string()
+            return end + 1
+        return i
+
+    def _append_plain(self, text: str) -> None:
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            self._append("\ufffd")
+        self._append(text)
+
+    def _read_escape(self, chunk: str, i: int) -> int:
+        n = len(chunk)
+        if self._escape == "\\":
+            c = chunk[i]
+            if c == "u":
+                self._escape = "\\u"
+                return i + 1
+            self._escape = ""
+            self._append_plain(_SIMPLE_ESCAPES.get(c, c))
+            return i + 1
+        # \uXXXX — onaltılık rakamlar parçalar arasında bölünmüş olabilir
+        need = 6 - len(self._escape)
+        take = chunk[i:i + need]
+        self._escape += take
+        if len(self._escape) < 6:
+            return n
+        try:
+            code = int(self._escape[2:], 16)
+        except ValueError:
+            code = 0xFFFD
+        self._escape = ""
+        if 0xD800 <= code < 0xDC00:
+            if self._high_surrogate is not None:
+                self._append("\ufffd")
+            self._high_surrogate = code
+        elif 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            pair = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            self._append(chr(pair))
+        else:
+            self._append_plain(chr(code))
+        return i + len(take)
+
+    def _end_string(self) -> None:
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            self._append("\ufffd")
+        value = "".join(self._buf)
+        self._buf = []
+        if self._in_key:
+            self._key = value
+            self._state = _COLON
+            return
+        if self._key == "tool":
+            self.tool = value.strip()
+        elif self._key == "argument":
+            self.argument_complete = True
+        self._state = _COMMA
+
+    def _skip_value(self, chunk: str, i: int) -> int:
+        """Dize olmayan bir değeri (iç içe nesne/dizi dahil) atlar."""
+        n = len(chunk)
+        while i < n:
+            c = chunk[i]
+            if self._skip_in_string:
+                if self._skip_escape:
+                    self._skip_escape = False
+                elif c == "\\":
+                    self._skip_escape = True
+                elif c == '"':
+                    self._skip_in_string = False
+            elif c == '"':
+                self._skip_in_string = True
+            elif c in "{[":
+                self._skip_depth += 1
+            elif c in "}]":
+                if self._skip_depth == 0:
+                    # Skaler değerin ardından üst nesnenin kapanışı
+                    self._state = _COMMA
+                    return i
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._state = _COMMA
+                    return i + 1
+            elif c == "," and self._skip_depth == 0:
+                self._state = _COMMA
+                return i
+            i += 1
+        return n
@@ -0,0 +1,156 @@
+"""
+Sidar Project - Ollama NDJSON Akış Çözücü Kıyaslaması
+Eski _stream_ollama_response ayrıştırıcısı (bayt birleştirme + deneme-yanılma
+UTF-8 kırpma + buffer.split("\\n", 1)) ile NDJSONDecoder'ı (artımlı UTF-8 +
+tek geçişli satır çerçeveleyici) aynı kayıtlı akış üzerinde karşılaştırır.
+
+Varsayılan olarak 100k token'lık Ollama /api/chat akışı deterministik olarak
+üretilir ve TCP benzeri rastgele paket boyutlarına bölünür. Gerçek bir kayıt
+kullanmak için ham yanıtı dosyaya alın:
+    curl -sN http://localhost:11434/api/chat -d '{"model": "...", "messages": [...]}' > akis.ndjson
+
+Çalıştırmak için kök dizinde:
+    python benchmarks/bench_ndjson_stream.py
+    python benchmarks/bench_ndjson_stream.py --tokens 100000 --max-packet 65536
+    python benchmarks/bench_ndjson_stream.py --input akis.ndjson
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.llm_client import NDJSONDecoder  # noqa: E402
+
+_WORDS = [
+    "def", "return", "async", "await", "çözüm", "değişken", "öğrenme", "şimdi",
+    "İstanbul", "ığdır", "müşteri", "yapılandırma", "→", "✓", "😀", "config.py",
+    "\n", "    ", "{", "}", "\"", "\\", "0.3",
+]
+
+
+def _record_stream(n_tokens: int, seed: int) -> bytes:
+    """Ollama stream biçiminde (satır başına bir token) NDJSON akışı üretir."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n_tokens):
+        token = rng.choice(_WORDS) + (" " if rng.random() < 0.6 else "")
+        lines.append(json.dumps({
+            "model": "qwen2.5-coder:7b",
+            "created_at": "2026-01-01T00:00:00.000000Z",
+            "message": {"role": "assistant", "content": token},
+            "done": False,
+        }, ensure_ascii=False))
+    lines.append(json.dumps({"model": "qwen2.5-coder:7b", "message": {"role": "assistant", "content": ""},
+                             "done": True, "eval_count": n_tokens}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _packetize(raw: bytes, max_packet: int, seed: int) -> list:
+    """Akışı 1..max_packet bayt arası paketlere böler (çok baytlı karakter ortasından da)."""
+    rng = random.Random(seed)
+    packets, pos = [], 0
+    while pos < len(raw):
+        size = rng.randint(1, max_packet)
+        packets.append(raw[pos:pos + size])
+        pos += size
+    return packets
+
+
+def legacy_decode(packets: list) -> list:
+    """Eski _stream_ollama_response ayrıştırma mantığının birebir kopyası."""
+    out = []
+    buffer = ""
+    _byte_buf = b""
+    for raw_bytes in packets:
+        _byte_buf += raw_bytes
+        try:
+            decoded = _byte_buf.decode("utf-8")
+            _byte_buf = b""
+        except UnicodeDecodeError:
+            decoded = None
+            for trim in (1, 2, 3):
+                try:
+                    decoded = _byte_buf[:-trim].decode("utf-8")
+                    _byte_buf = _byte_buf[-trim:]
+                    break
+                except UnicodeDecodeError:
+                    continue
+            if decoded is None:
+                decoded = _byte_buf.decode("utf-8", errors="replace")
+                _byte_buf = b""
+        buffer += decoded
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                body = json.loads(line)
+                chunk = body.get("message", {}).get("content", "")
+                if chunk:
+                    out.append(chunk)
+            except json.JSONDecodeError:
+                continue
+    return out
+
+
+def new_decode(packets: list) -> list:
+    out = []
+    decoder = NDJSONDecoder()
+    for raw_bytes in packets:
+        for body in decoder.feed(raw_bytes):
+            chunk = body.get("message", {}).get("content", "")
+            if chunk:
+                out.append(chunk)
+    for body in decoder.close():
+        chunk = body.get("message", {}).get("content", "")
+        if chunk:
+            out.append(chunk)
+    return out
+
+
+def _timeit(fn, packets: list, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(packets)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ollama NDJSON akış çözücü kıyaslaması")
+    parser.add_argument("--tokens", type=int, default=100_000, help="Üretilecek akıştaki token sayısı")
+    parser.add_argument("--input", type=Path, help="Kayıtlı ham NDJSON akış dosyası (üretim yerine)")
+    parser.add_argument("--max-packet", type=int, default=65536, help="En büyük paket boyutu (bayt)")
+    parser.add_argument("--rounds", type=int, default=5, help="Ölçüm tekrarı")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    raw = args.input.read_bytes() if args.input else _record_stream(args.tokens, args.seed)
+    packets = _packetize(raw, args.max_packet, args.seed)
+
+    expected = new_decode(packets)
+    assert legacy_decode(packets) == expected, "Çözücüler farklı çıktı üretti"
+
+    mb = len(raw) / (1024 * 1024)
+    legacy_s = _timeit(legacy_decode, packets, args.rounds)
+    new_s = _timeit(new_decode, packets, args.rounds)
+
+    print(f"\nNDJSON akış çözücü kıyaslaması — {len(expected):,} token, {mb:.2f} MB, "
+          f"{len(packets):,} paket (≤{args.max_packet} B), medyan / {args.rounds} tekrar")
+    print(f"{'Çözücü':<16}{'Süre (ms)':>12}{'MB/s':>10}{'token/s':>14}")
+    print("─" * 52)
+    for label, sec in (("Eski", legacy_s), ("NDJSONDecoder", new_s)):
+        print(f"{label:<16}{sec * 1000:>12.1f}{mb / sec:>10.1f}{len(expected) / sec:>14,.0f}")
+    print(f"\nHızlanma: {legacy_s / new_s:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
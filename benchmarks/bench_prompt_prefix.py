@@ -0,0 +1,140 @@
+"""
+Sidar Project - İstem Öneki (KV Önbelleği) Kıyaslaması
+ReAct istem düzeninin Ollama KV önbelleği yeniden kullanımına etkisini ölçer.
+
+  Eski düzen : sistem = SIDAR_SYSTEM_PROMPT + bağlam (sayaçlar, son dosya dahil)
+               → değişken değerler istemin en başında; her turda önek bozulur
+  Yeni düzen : sistem = SIDAR_SYSTEM_PROMPT + statik bağlam (bayt bayt sabit)
+               → değişken durum bu turun kullanıcı mesajının sonunda
+
+Her tur iki ReAct adımı içerir (araç çağrısı + sonuç, ardından final_answer).
+Her adım için yeniden değerlendirilen istem token'ı raporlanır:
+  --live    : Ollama'nın döndürdüğü gerçek prompt_eval_count (num_predict=1)
+  varsayılan: Çevrimdışı tahmin — bir önceki istemle ortak önek dışındaki
+              kısmın token sayısı (Ollama tek slotta son istemin önekini saklar)
+
+Çalıştırmak için kök dizinde:
+    python benchmarks/bench_prompt_prefix.py
+    python benchmarks/bench_prompt_prefix.py --live --url http://localhost:11434 --model qwen2.5-coder:7b
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.definitions import SIDAR_SYSTEM_PROMPT  # noqa: E402
+from core.tokenizer import heuristic_token_count  # noqa: E402
+
+_STATIC = (
+    "[Proje Ayarları — GERÇEK RUNTIME DEĞERLERİ]\n"
+    "  Proje        : Sidar v2.6.1\n  AI Sağlayıcı : OLLAMA\n"
+    "  Coding Modeli: qwen2.5-coder:7b\n  Erişim Seviye: SANDBOX\n\n"
+    "[Araç Durumu]\n  Güvenlik   : SANDBOX\n  GitHub     : Bağlı değil\n  WebSearch  : Aktif"
+)
+
+
+def _runtime(turn: int) -> str:
+    return (
+        f"[Güncel Durum]\n  RAG        : RAG: {turn} belge | Motorlar: BM25\n"
+        f"  Okunan     : {turn * 2} dosya | Yazılan: {turn}\n  Son dosya  : core/modul_{turn}.py"
+    )
+
+
+def _turn_requests(layout: str, turn: int, history: list) -> list:
+    """Bir turdaki iki ReAct adımının (sistem, mesajlar) isteklerini üretir."""
+    question = f"Soru {turn}: core/modul_{turn}.py dosyasındaki hatayı bul ve açıkla."
+    tool_call = json.dumps({"thought": "Dosyayı okumalıyım.", "tool": "read_file",
+                            "argument": f"core/modul_{turn}.py"}, ensure_ascii=False)
+    tool_result = f"[ARAÇ:read_file:SONUÇ]\n===\n" + f"def f_{turn}(x):\n    return x * {turn}\n" * 20 + "===\n"
+
+    if layout == "eski":
+        system = SIDAR_SYSTEM_PROMPT + "\n\n" + _STATIC + "\n\n" + _runtime(turn)
+        user = question
+    else:
+        system = SIDAR_SYSTEM_PROMPT + "\n\n" + _STATIC
+        user = question + "\n\n" + _runtime(turn)
+
+    base = [{"role": "system", "content": system}] + history + [{"role": "user", "content": user}]
+    step2 = base + [{"role": "assistant", "content": tool_call}, {"role": "user", "content": tool_result}]
+    history.extend([
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": f"Yanıt {turn}: hata satır {turn}'de."},
+    ])
+    return [base, step2]
+
+
+def _render(messages: list) -> str:
+    return "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages)
+
+
+def _offline_eval(prev: str, cur: str) -> int:
+    shared = 0
+    for a, b in zip(prev, cur):
+        if a != b:
+            break
+        shared += 1
+    return heuristic_token_count(cur[shared:])
+
+
+def _live_eval(client, url: str, model: str, messages: list) -> int:
+    resp = client.post(f"{url}/api/chat", json={
+        "model": model, "messages": messages, "stream": False,
+        "options": {"num_predict": 1, "temperature": 0},
+    }, timeout=300)
+    resp.raise_for_status()
+    return int(resp.json().get("prompt_eval_count", 0))
+
+
+def run(layout: str, turns: int, client=None, url: str = "", model: str = "") -> list:
+    history: list = []
+    prev = ""
+    rows = []
+    for turn in range(1, turns + 1):
+        for step, messages in enumerate(_turn_requests(layout, turn, history)):
+            if client is not None:
+                tokens = _live_eval(client, url, model, messages)
+            else:
+                rendered = _render(messages)
+                tokens = _offline_eval(prev, rendered)
+                prev = rendered
+            rows.append((turn, step, tokens))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ReAct istem öneki / KV önbelleği kıyaslaması")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--live", action="store_true", help="Gerçek Ollama prompt_eval_count ölç")
+    parser.add_argument("--url", default="http://localhost:11434")
+    parser.add_argument("--model", default="qwen2.5-coder:7b")
+    args = parser.parse_args()
+
+    client = None
+    if args.live:
+        import httpx
+        client = httpx.Client()
+
+    results = {layout: run(layout, args.turns, client, args.url.rstrip("/").removesuffix("/api"), args.model)
+               for layout in ("eski", "yeni")}
+    mode = "Ollama prompt_eval_count" if args.live else "çevrimdışı tahmin (ortak önek dışı token)"
+    print(f"\nİstem öneki kıyaslaması — {args.turns} tur × 2 adım, {mode}")
+    print(f"{'Tur':>4}{'Adım':>6}{'Eski':>10}{'Yeni':>10}")
+    print("─" * 30)
+    for (turn, step, old), (_, _, new) in zip(results["eski"], results["yeni"]):
+        print(f"{turn:>4}{step + 1:>6}{old:>10,}{new:>10,}")
+    # İlk tur her iki düzende de soğuk başlar; kararlı durum 2. turdan itibaren
+    old_avg = statistics.mean(t for turn, _, t in results["eski"] if turn > 1)
+    new_avg = statistics.mean(t for turn, _, t in results["yeni"] if turn > 1)
+    print("─" * 30)
+    print(f"Ortalama (tur ≥ 2): eski {old_avg:,.0f} → yeni {new_avg:,.0f} token/adım "
+          f"({(1 - new_avg / old_avg) * 100:.0f}% daha az yeniden değerlendirme)\n")
+    if client is not None:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Sidar Project - ReAct Yük Testi (LLM tekrar oynatma taşıyıcısı ile)
+Canlı model olmadan SidarAgent.respond'u (ReAct döngüsü + araç çağrıları)
+eşzamanlı oturumlarla, gerçekçi token hızlarında çalıştırır.
+
+  Süreç içi (varsayılan): LLM_TRANSPORT=replay ile bir SidarAgent kurulur,
+      --concurrency kadar istek aynı anda gönderilir
+  --url: çalışan bir web sunucusunun /chat SSE uç noktasına yük verir
+      (sunucu LLM_TRANSPORT=replay ile başlatılmış olmalı)
+
+Her istek için ilk parça süresi (TTFT) ve toplam süre raporlanır; süreç içi
+modda LLM telemetrisi ve zamanlayıcı kuyruğu da yazdırılır.
+
+Çalıştırmak için kök dizinde:
+    python benchmarks/bench_react_load.py --scenario multi_tool --concurrency 8 --requests 32
+    python benchmarks/bench_react_load.py --url http://localhost:7860 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.llm_replay import SCENARIOS  # noqa: E402
+
+PROMPT = "Bu projede yanıt süresini kısaltmak için neler önerirsin?"
+
+
+async def _timed(gen) -> tuple:
+    started = time.monotonic()
+    first = None
+    size = 0
+    async for chunk in gen:
+        if first is None:
+            first = time.monotonic() - started
+        size += len(chunk)
+    return first or 0.0, time.monotonic() - started, size
+
+
+async def run_inprocess(args) -> list:
+    from config import Config
+    from agent.sidar_agent import SidarAgent
+
+    cfg = Config()
+    cfg.AI_PROVIDER = "ollama"
+    cfg.LLM_TRANSPORT = "replay"
+    cfg.LLM_REPLAY_SCENARIO = args.scenario
+    cfg.LLM_REPLAY_FILE = args.replay_file or ""
+    cfg.LLM_REPLAY_TOKEN_RATE = args.token_rate
+    cfg.LLM_REPLAY_TTFT_MS = args.ttft_ms
+    cfg.LLM_REPLAY_JITTER = args.jitter
+    cfg.LLM_REPLAY_SEED = args.seed
+    cfg.LLM_MAX_IN_FLIGHT = args.in_flight
+    tmp = tempfile.TemporaryDirectory()
+    cfg.BASE_DIR = Path(tmp.name)
+    cfg.MEMORY_FILE = Path(tmp.name) / "memory.json"
+    agent = SidarAgent(cfg)
+
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> tuple:
+        async with sem:
+            return await _timed(agent.respond(f"{PROMPT} (#{i})"))
+
+    rows = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    print("\nLLM telemetrisi:")
+    for s in agent.llm.telemetry.stats()["series"]:
+        print(f"  {s['model']}/{s['caller']}: {s['latency_s']['count']} çağrı, "
+              f"TTFT ort {s['ttft_s']['avg']:.3f} s, {s['tokens_per_s']['avg']:.1f} token/s")
+    print(f"Zamanlayıcı: {json.dumps(agent.llm.scheduler.stats(), ensure_ascii=False)}")
+    await agent.llm.aclose()
+    tmp.cleanup()
+    return rows
+
+
+async def run_sse(args) -> list:
+    import httpx
+
+    async def events(client, i: int):
+        async with client.stream("POST", f"{args.url.rstrip('/')}/chat",
+                                 json={"message": f"{PROMPT} (#{i})"}, timeout=300) as resp:
+            async for line in resp.aiter_lines():
+                if line.startswith("data:"):
+                    yield line
+
+    sem = asyncio.Semaphore(args.concurrency)
+    async with httpx.AsyncClient() as client:
+        async def one(i: int) -> tuple:
+            async with sem:
+                return await _timed(events(client, i))
+        return await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tekrar oynatma taşıyıcısıyla ReAct yük testi")
+    parser.add_argument("--scenario", default="tool_then_answer", choices=sorted(SCENARIOS))
+    parser.add_argument("--replay-file", default="", help="Kayıtlı JSONL (LLM_TRANSPORT=record çıktısı)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--token-rate", type=float, default=40.0)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--in-flight", type=int, default=2, help="LLM_MAX_IN_FLIGHT")
+    parser.add_argument("--url", default="", help="Çalışan web sunucusu (SSE yük testi)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    rows = asyncio.run(run_sse(args) if args.url else run_inprocess(args))
+    wall = time.monotonic() - started
+
+    ttfts = sorted(r[0] for r in rows)
+    totals = sorted(r[1] for r in rows)
+    p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+    mode = f"SSE {args.url}" if args.url else f"süreç içi, senaryo={args.scenario}"
+    print(f"\nReAct yük testi — {len(rows)} istek, eşzamanlılık {args.concurrency} ({mode})")
+    print("─" * 52)
+    print(f"İlk parça   : ort {statistics.mean(ttfts):.3f} s | p50 {statistics.median(ttfts):.3f} s | p95 {p95(ttfts):.3f} s")
+    print(f"Toplam süre : ort {statistics.mean(totals):.3f} s | p50 {statistics.median(totals):.3f} s | p95 {p95(totals):.3f} s")
+    print(f"Verim       : {len(rows) / wall:.2f} istek/s ({wall:.1f} s duvar saati)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Sidar Project - Oturum Depolama Kıyaslaması
+Eski format (girintili JSON + tek parça Fernet) ile v2 formatını
+(kompakt JSON + zlib + parça tabanlı AES-GCM) diskte boyut ve
+kaydetme / yükleme / son-N-tur okuma gecikmesi açısından karşılaştırır.
+
+Çalıştırmak için kök dizinde:
+    python benchmarks/bench_session_storage.py
+    python benchmarks/bench_session_storage.py --turns 40 --rounds 50 --no-encrypt
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.session_codec import SessionCodec  # noqa: E402
+
+
+def _make_session(n_turns: int) -> dict:
+    """Araç çıktısı ve kod içeren gerçekçi bir oturum üretir."""
+    code = "\n".join(f"def handler_{i}(req):\n    return {{'status': {i}, 'ok': True}}" for i in range(40))
+    turns = []
+    for i in range(n_turns):
+        if i % 2 == 0:
+            content = f"Soru {i}: config.py içindeki OLLAMA_TIMEOUT değerini ve web_server.py akışını açıkla."
+            role = "user"
+        else:
+            content = f"Yanıt {i}:\n```python\n{code}\n```\nAçıklama: " + "Türkçe açıklama metni. " * 30
+            role = "assistant"
+        turns.append({"role": role, "content": content, "timestamp": time.time() + i, "tokens": len(content) // 3})
+    return {
+        "id": "bench-session", "title": "Kıyaslama", "updated_at": time.time(),
+        "last_file": None, "tokenizer": "heuristic", "summary": "", "turns": turns,
+    }
+
+
+def _timeit(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Oturum depolama kıyaslaması")
+    parser.add_argument("--turns", type=int, default=40, help="Oturumdaki tur sayısı")
+    parser.add_argument("--rounds", type=int, default=30, help="Ölçüm tekrarı")
+    parser.add_argument("--tail", type=int, default=4, help="Son N tur okuma kıyası")
+    parser.add_argument("--no-encrypt", action="store_true", help="Şifrelemeyi kapat")
+    args = parser.parse_args()
+
+    key = ""
+    fernet = None
+    if not args.no_encrypt:
+        from cryptography.fernet import Fernet
+        key = Fernet.generate_key().decode()
+        fernet = Fernet(key.encode())
+
+    data = _make_session(args.turns)
+    codec = SessionCodec(key)
+    tmp = Path(tempfile.mkdtemp(prefix="sidar_bench_"))
+    legacy_path = tmp / "legacy.json"
+    v2_path = tmp / f"{data['id']}.json"   # AAD oturum kimliğine (dosya adı) bağlıdır
+
+    # ── Eski format ────────────────────────────────────────────
+    def legacy_save():
+        blob = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        legacy_path.write_bytes(fernet.encrypt(blob) if fernet else blob)
+
+    def legacy_load():
+        raw = legacy_path.read_bytes()
+        return json.loads((fernet.decrypt(raw) if fernet else raw).decode("utf-8"))
+
+    def legacy_tail():
+        return legacy_load()["turns"][-args.tail:]
+
+    # ── v2 ─────────────────────────────────────────────────────
+    cache: dict = {}
+
+    def v2_save_cold():
+        v2_path.write_bytes(codec.encode(data))
+
+    def v2_save_warm():
+        # Tur eklendikten sonraki tipik kayıt: yalnızca son parça yeniden mühürlenir
+        v2_path.write_bytes(codec.encode(data, cache=cache))
+
+    def v2_load():
+        return codec.decode_file(v2_path)
+
+    def v2_tail():
+        total = codec.read_meta(v2_path)["turn_count"]
+        return codec.read_turns(v2_path, total - args.tail, total)[1]
+
+    legacy_save()
+    v2_save_cold()
+    v2_save_warm()
+    assert v2_load()["turns"] == data["turns"]
+    assert v2_tail() == data["turns"][-args.tail:]
+
+    rows = [
+        ("Diskte boyut (bayt)", legacy_path.stat().st_size, v2_path.stat().st_size),
+        ("Kaydetme (ms)", _timeit(legacy_save, args.rounds), _timeit(v2_save_cold, args.rounds)),
+        ("Kaydetme, önbellekli (ms)", None, _timeit(v2_save_warm, args.rounds)),
+        ("Tam yükleme (ms)", _timeit(legacy_load, args.rounds), _timeit(v2_load, args.rounds)),
+        (f"Son {args.tail} tur (ms)", _timeit(legacy_tail, args.rounds), _timeit(v2_tail, args.rounds)),
+    ]
+
+    mode = "şifreli" if key else "şifresiz"
+    print(f"\nOturum depolama kıyaslaması — {args.turns} tur, {mode}, medyan / {args.rounds} tekrar")
+    print(f"{'Ölçüm':<28}{'Eski':>14}{'v2':>14}")
+    print("─" * 56)
+    for label, old, new in rows:
+        fmt = (lambda v: "—" if v is None else (f"{v:,}" if isinstance(v, int) else f"{v:.3f}"))
+        print(f"{label:<28}{fmt(old):>14}{fmt(new):>14}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -231,6 +231,71 @@ class Config:
     OLLAMA_TIMEOUT: int = get_int_env("OLLAMA_TIMEOUT", 30)
     CODING_MODEL:   str = os.getenv("CODING_MODEL", "qwen2.5-coder:7b")
     TEXT_MODEL:     str = os.getenv("TEXT_MODEL", "gemma2:9b")
+    # OLLAMA_URL virgülle ayrılmış birden fazla uç nokta alabilir (yük dengeleme + yedekleme)
+    OLLAMA_LB_STRATEGY:     str   = os.getenv("OLLAMA_LB_STRATEGY", "least_outstanding")  # | "latency"
+    OLLAMA_HEALTH_INTERVAL: float = get_float_env("OLLAMA_HEALTH_INTERVAL", 15.0)
+    OLLAMA_LB_LOAD_PENALTY: float = get_float_env("OLLAMA_LB_LOAD_PENALTY", 2.0)
+
+    # ─── Bağlam Penceresi (num_ctx) ──────────────────────────
+    OLLAMA_NUM_CTX:            int = get_int_env("OLLAMA_NUM_CTX", 8192)
+    OLLAMA_NUM_CTX_OVERRIDES:  str = os.getenv("OLLAMA_NUM_CTX_OVERRIDES", "")  # "model=ctx,model2=ctx"
+    GEMINI_CONTEXT_WINDOW:     int = get_int_env("GEMINI_CONTEXT_WINDOW", 1_048_576)
+    REACT_RESPONSE_RESERVE:    int = get_int_env("REACT_RESPONSE_RESERVE", 1024)
+    REACT_TOOL_OUTPUT_KEEP:    int = get_int_env("REACT_TOOL_OUTPUT_KEEP", 256)
+
+    # ─── Model Yerleşimi (keep-alive / ön yükleme) ───────────
+    OLLAMA_RESIDENCY_POLICY:         str   = os.getenv("OLLAMA_RESIDENCY_POLICY", "idle")  # pinned | idle | off
+    OLLAMA_KEEP_ALIVE:               str   = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_PRELOAD_MODELS:           str   = os.getenv("OLLAMA_PRELOAD_MODELS", "")  # boş = TEXT_MODEL,CODING_MODEL
+    OLLAMA_RESIDENCY_CHECK_INTERVAL: float = get_float_env("OLLAMA_RESIDENCY_CHECK_INTERVAL", 300.0)
+
+    # ─── LLM Taşıyıcısı (kayıt / tekrar oynatma) ─────────────
+    LLM_TRANSPORT:          str   = os.getenv("LLM_TRANSPORT", "http").lower()  # http | replay | record
+    LLM_REPLAY_FILE:        str   = os.getenv("LLM_REPLAY_FILE", "")
+    LLM_REPLAY_SCENARIO:    str   = os.getenv("LLM_REPLAY_SCENARIO", "tool_then_answer")
+    LLM_REPLAY_TOKEN_RATE:  float = get_float_env("LLM_REPLAY_TOKEN_RATE", 40.0)   # <0: kayıttaki hız
+    LLM_REPLAY_TTFT_MS:     float = get_float_env("LLM_REPLAY_TTFT_MS", 300.0)     # <0: kayıttaki TTFT
+    LLM_REPLAY_JITTER:      float = get_float_env("LLM_REPLAY_JITTER", 0.3)
+    LLM_REPLAY_SEED:        Optional[int] = (
+        get_int_env("LLM_REPLAY_SEED", 0) if os.getenv("LLM_REPLAY_SEED") else None
+    )
+
+    # ─── LLM HTTP Bağlantı Havuzu ────────────────────────────
+    LLM_HTTP_MAX_CONNECTIONS:  int   = get_int_env("LLM_HTTP_MAX_CONNECTIONS", 10)
+    LLM_HTTP_MAX_KEEPALIVE:    int   = get_int_env("LLM_HTTP_MAX_KEEPALIVE", 5)
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = get_float_env("LLM_HTTP_KEEPALIVE_EXPIRY", 60.0)
+    LLM_HTTP2:                 bool  = get_bool_env("LLM_HTTP2", True)
+    # Zamanlayıcı: sağlayıcıya aynı anda giden en fazla istek; arka plan işleri (özetleme) için ayrı sınır
+    LLM_MAX_IN_FLIGHT:            int = get_int_env("LLM_MAX_IN_FLIGHT", 2)
+    LLM_BACKGROUND_MAX_IN_FLIGHT: int = get_int_env("LLM_BACKGROUND_MAX_IN_FLIGHT", 1)
+
+    # ─── LLM Yanıt Önbelleği (opsiyonel) ─────────────────────
+    LLM_CACHE_ENABLED:         bool  = get_bool_env("LLM_CACHE_ENABLED", False)
+    LLM_CACHE_TTL:             int   = get_int_env("LLM_CACHE_TTL", 86400)
+    LLM_CACHE_MAX_MB:          float = get_float_env("LLM_CACHE_MAX_MB", 100)
+    LLM_CACHE_MAX_TEMPERATURE: float = get_float_env("LLM_CACHE_MAX_TEMPERATURE", 0.3)
+
+    # ─── Araç Sonucu Önbelleği (oturum başına, bellek içi) ────
+    TOOL_CACHE_ENABLED:     bool = get_bool_env("TOOL_CACHE_ENABLED", True)
+    TOOL_CACHE_MAX_ENTRIES: int  = get_int_env("TOOL_CACHE_MAX_ENTRIES", 256)
+    TOOL_CACHE_TTLS:        str  = os.getenv("TOOL_CACHE_TTLS", "")  # "read_file=60,pypi=0"
+
+    # ─── Anlamsal Yanıt Önbelleği (oturumlar arası, bellek içi) ─
+    ANSWER_CACHE_ENABLED:     bool  = get_bool_env("ANSWER_CACHE_ENABLED", False)
+    ANSWER_CACHE_THRESHOLD:   float = get_float_env("ANSWER_CACHE_THRESHOLD", 0.9)
+    ANSWER_CACHE_TTL:         int   = get_int_env("ANSWER_CACHE_TTL", 3600)
+    ANSWER_CACHE_MAX_ENTRIES: int   = get_int_env("ANSWER_CACHE_MAX_ENTRIES", 500)
+    ANSWER_CACHE_MIN_CHARS:   int   = get_int_env("ANSWER_CACHE_MIN_CHARS", 8)
+    ANSWER_CACHE_EMBED_MODEL: str   = os.getenv("ANSWER_CACHE_EMBED_MODEL", "")  # "" = yerleşik 3-gram
+    ANSWER_CACHE_TOOL_TTLS:   str   = os.getenv("ANSWER_CACHE_TOOL_TTLS", "")    # "web_search=60,pypi=0"
+
+    # ─── İzleme (span tabanlı, opsiyonel) ────────────────────
+    TRACE_ENABLED:       bool = get_bool_env("TRACE_ENABLED", False)
+    TRACE_FILE:          str  = os.getenv("TRACE_FILE", "logs/traces.jsonl")
+    TRACE_MAX_BYTES:     int  = get_int_env("TRACE_MAX_BYTES", 10_485_760)   # 10 MB
+    TRACE_BACKUP_COUNT:  int  = get_int_env("TRACE_BACKUP_COUNT", 3)
+    TRACE_OTLP_ENDPOINT: str  = os.getenv("TRACE_OTLP_ENDPOINT", "")  # örn. http://localhost:4318
+    TRACE_SERVICE_NAME:  str  = os.getenv("TRACE_SERVICE_NAME", "sidar")
 
     # ─── Erişim Seviyesi (OpenClaw) ──────────────────────────
     ACCESS_LEVEL: str = os.getenv("ACCESS_LEVEL", "full")
@@ -261,6 +326,24 @@ class Config:
 
     # ─── Uygulama ────────────────────────────────────────────
     MAX_MEMORY_TURNS:  int = get_int_env("MAX_MEMORY_TURNS", 20)
+    # Tur token sayımı: auto | hf | tiktoken | heuristic  (bkz. core/tokenizer.py)
+    TOKENIZER_BACKEND: str = os.getenv("TOKENIZER_BACKEND", "auto")
+    # Kayan özet: her seferinde en eski N tur özetlenir, son M tur aynen korunur
+    MEMORY_SUMMARY_WINDOW: int = get_int_env("MEMORY_SUMMARY_WINDOW", 10)
+    MEMORY_KEEP_RECENT:    int = get_int_env("MEMORY_KEEP_RECENT", 6)
+
+    # ─── Oturum Saklama (Retention) ──────────────────────────
+    # Periyodik temizlik aralığı (saniye, 0 = kapalı)
+    SESSION_RETENTION_INTERVAL: int   = get_int_env("SESSION_RETENTION_INTERVAL", 3600)
+    # Bu kadar gündür güncellenmeyen oturumlar .tar.gz paketine arşivlenir (0 = kapalı)
+    # Arşivlenenler /sessions listesinden çıkar; POST /sessions/{id}/restore ile geri alınır
+    SESSION_ARCHIVE_AFTER_DAYS: float = get_float_env("SESSION_ARCHIVE_AFTER_DAYS", 0)
+    # Bu kadar günden eski oturumlar ve arşiv paketleri silinir (0 = sınırsız)
+    SESSION_MAX_AGE_DAYS:       float = get_float_env("SESSION_MAX_AGE_DAYS", 0)
+    # sessions + arşiv toplam disk bütçesi (MB, 0 = sınırsız); aşılınca en eski paketler KALICI silinir
+    SESSION_DISK_BUDGET_MB:     float = get_float_env("SESSION_DISK_BUDGET_MB", 0)
+    # Karantina (.json.broken) dosyalarının saklanma süresi (gün)
+    SESSION_BROKEN_MAX_AGE_DAYS: float = get_float_env("SESSION_BROKEN_MAX_AGE_DAYS", 7)
     LOG_LEVEL:         str = os.getenv("LOG_LEVEL", "INFO")
     RESPONSE_LANGUAGE: str = os.getenv("RESPONSE_LANGUAGE", "tr")
 
@@ -271,7 +354,14 @@ class Config:
 
     # ─── ReAct Döngüsü ───────────────────────────────────────
     MAX_REACT_STEPS: int = get_int_env("MAX_REACT_STEPS", 10)
-    REACT_TIMEOUT:   int = get_int_env("REACT_TIMEOUT", 60)
+    REACT_TIMEOUT:   int = get_int_env("REACT_TIMEOUT", 60)   # istek başına toplam süre (0 = sınırsız)
+    REACT_ANSWER_RESERVE: float = get_float_env("REACT_ANSWER_RESERVE", 10.0)
+    # "parallel" grubunda bir adımda çalıştırılacak en fazla araç ve araç başına eşzamanlılık
+    REACT_MAX_PARALLEL_TOOLS: int = get_int_env("REACT_MAX_PARALLEL_TOOLS", 4)
+    REACT_TOOL_CONCURRENCY:   int = get_int_env("REACT_TOOL_CONCURRENCY", 4)
+    # Tam tutulan en son araç çıktısı sayısı; daha eskiler önizlemeye indirgenir
+    REACT_KEEP_FULL_TOOL_RESULTS: int = get_int_env("REACT_KEEP_FULL_TOOL_RESULTS", 2)
+    REACT_TOOL_PREVIEW_CHARS:     int = get_int_env("REACT_TOOL_PREVIEW_CHARS", 300)
 
     # ─── Web Arama ───────────────────────────────────────────
     SEARCH_ENGINE:        str = os.getenv("SEARCH_ENGINE", "auto")
@@ -376,10 +466,13 @@ class Config:
                 )
                 is_valid = False
 
-        if cls.AI_PROVIDER == "ollama":
+        if cls.AI_PROVIDER == "ollama" and cls.LLM_TRANSPORT == "replay":
+            logger.info("🎞️  LLM_TRANSPORT=replay — Ollama yerine kayıt/senaryo yanıtları kullanılıyor.")
+        elif cls.AI_PROVIDER == "ollama":
             try:
                 import httpx
-                base = cls.OLLAMA_URL.rstrip("/")
+                # Birden fazla uç nokta varsa birincisi yoklanır; diğerleri LLMClient'ta izlenir
+                base = cls.OLLAMA_URL.split(",")[0].strip().rstrip("/")
                 if base.endswith("/api"):
                     tags_url = base + "/tags"
                 else:
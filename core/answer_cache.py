@@ -0,0 +1,272 @@
+"""
+Sidar Project - Anlamsal Yanıt Önbelleği
+Oturumlar arasında tekrar sorulan, neredeyse aynı soruların ("config ayarlarını
+göster", "sistem sağlığı nedir") nihai yanıtlarını saklar; eşik üzerindeki bir
+benzerlikte ReAct döngüsü hiç çalıştırılmadan yanıt milisaniyeler içinde döner.
+
+Gömme (embedding):
+  ANSWER_CACHE_EMBED_MODEL boş → yerleşik karakter 3-gram vektörleri (bağımlılıksız,
+                                 yazım farklarına ve eklere dayanıklı)
+  ANSWER_CACHE_EMBED_MODEL=<model> → Ollama /api/embed (örn. nomic-embed-text);
+                                 hata olursa yerleşik gömmeye düşülür
+Her kayıt gömme türüyle etiketlenir; farklı türler birbiriyle karşılaştırılmaz.
+
+Tazelik:
+  • TTL (ANSWER_CACHE_TTL) dolan kayıt kullanılmaz; canlı veri döndüren araçlara
+    dayanan yanıtların ömrü araç TTL'i ile kısalır (TOOL_TTLS, ANSWER_CACHE_TOOL_TTLS),
+    health gibi anlık ölçüm araçlarını kullanan yanıtlar hiç saklanmaz. Listede
+    olmayan araçlar da güvenli tarafta kalınarak önbelleğe alınmaz.
+  • Sorudaki sayılar, sürümler ve yol/dosya adları ("son 20 commit", "python 3.11",
+    "main.py") birebir eşleşmelidir; n-gram benzerliği bu farkları ayırt edemez
+  • Yanıt değişebilir duruma dayanıyorsa (read_file, github_read, docs_search ...)
+    o durumun sürümü kayda yazılır; yazma araçları sürümü artırınca kayıt geçersizdir
+  • Yan etkili araç (write_file, execute_code ...) kullanan turlar hiç saklanmaz —
+    aksi halde "dosyayı yaz" isteği önbellekten yanıtlanıp işlem atlanırdı
+  • Önceki konuşmaya atıf yapan sorular ("bunu açıkla") ne aranır ne saklanır
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Okuma aracı → dayandığı değişebilir durum; yazma aracı → değiştirdiği durum.
+# Ajan her durum için bir sürüm tutar (SidarAgent.answer_versions).
+DEPENDS_ON: Dict[str, str] = {
+    "read_file": "files", "list_dir": "files", "audit": "files",
+    "github_read": "github", "github_list_files": "github", "github_search_code": "github",
+    "github_info": "github", "github_commits": "github",
+    "docs_search": "docs", "docs_list": "docs",
+}
+WRITES_TO: Dict[str, str] = {
+    "write_file": "files", "patch_file": "files", "execute_code": "files",
+    "github_write": "github", "github_create_branch": "github", "github_create_pr": "github",
+    "docs_add": "docs", "docs_delete": "docs",
+}
+
+# Canlı / değişken veri döndüren salt-okunur araçlar → o araca dayanan yanıtın en uzun ömrü
+# (saniye). 0: yanıt saklanmaz. DEPENDS_ON'dakiler sürümle, STABLE_TOOLS ANSWER_CACHE_TTL ile
+# sınırlanır; hiçbirinde olmayan araçlar 0 kabul edilir.
+TOOL_TTLS: Dict[str, float] = {
+    "health": 0,
+    "web_search": 300, "fetch_url": 300,
+    "search_docs": 1800, "search_stackoverflow": 1800,
+    "pypi": 900, "pypi_compare": 900, "npm": 900,
+    "gh_releases": 900, "gh_latest": 900,
+}
+STABLE_TOOLS = frozenset({"get_config", "print_config_summary"})
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Birebir eşleşmesi gereken belirteçler: rakam içerenler (20, 3.11, v2) ve
+# nokta / eğik çizgi ile bağlanmış yol benzeri adlar (main.py, core/rag)
+_ANCHOR_RE = re.compile(r"[\w./\\-]*\d[\w./\\-]*|\w[\w-]*(?:[./\\]\w[\w-]*)+", re.UNICODE)
+# Önceki tura atıf: yanıt konuşma geçmişine bağlıdır, oturumlar arası paylaşılamaz
+_DEICTIC_RE = re.compile(
+    r"\b(bunu|bunun|buna|bunlar\w*|şunu|şunun|şuna|onu|onun|yukarıda\w*|önceki|az önce|"
+    r"aynısını|devam|tekrar|this|that|above|previous)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_question(text: str) -> str:
+    """Türkçe büyük/küçük harf, noktalama ve boşluk farklarını giderir."""
+    text = text.replace("I", "ı").replace("İ", "i").lower()
+    return " ".join(_WORD_RE.findall(text))
+
+
+def anchors(text: str) -> frozenset:
+    """Sorudaki sayı / sürüm / yol belirteçleri (küçük harf, sondaki noktalama atılmış)."""
+    text = text.replace("I", "ı").replace("İ", "i").lower()
+    return frozenset(t.strip("./\\-") for t in _ANCHOR_RE.findall(text) if t.strip("./\\-"))
+
+
+Vector = Dict[object, float]
+
+
+def _unit(vec: Vector) -> Vector:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {k: v / norm for k, v in vec.items()} if norm else {}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def ngram_embedding(text: str) -> Vector:
+    """Kelime + karakter 3-gram seyrek vektörü (birim uzunlukta)."""
+    vec: Dict[object, float] = {}
+    for word in normalize_question(text).split():
+        vec[word] = vec.get(word, 0.0) + 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            gram = padded[i:i + 3]
+            vec[gram] = vec.get(gram, 0.0) + 0.5
+    return _unit(vec)
+
+
+def dependencies(tools: Iterable[str], versions: Dict[str, Hashable]) -> Dict[str, Hashable]:
+    """Turda kullanılan okuma araçlarının dayandığı durumların sürümleri."""
+    return {dep: versions.get(dep) for dep in {DEPENDS_ON[t] for t in tools if t in DEPENDS_ON}}
+
+
+class _Entry:
+    __slots__ = ("question", "namespace", "kind", "vector", "anchors", "answer", "expires",
+                 "deps", "tools", "hits")
+
+    def __init__(self, question, namespace, kind, vector, answer, ttl_s, deps, tools) -> None:
+        self.question = question
+        self.namespace = namespace
+        self.kind = kind
+        self.vector = vector
+        self.anchors = anchors(question)
+        self.answer = answer
+        self.expires = time.monotonic() + ttl_s
+        self.deps = deps
+        self.tools = tools
+        self.hits = 0
+
+
+class SemanticAnswerCache:
+    """
+    llm         : LLMClient (Ollama gömmesi için HTTP istemcisi; embed_model boşsa kullanılmaz)
+    embed_model : Ollama gömme modeli ("" = yerleşik 3-gram)
+    threshold   : Kabul için en düşük kosinüs benzerliği
+    ttl_s       : Kaydın geçerlilik süresi
+    max_entries : En fazla kayıt (en eski önce çıkar)
+    min_chars   : Bundan kısa sorular önbelleğe alınmaz
+    tool_ttls   : TOOL_TTLS üzerine yazılacak araç başına en uzun ömür
+    """
+
+    def __init__(self, llm=None, embed_model: str = "", threshold: float = 0.9,
+                 ttl_s: float = 3600, max_entries: int = 500, min_chars: int = 8,
+                 tool_ttls: Optional[Dict[str, float]] = None) -> None:
+        self.llm = llm
+        self.tool_ttls = dict(TOOL_TTLS)
+        self.tool_ttls.update(tool_ttls or {})
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.min_chars = min_chars
+        self._lock = threading.Lock()
+        self._entries: List[_Entry] = []
+        self.stats: Dict[str, float] = {
+            "lookups": 0, "hits": 0, "stores": 0, "expired": 0, "stale": 0,
+            "skipped_question": 0, "skipped_side_effects": 0, "skipped_volatile": 0,
+            "anchor_mismatches": 0, "embed_fallbacks": 0,
+            "lookup_ms_last": 0.0,
+        }
+
+    # ─────────────────────────────────────────────
+    #  GÖMME
+    # ─────────────────────────────────────────────
+
+    async def _embed(self, text: str) -> Tuple[str, Vector]:
+        if self.embed_model and self.llm is not None:
+            try:
+                url = self.llm._ollama_base_url
+                resp = await self.llm._get_http().post(
+                    f"{url}/api/embed", json={"model": self.embed_model, "input": normalize_question(text)},
+                    timeout=10, extensions=self.llm._request_extensions(),
+                )
+                resp.raise_for_status()
+                dense = resp.json()["embeddings"][0]
+                return self.embed_model, _unit(dict(enumerate(dense)))
+            except Exception as exc:
+                self.stats["embed_fallbacks"] += 1
+                logger.debug("Ollama gömmesi alınamadı, 3-gram kullanılıyor: %s", exc)
+        return "ngram", ngram_embedding(text)
+
+    # ─────────────────────────────────────────────
+    #  ARAMA / KAYIT
+    # ─────────────────────────────────────────────
+
+    def cacheable_question(self, question: str) -> bool:
+        if len(question.strip()) < self.min_chars or _DEICTIC_RE.search(question):
+            self.stats["skipped_question"] += 1
+            return False
+        return True
+
+    async def lookup(self, question: str, namespace: str,
+                     versions: Dict[str, Hashable]) -> Optional[Tuple[str, float]]:
+        """Eşik üzerindeki en benzer taze kaydın (yanıt, benzerlik) çiftini döndürür."""
+        started = time.monotonic()
+        kind, vec = await self._embed(question)
+        wanted = anchors(question)
+        best, best_sim = None, self.threshold
+        now = time.monotonic()
+        with self._lock:
+            self.stats["lookups"] += 1
+            live = []
+            for entry in self._entries:
+                if now > entry.expires:
+                    self.stats["expired"] += 1
+                    continue
+                if any(versions.get(dep) != ver for dep, ver in entry.deps.items()):
+                    self.stats["stale"] += 1
+                    continue
+                live.append(entry)
+                if entry.namespace != namespace or entry.kind != kind:
+                    continue
+                sim = cosine(vec, entry.vector)
+                if sim >= best_sim:
+                    if entry.anchors != wanted:
+                        self.stats["anchor_mismatches"] += 1
+                        continue
+                    best, best_sim = entry, sim
+            self._entries = live
+            if best is not None:
+                best.hits += 1
+                self.stats["hits"] += 1
+            self.stats["lookup_ms_last"] = round((time.monotonic() - started) * 1000, 2)
+        return (best.answer, best_sim) if best is not None else None
+
+    async def store(self, question: str, namespace: str, answer: str,
+                    deps: Dict[str, Hashable], tools: List[str], side_effects: bool) -> bool:
+        """
+        deps: yanıtın dayandığı durum → tur başındaki sürüm (ör. {"files": 3}).
+        side_effects: turda yan etkili araç kullanıldıysa kayıt yapılmaz.
+        """
+        if side_effects:
+            self.stats["skipped_side_effects"] += 1
+            return False
+        ttl = self.entry_ttl(tools)
+        if ttl <= 0:
+            self.stats["skipped_volatile"] += 1
+            return False
+        kind, vec = await self._embed(question)
+        with self._lock:
+            self._entries.append(_Entry(question, namespace, kind, vec, answer, ttl, dict(deps), list(tools)))
+            if len(self._entries) > self.max_entries:
+                del self._entries[: len(self._entries) - self.max_entries]
+            self.stats["stores"] += 1
+        return True
+
+    def entry_ttl(self, tools: Iterable[str]) -> float:
+        """Kaydın ömrü: ANSWER_CACHE_TTL, kullanılan canlı veri araçlarının TTL'leriyle kısaltılır."""
+        ttl = self.ttl_s
+        for tool in tools:
+            if tool in DEPENDS_ON or tool in STABLE_TOOLS:
+                continue
+            ttl = min(ttl, self.tool_ttls.get(tool, 0))
+        return ttl
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["lookups"]
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                embedder=self.embed_model or "ngram",
+            )
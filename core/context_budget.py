@@ -0,0 +1,168 @@
+"""
+Sidar Project - Bağlam Penceresi Bütçeleyici
+ReAct mesaj listesini modelin bağlam penceresine (num_ctx) sığdırır.
+
+Ollama pencereyi aşan istemi sessizce baştan keser; bu hem sistem isteminin
+kaybolmasına hem de gereksiz uzun prompt-eval süresine yol açar. Bütçeleyici
+her adımda mesajların token sayısını hesaplar ve gerekirse sırasıyla:
+
+  1. En eski araç çıktılarını kırpar (başı korunur, kalan kısım not ile değiştirilir)
+  2. En eski konuşma turlarını bütün olarak düşürür (kullanıcı mesajı yanıtıyla
+     birlikte gider, sahipsiz asistan mesajı kalmaz; kayan özet ve bu tur korunur)
+  3. Son çare olarak en yeni araç çıktısını da kırpar
+
+Pencere boyutu model başına yapılandırılır (OLLAMA_NUM_CTX_OVERRIDES) ve Ollama
+isteklerine options.num_ctx olarak açıkça geçirilir.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Her mesaj için rol / ayraç token'ları (sohbet şablonu ek yükü)
+MESSAGE_OVERHEAD = 4
+_TOOL_PREFIX = "[ARAÇ:"
+_SUMMARY_PREFIX = "[KONUŞMA ÖZETİ]"
+
+
+def parse_ctx_overrides(raw: str) -> Dict[str, int]:
+    """'qwen2.5-coder:7b=32768,gemma2:9b=8192' → {model: num_ctx}."""
+    out: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        model, sep, value = part.strip().rpartition("=")
+        if sep and model.strip() and value.strip().isdigit():
+            out[model.strip()] = int(value)
+    return out
+
+
+class ContextBudgeter:
+    """
+    counter           : Metin → token sayısı (memory ile aynı sayaç)
+    default_ctx       : Varsayılan bağlam penceresi (OLLAMA_NUM_CTX)
+    overrides         : Model başına pencere
+    response_reserve  : Yanıt için ayrılan token
+    tool_keep_tokens  : Kırpılan araç çıktısından korunacak baş kısım
+    """
+
+    _MEMO_LIMIT = 4096
+
+    def __init__(self, counter: Callable[[str], int], default_ctx: int = 8192,
+                 overrides: Optional[Dict[str, int]] = None, response_reserve: int = 1024,
+                 tool_keep_tokens: int = 256) -> None:
+        self.counter = counter
+        self.default_ctx = default_ctx
+        self.overrides = dict(overrides or {})
+        self.response_reserve = response_reserve
+        self.tool_keep_tokens = tool_keep_tokens
+        self._memo: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config, counter: Callable[[str], int]) -> "ContextBudgeter":
+        overrides = parse_ctx_overrides(getattr(config, "OLLAMA_NUM_CTX_OVERRIDES", ""))
+        gemini_model = getattr(config, "GEMINI_MODEL", "")
+        if gemini_model and gemini_model not in overrides:
+            overrides[gemini_model] = getattr(config, "GEMINI_CONTEXT_WINDOW", 1_048_576)
+        return cls(
+            counter,
+            default_ctx=getattr(config, "OLLAMA_NUM_CTX", 8192),
+            overrides=overrides,
+            response_reserve=getattr(config, "REACT_RESPONSE_RESERVE", 1024),
+            tool_keep_tokens=getattr(config, "REACT_TOOL_OUTPUT_KEEP", 256),
+        )
+
+    def window(self, model: str) -> int:
+        return self.overrides.get(model, self.default_ctx)
+
+    def count(self, text: str) -> int:
+        n = self._memo.get(text)
+        if n is None:
+            if len(self._memo) >= self._MEMO_LIMIT:
+                self._memo.clear()
+            n = self._memo[text] = self.counter(text)
+        return n
+
+    def _cost(self, message: Dict[str, str]) -> int:
+        return self.count(message["content"]) + MESSAGE_OVERHEAD
+
+    # ─────────────────────────────────────────────
+    #  KIRPMA
+    # ─────────────────────────────────────────────
+
+    def _shrink(self, content: str, keep_tokens: int) -> str:
+        """Metnin baş kısmını (~keep_tokens) tutar, kalanı not ile değiştirir."""
+        total = self.count(content)
+        if total <= keep_tokens:
+            return content
+        cut = max(0, int(len(content) * keep_tokens / total))
+        head = content[:cut].rstrip()
+        return (f"{head}\n… [bağlam bütçesi: araç çıktısının kalan ~{total - keep_tokens} token'ı "
+                f"kırpıldı; gerekirse aracı daha dar bir argümanla yeniden çağır]")
+
+    def fit(self, system_prompt: str, messages: List[Dict[str, str]], model: str,
+            protect: int = 1) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """
+        Mesajları pencereye sığdırır. Son `protect` mesaj (bu turun kullanıcı
+        mesajı ve araç adımları) asla düşürülmez, yalnızca kırpılabilir.
+        Girdi listesi değiştirilmez; yeni liste ve rapor döner:
+        {num_ctx, budget, before, after, trimmed, dropped_messages}.
+        """
+        num_ctx = self.window(model)
+        budget = num_ctx - self.response_reserve - self.count(system_prompt) - MESSAGE_OVERHEAD
+        out = list(messages)
+        costs = [self._cost(m) for m in out]
+        before = total = sum(costs)
+        dropped = 0
+
+        if total > budget:
+            droppable = len(out) - max(1, protect)
+            # 1. En eski araç çıktıları (en yenisi hariç) kırpılır
+            tool_idx = [i for i, m in enumerate(out) if m["role"] == "user" and m["content"].startswith(_TOOL_PREFIX)]
+            for i in tool_idx[:-1]:
+                if total <= budget:
+                    break
+                total -= self._replace(out, costs, i, self._shrink(out[i]["content"], self.tool_keep_tokens))
+
+            # 2. En eski turlar bütün olarak düşürülür (özet turu ve korunan mesajlar kalır)
+            drop: set = set()
+            for start, end in self._turns(out):
+                if total <= budget or end > droppable:   # korunan mesajlara taşan tur düşürülmez
+                    break
+                if any(out[k]["content"].startswith(_SUMMARY_PREFIX) for k in range(start, end)):
+                    continue
+                total -= sum(costs[start:end])
+                drop.update(range(start, end))
+            if drop:
+                costs = [c for k, c in enumerate(costs) if k not in drop]
+                out = [m for k, m in enumerate(out) if k not in drop]
+                dropped = len(drop)
+
+            # 3. Hâlâ sığmıyorsa en yeni araç çıktısı / son mesaj da kırpılır
+            if total > budget and out:
+                j = len(out) - 1
+                # Kırpma notunun kendi maliyeti için küçük bir pay bırakılır
+                keep = max(0, self.count(out[j]["content"]) - (total - budget) - 48)
+                total -= self._replace(out, costs, j, self._shrink(out[j]["content"], keep))
+
+        return out, {
+            "num_ctx": num_ctx,
+            "budget": budget,
+            "before": before,
+            "after": total,
+            "trimmed": before - total,
+            "dropped_messages": dropped,
+        }
+
+    @staticmethod
+    def _turns(messages: List[Dict[str, str]]) -> List[Tuple[int, int]]:
+        """[başlangıç, bitiş) tur aralıkları: her tur araç çıktısı olmayan bir kullanıcı mesajıyla başlar."""
+        bounds = [i for i, m in enumerate(messages)
+                  if i == 0 or (m["role"] == "user" and not m["content"].startswith(_TOOL_PREFIX))]
+        return list(zip(bounds, bounds[1:] + [len(messages)]))
+
+    def _replace(self, out: List[Dict[str, str]], costs: List[int], i: int, content: str) -> int:
+        """i. mesajın içeriğini değiştirir; kazanılan token'ı döndürür."""
+        if content == out[i]["content"]:
+            return 0
+        out[i] = {"role": out[i]["role"], "content": content}
+        new_cost = self._cost(out[i])
+        saved = costs[i] - new_cost
+        costs[i] = new_cost
+        return saved
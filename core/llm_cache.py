@@ -0,0 +1,159 @@
+"""
+Sidar Project - LLM Yanıt Önbelleği
+Deterministik (düşük sıcaklıklı) LLM çağrılarının yanıtlarını diskte saklar.
+
+Anahtar: sha256(provider, model, mesajlar, sistem istemi, sıcaklık, json_mode).
+Her kayıt ayrı bir dosyadır ve oturum dosyalarıyla aynı biçimde mühürlenir
+(core/session_codec.py) — MEMORY_ENCRYPTION_KEY varsa önbellek de şifrelidir.
+Süresi dolan kayıtlar okunurken silinir; toplam boyut bütçesi aşılınca en uzun
+süredir kullanılmayan kayıtlar (LRU, dosya mtime'ı) çıkarılır.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.session_codec import SessionCodec, SessionFormatError
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    cache_dir      : Kayıt dizini
+    ttl_s          : Kaydın geçerlilik süresi (saniye)
+    max_bytes      : Toplam disk bütçesi (0 = sınırsız)
+    codec          : Mühürleme için SessionCodec (şifreleme anahtarı taşıyabilir)
+    """
+
+    SUFFIX = ".llmc"
+
+    def __init__(self, cache_dir: Path, ttl_s: float = 86400, max_bytes: int = 0,
+                 codec: Optional[SessionCodec] = None) -> None:
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._codec = codec or SessionCodec()
+        self._lock = threading.Lock()
+        # Bellek içi indeks: anahtar → [boyut, son erişim]; başlangıçta dizinden kurulur
+        self._entries: Dict[str, List[float]] = {}
+        self._total_bytes = 0
+        self._callers: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self._scan()
+
+    @staticmethod
+    def make_key(provider: str, model: str, messages: List[Dict[str, str]],
+                 system_prompt: Optional[str], temperature: float, json_mode: bool) -> str:
+        raw = json.dumps(
+            [provider, model, messages, system_prompt or "", round(float(temperature), 4), bool(json_mode)],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def _scan(self) -> None:
+        for p in self.cache_dir.glob(f"*{self.SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            self._entries[p.stem] = [st.st_size, st.st_mtime]
+            self._total_bytes += st.st_size
+
+    # ─────────────────────────────────────────────
+    #  OKUMA / YAZMA
+    # ─────────────────────────────────────────────
+
+    def get(self, key: str, caller: str = "default") -> Optional[str]:
+        """Geçerli kayıt varsa yanıt metnini döndürür; isabet/ıska sayacını günceller."""
+        text = None
+        with self._lock:
+            if key in self._entries:
+                path = self._path(key)
+                try:
+                    record = self._codec.unseal(path.read_bytes(), key.encode())
+                    if time.time() - record.get("created", 0) <= self.ttl_s:
+                        text = record.get("response")
+                        now = time.time()
+                        os.utime(path, (now, now))
+                        self._entries[key][1] = now
+                    else:
+                        self._remove(key)
+                except (OSError, SessionFormatError) as exc:
+                    logger.warning("LLM önbellek kaydı okunamadı (%s): %s", key[:12], exc)
+                    self._remove(key)
+            self._count(caller, "hits" if text is not None else "misses")
+        return text
+
+    def put(self, key: str, response: str, caller: str = "default") -> None:
+        blob = self._codec.seal(
+            {"created": time.time(), "caller": caller, "response": response}, key.encode()
+        )
+        path = self._path(key)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            try:
+                tmp.write_bytes(blob)
+                os.replace(tmp, path)
+            except OSError as exc:
+                logger.warning("LLM önbelleğine yazılamadı: %s", exc)
+                return
+            old = self._entries.get(key)
+            if old:
+                self._total_bytes -= old[0]
+            self._entries[key] = [len(blob), time.time()]
+            self._total_bytes += len(blob)
+            self._count(caller, "stores")
+            self._enforce_budget()
+
+    def _remove(self, key: str) -> None:
+        size, _ = self._entries.pop(key, (0, 0))
+        self._total_bytes -= size
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _enforce_budget(self) -> None:
+        if self.max_bytes <= 0 or self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    # ─────────────────────────────────────────────
+    #  METRİKLER
+    # ─────────────────────────────────────────────
+
+    def _count(self, caller: str, field: str) -> None:
+        c = self._callers.setdefault(caller, {"hits": 0, "misses": 0, "stores": 0})
+        c[field] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            callers = {}
+            for name, c in self._callers.items():
+                lookups = c["hits"] + c["misses"]
+                callers[name] = dict(c, hit_rate=round(c["hits"] / lookups, 4) if lookups else 0.0)
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "evictions": self.evictions,
+                "callers": callers,
+            }
@@ -3,18 +3,89 @@ Sidar Project - LLM İstemcisi
 Ollama ve Google Gemini API entegrasyonu (Asenkron).
 """
 
+import asyncio
+import codecs
 import json
 import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
 from typing import AsyncGenerator, AsyncIterator, Dict, List, Optional, Union
 
 import httpx
 
+from core.context_budget import parse_ctx_overrides
+from core.llm_cache import LLMResponseCache
+from core.llm_replay import build_transport
+from core.llm_scheduler import INTERACTIVE, LLMScheduler
+from core.llm_telemetry import CallRecord, LLMTelemetry, current_call
+from core.model_residency import ModelResidencyManager
+from core.ollama_pool import OllamaEndpointPool, parse_endpoints
+from core.session_codec import SessionCodec
+from core import tracing
+
 logger = logging.getLogger(__name__)
 
+# Uç noktaya hiç ulaşılamadı: bağlantı reddi ya da paketleri sessizce düşüren makinede bağlantı zaman aşımı
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class NDJSONDecoder:
+    """
+    Bayt akışını satır satır JSON nesnelerine dönüştürür (Ollama /api/chat stream).
+
+    Artımlı UTF-8 çözücü (codecs) paket sınırında bölünen çok baytlı karakterleri
+    kendi içinde tamponlar; satır çerçeveleyici her paketi yalnızca bir kez böler
+    ve yarım satırı parça listesi olarak tutar. Böylece toplam iş akış
+    uzunluğuyla doğrusaldır (eski yöntemde her satırda kalan tampon kopyalanıyordu).
+    Ayrıştırılamayan satırlar atlanır.
+    """
+
+    def __init__(self) -> None:
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial: List[str] = []
+
+    def feed(self, data: bytes) -> List[dict]:
+        text = self._utf8.decode(data)
+        if "\n" not in text:
+            if text:
+                self._partial.append(text)
+            return []
+        lines = text.split("\n")
+        if self._partial:
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+        tail = lines.pop()
+        self._partial = [tail] if tail else []
+        return self._parse(lines)
+
+    def close(self) -> List[dict]:
+        """Akış bittiğinde sonda satır sonu olmadan kalan satırı ayrıştırır."""
+        rest = "".join(self._partial) + self._utf8.decode(b"", final=True)
+        self._partial = []
+        return self._parse([rest])
+
+    @staticmethod
+    def _parse(lines: List[str]) -> List[dict]:
+        out = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                body = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(body, dict):
+                out.append(body)
+        return out
+
 
 class LLMClient:
     """Ollama veya Gemini üzerinden asenkron LLM çağrıları yapar."""
 
+    _GEMINI_MODEL_CACHE = 16   # önbellekte tutulacak en fazla GenerativeModel
+
     def __init__(self, provider: str, config) -> None:
         """
         provider: "ollama" | "gemini"
@@ -22,11 +93,152 @@ class LLMClient:
         """
         self.provider = provider.lower()
         self.config = config
+        # Uzun ömürlü, havuzlu HTTP istemcisi (ilk kullanımda oluşturulur)
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retiring: set = set()   # eski loop'tan kalan istemcileri kapatan görevler
+        self.http_stats: Dict[str, int] = {
+            "requests_total": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "clients_created": 0,
+        }
+        # Öncelikli istek zamanlayıcısı: eşzamanlı istek sınırı + etkileşimli > arka plan
+        self.scheduler = LLMScheduler(
+            max_in_flight=getattr(config, "LLM_MAX_IN_FLIGHT", 2),
+            background_max=getattr(config, "LLM_BACKGROUND_MAX_IN_FLIGHT", 1),
+        )
+        # Çağrı başına TTFT / gecikme / token telemetrisi (model × çağıran histogramları)
+        self.telemetry = LLMTelemetry()
+        # Ollama uç nokta havuzu: OLLAMA_URL virgülle ayrılmış birden fazla adres alabilir
+        self.ollama_pool = OllamaEndpointPool(
+            parse_endpoints(getattr(config, "OLLAMA_URL", "")),
+            strategy=getattr(config, "OLLAMA_LB_STRATEGY", "least_outstanding"),
+            health_interval=getattr(config, "OLLAMA_HEALTH_INTERVAL", 15.0),
+            load_penalty=getattr(config, "OLLAMA_LB_LOAD_PENALTY", 2.0),
+        )
+        # Gemini: tek seferlik configure, GenerativeModel önbelleği, artımlı history dönüşümü
+        self._gemini_configured_key: Optional[str] = None
+        self._gemini_models: "OrderedDict[tuple, object]" = OrderedDict()
+        self._gemini_hist_src: List[Dict[str, str]] = []
+        self._gemini_hist_out: List[Optional[dict]] = []
+        # Model başına bağlam penceresi (options.num_ctx olarak açıkça gönderilir)
+        self._num_ctx_overrides = parse_ctx_overrides(getattr(config, "OLLAMA_NUM_CTX_OVERRIDES", ""))
+        # Model yerleşimi: keep_alive politikası, açılışta ön yükleme, soğuk yükleme olayları
+        self.residency = ModelResidencyManager(self, config)
+        # Opsiyonel deterministik yanıt önbelleği (LLM_CACHE_ENABLED)
+        self.cache: Optional[LLMResponseCache] = None
+        if getattr(config, "LLM_CACHE_ENABLED", False):
+            self.cache = LLMResponseCache(
+                Path(config.DATA_DIR) / "llm_cache",
+                ttl_s=getattr(config, "LLM_CACHE_TTL", 86400),
+                max_bytes=int(getattr(config, "LLM_CACHE_MAX_MB", 100) * 1024 * 1024),
+                codec=SessionCodec(getattr(config, "MEMORY_ENCRYPTION_KEY", "")),
+            )
+
+    def num_ctx(self, model: str) -> int:
+        """Modelin bağlam penceresi (OLLAMA_NUM_CTX_OVERRIDES > OLLAMA_NUM_CTX)."""
+        return self._num_ctx_overrides.get(model, getattr(self.config, "OLLAMA_NUM_CTX", 8192))
 
     @property
     def _ollama_base_url(self) -> str:
-        """Ollama API kök URL'sini normalize eder (sondaki '/api' varsa kaldırır)."""
-        return self.config.OLLAMA_URL.removesuffix("/api")
+        """Birincil Ollama uç noktasının kök URL'si (sondaki '/api' kaldırılmış)."""
+        return self.ollama_pool.primary.url
+
+    # ─────────────────────────────────────────────
+    #  HTTP BAĞLANTI HAVUZU
+    # ─────────────────────────────────────────────
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """
+        Paylaşılan AsyncClient'ı döndürür. Keep-alive havuzu sayesinde ReAct
+        adımları ve sağlık yoklamaları TCP bağlantısını yeniden kullanır.
+        İstemci event loop'a bağlıdır; loop değişmişse (örn. ardışık
+        asyncio.run çağrıları) eskisi kapatılır ve yenisi oluşturulur.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            if self._http is not None and not self._http.is_closed:
+                self._retire_http(self._http, self._http_loop)
+            limits = httpx.Limits(
+                max_connections=getattr(self.config, "LLM_HTTP_MAX_CONNECTIONS", 10),
+                max_keepalive_connections=getattr(self.config, "LLM_HTTP_MAX_KEEPALIVE", 5),
+                keepalive_expiry=getattr(self.config, "LLM_HTTP_KEEPALIVE_EXPIRY", 60.0),
+            )
+            http2 = self._http2_enabled()
+            self._http = httpx.AsyncClient(
+                timeout=getattr(self.config, "OLLAMA_TIMEOUT", 60),
+                limits=limits,
+                http2=http2,
+                # LLM_TRANSPORT=replay/record: Ollama taklidi veya kaydedici (None → gerçek ağ)
+                transport=build_transport(self.config, limits, http2),
+            )
+            self._http_loop = loop
+            self.http_stats["clients_created"] += 1
+        return self._http
+
+    def _retire_http(self, client: httpx.AsyncClient, owner: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Başka loop'a bağlı eski istemciyi kapatır (havuzdaki bağlantılar sızmasın).
+        Sahip loop başka bir thread'de hâlâ çalışıyorsa kapatma oraya gönderilir;
+        kapanmışsa geçerli loop'ta denenir — soketleri ölü loop'a bağlı bağlantılar
+        bu durumda kapatılamayabilir, hata yalnızca debug olarak loglanır.
+        """
+        if owner is not None and owner.is_running() and not owner.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+            return
+
+        async def close() -> None:
+            try:
+                await client.aclose()
+            except Exception as exc:
+                logger.debug("Eski HTTP istemcisi kapatılamadı: %s", exc)
+
+        task = asyncio.get_running_loop().create_task(close())
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    def _http2_enabled(self) -> bool:
+        """HTTP/2 yalnızca istenmişse ve 'h2' paketi kuruluysa açılır (https uç noktalarında geçerli)."""
+        if not getattr(self.config, "LLM_HTTP2", True):
+            return False
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _request_extensions(self) -> dict:
+        """Her isteğe bağlantı takibi ekler; yeni TCP bağlantıları trace olayından sayılır."""
+        self.http_stats["requests_total"] += 1
+        self.http_stats["connections_reused"] += 1
+        return {"trace": self._trace}
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.http_stats["connections_opened"] += 1
+            self.http_stats["connections_reused"] -= 1
+        elif event == "connection.connect_tcp.failed":
+            self.http_stats["connections_reused"] -= 1
+
+    def connection_stats(self) -> Dict[str, float]:
+        """Bağlantı yeniden kullanım istatistikleri (/metrics için)."""
+        stats: Dict[str, float] = dict(self.http_stats)
+        total = stats["requests_total"]
+        stats["reuse_ratio"] = round(stats["connections_reused"] / total, 4) if total else 0.0
+        return stats
+
+    async def aclose(self) -> None:
+        """Havuzdaki bağlantıları kapatır (uygulama kapanışında çağrılmalı)."""
+        await self.ollama_pool.stop()
+        loop = asyncio.get_running_loop()
+        pending = [t for t in self._retiring if t.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+        self._http_loop = None
 
     # ─────────────────────────────────────────────
     #  ANA ÇAĞRI NOKTASI
@@ -40,6 +252,9 @@ class LLMClient:
         temperature: float = 0.3,
         stream: bool = False,
         json_mode: bool = True,
+        caller: str = "default",
+        priority: str = INTERACTIVE,
+        usage_sink: Optional[List[CallRecord]] = None,
     ) -> Union[str, AsyncIterator[str]]:
         """
         Sohbet tamamlama isteği gönder (Asenkron).
@@ -48,17 +263,132 @@ class LLMClient:
             stream   : True ise yanıt parça parça (AsyncIterator) döner.
             json_mode: True ise modeli JSON çıktıya zorlar (ReAct döngüsü için).
                        Özetleme gibi düz metin gereken çağrılarda False geçin.
+            caller   : Çağıran bileşenin adı (önbellek isabet metrikleri için).
+            priority : "interactive" (kullanıcı bekliyor) | "background" (özetleme vb.).
+                       İstek, zamanlayıcıda slot alana kadar bekler; akışlarda slot
+                       akış bitene veya kapatılana kadar tutulur.
+            usage_sink: Verilirse bu çağrının CallRecord'u listeye eklenir; token
+                       sayaçları akış bittiğinde kayıtta olur (önbellek isabetinde eklenmez).
         """
+        if self.provider == "gemini":
+            model = getattr(self.config, "GEMINI_MODEL", "")
+        else:
+            model = model or self.config.CODING_MODEL
+
+        # Akışta span akış bitince kapanır; geçerli span yapılmaz (ReAct adımı üst span kalır)
+        span = tracing.start_span("llm.chat", activate=False, model=model, caller=caller, stream=stream)
+        cache_key = None
+        if self.cache is not None and temperature <= getattr(self.config, "LLM_CACHE_MAX_TEMPERATURE", 0.3):
+            cache_key = LLMResponseCache.make_key(
+                self.provider, model, list(messages), system_prompt, temperature, json_mode
+            )
+            cached = await asyncio.to_thread(self.cache.get, cache_key, caller)
+            if cached is not None:
+                span.end(cache_hit=True)
+                return self._fallback_stream(cached) if stream else cached
+
         if system_prompt:
             messages = [{"role": "system", "content": system_prompt}] + list(messages)
 
-        if self.provider == "ollama":
-            return await self._ollama_chat(messages, model or self.config.CODING_MODEL, temperature, stream, json_mode)
-        elif self.provider == "gemini":
-            return await self._gemini_chat(messages, temperature, stream, json_mode)
-        else:
+        if self.provider not in ("ollama", "gemini"):
             raise ValueError(f"Bilinmeyen AI sağlayıcısı: {self.provider}")
 
+        queued = time.monotonic()
+        await self.scheduler.acquire(priority)
+        span.set(queue_ms=round((time.monotonic() - queued) * 1000, 1))
+        record = CallRecord(self.provider, model, caller)
+        if usage_sink is not None:
+            usage_sink.append(record)
+        token = current_call.set(record)
+        try:
+            if self.provider == "ollama":
+                result = await self._ollama_chat(messages, model, temperature, stream, json_mode)
+            else:
+                result = await self._gemini_chat(messages, temperature, stream, json_mode)
+        except BaseException:
+            self.scheduler.release(priority)
+            record.finish(ok=False)
+            self.telemetry.observe(record)
+            self._end_span(span, record)
+            raise
+        finally:
+            current_call.reset(token)
+        if stream:
+            result = self._observe_stream(result, record, span)
+            if cache_key is not None:
+                result = self._capture_stream(result, cache_key, caller)
+            # Slotu tutan sarmalayıcı en dışta: hiç okunmadan kapatılan akış da slotu bırakır
+            return self.scheduler.hold_stream(result, priority)
+
+        self.scheduler.release(priority)
+        record.finish(ok=not self._is_error_payload(result))
+        self.telemetry.observe(record)
+        self._end_span(span, record)
+        if cache_key is None:
+            return result
+        if not self._is_error_payload(result):
+            await asyncio.to_thread(self.cache.put, cache_key, result, caller)
+        return result
+
+    async def _capture_stream(self, stream: AsyncIterator[str], cache_key: str,
+                              caller: str) -> AsyncGenerator[str, None]:
+        """
+        Akışı olduğu gibi iletir; yalnızca akış sonuna kadar tüketilir ve hata
+        parçası içermezse tam yanıtı önbelleğe yazar.
+        """
+        parts: List[str] = []
+        failed = False
+        try:
+            async for chunk in stream:
+                failed = failed or self._is_error_payload(chunk)
+                parts.append(chunk)
+                yield chunk
+        finally:
+            # Yarıda kapatılırsa alttaki akış da kapatılır (telemetri kaydı hemen yazılır)
+            await stream.aclose()
+        if not failed and parts:
+            await asyncio.to_thread(self.cache.put, cache_key, "".join(parts), caller)
+
+    async def _observe_stream(self, stream: AsyncIterator[str], record: CallRecord,
+                              span=tracing.NOOP_SPAN) -> AsyncGenerator[str, None]:
+        """İlk parçada TTFT'yi işaretler; akış bitince (veya kesilince) kaydı telemetriye yazar."""
+        failed = False
+        completed = False
+        try:
+            async for chunk in stream:
+                record.mark_first_token()
+                failed = failed or self._is_error_payload(chunk)
+                yield chunk
+            completed = True
+        finally:
+            # Yarıda kapatılan akış tam süreyi ölçmez → hata sayılır, histogramlara girmez
+            record.finish(ok=completed and not failed)
+            self.telemetry.observe(record)
+            self._end_span(span, record, "" if completed else "cancelled")
+
+    @staticmethod
+    def _end_span(span, record: CallRecord, status: str = "") -> None:
+        """llm.chat span'ını çağrı kaydının TTFT ve token sayılarıyla kapatır."""
+        attrs = {}
+        if record.ttft_s is not None:
+            attrs["ttft_ms"] = round(record.ttft_s * 1000, 1)
+        if record.prompt_tokens is not None:
+            attrs["prompt_tokens"] = record.prompt_tokens
+        if record.completion_tokens is not None:
+            attrs["completion_tokens"] = record.completion_tokens
+        span.end(status or ("ok" if record.ok else "error"), **attrs)
+
+    @staticmethod
+    def _is_error_payload(text: str) -> bool:
+        """İstemcinin ürettiği [HATA] final_answer yanıtları önbelleğe alınmaz."""
+        if "[HATA]" not in text:
+            return False
+        try:
+            body = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return False
+        return isinstance(body, dict) and str(body.get("argument", "")).lstrip().startswith("[HATA]")
+
     # ─────────────────────────────────────────────
     #  OLLAMA (ASYNC)
     # ─────────────────────────────────────────────
@@ -71,10 +401,9 @@ class LLMClient:
         stream: bool,
         json_mode: bool = True,
     ) -> Union[str, AsyncIterator[str]]:
-        url = f"{self._ollama_base_url}/api/chat"
-
         # Ollama options: GPU katman sayısını ilet (USE_GPU=true ise)
-        options: dict = {"temperature": temperature}
+        # num_ctx açıkça verilir: Ollama'nın varsayılanı küçük olabilir ve aşan istem sessizce kesilir
+        options: dict = {"temperature": temperature, "num_ctx": self.num_ctx(model)}
         use_gpu = getattr(self.config, "USE_GPU", False)
         if use_gpu:
             # num_gpu=-1 → Ollama tüm model katmanlarını GPU'ya atar (0 = CPU-only).
@@ -87,6 +416,8 @@ class LLMClient:
             "stream": stream,
             "options": options,
         }
+        if self.residency.keep_alive is not None:
+            payload["keep_alive"] = self.residency.keep_alive
         # Structured output: Ollama ≥0.4 JSON şeması destekler.
         # ToolCall şeması ile modeli SADECE {thought, tool, argument} üretmeye zorla.
         # Bu hallucination ve yanlış formatlı çıktıların önüne geçer.
@@ -104,19 +435,40 @@ class LLMClient:
         
         timeout = getattr(self.config, "OLLAMA_TIMEOUT", 60)
         
-        try:
-            # STREAM MODU
-            if stream:
-                return self._stream_ollama_response(url, payload, timeout=timeout)
+        self.ollama_pool.ensure_health_task(self._get_http)
+        record = current_call.get()
 
-            # NORMAL MOD
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.post(url, json=payload)
-                resp.raise_for_status()
-                data = resp.json()
+        # STREAM MODU
+        if stream:
+            return self._stream_ollama_response(payload, timeout=timeout, record=record)
+
+        # NORMAL MOD — bağlantı kurulamazsa sıradaki uç noktaya geçilir
+        tried: set = set()
+        try:
+            while True:
+                ep = self.ollama_pool.pick(model, exclude=tried)
+                tried.add(ep.url)
+                started = self.ollama_pool.begin(ep)
+                try:
+                    resp = await self._get_http().post(
+                        f"{ep.url}/api/chat", json=payload, timeout=timeout,
+                        extensions=self._request_extensions(),
+                    )
+                    resp.raise_for_status()
+                    data = resp.json()
+                except _CONNECT_ERRORS as exc:
+                    self.ollama_pool.end(ep, started, ok=False)
+                    if not self._fail_over(ep, exc, model, tried):
+                        raise
+                    continue
+                except BaseException:
+                    self.ollama_pool.end(ep, started, ok=False)
+                    raise
+                self.ollama_pool.end(ep, started, model)
+                self._note_usage(data, ep.url, record)
                 return data.get("message", {}).get("content", "")
 
-        except httpx.ConnectError:
+        except _CONNECT_ERRORS:
             logger.error("Ollama bağlantı hatası.")
             msg = json.dumps({"tool": "final_answer", "argument": "[HATA] Ollama'ya bağlanılamadı. 'ollama serve' açık mı?", "thought": "Hata oluştu."})
             return self._fallback_stream(msg) if stream else msg
@@ -125,55 +477,78 @@ class LLMClient:
             msg = json.dumps({"tool": "final_answer", "argument": f"[HATA] Ollama: {exc}", "thought": "Hata oluştu."})
             return self._fallback_stream(msg) if stream else msg
 
-    async def _stream_ollama_response(self, url: str, payload: dict, timeout: int = 120) -> AsyncGenerator[str, None]:
+    def _note_usage(self, body: dict, endpoint: str, record: Optional[CallRecord]) -> None:
+        """Ollama son kaydındaki sayaçları telemetriye, model yükleme süresini yerleşim yöneticisine iletir."""
+        if record is not None:
+            record.set_ollama_usage(body)
+        if body.get("load_duration"):
+            self.residency.note_load(body.get("model", ""), endpoint, body["load_duration"] / 1e9)
+
+    def _fail_over(self, ep, exc: BaseException, model: str, tried: set) -> bool:
+        """Uç noktayı devre dışı bırakır; denenmemiş başka aday varsa True döner."""
+        self.ollama_pool.mark_down(ep, exc)
+        if self.ollama_pool.pick(model, exclude=tried) is None:
+            return False
+        self.ollama_pool.failovers += 1
+        logger.warning("Ollama isteği başka uç noktaya aktarılıyor (%s başarısız).", ep.url)
+        return True
+
+    async def _stream_ollama_response(self, payload: dict, timeout: int = 120,
+                                      record: Optional[CallRecord] = None) -> AsyncGenerator[str, None]:
         """
-        Ollama stream yanıtını manuel buffer ile güvenli şekilde ayrıştırır.
+        Ollama NDJSON stream yanıtını doğrusal zamanda ayrıştırır.
 
         Sorun (aiter_lines): TCP paket sınırlarında JSON objesi ikiye bölünebilir;
         JSONDecodeError ile atlanan satır sessizce içerik kaybına yol açar.
 
-        Çözüm: aiter_bytes() ile ham veri okunur, '\\n' karakterine göre satırlara
-        bölünür. Tamamlanmamış satır buffer'da bekletilir, tam satır gelince ayrıştırılır.
+        Çözüm: aiter_bytes() ile ham veri okunur; NDJSONDecoder her baytı bir kez
+        işler (artımlı UTF-8 çözücü + satır çerçeveleyici). Tamamlanmamış satır ve
+        yarım çok baytlı karakterler bir sonraki pakete kadar bekletilir.
+
+        Bağlantı hatasında (henüz hiç parça verilmemişken) sıradaki uç noktaya geçilir.
+        Uç nokta ancak son kayıt (done=true) alınınca sağlıklı sayılır; yarıda kesilen akış sayılmaz.
+        Son kayıttaki (done=true) token/süre sayaçları telemetri kaydına aktarılır.
         """
+        model = payload.get("model", "")
+        tried: set = set()
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                async with client.stream("POST", url, json=payload) as resp:
-                    resp.raise_for_status()
-                    buffer = ""
-                    _byte_buf = b""  # Tamamlanmamış UTF-8 çok baytlı karakterler için
-                    async for raw_bytes in resp.aiter_bytes():
-                        _byte_buf += raw_bytes
-                        # Tamamlanmamış çok baytlı karakterleri sonraki pakete bırak
-                        try:
-                            decoded = _byte_buf.decode("utf-8")
-                            _byte_buf = b""
-                        except UnicodeDecodeError:
-                            # Son 1-3 bayt tamamlanmamış UTF-8 sekansı olabilir
-                            decoded = None
-                            for trim in (1, 2, 3):
-                                try:
-                                    decoded = _byte_buf[:-trim].decode("utf-8")
-                                    _byte_buf = _byte_buf[-trim:]
-                                    break
-                                except UnicodeDecodeError:
-                                    continue
-                            if decoded is None:
-                                decoded = _byte_buf.decode("utf-8", errors="replace")
-                                _byte_buf = b""
-                        buffer += decoded
-                        # Tamamlanmış satırları işle; son (henüz bitmemiş) satır buffer'da kalır
-                        while "\n" in buffer:
-                            line, buffer = buffer.split("\n", 1)
-                            line = line.strip()
-                            if not line:
-                                continue
-                            try:
-                                body = json.loads(line)
+            while True:
+                ep = self.ollama_pool.pick(model, exclude=tried)
+                tried.add(ep.url)
+                started = self.ollama_pool.begin(ep)
+                ok = False          # yalnızca done=true kaydı alınınca başarılı sayılır
+                connected = False   # başlıklar geldikten sonra başka uç noktaya geçilmez
+                try:
+                    async with self._get_http().stream(
+                        "POST", f"{ep.url}/api/chat", json=payload, timeout=timeout,
+                        extensions=self._request_extensions(),
+                    ) as resp:
+                        resp.raise_for_status()
+                        # Gecikme: yanıt başlıklarına kadar geçen süre; istek akış bitene dek sürer
+                        ep.observe_latency(time.monotonic() - started)
+                        connected = True
+                        decoder = NDJSONDecoder()
+                        async for raw_bytes in resp.aiter_bytes():
+                            for body in decoder.feed(raw_bytes):
+                                if body.get("done"):
+                                    ok = True
+                                    self._note_usage(body, ep.url, record)
                                 chunk = body.get("message", {}).get("content", "")
                                 if chunk:
                                     yield chunk
-                            except json.JSONDecodeError:
-                                continue
+                        for body in decoder.close():
+                            if body.get("done"):
+                                ok = True
+                                self._note_usage(body, ep.url, record)
+                            chunk = body.get("message", {}).get("content", "")
+                            if chunk:
+                                yield chunk
+                    return
+                except _CONNECT_ERRORS as exc:
+                    if connected or not self._fail_over(ep, exc, model, tried):
+                        raise
+                finally:
+                    self.ollama_pool.end(ep, None, model, ok=ok)
         except Exception as exc:
             yield json.dumps({"tool": "final_answer", "argument": f"\n[HATA] Akış kesildi: {exc}", "thought": "Hata"})
 
@@ -198,7 +573,11 @@ class LLMClient:
             msg = json.dumps({"tool": "final_answer", "argument": "[HATA] GEMINI_API_KEY ayarlanmamış.", "thought": "Key eksik"})
             return self._fallback_stream(msg) if stream else msg
 
-        genai.configure(api_key=self.config.GEMINI_API_KEY)
+        # İstemci API anahtarı başına bir kez yapılandırılır
+        if self._gemini_configured_key != self.config.GEMINI_API_KEY:
+            genai.configure(api_key=self.config.GEMINI_API_KEY)
+            self._gemini_configured_key = self.config.GEMINI_API_KEY
+            self._gemini_models.clear()
 
         # Sistem mesajını ayır
         system_text = ""
@@ -209,42 +588,27 @@ class LLMClient:
             else:
                 chat_messages.append(m)
 
-        gen_config = {"temperature": temperature}
-        if json_mode:
-            gen_config["response_mime_type"] = "application/json"
-
-        model = genai.GenerativeModel(
-            model_name=self.config.GEMINI_MODEL,
-            system_instruction=system_text or None,
-            generation_config=gen_config,
-        )
-
-        # Gemini history formatı
-        history = []
-        last_user = None
-        for m in chat_messages:
-            role = "user" if m["role"] == "user" else "model"
-            if role == "user":
-                last_user = m["content"]
-                if history or last_user:
-                    history.append({"role": role, "parts": [m["content"]]})
-            else:
-                history.append({"role": role, "parts": [m["content"]]})
+        model = self._gemini_model(genai, system_text, temperature, json_mode)
+        history = self._gemini_history(chat_messages)
 
+        last_user = next((m["content"] for m in reversed(chat_messages) if m["role"] == "user"), None)
         if not last_user and chat_messages:
             last_user = chat_messages[-1]["content"]
-        
+
         prompt = last_user or "Merhaba"
 
         try:
             chat_session = model.start_chat(history=history[:-1] if history else [])
             
+            record = current_call.get()
             if stream:
                 # Gemini asenkron çağrısı: send_message_async
                 response_stream = await chat_session.send_message_async(prompt, stream=True)
-                return self._stream_gemini_generator(response_stream)
+                return self._stream_gemini_generator(response_stream, record)
             else:
                 response = await chat_session.send_message_async(prompt)
+                if record is not None:
+                    record.set_gemini_usage(getattr(response, "usage_metadata", None))
                 return response.text
 
         except Exception as exc:
@@ -252,17 +616,61 @@ class LLMClient:
             msg = json.dumps({"tool": "final_answer", "argument": f"[HATA] Gemini: {exc}", "thought": "Hata"})
             return self._fallback_stream(msg) if stream else msg
 
-    async def _stream_gemini_generator(self, response_stream) -> AsyncGenerator[str, None]:
-        """Gemini stream yanıtını asenkron dönüştürür."""
+    def _gemini_model(self, genai, system_text: str, temperature: float, json_mode: bool):
+        """(model, sistem istemi, üretim ayarı) başına GenerativeModel örneğini önbellekten verir (LRU)."""
+        key = (self.config.GEMINI_MODEL, system_text, float(temperature), bool(json_mode))
+        model = self._gemini_models.get(key)
+        if model is not None:
+            self._gemini_models.move_to_end(key)
+            return model
+        gen_config = {"temperature": temperature}
+        if json_mode:
+            gen_config["response_mime_type"] = "application/json"
+        model = genai.GenerativeModel(
+            model_name=self.config.GEMINI_MODEL,
+            system_instruction=system_text or None,
+            generation_config=gen_config,
+        )
+        self._gemini_models[key] = model
+        if len(self._gemini_models) > self._GEMINI_MODEL_CACHE:
+            self._gemini_models.popitem(last=False)
+        return model
+
+    def _gemini_history(self, chat_messages: List[Dict[str, str]]) -> List[dict]:
+        """
+        Mesajları Gemini history biçimine çevirir. ReAct adımlarında liste yalnızca
+        sonuna ekleme ile büyüdüğü için önceki çağrıyla ortak önek yeniden
+        kullanılır; yalnızca yeni mesajlar dönüştürülür.
+        """
+        src, entries = self._gemini_hist_src, self._gemini_hist_out
+        k, n = 0, min(len(src), len(chat_messages))
+        while k < n and (src[k] is chat_messages[k] or src[k] == chat_messages[k]):
+            k += 1
+        del src[k:], entries[k:]
+        has_history = any(entries)
+        for m in chat_messages[k:]:
+            role = "user" if m["role"] == "user" else "model"
+            # Baştaki boş kullanıcı mesajı atlanır (entries ile src hizalı kalsın diye None)
+            entry = {"role": role, "parts": [m["content"]]} if (role == "model" or has_history or m["content"]) else None
+            has_history = has_history or entry is not None
+            src.append(m)
+            entries.append(entry)
+        return [e for e in entries if e is not None]
+
+    async def _stream_gemini_generator(self, response_stream,
+                                       record: Optional[CallRecord] = None) -> AsyncGenerator[str, None]:
+        """Gemini stream yanıtını asenkron dönüştürür (son parçadaki usage_metadata kaydedilir)."""
         try:
             async for chunk in response_stream:
+                if record is not None:
+                    record.set_gemini_usage(getattr(chunk, "usage_metadata", None))
                 if chunk.text:
                     yield chunk.text
         except Exception as exc:
             yield json.dumps({"tool": "final_answer", "argument": f"\n[HATA] Gemini akış hatası: {exc}", "thought": "Hata"})
 
     async def _fallback_stream(self, msg: str) -> AsyncGenerator[str, None]:
-        """Hata durumlarında tek elemanlı asenkron akış döndürür."""
+        """Hata durumlarında ve önbellek isabetlerinde tek elemanlı asenkron akış döndürür."""
         yield msg
 
     # ─────────────────────────────────────────────
@@ -270,21 +678,26 @@ class LLMClient:
     # ─────────────────────────────────────────────
 
     async def list_ollama_models(self) -> List[str]:
-        url = f"{self._ollama_base_url}/api/tags"
-        try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(url)
+        """Tüm uç noktalardaki modellerin birleşimi (ilk görülme sırasıyla)."""
+        names: List[str] = []
+        for ep in self.ollama_pool.endpoints:
+            try:
+                resp = await self._get_http().get(f"{ep.url}/api/tags", timeout=10,
+                                                  extensions=self._request_extensions())
                 resp.raise_for_status()
                 models = resp.json().get("models", [])
-                return [m["name"] for m in models]
-        except Exception:
-            return []
+            except Exception:
+                continue
+            names.extend(m["name"] for m in models if m["name"] not in names)
+        return names
 
     async def is_ollama_available(self) -> bool:
-        url = f"{self._ollama_base_url}/api/tags"
-        try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                await client.get(url)
+        """En az bir uç nokta yanıt veriyorsa True."""
+        for ep in self.ollama_pool.endpoints:
+            try:
+                await self._get_http().get(f"{ep.url}/api/tags", timeout=5,
+                                           extensions=self._request_extensions())
                 return True
-        except Exception:
-            return False
\ No newline at end of file
+            except Exception:
+                continue
+        return False
\ No newline at end of file
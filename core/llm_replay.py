@@ -0,0 +1,337 @@
+"""
+Sidar Project - Kayıt / Tekrar Oynatma LLM Taşıyıcısı
+Canlı Ollama veya Gemini olmadan SidarAgent.respond'u uçtan uca çalıştırmak için
+Ollama HTTP API'sini taklit eden httpx taşıyıcıları.
+
+LLM_TRANSPORT (yalnızca AI_PROVIDER=ollama ile):
+  http    : Gerçek Ollama (varsayılan)
+  replay  : LLM_REPLAY_FILE varsa kayıtlı yanıtlar, yoksa LLM_REPLAY_SCENARIO
+            senaryosundaki sentetik yanıtlar; token hızı ve gecikme dağılımı
+            ayarlanabilir (LLM_REPLAY_TOKEN_RATE, LLM_REPLAY_TTFT_MS, LLM_REPLAY_JITTER)
+  record  : Gerçek Ollama'ya gider, her /api/chat isteğini ve yanıtını
+            LLM_REPLAY_FILE dosyasına (JSONL) ekler
+
+Taşıyıcı HTTP katmanında çalıştığı için NDJSON çözücü, uç nokta havuzu,
+zamanlayıcı, telemetri ve SSE akışı gerçek kodla sınanır.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+from core.tokenizer import heuristic_token_count
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+_FEEDBACK_PREFIXES = ("[ARAÇ:", "[Sistem")
+
+
+def _answer(text: str, thought: str = "Yanıt hazır.") -> str:
+    return json.dumps({"thought": thought, "tool": "final_answer", "argument": text}, ensure_ascii=False)
+
+
+def _tool(name: str, argument: str, thought: str) -> str:
+    return json.dumps({"thought": thought, "tool": name, "argument": argument}, ensure_ascii=False)
+
+
+_LONG_ANSWER = (
+    "## Özet\n\nİstenen inceleme tamamlandı. Aşağıda bulgular ve öneriler yer alıyor.\n\n"
+    + "".join(f"{i}. **Bulgu {i}:** `core/modul_{i}.py` içinde gereksiz kopyalama var; "
+              f"liste birleştirme yerine `join` kullanılabilir.\n" for i in range(1, 13))
+    + "\n```python\ndef ornek(x):\n    return [y * 2 for y in x]\n```\n"
+)
+
+# Senaryo kütüphanesi: her senaryo ReAct adımı başına bir yanıt listesidir.
+# Adım sayısı yanıt sayısını aşarsa son yanıt tekrarlanır. "plain" düz metin
+# (json_mode=False) istekleri için kullanılır (örn. bellek özetleme).
+SCENARIOS: Dict[str, Dict] = {
+    "final_answer": {
+        "description": "Tek adımda uzun markdown final_answer",
+        "steps": [_answer(_LONG_ANSWER)],
+    },
+    "tool_then_answer": {
+        "description": "list_dir aracı, ardından final_answer",
+        "steps": [
+            _tool("list_dir", ".", "Önce proje dizinine bakmalıyım."),
+            _answer("Dizin incelendi; proje yapısı beklendiği gibi.", "Sonuç mevcut."),
+        ],
+    },
+    "multi_tool": {
+        "description": "read_file → list_dir → final_answer",
+        "steps": [
+            _tool("read_file", "config.py", "Yapılandırmayı okuyayım."),
+            _tool("list_dir", "core", "Çekirdek modüllere bakayım."),
+            _answer(_LONG_ANSWER, "Yeterli bilgi toplandı."),
+        ],
+    },
+    "parallel_read": {
+        "description": "parallel ile üç araç tek adımda, ardından final_answer",
+        "steps": [
+            json.dumps({"thought": "Bağımsız dosyaları birlikte okuyorum.", "tool": "parallel", "argument": "",
+                        "calls": [{"tool": "read_file", "argument": "config.py"},
+                                  {"tool": "read_file", "argument": "main.py"},
+                                  {"tool": "list_dir", "argument": "core"}]}, ensure_ascii=False),
+            _answer(_LONG_ANSWER, "Üç sonuç tek adımda geldi."),
+        ],
+    },
+    "malformed_then_fix": {
+        "description": "Önce bozuk JSON (ayrıştırma yeniden denemesi), sonra geçerli yanıt",
+        "steps": [
+            '```json\n{"thought": "eksik", "tool": ',
+            _answer("Düzeltilmiş yanıt."),
+        ],
+    },
+}
+PLAIN_RESPONSE = "Kullanıcı proje yapısını ve performans iyileştirmelerini sordu; araçlarla incelendi ve özetlendi."
+
+
+def _react_step(messages: List[Dict[str, str]]) -> int:
+    """Son gerçek kullanıcı mesajından sonraki asistan mesajı sayısı = ReAct adım indeksi."""
+    step = 0
+    for m in reversed(messages):
+        if m.get("role") == "assistant":
+            step += 1
+        elif m.get("role") == "user" and not str(m.get("content", "")).startswith(_FEEDBACK_PREFIXES):
+            break
+    return step
+
+
+def request_key(model: str, messages: List[Dict[str, str]], json_mode: bool) -> str:
+    raw = json.dumps([model, [[m.get("role"), m.get("content")] for m in messages], json_mode],
+                     ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReplaySource:
+    """
+    Yanıt kaynağı: kayıt dosyası (tam eşleşme, yoksa sırayla) veya senaryo.
+    Kayıt satırı: {"key", "model", "json_mode", "response", "ttft_s", "tokens_per_s"}
+    """
+
+    def __init__(self, scenario: str = "tool_then_answer", records_file: Optional[Path] = None) -> None:
+        self.scenario = scenario if scenario in SCENARIOS else "tool_then_answer"
+        self.records: List[Dict] = []
+        self._by_key: Dict[str, Dict] = {}
+        self._cursor = 0
+        if records_file is not None and Path(records_file).exists():
+            for line in Path(records_file).read_text(encoding="utf-8").splitlines():
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.records.append(rec)
+                self._by_key.setdefault(rec.get("key", ""), rec)
+            logger.info("LLM replay: %d kayıt yüklendi (%s)", len(self.records), records_file)
+
+    def respond(self, model: str, messages: List[Dict[str, str]], json_mode: bool) -> Dict:
+        """{"response", "ttft_s"?, "tokens_per_s"?} döndürür."""
+        if self.records:
+            rec = self._by_key.get(request_key(model, messages, json_mode))
+            if rec is None:
+                rec = self.records[self._cursor % len(self.records)]
+                self._cursor += 1
+            return rec
+        if not json_mode:
+            return {"response": PLAIN_RESPONSE}
+        steps = SCENARIOS[self.scenario]["steps"]
+        return {"response": steps[min(_react_step(messages), len(steps) - 1)]}
+
+
+class _PacedNDJSON(httpx.AsyncByteStream):
+    """Yanıtı token token, verilen gecikme ve hızla Ollama NDJSON biçiminde akıtır."""
+
+    def __init__(self, model: str, tokens: List[str], ttft_s: float, delays: List[float],
+                 prompt_tokens: int) -> None:
+        self.model = model
+        self.tokens = tokens
+        self.ttft_s = ttft_s
+        self.delays = delays
+        self.prompt_tokens = prompt_tokens
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        started = time.monotonic()
+        await asyncio.sleep(self.ttft_s)
+        gen_started = time.monotonic()
+        pending = 0.0
+        for tok, delay in zip(self.tokens, self.delays):
+            yield (json.dumps({"model": self.model, "message": {"role": "assistant", "content": tok},
+                               "done": False}, ensure_ascii=False) + "\n").encode("utf-8")
+            # Çok kısa beklemeler biriktirilir (zamanlayıcı çözünürlüğü)
+            pending += delay
+            if pending >= 0.005:
+                await asyncio.sleep(pending)
+                pending = 0.0
+        now = time.monotonic()
+        yield (json.dumps({
+            "model": self.model, "message": {"role": "assistant", "content": ""}, "done": True,
+            "prompt_eval_count": self.prompt_tokens, "eval_count": len(self.tokens),
+            "eval_duration": int((now - gen_started) * 1e9), "total_duration": int((now - started) * 1e9),
+            "load_duration": 0,
+        }) + "\n").encode("utf-8")
+
+
+class ReplayOllamaTransport(httpx.AsyncBaseTransport):
+    """
+    Ollama /api/chat, /api/tags, /api/ps uç noktalarını taklit eder.
+
+    token_rate  : Ortalama token/saniye (0 = beklemesiz)
+    ttft_ms     : Ortalama ilk token gecikmesi (ms)
+    jitter      : Log-normal dağılım sigması (0 = sabit)
+    """
+
+    def __init__(self, source: ReplaySource, token_rate: float = 40.0, ttft_ms: float = 300.0,
+                 jitter: float = 0.3, seed: Optional[int] = None,
+                 counter: Callable[[str], int] = heuristic_token_count) -> None:
+        self.source = source
+        self.token_rate = token_rate
+        self.ttft_ms = ttft_ms
+        self.jitter = jitter
+        self.counter = counter
+        self._rng = random.Random(seed)
+        self.requests = 0
+
+    def _sample(self, mean: float) -> float:
+        """Ortalaması `mean` olan log-normal örnek (jitter=0 → sabit)."""
+        if mean <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return mean
+        mu = -0.5 * self.jitter ** 2   # E[lognormal(mu, s)] = 1
+        return mean * self._rng.lognormvariate(mu, self.jitter)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path in ("/api/tags", "/api/ps"):
+            return httpx.Response(200, json={"models": []})
+        if path != "/api/chat":
+            return httpx.Response(404, json={"error": f"replay: {path} desteklenmiyor"})
+
+        body = json.loads(await request.aread() or b"{}")
+        model = body.get("model", "")
+        messages = body.get("messages") or []
+        if not messages:   # ön yükleme isteği
+            return httpx.Response(200, json={"model": model, "done": True, "done_reason": "load",
+                                             "load_duration": 0})
+        self.requests += 1
+        json_mode = "format" in body
+        rec = self.source.respond(model, messages, json_mode)
+        text = rec.get("response", "")
+        tokens = _TOKEN_RE.findall(text) or [""]
+        prompt_tokens = sum(self.counter(str(m.get("content", ""))) for m in messages)
+        ttft = rec["ttft_s"] if "ttft_s" in rec and self.ttft_ms < 0 else self._sample(self.ttft_ms / 1000)
+        rate = rec.get("tokens_per_s") if self.token_rate < 0 else self.token_rate
+        per_token = 1.0 / rate if rate else 0.0
+        delays = [self._sample(per_token) for _ in tokens]
+
+        if body.get("stream", True):
+            return httpx.Response(
+                200, headers={"Content-Type": "application/x-ndjson"},
+                stream=_PacedNDJSON(model, tokens, ttft, delays, prompt_tokens),
+            )
+        await asyncio.sleep(ttft + sum(delays))
+        return httpx.Response(200, json={
+            "model": model, "message": {"role": "assistant", "content": text}, "done": True,
+            "prompt_eval_count": prompt_tokens, "eval_count": len(tokens),
+            "eval_duration": int(sum(delays) * 1e9), "load_duration": 0,
+        })
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, on_done: Callable[[bytes, float, float], None]) -> None:
+        self.inner = inner
+        self.on_done = on_done
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        started = time.monotonic()
+        first = None
+        parts = []
+        async for chunk in self.inner:
+            if first is None:
+                first = time.monotonic()
+            parts.append(chunk)
+            yield chunk
+        self.on_done(b"".join(parts), (first or time.monotonic()) - started, time.monotonic() - started)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Gerçek taşıyıcıyı sarar; /api/chat istek-yanıt çiftlerini JSONL olarak kaydeder."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, records_file: Path) -> None:
+        self.inner = inner
+        self.records_file = Path(records_file)
+        self.records_file.parent.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        if request.url.path != "/api/chat" or response.status_code != 200:
+            return response
+        body = json.loads(request.content or b"{}")
+        if not body.get("messages"):
+            return response
+
+        def on_done(raw: bytes, ttft_s: float, total_s: float) -> None:
+            text, eval_count = [], 0
+            for line in raw.decode("utf-8", errors="replace").splitlines():
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text.append(rec.get("message", {}).get("content", ""))
+                eval_count = rec.get("eval_count", eval_count)
+            gen_s = max(total_s - ttft_s, 1e-6)
+            record = {
+                "key": request_key(body.get("model", ""), body["messages"], "format" in body),
+                "model": body.get("model", ""),
+                "json_mode": "format" in body,
+                "last_user": next((m.get("content", "")[:200] for m in reversed(body["messages"])
+                                   if m.get("role") == "user"), ""),
+                "response": "".join(text),
+                "ttft_s": round(ttft_s, 4),
+                "tokens_per_s": round(eval_count / gen_s, 2) if eval_count else None,
+            }
+            with self.records_file.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+        return httpx.Response(
+            response.status_code, headers=response.headers,
+            stream=_RecordingStream(response.stream, on_done), extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def build_transport(config, limits: httpx.Limits, http2: bool) -> Optional[httpx.AsyncBaseTransport]:
+    """LLM_TRANSPORT ayarına göre taşıyıcı üretir; 'http' için None (httpx varsayılanı)."""
+    mode = str(getattr(config, "LLM_TRANSPORT", "http")).lower()
+    records = getattr(config, "LLM_REPLAY_FILE", "") or None
+    if mode == "replay":
+        source = ReplaySource(getattr(config, "LLM_REPLAY_SCENARIO", "tool_then_answer"),
+                              Path(records) if records else None)
+        return ReplayOllamaTransport(
+            source,
+            token_rate=getattr(config, "LLM_REPLAY_TOKEN_RATE", 40.0),
+            ttft_ms=getattr(config, "LLM_REPLAY_TTFT_MS", 300.0),
+            jitter=getattr(config, "LLM_REPLAY_JITTER", 0.3),
+            seed=getattr(config, "LLM_REPLAY_SEED", None),
+        )
+    if mode == "record":
+        if not records:
+            logger.warning("LLM_TRANSPORT=record ama LLM_REPLAY_FILE boş — kayıt yapılmıyor.")
+            return None
+        return RecordingTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2), Path(records))
+    return None
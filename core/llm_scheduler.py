@@ -0,0 +1,182 @@
+"""
+Sidar Project - LLM İstek Zamanlayıcısı
+LLM çağrılarını öncelik sınıflarına göre sıraya koyar ve eşzamanlı istek
+sayısını sınırlar. Tek model sunan yerel bir Ollama paralel isteklerde ciddi
+yavaşladığı için etkileşimli (ReAct) adımlar arka plan işlerinin (özetleme vb.)
+önüne geçer; arka plan işleri ayrıca kendi üst sınırıyla kısıtlanır, böylece
+etkileşimli istekler için her zaman boş bir slot kalır.
+
+Bekleyen bir istek iptal edilirse (örn. SSE istemcisi bağlantıyı kesti) kuyruktan
+çıkarılır; slot almış ama iptal edilmiş istekler slotu geri bırakır.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)  # yüksekten düşüğe
+
+
+class LLMScheduler:
+    """
+    max_in_flight        : Aynı anda sağlayıcıya giden en fazla istek sayısı
+    background_max       : Arka plan sınıfının kullanabileceği en fazla slot
+    """
+
+    def __init__(self, max_in_flight: int = 2, background_max: int = 1) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self.background_max = max(1, min(background_max, self.max_in_flight))
+        self._in_flight = 0
+        self._class_in_flight: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._queues: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+        self._stats: Dict[str, Dict[str, float]] = {
+            p: {"requests": 0, "cancelled": 0, "wait_total_s": 0.0, "wait_max_s": 0.0, "wait_last_s": 0.0}
+            for p in PRIORITIES
+        }
+
+    # ─────────────────────────────────────────────
+    #  SLOT YÖNETİMİ
+    # ─────────────────────────────────────────────
+
+    def _can_run(self, cls: str) -> bool:
+        if self._in_flight >= self.max_in_flight:
+            return False
+        return cls != BACKGROUND or self._class_in_flight[BACKGROUND] < self.background_max
+
+    def _ahead(self, cls: str) -> bool:
+        """Aynı veya daha yüksek öncelikte bekleyen istek var mı?"""
+        for p in PRIORITIES:
+            if any(not f.done() for f in self._queues[p]):
+                return True
+            if p == cls:
+                return False
+        return False
+
+    def _grant(self, cls: str) -> None:
+        self._in_flight += 1
+        self._class_in_flight[cls] += 1
+
+    def _dispatch(self) -> None:
+        """Boş slotları öncelik sırasına göre bekleyenlere dağıtır."""
+        for cls in PRIORITIES:
+            queue = self._queues[cls]
+            while queue and self._can_run(cls):
+                fut = queue.popleft()
+                if fut.done():  # iptal edilmiş bekleyen
+                    continue
+                self._grant(cls)
+                fut.set_result(None)
+
+    async def acquire(self, priority: str = INTERACTIVE) -> None:
+        cls = priority if priority in self._queues else INTERACTIVE
+        started = time.monotonic()
+        if not self._ahead(cls) and self._can_run(cls):
+            self._grant(cls)
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            self._queues[cls].append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                self._stats[cls]["cancelled"] += 1
+                if fut.done() and not fut.cancelled():
+                    # Slot verildikten hemen sonra iptal edildi → geri bırak
+                    self.release(cls)
+                else:
+                    fut.cancel()
+                    try:
+                        self._queues[cls].remove(fut)
+                    except ValueError:
+                        pass
+                raise
+        wait = time.monotonic() - started
+        st = self._stats[cls]
+        st["requests"] += 1
+        st["wait_total_s"] += wait
+        st["wait_last_s"] = round(wait, 4)
+        st["wait_max_s"] = max(st["wait_max_s"], st["wait_last_s"])
+
+    def release(self, priority: str = INTERACTIVE) -> None:
+        cls = priority if priority in self._queues else INTERACTIVE
+        self._in_flight = max(0, self._in_flight - 1)
+        self._class_in_flight[cls] = max(0, self._class_in_flight[cls] - 1)
+        self._dispatch()
+
+    def hold_stream(self, stream: AsyncIterator[str], priority: str) -> "HeldStream":
+        """Akış sonuna kadar (veya kapatılana / iptal edilene kadar) slotu tutar."""
+        return HeldStream(self, stream, priority)
+
+    # ─────────────────────────────────────────────
+    #  METRİKLER
+    # ─────────────────────────────────────────────
+
+    def stats(self) -> Dict:
+        classes = {}
+        for cls, st in self._stats.items():
+            n = st["requests"]
+            classes[cls] = {
+                "requests": n,
+                "cancelled": st["cancelled"],
+                "queued": sum(1 for f in self._queues[cls] if not f.done()),
+                "in_flight": self._class_in_flight[cls],
+                "wait_avg_s": round(st["wait_total_s"] / n, 4) if n else 0.0,
+                "wait_max_s": st["wait_max_s"],
+                "wait_last_s": st["wait_last_s"],
+            }
+        return {
+            "max_in_flight": self.max_in_flight,
+            "background_max": self.background_max,
+            "in_flight": self._in_flight,
+            "classes": classes,
+        }
+
+
+class HeldStream:
+    """
+    Zamanlayıcı slotunu tutan akış sarmalayıcısı.
+
+    Async generator'ın finally bloğu, ilk __anext__ çağrısından önce kapatılırsa
+    hiç çalışmaz (örn. istemci chat() döndükten hemen sonra ayrıldı) ve slot
+    sızardı. Burada aclose() slotu her koşulda bir kez bırakır; akış sonu ve
+    hata da aclose() üzerinden geçer. Ne tüketilmiş ne kapatılmış nesne çöpe
+    giderken slot yine bırakılır.
+    """
+
+    def __init__(self, scheduler: LLMScheduler, stream: AsyncIterator[str], priority: str) -> None:
+        self._scheduler = scheduler
+        self._stream = stream
+        self._priority = priority
+        self._released = False
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler.release(self._priority)
+
+    def __aiter__(self) -> "HeldStream":
+        return self
+
+    async def __anext__(self) -> str:
+        if self._released:
+            raise StopAsyncIteration
+        try:
+            return await self._stream.__anext__()
+        except BaseException:
+            # StopAsyncIteration, hata veya iptal: slot bırakılır, alttaki akış kapatılır
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        if self._released:
+            return
+        self._release()
+        # Yarıda kapatılırsa alttaki akış da hemen kapatılır (HTTP yanıtı, telemetri)
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def __del__(self) -> None:
+        self._release()
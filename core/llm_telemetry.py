@@ -0,0 +1,199 @@
+"""
+Sidar Project - LLM Çağrı Telemetrisi
+Her LLM çağrısı için ilk token süresi (TTFT), toplam gecikme, istem/yanıt token
+sayıları ve token/saniye ölçülür; model × çağıran (react, summary ...) başına
+histogramlarda toplanır ve /metrics üzerinden sunulur.
+
+Ollama son kayıtta (done=true) prompt_eval_count, eval_count, eval_duration ve
+load_duration alanlarını döndürür; Gemini usage_metadata içinde token sayılarını
+verir. Token/saniye mümkünse sunucunun ölçtüğü eval_duration'dan, değilse ilk
+token ile son token arasındaki süreden hesaplanır.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Aktif çağrının kaydı: LLMClient.chat() ayarlar, sağlayıcı kodu kullanım bilgisini buraya yazar
+current_call: contextvars.ContextVar[Optional["CallRecord"]] = contextvars.ContextVar(
+    "sidar_llm_call", default=None
+)
+
+SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 80, 160)
+
+# Ölçü adı → (kova sınırları, açıklama, Prometheus metrik adı)
+METRICS: Dict[str, Tuple[Sequence[float], str, str]] = {
+    "ttft_s":            (SECONDS_BUCKETS, "İlk token süresi (saniye)", "sidar_llm_ttft_seconds"),
+    "latency_s":         (SECONDS_BUCKETS, "Toplam çağrı süresi (saniye)", "sidar_llm_latency_seconds"),
+    "prompt_tokens":     (TOKEN_BUCKETS, "İstem token sayısı", "sidar_llm_prompt_tokens"),
+    "completion_tokens": (TOKEN_BUCKETS, "Yanıt token sayısı", "sidar_llm_completion_tokens"),
+    "tokens_per_s":      (RATE_BUCKETS, "Üretim hızı (token/saniye)", "sidar_llm_tokens_per_second"),
+}
+
+
+class Histogram:
+    """Sabit kovalı, birikimli olmayan sayaçlarla tutulan hafif histogram."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # son kova: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Kova üst sınırına göre yaklaşık yüzdelik (son kovada gözlenen en büyük değer)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Prometheus biçiminde (le, birikimli sayı) listesi."""
+        out, total = [], 0
+        for bound, c in zip(self.bounds, self.counts):
+            total += c
+            out.append((str(bound), total))
+        out.append(("+Inf", self.count))
+        return out
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 4) if self.count else 0.0,
+            "max": round(self.max, 4),
+            "p50": round(self.quantile(0.5), 4),
+            "p95": round(self.quantile(0.95), 4),
+        }
+
+
+class CallRecord:
+    """Tek bir LLM çağrısının ölçümleri."""
+
+    def __init__(self, provider: str, model: str, caller: str) -> None:
+        self.provider = provider
+        self.model = model
+        self.caller = caller
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.eval_duration_s: Optional[float] = None
+        self.load_duration_s: Optional[float] = None
+        self.ok = True
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def finish(self, ok: bool = True) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+            self.mark_first_token()     # akışsız çağrıda ilk token = tam yanıt
+            self.ok = ok
+
+    def set_ollama_usage(self, body: dict) -> None:
+        """Ollama son kaydındaki sayaçları alır (süreler nanosaniye)."""
+        if "prompt_eval_count" in body:
+            self.prompt_tokens = int(body["prompt_eval_count"])
+        if "eval_count" in body:
+            self.completion_tokens = int(body["eval_count"])
+        if body.get("eval_duration"):
+            self.eval_duration_s = body["eval_duration"] / 1e9
+        if body.get("load_duration"):
+            self.load_duration_s = body["load_duration"] / 1e9
+
+    def set_gemini_usage(self, usage) -> None:
+        """Gemini usage_metadata nesnesindeki token sayılarını alır."""
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_token_count", None)
+        completion = getattr(usage, "candidates_token_count", None)
+        if prompt:
+            self.prompt_tokens = int(prompt)
+        if completion:
+            self.completion_tokens = int(completion)
+
+    @property
+    def ttft_s(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.started
+
+    @property
+    def latency_s(self) -> Optional[float]:
+        return None if self.finished_at is None else self.finished_at - self.started
+
+    @property
+    def tokens_per_s(self) -> Optional[float]:
+        if not self.completion_tokens:
+            return None
+        duration = self.eval_duration_s
+        if not duration and self.finished_at is not None and self.first_token_at is not None:
+            duration = self.finished_at - self.first_token_at
+        return self.completion_tokens / duration if duration else None
+
+    def as_dict(self) -> Dict:
+        def r(v):
+            return round(v, 4) if isinstance(v, float) else v
+        return {
+            "provider": self.provider, "model": self.model, "caller": self.caller, "ok": self.ok,
+            "ttft_s": r(self.ttft_s), "latency_s": r(self.latency_s),
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "tokens_per_s": r(self.tokens_per_s), "load_duration_s": r(self.load_duration_s),
+        }
+
+
+class LLMTelemetry:
+    """Çağrı kayıtlarını (model, çağıran) serilerinde histogramlara toplar."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], Dict[str, Histogram]] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self.last: Optional[Dict] = None
+
+    def observe(self, record: CallRecord) -> None:
+        key = (record.model, record.caller)
+        with self._lock:
+            self.last = record.as_dict()
+            if not record.ok:
+                self._errors[key] = self._errors.get(key, 0) + 1
+                return
+            hists = self._series.get(key)
+            if hists is None:
+                hists = self._series[key] = {name: Histogram(m[0]) for name, m in METRICS.items()}
+            for name in METRICS:
+                value = getattr(record, name)
+                if value is not None:
+                    hists[name].observe(value)
+
+    def series(self) -> List[Tuple[str, str, Dict[str, Histogram]]]:
+        """(model, çağıran, histogramlar) listesi — Prometheus dışa aktarımı için."""
+        with self._lock:
+            return [(m, c, h) for (m, c), h in self._series.items()]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            keys = sorted(set(self._series) | set(self._errors))
+            series = []
+            for key in keys:
+                hists = self._series.get(key, {})
+                entry = {"model": key[0], "caller": key[1], "errors": self._errors.get(key, 0)}
+                entry.update({name: h.summary() for name, h in hists.items()})
+                series.append(entry)
+            return {"last_call": self.last, "series": series}
@@ -4,38 +4,66 @@ Sidar Project - Konuşma Belleği (Kalıcı)
 """
 
 import json
+import os
 import time
 import uuid
 import threading
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+
+from core.session_codec import SessionCodec, SessionFormatError, is_v2_blob
+from core.session_index import SessionSearchIndex
+from core.tokenizer import HEURISTIC_COUNTER
+from core import tracing
 
 logger = logging.getLogger(__name__)
 
 class ConversationMemory:
     """
     Thread-safe ve kalıcı (persistent) çoklu konuşma (session) belleği yöneticisi.
-    Verileri sessions dizininde ayrı JSON dosyalarında saklar.
-    MEMORY_ENCRYPTION_KEY ayarlandığında oturum dosyaları Fernet (AES-128-CBC) ile şifrelenir.
+    Verileri sessions dizininde oturum başına bir dosyada saklar (v2: kompakt JSON,
+    zlib sıkıştırma, parça tabanlı — bkz. core/session_codec.py).
+    MEMORY_ENCRYPTION_KEY ayarlandığında her parça AES-256-GCM ile şifrelenir.
+    Eski düz JSON / tek parça Fernet dosyaları okunabilir; ilk kayıtta v2'ye geçirilir.
     """
 
+    # needs_summarization() token eşiği
+    SUMMARY_TOKEN_THRESHOLD = 6000
+
     def __init__(self, file_path: Path, max_turns: int = 20,
-                 encryption_key: str = "") -> None:
+                 encryption_key: str = "",
+                 token_counter: Optional[Callable[[str], int]] = None) -> None:
         # Eski memory.json yolunu alıp yerine 'sessions' klasörü oluşturuyoruz
         self.sessions_dir = file_path.parent / "sessions"
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
         self.max_turns = max_turns
         self._lock = threading.RLock()
 
-        # Opsiyonel Fernet şifreleme
+        # Opsiyonel Fernet şifreleme (eski format dosyaları okumak için)
         self._fernet = self._init_fernet(encryption_key)
+        # v2 oturum formatı + değişmeyen parçaların mühürlü bayt önbelleği
+        self._codec = SessionCodec(encryption_key if self._fernet else "")
+        self._chunk_cache: Dict[tuple, bytes] = {}
+
+        # Tur başına bir kez hesaplanan token sayımı + aktif oturumun toplamı
+        self._token_counter = token_counter or HEURISTIC_COUNTER
+        self._token_total: int = 0
 
         # Aktif oturum (seçili sohbet) bilgileri
         self.active_session_id: Optional[str] = None
         self.active_title: str = "Yeni Sohbet"
         self._turns: List[Dict] = []
         self._last_file: Optional[str] = None
+        # Bağlama yansıyan durum (son dosya, oturum) değiştikçe artar
+        self.state_version: int = 0
+        # Kayan özet: en eski turlar sıkıştırıldıkça güncellenen özet metni
+        self._summary: str = ""
+        self._summary_tokens: int = 0
+
+        # Tam metin arama indeksi (turlar eklendikçe artımlı güncellenir)
+        self.search_index = SessionSearchIndex(self.sessions_dir / "index", codec=self._codec)
+        self._sync_search_index()
 
         # Başlangıçta oturumları yükle veya yeni oluştur
         self._init_sessions()
@@ -58,8 +86,14 @@ class ConversationMemory:
             return None
 
     def _read_session_file(self, file_path: Path) -> dict:
-        """Oturum dosyasını okur; şifreli ise çözer, düz metin ise doğrudan parse eder."""
+        """Oturum dosyasını okur; v2 ise parçaları çözer, eski formatta Fernet/düz JSON dener."""
         raw = file_path.read_bytes()
+        if is_v2_blob(raw):
+            return self._codec.decode_file(file_path)
+        return self._read_legacy_blob(raw, file_path)
+
+    def _read_legacy_blob(self, raw: bytes, file_path: Path) -> dict:
+        """Eski format: girintili JSON, opsiyonel olarak tek parça Fernet ile şifreli."""
         if self._fernet:
             try:
                 content = self._fernet.decrypt(raw).decode("utf-8")
@@ -74,13 +108,170 @@ class ConversationMemory:
             content = raw.decode("utf-8")
         return json.loads(content)
 
-    def _write_session_file(self, file_path: Path, data: dict) -> None:
-        """Oturum dosyasını yazar; şifreleme etkinse Fernet ile şifreler."""
-        json_bytes = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
-        if self._fernet:
-            file_path.write_bytes(self._fernet.encrypt(json_bytes))
+    def _read_session_meta(self, file_path: Path) -> dict:
+        """Listeleme için metaveri: v2'de yalnızca footer okunur, turlar çözülmez."""
+        with open(file_path, "rb") as fh:
+            head = fh.read(4)
+        if is_v2_blob(head):
+            return self._codec.read_meta(file_path)
+        data = self._read_legacy_blob(file_path.read_bytes(), file_path)
+        turns = data.get("turns", [])
+        data["turn_count"] = len(turns)
+        data["user_count"] = sum(1 for t in turns if t.get("role") == "user")
+        data["asst_count"] = sum(1 for t in turns if t.get("role") == "assistant")
+        return data
+
+    def _write_session_file(self, file_path: Path, data: dict,
+                            cache: Optional[Dict[tuple, bytes]] = None) -> None:
+        """Oturum dosyasını v2 formatında atomik olarak yazar (tmp + os.replace)."""
+        # İstek dışı yazımlar (oturum yönetimi uç noktaları) izleme başlatmaz
+        with tracing.start_span("memory.save", require_parent=True) as span:
+            blob = self._codec.encode(data, cache=cache, session_id=file_path.stem)
+            tmp_path = file_path.with_name(file_path.name + ".tmp")
+            tmp_path.write_bytes(blob)
+            os.replace(tmp_path, file_path)
+            span.set(bytes=len(blob), turns=len(data.get("turns", ())))
+
+    def read_session_turns(self, session_id: str, start: int = 0,
+                           stop: Optional[int] = None) -> Optional[Dict]:
+        """
+        Bir oturumun [start, stop) tur aralığını, oturumu aktif yapmadan okur.
+        v2 dosyalarında yalnızca aralığı kapsayan parçalar çözülür.
+
+        Returns:
+            {"meta": {...}, "turns": [...]} veya oturum yoksa None.
+        """
+        file_path = self.sessions_dir / f"{session_id}.json"
+        if not file_path.exists():
+            return None
+        with self._lock:
+            with open(file_path, "rb") as fh:
+                head = fh.read(4)
+            if is_v2_blob(head):
+                meta, turns = self._codec.read_turns(file_path, start, stop)
+            else:
+                meta = self._read_legacy_blob(file_path.read_bytes(), file_path)
+                all_turns = meta.pop("turns", [])
+                meta["turn_count"] = len(all_turns)
+                turns = all_turns[start:stop]
+        return {"meta": meta, "turns": turns}
+
+    def read_history_page(self, session_id: str, limit: int = 50,
+                          before: Optional[str] = None) -> Optional[Dict]:
+        """
+        Oturum geçmişini en yeniden eskiye sayfalar halinde okur.
+        Yalnızca sayfanın düştüğü parçalar çözülür; oturum aktif yapılmaz.
+
+        before: Önceki sayfanın döndürdüğü "next_cursor" ("<indeks>:<zaman damgası>").
+                Boşsa en yeni sayfa döner.
+
+        Returns:
+            {"turns": [...] (sayfa içinde kronolojik), "total", "start",
+             "has_more", "next_cursor"} veya oturum yoksa None.
+
+        Raises:
+            ValueError: İmleç geçersizse veya oturumun başı o sırada kırpıldıysa
+                        (özet / pencere taşması) — istemci ilk sayfadan yeniden başlamalı.
+        """
+        limit = max(1, limit)
+        if before:
+            try:
+                idx_str, ts_str = before.split(":", 1)
+                anchor, anchor_ts = int(idx_str), float(ts_str)
+            except ValueError:
+                raise ValueError("Geçersiz imleç.")
+            # Bir fazla tur okunarak imlecin hâlâ aynı tura işaret ettiği doğrulanır
+            page = self.read_session_turns(session_id, max(anchor - limit, 0), anchor + 1)
+            if page is None:
+                return None
+            turns = page["turns"]
+            if not turns or anchor < 0 or turns[-1].get("timestamp") != anchor_ts:
+                raise ValueError("İmleç eskidi; geçmiş değişti.")
+            turns = turns[:-1]
+            start = max(anchor - limit, 0)
         else:
-            file_path.write_bytes(json_bytes)
+            page = self.read_session_turns(session_id, -limit)
+            if page is None:
+                return None
+            turns = page["turns"]
+            start = page["meta"].get("turn_count", len(turns)) - len(turns)
+        return self._history_page(turns, page["meta"].get("turn_count", 0), start)
+
+    @staticmethod
+    def _history_page(turns: List[Dict], total: int, start: int) -> Dict:
+        return {
+            "turns": turns,
+            "total": total,
+            "start": start,
+            "has_more": start > 0,
+            "next_cursor": f"{start}:{turns[0].get('timestamp')!r}" if start > 0 and turns else None,
+        }
+
+    def migrate_sessions(self) -> Dict[str, int]:
+        """
+        Eski formattaki (girintili JSON / tek parça Fernet) tüm oturumları v2'ye dönüştürür.
+        Dönüştürülemeyen dosyalara dokunulmaz.
+        """
+        stats = {"migrated": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+        with self._lock:
+            for file_path in self.sessions_dir.glob("*.json"):
+                try:
+                    raw = file_path.read_bytes()
+                    if is_v2_blob(raw):
+                        stats["skipped"] += 1
+                        continue
+                    data = self._read_legacy_blob(raw, file_path)
+                    self._write_session_file(file_path, data)
+                    stats["migrated"] += 1
+                    stats["bytes_before"] += len(raw)
+                    stats["bytes_after"] += file_path.stat().st_size
+                except Exception as exc:
+                    stats["failed"] += 1
+                    logger.error("Oturum dönüştürülemedi (%s): %s", file_path.name, exc)
+        logger.info(
+            "Oturum geçişi: %d dönüştürüldü, %d zaten v2, %d hatalı (%d → %d bayt).",
+            stats["migrated"], stats["skipped"], stats["failed"],
+            stats["bytes_before"], stats["bytes_after"],
+        )
+        return stats
+
+    def _sync_search_index(self) -> None:
+        """
+        Arama indeksini diskteki oturumlarla uzlaştırır: indeks yoksa/bozuksa
+        tümü yeniden kurulur; aksi halde yalnızca eksik oturumlar eklenir
+        (örn. arşivden geri yüklenen) ve dosyası kalmayanlar çıkarılır.
+        """
+        index = self.search_index
+        on_disk = {p.stem: p for p in self.sessions_dir.glob("*.json")}
+        with self._lock:
+            if not index.loaded:
+                sessions = []
+                for sid, path in on_disk.items():
+                    try:
+                        sessions.append(self._read_session_file(path))
+                    except Exception as exc:
+                        logger.warning("Oturum indekslenemedi (%s): %s", path.name, exc)
+                index.rebuild(sessions)
+                logger.info("Oturum arama indeksi oluşturuldu (%d oturum).", len(sessions))
+                return
+            indexed = set(index.session_ids())
+            for sid in indexed - on_disk.keys():
+                index.remove_session(sid)
+            for sid in on_disk.keys() - indexed:
+                self.reindex_session(sid)
+
+    def reindex_session(self, session_id: str) -> None:
+        """Tek bir oturumu dosyasından yeniden indeksler."""
+        file_path = self.sessions_dir / f"{session_id}.json"
+        with self._lock:
+            try:
+                self.search_index.index_session(self._read_session_file(file_path))
+            except Exception as exc:
+                logger.warning("Oturum indekslenemedi (%s): %s", file_path.name, exc)
+
+    def search_sessions(self, query: str, limit: int = 20) -> List[Dict]:
+        """Tüm oturumlarda tam metin arama (bkz. SessionSearchIndex.search)."""
+        return self.search_index.search(query, limit=limit)
 
     def _init_sessions(self) -> None:
         """Mevcut oturumları bul, yoksa yeni bir tane oluştur ve aktif yap."""
@@ -102,19 +293,16 @@ class ConversationMemory:
         with self._lock:
             for file_path in self.sessions_dir.glob("*.json"):
                 try:
-                    data = self._read_session_file(file_path)
-                    turns = data.get("turns", [])
-                    user_count = sum(1 for t in turns if t.get("role") == "user")
-                    asst_count = sum(1 for t in turns if t.get("role") == "assistant")
+                    data = self._read_session_meta(file_path)
                     sessions.append({
                         "id": data.get("id", file_path.stem),
                         "title": data.get("title", "İsimsiz Sohbet"),
                         "updated_at": data.get("updated_at", 0),
-                        "msg_count": len(turns),
-                        "user_count": user_count,
-                        "asst_count": asst_count,
+                        "msg_count": data.get("turn_count", 0),
+                        "user_count": data.get("user_count", 0),
+                        "asst_count": data.get("asst_count", 0),
                     })
-                except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                except (json.JSONDecodeError, UnicodeDecodeError, SessionFormatError) as exc:
                     logger.error("Bozuk oturum dosyası: %s — %s", file_path.name, exc)
                     # Bozuk / şifre çözülemeyen dosyayı karantinaya al
                     broken_path = file_path.with_suffix(".json.broken")
@@ -139,9 +327,15 @@ class ConversationMemory:
         with self._lock:
             self.active_session_id = session_id
             self.active_title = title
+            self._chunk_cache = {}
             self._turns = []
+            self._token_total = 0
+            self._summary = ""
+            self._summary_tokens = 0
             self._last_file = None
+            self.state_version += 1
             self._save()
+            self.search_index.set_title(session_id, title, time.time())
             logger.info(f"Yeni oturum oluşturuldu: {session_id} - {title}")
         return session_id
 
@@ -156,15 +350,33 @@ class ConversationMemory:
             with self._lock:
                 data = self._read_session_file(file_path)
                 self.active_session_id = session_id
+                self._chunk_cache = {}
                 self.active_title = data.get("title", "İsimsiz Sohbet")
                 self._turns = data.get("turns", [])
                 self._last_file = data.get("last_file")
+                self.state_version += 1
+                self._summary = data.get("summary", "")
+                self._sync_token_counts(data.get("tokenizer"))
                 logger.info(f"Oturum yüklendi: {session_id} ({len(self._turns)} mesaj)")
             return True
         except Exception as exc:
             logger.error(f"Oturum yükleme hatası ({session_id}): {exc}")
             return False
 
+    def load_session_page(self, session_id: str, limit: int = 50) -> Optional[Dict]:
+        """
+        Oturumu aktif yapar ve geçmişin en yeni sayfasını döndürür.
+        Aktif oturum tüm turlarıyla bellekte tutulduğundan etkinleştirme dosyanın
+        tamamını çözer (engelleyici — thread'de çağrılmalı); sayfa bellekteki
+        turlardan kurulur, dosya ikinci kez okunmaz. Biçim read_history_page ile aynıdır.
+        """
+        with self._lock:
+            if not self.load_session(session_id):
+                return None
+            total = len(self._turns)
+            turns = self._turns[-max(1, limit):]
+            return self._history_page(list(turns), total, total - len(turns))
+
     def delete_session(self, session_id: str) -> bool:
         """Belirtilen oturumu siler."""
         file_path = self.sessions_dir / f"{session_id}.json"
@@ -172,6 +384,7 @@ class ConversationMemory:
             if file_path.exists():
                 try:
                     file_path.unlink()
+                    self.search_index.remove_session(session_id)
                     logger.info(f"Oturum silindi: {session_id}")
                     # Eğer silinen oturum aktif oturumsa, başka birine geç veya yeni oluştur
                     if self.active_session_id == session_id:
@@ -186,6 +399,7 @@ class ConversationMemory:
         with self._lock:
             self.active_title = new_title
             self._save()
+            self.search_index.set_title(self.active_session_id, new_title, time.time())
 
     # ─────────────────────────────────────────────
     #  PERSISTENCE (Kalıcılık)
@@ -202,11 +416,13 @@ class ConversationMemory:
                 "title": self.active_title,
                 "updated_at": time.time(),
                 "last_file": self._last_file,
+                "tokenizer": self.tokenizer_name,
+                "summary": self._summary,
                 "turns": self._turns
             }
             file_path = self.sessions_dir / f"{self.active_session_id}.json"
             with self._lock:
-                self._write_session_file(file_path, data)
+                self._write_session_file(file_path, data, cache=self._chunk_cache)
         except Exception as exc:
             logger.error(f"Bellek kaydetme hatası: {exc}")
 
@@ -217,15 +433,20 @@ class ConversationMemory:
     def add(self, role: str, content: str) -> None:
         """Yeni bir mesaj turu ekle ve kaydet."""
         with self._lock:
-            self._turns.append({
-                "role": role,
-                "content": content,
-                "timestamp": time.time(),
-            })
+            turn = self._make_turn(role, content)
+            self._turns.append(turn)
+            self._token_total += turn["tokens"]
+            self.search_index.add_turn(self.active_session_id, turn, turn["timestamp"])
             # Pencere boyutunu koru
             if len(self._turns) > self.max_turns * 2:
-                self._turns = self._turns[-(self.max_turns * 2):]
-            
+                overflow = len(self._turns) - self.max_turns * 2
+                dropped = self._turns[:overflow]
+                self._token_total -= sum(t.get("tokens", 0) for t in dropped)
+                self._turns = self._turns[overflow:]
+                self.search_index.drop_turns(
+                    self.active_session_id, [t.get("timestamp") for t in dropped]
+                )
+
             self._save()
 
     def get_history(self, n_last: Optional[int] = None) -> List[Dict]:
@@ -235,9 +456,14 @@ class ConversationMemory:
         return turns if n_last is None else turns[-n_last:]
 
     def get_messages_for_llm(self) -> List[Dict[str, str]]:
-        """LLM API çağrısı için mesaj listesi döndür."""
+        """LLM API çağrısı için mesaj listesi döndür (varsa kayan özet başta)."""
         with self._lock:
-            return [{"role": t["role"], "content": t["content"]} for t in self._turns]
+            messages = []
+            if self._summary:
+                messages.append({"role": "user", "content": "[Önceki konuşmaların özeti istendi]"})
+                messages.append({"role": "assistant", "content": f"[KONUŞMA ÖZETİ]\n{self._summary}"})
+            messages.extend({"role": t["role"], "content": t["content"]} for t in self._turns)
+            return messages
 
     # ─────────────────────────────────────────────
     #  DOSYA TAKİBİ
@@ -245,7 +471,10 @@ class ConversationMemory:
 
     def set_last_file(self, path: str) -> None:
         with self._lock:
+            if self._last_file == path:   # değişmediyse diske yazma
+                return
             self._last_file = path
+            self.state_version += 1
             self._save()
 
     def get_last_file(self) -> Optional[str]:
@@ -253,43 +482,112 @@ class ConversationMemory:
             return self._last_file
 
     # ─────────────────────────────────────────────
-    #  ÖZETLEME DESTEĞİ
+    #  TOKEN SAYIMI
     # ─────────────────────────────────────────────
 
+    @property
+    def tokenizer_name(self) -> str:
+        return getattr(self._token_counter, "name", "custom")
+
+    def set_token_counter(self, counter: Callable[[str], int]) -> None:
+        """Token sayacını değiştirir (örn. model değişimi) ve aktif oturumu yeniden sayar."""
+        with self._lock:
+            self._token_counter = counter
+            self._sync_token_counts(None)
+
+    def _make_turn(self, role: str, content: str) -> Dict:
+        return {
+            "role": role,
+            "content": content,
+            "timestamp": time.time(),
+            "tokens": self._token_counter(content),
+        }
+
+    def _sync_token_counts(self, stored_tokenizer: Optional[str]) -> None:
+        """
+        Yüklenen turların token sayımlarını doğrular.
+        Eski dosyalarda 'tokens' alanı yoksa veya oturum farklı bir
+        tokenizer ile kaydedildiyse sayımlar bir kez yeniden hesaplanır.
+        """
+        recount = stored_tokenizer != self.tokenizer_name
+        total = 0
+        for t in self._turns:
+            if recount or "tokens" not in t:
+                t["tokens"] = self._token_counter(t.get("content", ""))
+            total += t["tokens"]
+        self._summary_tokens = self._token_counter(self._summary)
+        self._token_total = total + self._summary_tokens
+
     def _estimate_tokens(self) -> int:
-        """Kabaca token tahmini: UTF-8 Türkçe için ~3.5 karakter/token."""
-        total_chars = sum(len(t.get("content", "")) for t in self._turns)
-        return int(total_chars / 3.5)
+        """Aktif oturumun toplam token sayısı (tur eklenirken güncellenen toplam, O(1))."""
+        return self._token_total
+
+    def token_count(self) -> int:
+        with self._lock:
+            return self._token_total
+
+    # ─────────────────────────────────────────────
+    #  ÖZETLEME DESTEĞİ
+    # ─────────────────────────────────────────────
 
     def needs_summarization(self) -> bool:
         """
-        Bellek penceresinin %80'i dolduğunda veya tahmini token sayısı
-        6000'i aştığında özetleme sinyali ver.
+        Bellek penceresinin %80'i dolduğunda veya token toplamı
+        SUMMARY_TOKEN_THRESHOLD'u aştığında özetleme sinyali ver.
         """
         with self._lock:
             threshold = int(self.max_turns * 2 * 0.8)
-            token_est = self._estimate_tokens()
-            return len(self._turns) >= threshold or token_est > 6000
+            return (len(self._turns) >= threshold
+                    or self._token_total > self.SUMMARY_TOKEN_THRESHOLD)
 
-    def apply_summary(self, summary_text: str) -> None:
+    def get_summary(self) -> str:
+        with self._lock:
+            return self._summary
+
+    def get_summary_window(self, max_turns: int, keep_recent: int) -> List[Dict]:
         """
-        Tüm konuşma geçmişini özetle değiştir; belleği sıkıştırır.
+        Özetlenecek en eski tur penceresini döndürür.
+        Son `keep_recent` tur her zaman aynen korunur; pencere bir
+        user/assistant çiftini bölmemek için assistant turu ile biter.
+        """
+        with self._lock:
+            n = min(max_turns, len(self._turns) - keep_recent)
+            while n > 0 and self._turns[n - 1].get("role") != "assistant":
+                n -= 1
+            return [dict(t) for t in self._turns[:max(n, 0)]]
+
+    def apply_rolling_summary(self, summary_text: str, window: List[Dict],
+                              session_id: Optional[str] = None) -> int:
+        """
+        `window` turlarını (get_summary_window çıktısı) kayan özetle değiştirir;
+        sonraki turlar aynen kalır. Özetleme sürerken oturum değiştiyse veya
+        pencere artık geçmişin başında değilse hiçbir şey yapılmaz.
+
+        Returns:
+            Kazanılan token sayısı (uygulanamadıysa 0).
         """
         with self._lock:
-            self._turns = [
-                {
-                    "role": "user",
-                    "content": "[Önceki konuşmaların özeti istendi]",
-                    "timestamp": time.time(),
-                },
-                {
-                    "role": "assistant",
-                    "content": f"[KONUŞMA ÖZETİ]\n{summary_text}",
-                    "timestamp": time.time(),
-                },
-            ]
+            if session_id is not None and session_id != self.active_session_id:
+                logger.info("Özet atlandı: aktif oturum değişti.")
+                return 0
+            n = len(window)
+            head = self._turns[:n]
+            if not n or [(t.get("timestamp"), t.get("role")) for t in head] != \
+                    [(t.get("timestamp"), t.get("role")) for t in window]:
+                logger.info("Özet atlandı: özetlenen pencere artık geçmişin başında değil.")
+                return 0
+
+            removed = sum(t.get("tokens", 0) for t in head) + self._summary_tokens
+            new_tokens = self._token_counter(summary_text)
+            self._turns = self._turns[n:]
+            self._summary = summary_text
+            self._summary_tokens = new_tokens
+            self._token_total += new_tokens - removed
             self._save()
-        logger.info("Konuşma belleği özetleme ile sıkıştırıldı.")
+            self.search_index.drop_turns(session_id or self.active_session_id,
+                                         [t.get("timestamp") for t in head])
+        logger.info("Konuşma belleği kayan özetle sıkıştırıldı (%d tur → özet).", n)
+        return removed - new_tokens
 
     # ─────────────────────────────────────────────
     #  YARDIMCILAR
@@ -299,8 +597,13 @@ class ConversationMemory:
         """Aktif belleği temizle (dosyayı boşaltır ancak silmez)."""
         with self._lock:
             self._turns.clear()
+            self._token_total = 0
+            self._summary = ""
+            self._summary_tokens = 0
             self._last_file = None
+            self.state_version += 1
             self._save()
+            self.search_index.clear_session(self.active_session_id)
 
     def __len__(self) -> int:
         with self._lock:
@@ -0,0 +1,204 @@
+"""
+Sidar Project - Model Yerleşim (Residency) Yöneticisi
+Ollama modellerinin bellekte kalmasını yönetir; böylece yeniden başlatma veya
+uzun bir boşta kalma sonrasındaki ilk /chat, model yükleme süresini ödemez.
+
+Politikalar (OLLAMA_RESIDENCY_POLICY):
+  pinned : keep_alive=-1 — modeller süresiz bellekte tutulur; periyodik kontrolde
+           tümü bellekten düşmüşse (örn. Ollama yeniden başladı) yeniden yüklenir
+  idle   : keep_alive=OLLAMA_KEEP_ALIVE — son istekten bu süre sonra boşaltılır
+  off    : keep_alive gönderilmez, ön yükleme yapılmaz (Ollama varsayılanı)
+
+Ön yükleme, boş mesaj listesiyle /api/chat çağrısıdır (Ollama bunu "yalnızca yükle"
+olarak yorumlar). Yükleme sonrası /api/ps ile modellerin birlikte sığıp sığmadığı
+kontrol edilir: biri diğerini çıkardıysa ya da model kısmen CPU'ya taştıysa uyarılır.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PINNED = "pinned"
+IDLE = "idle"
+OFF = "off"
+POLICIES = (PINNED, IDLE, OFF)
+
+# Bu süreden uzun load_duration "soğuk başlangıç" olarak kaydedilir
+COLD_LOAD_THRESHOLD_S = 0.5
+
+
+def _tagged(name: str) -> str:
+    """Etiketsiz model adını Ollama'nın /api/ps biçimine getirir (gemma2 → gemma2:latest)."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ModelResidencyManager:
+    """
+    llm    : LLMClient (HTTP istemcisi ve uç nokta havuzu için)
+    config : Config nesnesi
+    """
+
+    MAX_EVENTS = 50
+
+    def __init__(self, llm, config) -> None:
+        self.llm = llm
+        policy = str(getattr(config, "OLLAMA_RESIDENCY_POLICY", IDLE)).lower()
+        self.policy = policy if policy in POLICIES else IDLE
+        self.idle_keep_alive = str(getattr(config, "OLLAMA_KEEP_ALIVE", "30m"))
+        self.check_interval = float(getattr(config, "OLLAMA_RESIDENCY_CHECK_INTERVAL", 300))
+        models = getattr(config, "OLLAMA_PRELOAD_MODELS", "") or ",".join(
+            [getattr(config, "TEXT_MODEL", ""), getattr(config, "CODING_MODEL", "")]
+        )
+        self.models: List[str] = []
+        for name in models.split(","):
+            name = name.strip()
+            if name and name not in self.models:
+                self.models.append(name)
+        self.events: Deque[Dict] = deque(maxlen=self.MAX_EVENTS)
+        self.warnings: List[str] = []
+        self.cold_loads = 0
+        self.preloaded = False
+
+    @property
+    def keep_alive(self) -> Optional[str]:
+        """İsteklere eklenecek keep_alive değeri (None = gönderme)."""
+        if self.policy == PINNED:
+            return "-1"
+        if self.policy == IDLE:
+            return self.idle_keep_alive
+        return None
+
+    # ─────────────────────────────────────────────
+    #  YÜKLEME OLAYLARI
+    # ─────────────────────────────────────────────
+
+    def _event(self, kind: str, model: str, endpoint: str, **extra) -> None:
+        self.events.append(dict(kind=kind, model=model, endpoint=endpoint, at=time.time(), **extra))
+
+    def note_load(self, model: str, endpoint: str, load_duration_s: Optional[float]) -> None:
+        """Kullanıcı isteği sırasında gözlenen model yüklemesini kaydeder."""
+        if not load_duration_s or load_duration_s < COLD_LOAD_THRESHOLD_S:
+            return
+        self.cold_loads += 1
+        self._event("cold_load", model, endpoint, load_duration_s=round(load_duration_s, 3))
+        logger.info("Model soğuk yüklendi: %s @ %s (%.1f s)", model, endpoint, load_duration_s)
+
+    # ─────────────────────────────────────────────
+    #  ÖN YÜKLEME
+    # ─────────────────────────────────────────────
+
+    async def _load(self, endpoint, model: str) -> bool:
+        # num_ctx istekteki değerle aynı olmalı; farklıysa Ollama modeli ilk istekte yeniden yükler
+        payload: Dict = {"model": model, "messages": [], "options": {"num_ctx": self.llm.num_ctx(model)}}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        started = time.monotonic()
+        try:
+            resp = await self.llm._get_http().post(
+                f"{endpoint.url}/api/chat", json=payload, timeout=max(60, self.llm.config.OLLAMA_TIMEOUT),
+                extensions=self.llm._request_extensions(),
+            )
+            resp.raise_for_status()
+            body = resp.json()
+        except Exception as exc:
+            self._event("preload_failed", model, endpoint.url, error=str(exc) or type(exc).__name__)
+            logger.warning("Model ön yüklenemedi: %s @ %s (%s)", model, endpoint.url, exc)
+            return False
+        endpoint.loaded.add(model)
+        load_s = (body.get("load_duration") or 0) / 1e9
+        self._event("preload", model, endpoint.url,
+                    duration_s=round(time.monotonic() - started, 3), load_duration_s=round(load_s, 3))
+        return True
+
+    async def preload(self) -> Dict:
+        """
+        Yapılandırılmış modelleri sağlıklı tüm uç noktalara yükler, ardından
+        birlikte sığıp sığmadıklarını kontrol eder. Sonuç özetini döndürür.
+        """
+        if self.policy == OFF or self.llm.provider != "ollama" or not self.models:
+            return {"skipped": True}
+        loaded = 0
+        for ep in self.llm.ollama_pool.endpoints:
+            if not ep.healthy:
+                continue
+            for model in self.models:
+                loaded += await self._load(ep, model)
+            await self.check_fit(ep)
+        self.preloaded = True
+        return {"skipped": False, "loaded": loaded, "warnings": list(self.warnings)}
+
+    async def check_fit(self, endpoint) -> List[str]:
+        """
+        /api/ps ile yüklü modelleri denetler. Yapılandırılmış bir model listede
+        yoksa (diğeri onu çıkarmış) veya VRAM'e tam sığmamışsa uyarı üretir.
+        """
+        try:
+            resp = await self.llm._get_http().get(f"{endpoint.url}/api/ps", timeout=5,
+                                                  extensions=self.llm._request_extensions())
+            resp.raise_for_status()
+            running = {m.get("name", ""): m for m in resp.json().get("models", [])}
+        except Exception:
+            return []
+        endpoint.loaded = set(running) - {""}
+        endpoint.loaded.update(m for m in self.models if _tagged(m) in running)
+        found = []
+        missing = self.missing(endpoint)
+        if 0 < len(missing) < len(self.models):
+            found.append(
+                f"{endpoint.url}: {', '.join(self.models)} birlikte belleğe sığmıyor "
+                f"({', '.join(missing)} çıkarıldı) — istekler arasında model yeniden yüklenecek."
+            )
+        for name in self.models:
+            info = running.get(_tagged(name))
+            if info and info.get("size") and info.get("size_vram", info["size"]) < info["size"]:
+                share = info["size_vram"] / info["size"]
+                found.append(f"{endpoint.url}: {name} VRAM'e tam sığmadı (%{share * 100:.0f} GPU) — CPU'ya taşıyor.")
+        for msg in found:
+            if msg not in self.warnings:
+                self.warnings.append(msg)
+                logger.warning("⚠️  %s", msg)
+        return found
+
+    def missing(self, endpoint) -> List[str]:
+        return [m for m in self.models if m not in endpoint.loaded and _tagged(m) not in endpoint.loaded]
+
+    # ─────────────────────────────────────────────
+    #  PERİYODİK KORUMA
+    # ─────────────────────────────────────────────
+
+    async def run_periodic(self) -> None:
+        """
+        Başlangıçta ön yükler; 'pinned' politikasında düşen modelleri yeniden yükler.
+        Modellerin yalnızca bir kısmı düştüyse (birlikte sığmıyorlar) birbirini
+        sürekli çıkarmamak için yeniden yükleme yapılmaz, yalnızca uyarılır.
+        """
+        await self.preload()
+        if self.policy != PINNED or self.check_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for ep in self.llm.ollama_pool.endpoints:
+                if not ep.healthy:
+                    continue
+                await self.check_fit(ep)
+                missing = self.missing(ep)
+                if len(missing) != len(self.models):
+                    continue
+                for model in missing:   # hepsi düşmüş (örn. Ollama yeniden başladı)
+                    self._event("evicted", model, ep.url)
+                    await self._load(ep, model)
+
+    def stats(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "keep_alive": self.keep_alive,
+            "models": list(self.models),
+            "preloaded": self.preloaded,
+            "cold_loads": self.cold_loads,
+            "warnings": list(self.warnings),
+            "events": list(self.events)[-10:],
+        }
@@ -0,0 +1,226 @@
+"""
+Sidar Project - Ollama Uç Nokta Havuzu
+Birden fazla Ollama sunucusu (GPU makinesi) arasında istek dağıtımı.
+
+OLLAMA_URL virgülle ayrılmış birden fazla adres alabilir:
+    OLLAMA_URL=http://gpu1:11434/api,http://gpu2:11434/api
+
+Seçim stratejileri (OLLAMA_LB_STRATEGY):
+  least_outstanding : En az süren isteği olan uç nokta (eşitlikte düşük gecikme)
+  latency           : Gecikme ağırlıklı — EWMA gecikmesi × (süren istek + 1)
+
+Model yakınlığı bir filtre değil, puana eklenen maliyettir: modeli belleğe
+yüklememiş (/api/ps) uç noktaya soğuk yükleme için load_penalty kadar "süren
+istek" eklenir. Böylece yüklü uç nokta meşgulse istekler diğerlerine yayılır;
+yoklamada modeli hiç indirmediği görülen uç nokta yalnızca başka aday yoksa
+seçilir. Sağlık yoklaması
+arka planda /api/tags ile yapılır; bağlantı hatası alan uç nokta hemen devre
+dışı bırakılır ve bir sonraki başarılı yoklamada yeniden havuza girer.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LEAST_OUTSTANDING = "least_outstanding"
+LATENCY = "latency"
+STRATEGIES = (LEAST_OUTSTANDING, LATENCY)
+
+
+def parse_endpoints(raw: str) -> List[str]:
+    """'a,b' biçimindeki OLLAMA_URL değerini normalize edilmiş kök URL listesine çevirir."""
+    urls = []
+    for part in (raw or "").split(","):
+        url = part.strip().rstrip("/").removesuffix("/api")
+        if url and url not in urls:
+            urls.append(url)
+    return urls or ["http://localhost:11434"]
+
+
+class OllamaEndpoint:
+    """Tek bir Ollama sunucusunun anlık durumu."""
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.healthy = True             # ilk yoklamaya kadar iyimser
+        self.outstanding = 0
+        self.latency_s: Optional[float] = None
+        self.available: Set[str] = set()   # /api/tags — indirilmiş modeller
+        self.loaded: Set[str] = set()      # /api/ps — bellekteki modeller
+        self.requests = 0
+        self.failures = 0
+        self.last_error = ""
+        self.last_check = 0.0
+
+    def observe_latency(self, seconds: float) -> None:
+        if self.latency_s is None:
+            self.latency_s = seconds
+        else:
+            self.latency_s += self.EWMA_ALPHA * (seconds - self.latency_s)
+
+    def stats(self) -> Dict:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ewma_s": round(self.latency_s, 4) if self.latency_s is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded),
+            "last_error": self.last_error,
+        }
+
+
+class OllamaEndpointPool:
+    """
+    urls            : Ollama kök URL'leri ('/api' soneki olmadan)
+    strategy        : "least_outstanding" | "latency"
+    health_interval : Arka plan sağlık yoklaması aralığı (saniye)
+    load_penalty    : Modeli yüklü olmayan uç noktaya eklenen maliyet (süren istek cinsinden)
+    """
+
+    def __init__(self, urls: List[str], strategy: str = LEAST_OUTSTANDING,
+                 health_interval: float = 15.0, load_penalty: float = 2.0) -> None:
+        self.endpoints = [OllamaEndpoint(u) for u in urls]
+        self.strategy = strategy if strategy in STRATEGIES else LEAST_OUTSTANDING
+        self.health_interval = max(1.0, health_interval)
+        self.load_penalty = max(0.0, load_penalty)
+        self.failovers = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def primary(self) -> OllamaEndpoint:
+        return self.endpoints[0]
+
+    # ─────────────────────────────────────────────
+    #  SEÇİM
+    # ─────────────────────────────────────────────
+
+    def _score(self, ep: OllamaEndpoint, model: str = "") -> tuple:
+        latency = ep.latency_s if ep.latency_s is not None else 0.0
+        load = 0.0
+        missing = False
+        if model and model not in ep.loaded:
+            load = self.load_penalty
+            # Yoklanmış ve modeli indirmemiş uç nokta yalnızca son çare
+            missing = bool(ep.last_check) and model not in ep.available
+        busy = ep.outstanding + load
+        if self.strategy == LATENCY:
+            return (missing, latency * (busy + 1), busy)
+        return (missing, busy, latency)
+
+    def pick(self, model: str = "", exclude: Optional[Set[str]] = None) -> Optional[OllamaEndpoint]:
+        """
+        İsteğin gönderileceği uç noktayı seçer; exclude içindeki URL'ler
+        (bu istekte zaten denenmiş olanlar) atlanır. Aday kalmazsa None döner.
+        """
+        candidates = [ep for ep in self.endpoints if not exclude or ep.url not in exclude]
+        if not candidates:
+            return None
+        healthy = [ep for ep in candidates if ep.healthy]
+        # Hiçbiri sağlıklı görünmüyorsa yine de denenir (yoklama gecikmiş olabilir)
+        candidates = healthy or candidates
+        return min(candidates, key=lambda ep: self._score(ep, model))
+
+    def begin(self, ep: OllamaEndpoint) -> float:
+        ep.outstanding += 1
+        ep.requests += 1
+        return time.monotonic()
+
+    def end(self, ep: OllamaEndpoint, started: Optional[float], model: str = "", ok: bool = True) -> None:
+        """İsteği kapatır; started None ise gecikme zaten ölçülmüştür (akışlarda başlık anı)."""
+        ep.outstanding = max(0, ep.outstanding - 1)
+        if ok:
+            if started is not None:
+                ep.observe_latency(time.monotonic() - started)
+            if model:
+                # Başarılı istekten sonra Ollama modeli belleğe almış olur
+                ep.loaded.add(model)
+
+    def mark_down(self, ep: OllamaEndpoint, exc: BaseException) -> None:
+        ep.failures += 1
+        ep.last_error = str(exc) or type(exc).__name__
+        if ep.healthy:
+            logger.warning("Ollama uç noktası devre dışı: %s (%s)", ep.url, ep.last_error)
+        ep.healthy = False
+
+    # ─────────────────────────────────────────────
+    #  SAĞLIK YOKLAMASI
+    # ─────────────────────────────────────────────
+
+    async def probe(self, client: httpx.AsyncClient, ep: OllamaEndpoint, timeout: float = 5.0) -> bool:
+        """/api/tags ile sağlık + model listesi, /api/ps ile yüklü modeller."""
+        started = time.monotonic()
+        try:
+            resp = await client.get(f"{ep.url}/api/tags", timeout=timeout)
+            resp.raise_for_status()
+            ep.available = {m.get("name", "") for m in resp.json().get("models", [])} - {""}
+        except Exception as exc:
+            self.mark_down(ep, exc)
+            ep.last_check = time.time()
+            return False
+        ep.observe_latency(time.monotonic() - started)
+        try:
+            resp = await client.get(f"{ep.url}/api/ps", timeout=timeout)
+            if resp.status_code == 200:
+                ep.loaded = {m.get("name", "") for m in resp.json().get("models", [])} - {""}
+        except Exception:
+            pass  # eski Ollama sürümlerinde /api/ps yok — yakınlık yalnızca gözlemden öğrenilir
+        if not ep.healthy:
+            logger.info("Ollama uç noktası yeniden havuzda: %s", ep.url)
+        ep.healthy = True
+        ep.last_error = ""
+        ep.last_check = time.time()
+        return True
+
+    async def probe_all(self, client: httpx.AsyncClient) -> None:
+        await asyncio.gather(*(self.probe(client, ep) for ep in self.endpoints))
+
+    def ensure_health_task(self, client_factory) -> None:
+        """Birden fazla uç nokta varsa arka plan yoklama görevini (bir kez) başlatır."""
+        if len(self.endpoints) < 2:
+            return
+        loop = asyncio.get_running_loop()
+        task = self._health_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._health_task = loop.create_task(self._health_loop(client_factory))
+
+    async def _health_loop(self, client_factory) -> None:
+        while True:
+            try:
+                await self.probe_all(client_factory())
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.debug("Ollama sağlık yoklaması hatası: %s", exc)
+            await asyncio.sleep(self.health_interval)
+
+    async def stop(self) -> None:
+        task, self._health_task = self._health_task, None
+        if task is None or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            return  # görev başka (kapanmış) bir loop'a ait; o loop ile birlikte sonlandı
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    # ─────────────────────────────────────────────
+    #  METRİKLER
+    # ─────────────────────────────────────────────
+
+    def stats(self) -> Dict:
+        return {
+            "strategy": self.strategy,
+            "failovers": self.failovers,
+            "endpoints": {ep.url: ep.stats() for ep in self.endpoints},
+        }
@@ -112,6 +112,7 @@ class DocumentStore:
 
         # Meta verileri yükle
         self._index: Dict[str, Dict] = self._load_index()
+        self.version = 0
 
         # Arama motorlarını başlat
         self._bm25_available   = self._check_import("rank_bm25")
@@ -180,6 +181,7 @@ class DocumentStore:
         return {}
 
     def _save_index(self) -> None:
+        self.version += 1   # belge eklendi / silindi (ajan bağlam önbelleği)
         self.index_file.write_text(
             json.dumps(self._index, ensure_ascii=False, indent=2),
             encoding="utf-8",
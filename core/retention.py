@@ -0,0 +1,323 @@
+"""
+Sidar Project - Oturum Saklama (Retention) Motoru
+data/sessions dizinini sınırlı tutar: soğuk oturumları sıkıştırılmış paketlere
+arşivler, yaş sınırını aşanları siler, toplam disk bütçesini uygular ve
+karantina (.json.broken) / yarım kalmış (.tmp) dosyaları temizler.
+
+Yaş hesabı dosya mtime'ı ile yapılır; hiçbir oturum dosyası açılmaz/çözülmez.
+"""
+
+import asyncio
+import logging
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DAY = 86400
+
+
+class SessionRetention:
+    """
+    ConversationMemory'nin sessions dizini için saklama politikası.
+
+    archive_after_days : Bu süreden uzun süredir güncellenmeyen oturumlar arşivlenir (0 = kapalı);
+                         arşivlenen oturumlar restore() / POST /sessions/{id}/restore ile geri alınır
+    max_age_days       : Bu süreden eski oturumlar ve arşiv paketleri silinir (0 = sınırsız)
+    disk_budget_mb     : sessions + arşiv toplam bütçesi (0 = sınırsız)
+    broken_max_age_days: Karantina dosyalarının saklanma süresi
+    """
+
+    ARCHIVE_DIRNAME = "archive"
+
+    def __init__(
+        self,
+        memory,
+        archive_after_days: float = 0,
+        max_age_days: float = 0,
+        disk_budget_mb: float = 0,
+        broken_max_age_days: float = 7,
+    ) -> None:
+        self.memory = memory
+        self.sessions_dir: Path = memory.sessions_dir
+        self.archive_dir: Path = self.sessions_dir / self.ARCHIVE_DIRNAME
+        self.archive_after_days = archive_after_days
+        self.max_age_days = max_age_days
+        self.disk_budget_bytes = int(disk_budget_mb * 1024 * 1024)
+        self.broken_max_age_days = broken_max_age_days
+        self._run_lock = threading.Lock()
+
+        self.stats: Dict[str, float] = {
+            "runs": 0,
+            "sessions_archived_total": 0,
+            "sessions_deleted_total": 0,
+            "broken_removed_total": 0,
+            "bundles_deleted_total": 0,
+            "bytes_reclaimed_total": 0,
+            "last_run_at": 0.0,
+            "last_run_duration_s": 0.0,
+            "last_run_bytes_reclaimed": 0,
+        }
+
+    # ─────────────────────────────────────────────
+    #  TARAMA
+    # ─────────────────────────────────────────────
+
+    def _session_files(self) -> List[Tuple[Path, float, int]]:
+        """(yol, mtime, boyut) — en eskiden en yeniye; aktif oturum hariç."""
+        active = self.memory.active_session_id
+        items = []
+        for p in self.sessions_dir.glob("*.json"):
+            if p.stem == active:
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            items.append((p, st.st_mtime, st.st_size))
+        items.sort(key=lambda x: x[1])
+        return items
+
+    def _bundles(self) -> List[Tuple[Path, float, int]]:
+        if not self.archive_dir.exists():
+            return []
+        items = []
+        for p in self.archive_dir.glob("sessions-*.tar.gz"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            items.append((p, st.st_mtime, st.st_size))
+        items.sort(key=lambda x: x[1])
+        return items
+
+    def disk_usage(self) -> int:
+        """sessions dizini + arşiv paketlerinin toplam boyutu (bayt)."""
+        total = 0
+        for p in self.sessions_dir.glob("*.json*"):
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        total += sum(size for _, _, size in self._bundles())
+        return total
+
+    # ─────────────────────────────────────────────
+    #  ARŞİVLEME
+    # ─────────────────────────────────────────────
+
+    def _archive(self, files: List[Tuple[Path, float]]) -> Tuple[int, int]:
+        """
+        Oturum dosyalarını tek bir .tar.gz paketine taşır.
+        files: (yol, seçim anındaki mtime). Sıkıştırma bellek kilidi dışında yapılır;
+        silme kilit altında ve yalnızca dosya bu arada değişmediyse yapılır
+        (oturum yazımları atomik os.replace olduğundan paket hep tutarlı bir kopya içerir).
+        Returns: (arşivlenen oturum sayısı, geri kazanılan bayt)
+        """
+        if not files:
+            return 0, 0
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        bundle = self.archive_dir / f"sessions-{stamp}.tar.gz"
+        n = 1
+        while bundle.exists():
+            bundle = self.archive_dir / f"sessions-{stamp}-{n}.tar.gz"
+            n += 1
+
+        added: List[Tuple[Path, float]] = []
+        tmp = bundle.with_name(bundle.name + ".tmp")
+        with tarfile.open(tmp, "w:gz") as tar:
+            for p, mtime in files:
+                try:
+                    tar.add(p, arcname=p.name)
+                    added.append((p, mtime))
+                except OSError as exc:
+                    logger.warning("Arşive eklenemedi (%s): %s", p.name, exc)
+        tmp.replace(bundle)
+
+        freed = 0
+        archived = 0
+        with self.memory._lock:
+            active = self.memory.active_session_id
+            for p, mtime in added:
+                try:
+                    st = p.stat()
+                    if p.stem == active or st.st_mtime != mtime:
+                        continue   # sıkıştırma sırasında açıldı / güncellendi: dosya yerinde kalır
+                    p.unlink()
+                    freed += st.st_size
+                    archived += 1
+                    self._forget(p.stem)
+                except OSError as exc:
+                    logger.warning("Arşivlenen oturum silinemedi (%s): %s", p.name, exc)
+        freed -= bundle.stat().st_size
+        logger.info("🗄️  %d oturum arşivlendi → %s", archived, bundle.name)
+        return archived, max(freed, 0)
+
+    def _forget(self, session_id: str) -> None:
+        """Diskten kalkan oturumu arama indeksinden çıkarır."""
+        index = getattr(self.memory, "search_index", None)
+        if index is not None:
+            index.remove_session(session_id)
+
+    def restore(self, session_id: str) -> bool:
+        """Arşivlenmiş bir oturumu (en yeni paketten) sessions dizinine geri çıkarır."""
+        name = f"{session_id}.json"
+        if Path(name).name != name or name.startswith("."):
+            return False
+        target = self.sessions_dir / name
+        if target.exists():   # zaten geri yüklenmiş / hiç arşivlenmemiş
+            return True
+        for bundle, _, _ in reversed(self._bundles()):
+            try:
+                with tarfile.open(bundle, "r:gz") as tar:
+                    try:
+                        member = tar.getmember(name)
+                    except KeyError:
+                        continue
+                    data = tar.extractfile(member).read()
+            except (OSError, tarfile.TarError) as exc:
+                logger.warning("Arşiv okunamadı (%s): %s", bundle.name, exc)
+                continue
+            # Yeni mtime: geri yüklenen oturum bir sonraki çalıştırmada tekrar arşivlenmez
+            tmp = target.with_name(name + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(target)
+            self.memory.reindex_session(session_id)
+            logger.info("Oturum arşivden geri yüklendi: %s", session_id)
+            return True
+        return False
+
+    def archived_session_ids(self) -> List[str]:
+        """Arşiv paketlerindeki ve sessions dizininde bulunmayan oturum kimlikleri (en yeni paket önce)."""
+        ids: List[str] = []
+        for bundle, _, _ in reversed(self._bundles()):
+            try:
+                with tarfile.open(bundle, "r:gz") as tar:
+                    ids.extend(m.name[:-5] for m in tar.getmembers() if m.name.endswith(".json"))
+            except (OSError, tarfile.TarError):
+                continue
+        return [sid for sid in dict.fromkeys(ids) if not (self.sessions_dir / f"{sid}.json").exists()]
+
+    # ─────────────────────────────────────────────
+    #  ÇALIŞTIRMA
+    # ─────────────────────────────────────────────
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Saklama politikasını bir kez uygular; bu çalıştırmanın özetini döndürür."""
+        if not self._run_lock.acquire(blocking=False):
+            return {}
+        started = time.monotonic()
+        now = now or time.time()
+        result = {"archived": 0, "deleted": 0, "broken_removed": 0, "bundles_deleted": 0, "bytes_reclaimed": 0}
+        try:
+            # Kısa dosya işlemleri ve arşiv adaylarının seçimi bellek kilidi altında;
+            # sıkıştırma (_archive) kilit dışında yapılır, memory.add/kaydetme beklemez.
+            cold: List[Tuple[Path, float]] = []
+            with self.memory._lock:
+                # 1. Karantina ve yarım kalmış geçici dosyalar
+                cutoff = now - self.broken_max_age_days * _DAY
+                for pattern in ("*.json.broken", "*.json.tmp"):
+                    for p in self.sessions_dir.glob(pattern):
+                        try:
+                            st = p.stat()
+                            if st.st_mtime < cutoff:
+                                p.unlink()
+                                result["broken_removed"] += 1
+                                result["bytes_reclaimed"] += st.st_size
+                        except OSError:
+                            continue
+
+                # 2. Yaş sınırı: çok eski oturumlar ve paketler silinir
+                if self.max_age_days > 0:
+                    cutoff = now - self.max_age_days * _DAY
+                    for p, mtime, size in self._session_files():
+                        if mtime < cutoff:
+                            try:
+                                p.unlink()
+                                self._forget(p.stem)
+                                result["deleted"] += 1
+                                result["bytes_reclaimed"] += size
+                            except OSError:
+                                pass
+                    for p, mtime, size in self._bundles():
+                        if mtime < cutoff:
+                            try:
+                                p.unlink()
+                                result["bundles_deleted"] += 1
+                                result["bytes_reclaimed"] += size
+                            except OSError:
+                                pass
+
+                # 3. Soğuk oturumlar seçilir
+                if self.archive_after_days > 0:
+                    cutoff = now - self.archive_after_days * _DAY
+                    cold = [(p, mtime) for p, mtime, _ in self._session_files() if mtime < cutoff]
+
+            # 3. Soğuk oturumları arşivle
+            n, freed = self._archive(cold)
+            result["archived"] += n
+            result["bytes_reclaimed"] += freed
+
+            # 4. Disk bütçesi: önce en eski oturumlar arşivlenir, sonra en eski paketler silinir
+            if self.disk_budget_bytes > 0:
+                usage = self.disk_usage()
+                if usage > self.disk_budget_bytes:
+                    victims, excess = [], usage - self.disk_budget_bytes
+                    with self.memory._lock:
+                        for p, mtime, size in self._session_files():
+                            if excess <= 0:
+                                break
+                            victims.append((p, mtime))
+                            excess -= size
+                    n, freed = self._archive(victims)
+                    result["archived"] += n
+                    result["bytes_reclaimed"] += freed
+                    usage = self.disk_usage()
+                    for p, _, size in self._bundles():
+                        if usage <= self.disk_budget_bytes:
+                            break
+                        try:
+                            p.unlink()
+                            usage -= size
+                            result["bundles_deleted"] += 1
+                            result["bytes_reclaimed"] += size
+                            logger.warning("🗑️  Disk bütçesi için arşiv paketi kalıcı olarak silindi: %s", p.name)
+                        except OSError:
+                            pass
+                    if usage > self.disk_budget_bytes:
+                        logger.warning(
+                            "⚠️ Oturum disk bütçesi aşıldı (%d > %d bayt) — aktif oturum korunuyor.",
+                            usage, self.disk_budget_bytes,
+                        )
+        except Exception as exc:
+            logger.error("Oturum saklama çalıştırması başarısız: %s", exc)
+        finally:
+            duration = time.monotonic() - started
+            self.stats["runs"] += 1
+            self.stats["sessions_archived_total"] += result["archived"]
+            self.stats["sessions_deleted_total"] += result["deleted"]
+            self.stats["broken_removed_total"] += result["broken_removed"]
+            self.stats["bundles_deleted_total"] += result["bundles_deleted"]
+            self.stats["bytes_reclaimed_total"] += result["bytes_reclaimed"]
+            self.stats["last_run_at"] = now
+            self.stats["last_run_duration_s"] = round(duration, 4)
+            self.stats["last_run_bytes_reclaimed"] = result["bytes_reclaimed"]
+            self._run_lock.release()
+
+        if any(result.values()):
+            logger.info(
+                "Oturum saklama: %d arşivlendi, %d silindi, %d karantina temizlendi, %d bayt kazanıldı (%.3fs).",
+                result["archived"], result["deleted"], result["broken_removed"],
+                result["bytes_reclaimed"], duration,
+            )
+        return result
+
+    async def run_periodic(self, interval_s: float) -> None:
+        """run_once()'ı her interval_s saniyede bir thread'de çalıştırır (iptal edilene kadar)."""
+        while True:
+            await asyncio.to_thread(self.run_once)
+            await asyncio.sleep(interval_s)
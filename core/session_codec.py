@@ -0,0 +1,242 @@
+"""
+Sidar Project - Oturum Dosyası Kodlayıcısı (v2)
+Sıkıştırılmış, parça (chunk) tabanlı ve opsiyonel kimlik doğrulamalı şifreli oturum formatı.
+
+Dosya düzeni:
+    HEADER  : MAGIC(4) | VERSION(1) | FLAGS(1)
+    CHUNK*  : mühürlenmiş tur parçaları (her biri en fazla CHUNK_TURNS tur)
+    FOOTER  : mühürlenmiş {"meta": {...}, "chunks": [[offset, length, first_turn, n_turns], ...]}
+    TRAILER : footer_offset(u64) | footer_length(u32) | MAGIC(4)
+
+"Mühürleme": kompakt JSON → zlib → (anahtar varsa) AES-256-GCM.
+GCM ek verisi (AAD) oturum kimliğini, parça sırasını ve konumunu bağlar; parçalar
+yer değiştirilemez ve aynı anahtarı paylaşan başka bir oturumun dosyasına
+(aynı indekste bile) eklenemez. Oturum kimliği dosya adıdır (<id>.json).
+VERSION 1 dosyaları (AAD'de oturum kimliği yok) yalnızca okunur; ilk kayıtta 2'ye yükselir.
+Footer tek başına okunabildiği için liste/metaveri ve "son N tur" okumaları
+tüm dosyayı çözmeden yapılır.
+"""
+
+import base64
+import json
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SDS2"
+VERSION = 2
+_READABLE_VERSIONS = (1, VERSION)
+FLAG_ENCRYPTED = 0x01
+FLAG_COMPRESSED = 0x02
+
+CHUNK_TURNS = 16
+_HEADER = struct.Struct(">4sBB")
+_TRAILER = struct.Struct(">QI4s")
+_NONCE_LEN = 12
+
+
+class SessionFormatError(ValueError):
+    """Oturum dosyası bozuk, kesik veya kimlik doğrulaması başarısız."""
+
+
+def is_v2_blob(head: bytes) -> bool:
+    return head[:4] == MAGIC
+
+
+class SessionCodec:
+    """
+    v2 oturum dosyalarını kodlar/çözer.
+    encryption_key: Fernet anahtarı (MEMORY_ENCRYPTION_KEY). Boşsa yalnızca sıkıştırma yapılır.
+    """
+
+    def __init__(self, encryption_key: str = "", compress_level: int = 6) -> None:
+        self._aead = self._init_aead(encryption_key)
+        self._level = compress_level
+
+    @property
+    def encrypted(self) -> bool:
+        return self._aead is not None
+
+    @staticmethod
+    def _init_aead(key: str):
+        """Fernet anahtarından HKDF ile ayrı bir AES-256-GCM anahtarı türetir."""
+        if not key:
+            return None
+        try:
+            from cryptography.hazmat.primitives import hashes
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+            from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+            raw = base64.urlsafe_b64decode(key.encode() if isinstance(key, str) else key)
+            if len(raw) != 32:
+                raise ValueError("Fernet anahtarı 32 bayt olmalı")
+            derived = HKDF(
+                algorithm=hashes.SHA256(), length=32, salt=None,
+                info=b"sidar-session-v2",
+            ).derive(raw)
+            return AESGCM(derived)
+        except Exception as exc:
+            logger.warning("⚠️ Oturum şifrelemesi (AES-GCM) başlatılamadı: %s", exc)
+            return None
+
+    # ─────────────────────────────────────────────
+    #  MÜHÜRLEME
+    # ─────────────────────────────────────────────
+
+    def seal(self, obj, aad: bytes) -> bytes:
+        """Nesneyi kompakt JSON → zlib → (anahtar varsa) AES-GCM ile mühürler."""
+        data = zlib.compress(
+            json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            self._level,
+        )
+        if self._aead is None:
+            return data
+        nonce = os.urandom(_NONCE_LEN)
+        return nonce + self._aead.encrypt(nonce, data, aad)
+
+    def unseal(self, blob: bytes, aad: bytes, encrypted: Optional[bool] = None):
+        """seal() çıktısını çözer; encrypted=None ise codec'in anahtar durumu kullanılır."""
+        if encrypted is None:
+            encrypted = self._aead is not None
+        if encrypted:
+            if self._aead is None:
+                raise SessionFormatError("Şifreli oturum dosyası ama anahtar yok.")
+            try:
+                blob = self._aead.decrypt(blob[:_NONCE_LEN], blob[_NONCE_LEN:], aad)
+            except Exception as exc:
+                raise SessionFormatError(f"Kimlik doğrulaması başarısız: {exc}") from exc
+        try:
+            return json.loads(zlib.decompress(blob).decode("utf-8"))
+        except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise SessionFormatError(f"Parça çözümlenemedi: {exc}") from exc
+
+    @staticmethod
+    def _aad(session_id: str, version: int, kind: str) -> bytes:
+        if version == 1:   # eski dosyalar: oturum kimliği bağlanmamıştı
+            return kind.encode()
+        return f"{session_id}:{kind}".encode()
+
+    @classmethod
+    def _chunk_aad(cls, session_id: str, version: int, index: int, first_turn: int) -> bytes:
+        return cls._aad(session_id, version, f"chunk:{index}:{first_turn}")
+
+    @staticmethod
+    def _chunk_key(session_id: str, index: int, first_turn: int, part: List[Dict]) -> tuple:
+        return (session_id, index, first_turn) + tuple(
+            (t.get("timestamp"), t.get("role"), t.get("tokens"), len(t.get("content", "")))
+            for t in part
+        )
+
+    # ─────────────────────────────────────────────
+    #  KODLAMA
+    # ─────────────────────────────────────────────
+
+    def encode(self, data: Dict, cache: Optional[Dict[tuple, bytes]] = None,
+               session_id: str = "") -> bytes:
+        """
+        Oturum sözlüğünü v2 baytlarına dönüştürür.
+
+        cache     : Değişmeyen parçaların mühürlü baytlarını yeniden kullanmak için
+                    sözlük (çağıran tarafından oturum başına tutulur). Tur eklemek
+                    yalnızca son parçayı ve footer'ı yeniden mühürler.
+        session_id: AAD'ye bağlanan kimlik (dosya adı); boşsa data["id"].
+        """
+        sid = session_id or data.get("id", "")
+        turns = data.get("turns", [])
+        meta = {k: v for k, v in data.items() if k != "turns"}
+        meta["turn_count"] = len(turns)
+        meta["user_count"] = sum(1 for t in turns if t.get("role") == "user")
+        meta["asst_count"] = sum(1 for t in turns if t.get("role") == "assistant")
+
+        flags = FLAG_COMPRESSED | (FLAG_ENCRYPTED if self._aead is not None else 0)
+        out = bytearray(_HEADER.pack(MAGIC, VERSION, flags))
+        index: List[List[int]] = []
+        used: Dict[tuple, bytes] = {}
+        for ci, start in enumerate(range(0, len(turns), CHUNK_TURNS)):
+            part = turns[start:start + CHUNK_TURNS]
+            key = self._chunk_key(sid, ci, start, part)
+            sealed = cache.get(key) if cache is not None else None
+            if sealed is None:
+                sealed = self.seal(part, self._chunk_aad(sid, VERSION, ci, start))
+            used[key] = sealed
+            index.append([len(out), len(sealed), start, len(part)])
+            out += sealed
+
+        footer = self.seal({"meta": meta, "chunks": index}, self._aad(sid, VERSION, "footer"))
+        footer_off = len(out)
+        out += footer
+        out += _TRAILER.pack(footer_off, len(footer), MAGIC)
+
+        if cache is not None:
+            cache.clear()
+            cache.update(used)
+        return bytes(out)
+
+    # ─────────────────────────────────────────────
+    #  ÇÖZME
+    # ─────────────────────────────────────────────
+
+    def _read_footer(self, fh, session_id: str) -> Tuple[bool, int, Dict]:
+        head = fh.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise SessionFormatError("Kesik başlık.")
+        magic, version, flags = _HEADER.unpack(head)
+        if magic != MAGIC or version not in _READABLE_VERSIONS:
+            raise SessionFormatError("Tanınmayan oturum formatı.")
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        if size < _HEADER.size + _TRAILER.size:
+            raise SessionFormatError("Kesik dosya.")
+        fh.seek(size - _TRAILER.size)
+        footer_off, footer_len, tail_magic = _TRAILER.unpack(fh.read(_TRAILER.size))
+        if tail_magic != MAGIC or footer_off + footer_len > size - _TRAILER.size:
+            raise SessionFormatError("Bozuk dosya sonu (trailer).")
+        fh.seek(footer_off)
+        encrypted = bool(flags & FLAG_ENCRYPTED)
+        footer = self.unseal(fh.read(footer_len), self._aad(session_id, version, "footer"), encrypted)
+        return encrypted, version, footer
+
+    def read_meta(self, path: Path, session_id: Optional[str] = None) -> Dict:
+        """Yalnızca footer'ı okuyarak oturum metaverisini döndürür (turlar çözülmez)."""
+        with open(path, "rb") as fh:
+            _, _, footer = self._read_footer(fh, path.stem if session_id is None else session_id)
+        return footer["meta"]
+
+    def read_turns(self, path: Path, start: int = 0, stop: Optional[int] = None,
+                   session_id: Optional[str] = None) -> Tuple[Dict, List[Dict]]:
+        """
+        [start, stop) aralığındaki turları okur; yalnızca bu aralıkla kesişen
+        parçalar diskten okunur ve çözülür. Negatif indeksler list dilimlemesindeki
+        gibi sondan sayılır (örn. start=-20 → son 20 tur).
+        session_id verilmezse dosya adı (<id>.json) kullanılır.
+        """
+        sid = path.stem if session_id is None else session_id
+        with open(path, "rb") as fh:
+            encrypted, version, footer = self._read_footer(fh, sid)
+            meta = footer["meta"]
+            total = meta.get("turn_count", 0)
+            start, stop, _ = slice(start, stop).indices(total)
+            start = min(start, stop)
+            turns: List[Dict] = []
+            for ci, (offset, length, first, count) in enumerate(footer["chunks"]):
+                if first + count <= start or first >= stop:
+                    continue
+                fh.seek(offset)
+                part = self.unseal(fh.read(length), self._chunk_aad(sid, version, ci, first), encrypted)
+                lo = max(start - first, 0)
+                hi = min(stop - first, count)
+                turns.extend(part[lo:hi])
+        return meta, turns
+
+    def decode_file(self, path: Path, session_id: Optional[str] = None) -> Dict:
+        """Tüm oturumu (metaveri + turlar) sözlük olarak döndürür."""
+        meta, turns = self.read_turns(path, session_id=session_id)
+        data = {k: v for k, v in meta.items()
+                if k not in ("turn_count", "user_count", "asst_count")}
+        data["turns"] = turns
+        return data
@@ -0,0 +1,468 @@
+"""
+Sidar Project - Oturum Tam Metin Arama İndeksi
+Tüm oturum turları üzerinde artımlı güncellenen ters indeks (inverted index).
+
+ConversationMemory her tur eklediğinde / sildiğinde indeks aynı anda güncellenir;
+arama sırasında hiçbir oturum dosyası açılmaz.
+
+Turların tam metni tutulmaz: her tur için terim sayıları (postings) ve kesit
+üretmek üzere metnin yalnızca başı (EXCERPT_CHARS) saklanır.
+
+Kalıcılık:
+    index/snapshot.bin    : mühürlenmiş tam görüntü {"docs": {...}}
+    index/journal.bin     : snapshot'tan sonraki değişiklikler; her kayıt
+                            uzunluk(u32) + mühürlenmiş [op, ...] biçiminde eklenir.
+    index/journal.old.bin : sıkıştırma sırasında döndürülen günlük; snapshot
+                            yazılınca silinir (yarıda kalırsa açılışta yeniden oynatılır).
+Mühürleme oturum dosyalarıyla aynıdır (core/session_codec.py) — şifreleme
+anahtarı varsa indeks de şifrelenir. Günlük COMPACT_EVERY kaydı aşınca snapshot
+arka plan thread'inde yeniden yazılır: kilit yalnızca görüntü alınıp günlük
+döndürülürken tutulur, mühürleme ve disk yazımı sohbet yolunu bekletmez.
+"""
+
+import bisect
+import html
+import logging
+import math
+import os
+import re
+import struct
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.session_codec import SessionCodec, SessionFormatError
+
+logger = logging.getLogger(__name__)
+
+_LEN = struct.Struct(">I")
+_SNAPSHOT_AAD = b"index-snapshot"
+_JOURNAL_AAD = b"index-journal"
+
+# Türkçe büyük/küçük harf dönüşümü: str.lower() "I" → "i" ve "İ" → "i̇" (2 karakter) üretir
+_TR_FOLD = str.maketrans({"I": "ı", "İ": "i"})
+_WORD_RE = re.compile(r"\w+")
+
+TurnKey = Tuple[str, float]
+
+
+def fold(text: str) -> str:
+    """Türkçe kurallarına uygun küçük harfe çevirme."""
+    return text.translate(_TR_FOLD).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Aranabilir terimler: en az 2 karakterlik kelimeler veya sayılar."""
+    return [w for w in _WORD_RE.findall(fold(text)) if len(w) > 1 or w.isdigit()]
+
+
+class SessionSearchIndex:
+    """
+    Oturum turları için BM25 sıralamalı ters indeks.
+
+    Belge birimi bir turdur (oturum kimliği, tur zaman damgası); oturum skoru
+    en iyi eşleşen turun skoru ve diğer eşleşmelerden küçük bir katkıyla
+    hesaplanır. Türkçe eklerden dolayı 3+ karakterlik sorgu terimleri önek
+    olarak da eşleşir ("oturum" → "oturumları").
+    """
+
+    MAX_TEXT_CHARS = 8000      # terimleri çıkarılan en fazla metin
+    EXCERPT_CHARS = 320        # kesit için saklanan baş kısım
+    COMPACT_EVERY = 500
+    PREFIX_WEIGHT = 0.7
+    PREFIX_MAX_TERMS = 30
+    SNIPPET_RADIUS = 60
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_dir: Path, codec: Optional[SessionCodec] = None) -> None:
+        self.index_dir = index_dir
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._snapshot_path = index_dir / "snapshot.bin"
+        self._journal_path = index_dir / "journal.bin"
+        self._old_journal_path = index_dir / "journal.old.bin"
+        self._codec = codec or SessionCodec()
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+
+        # Belge deposu: {sid: {"title", "updated_at", "turns": {ts: (role, excerpt)}}}
+        self._docs: Dict[str, Dict] = {}
+        # term → {(sid, ts): tf}
+        self._postings: Dict[str, Dict[TurnKey, int]] = {}
+        self._turn_terms: Dict[TurnKey, Counter] = {}
+        self._turn_len: Dict[TurnKey, int] = {}
+        self._total_len = 0
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        self._journal_records = 0
+
+        self.loaded = self._load()
+
+    # ─────────────────────────────────────────────
+    #  KALICILIK
+    # ─────────────────────────────────────────────
+
+    def _load(self) -> bool:
+        """Snapshot + günlüğü okur. Kullanılabilir bir indeks yoksa False döner."""
+        if not self._snapshot_path.exists():
+            return False
+        try:
+            snap = self._codec.unseal(self._snapshot_path.read_bytes(), _SNAPSHOT_AAD)
+        except (OSError, SessionFormatError) as exc:
+            logger.warning("Arama indeksi okunamadı, yeniden oluşturulacak: %s", exc)
+            return False
+        for sid, doc in snap.get("docs", {}).items():
+            self._set_title(sid, doc.get("title", ""), doc.get("updated_at", 0))
+            for turn in doc.get("turns", []):
+                if len(turn) == 3:   # eski görüntü: [ts, role, tam metin]
+                    ts, role, text = turn
+                    excerpt, terms = self._prepare(text)
+                else:
+                    ts, role, excerpt, terms = turn
+                self._add_turn(sid, ts, role, excerpt, Counter(terms))
+        # Yarıda kalan sıkıştırmanın günlüğü: kayıtlar idempotent, yeniden oynatmak güvenli
+        for path in (self._old_journal_path, self._journal_path):
+            for record in self._read_journal(path):
+                self._apply(record)
+        return True
+
+    def _read_journal(self, path: Path) -> Iterable[list]:
+        if not path.exists():
+            return
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return
+        pos = 0
+        while pos + _LEN.size <= len(raw):
+            (length,) = _LEN.unpack_from(raw, pos)
+            blob = raw[pos + _LEN.size:pos + _LEN.size + length]
+            if len(blob) < length:
+                logger.warning("Arama indeksi günlüğünün sonu kesik; kalan kayıt atlandı.")
+                break
+            try:
+                record = self._codec.unseal(blob, _JOURNAL_AAD)
+            except SessionFormatError as exc:
+                logger.warning("Arama indeksi günlük kaydı çözülemedi: %s", exc)
+                break
+            pos += _LEN.size + length
+            self._journal_records += 1
+            yield record
+
+    def _log(self, record: list) -> None:
+        """Değişikliği belleğe uygular ve günlüğe ekler."""
+        self._apply(record)
+        blob = self._codec.seal(record, _JOURNAL_AAD)
+        try:
+            with open(self._journal_path, "ab") as fh:
+                fh.write(_LEN.pack(len(blob)) + blob)
+            self._journal_records += 1
+        except OSError as exc:
+            logger.error("Arama indeksi günlüğü yazılamadı: %s", exc)
+        if self._journal_records >= self.COMPACT_EVERY and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="session-index-compact", daemon=True).start()
+
+    def compact(self) -> None:
+        """
+        Tam snapshot yazar ve günlüğü sıfırlar. Kilit altında yalnızca görüntü
+        alınır ve günlük journal.old.bin'e döndürülür; mühürleme ve yazma kilit
+        dışında yapılır. Snapshot yerine geçince döndürülen günlük silinir.
+        """
+        with self._compact_lock:
+            try:
+                with self._lock:
+                    # Terim sayaçları yerinde değiştirilmez (her eklemede yenisi) → kopyalamadan paylaşılır
+                    docs = {
+                        sid: {
+                            "title": doc["title"],
+                            "updated_at": doc["updated_at"],
+                            "turns": [[ts, role, excerpt, self._turn_terms[(sid, ts)]]
+                                      for ts, (role, excerpt) in doc["turns"].items()],
+                        }
+                        for sid, doc in self._docs.items()
+                    }
+                    try:
+                        self._rotate_journal()
+                    except OSError as exc:
+                        logger.error("Arama indeksi günlüğü döndürülemedi: %s", exc)
+                        return
+                    self._journal_records = 0
+                tmp = self._snapshot_path.with_name(self._snapshot_path.name + ".tmp")
+                try:
+                    tmp.write_bytes(self._codec.seal({"docs": docs}, _SNAPSHOT_AAD))
+                    os.replace(tmp, self._snapshot_path)
+                    self._old_journal_path.unlink(missing_ok=True)
+                except OSError as exc:
+                    logger.error("Arama indeksi snapshot'ı yazılamadı: %s", exc)
+            finally:
+                self._compacting = False
+
+    def _rotate_journal(self) -> None:
+        """Günlüğü journal.old.bin'e taşır; önceki sıkıştırma yarıda kaldıysa sonuna ekler."""
+        if not self._journal_path.exists():
+            return
+        if self._old_journal_path.exists():
+            with open(self._old_journal_path, "ab") as fh:
+                fh.write(self._journal_path.read_bytes())
+            self._journal_path.write_bytes(b"")
+        else:
+            os.replace(self._journal_path, self._old_journal_path)
+
+    # ─────────────────────────────────────────────
+    #  BELLEK İÇİ GÜNCELLEME
+    # ─────────────────────────────────────────────
+
+    def _apply(self, record: list) -> None:
+        op, sid = record[0], record[1]
+        if op == "add":
+            if len(record) == 6:   # eski kayıt: tam metin
+                _, _, ts, role, text, updated_at = record
+                excerpt, terms = self._prepare(text)
+            else:
+                _, _, ts, role, excerpt, updated_at, terms = record
+            self._add_turn(sid, ts, role, excerpt, Counter(terms))
+            self._docs[sid]["updated_at"] = updated_at
+        elif op == "drop":
+            for ts in record[2]:
+                self._drop_turn(sid, ts)
+        elif op == "title":
+            self._set_title(sid, record[2], record[3])
+        elif op == "clear":
+            for ts in list(self._docs.get(sid, {}).get("turns", {})):
+                self._drop_turn(sid, ts)
+        elif op == "rm":
+            for ts in list(self._docs.get(sid, {}).get("turns", {})):
+                self._drop_turn(sid, ts)
+            self._docs.pop(sid, None)
+
+    def _set_title(self, sid: str, title: str, updated_at: float) -> None:
+        doc = self._docs.setdefault(sid, {"title": "", "updated_at": 0, "turns": {}})
+        doc["title"] = title
+        doc["updated_at"] = max(doc["updated_at"], updated_at)
+
+    def _prepare(self, text: str) -> Tuple[str, Counter]:
+        """Tur metninden saklanacak kesit başını ve terim sayılarını çıkarır."""
+        text = text[:self.MAX_TEXT_CHARS]
+        return text[:self.EXCERPT_CHARS], Counter(tokenize(text))
+
+    def _add_turn(self, sid: str, ts: float, role: str, excerpt: str, terms: Counter) -> None:
+        doc = self._docs.setdefault(sid, {"title": "", "updated_at": 0, "turns": {}})
+        key = (sid, ts)
+        if ts in doc["turns"]:
+            self._drop_turn(sid, ts)
+        doc["turns"][ts] = (role, excerpt)
+        self._turn_terms[key] = terms
+        length = sum(terms.values())
+        self._turn_len[key] = length
+        self._total_len += length
+        for term, tf in terms.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                self._vocab_dirty = True
+            posting[key] = tf
+
+    def _drop_turn(self, sid: str, ts: float) -> None:
+        doc = self._docs.get(sid)
+        if doc is None or doc["turns"].pop(ts, None) is None:
+            return
+        key = (sid, ts)
+        for term in self._turn_terms.pop(key, ()):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[term]
+                self._vocab_dirty = True
+        self._total_len -= self._turn_len.pop(key, 0)
+
+    # ─────────────────────────────────────────────
+    #  GENEL API (ConversationMemory tarafından çağrılır)
+    # ─────────────────────────────────────────────
+
+    def add_turn(self, session_id: str, turn: Dict, updated_at: float) -> None:
+        excerpt, terms = self._prepare(turn.get("content", ""))
+        with self._lock:
+            self._log(["add", session_id, turn.get("timestamp", 0), turn.get("role", ""),
+                       excerpt, updated_at, dict(terms)])
+
+    def drop_turns(self, session_id: str, timestamps: List[float]) -> None:
+        if timestamps:
+            with self._lock:
+                self._log(["drop", session_id, list(timestamps)])
+
+    def set_title(self, session_id: str, title: str, updated_at: float) -> None:
+        with self._lock:
+            self._log(["title", session_id, title, updated_at])
+
+    def clear_session(self, session_id: str) -> None:
+        with self._lock:
+            self._log(["clear", session_id])
+
+    def remove_session(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._docs:
+                self._log(["rm", session_id])
+
+    def index_session(self, data: Dict) -> None:
+        """Oturum dosyasının tüm içeriğini indeksler (önyükleme / arşivden geri yükleme)."""
+        sid = data.get("id")
+        if not sid:
+            return
+        with self._lock:
+            self.remove_session(sid)
+            self.set_title(sid, data.get("title", ""), data.get("updated_at", 0))
+            for turn in data.get("turns", []):
+                self.add_turn(sid, turn, data.get("updated_at", 0))
+
+    def rebuild(self, sessions: Iterable[Dict]) -> None:
+        """İndeksi verilen oturum sözlüklerinden sıfırdan kurar ve tek snapshot yazar."""
+        with self._lock:
+            for sid in list(self._docs):
+                self._apply(["rm", sid])
+            for data in sessions:
+                sid = data.get("id")
+                if not sid:
+                    continue
+                self._set_title(sid, data.get("title", ""), data.get("updated_at", 0))
+                for turn in data.get("turns", []):
+                    excerpt, terms = self._prepare(turn.get("content", ""))
+                    self._add_turn(sid, turn.get("timestamp", 0), turn.get("role", ""), excerpt, terms)
+            self.compact()
+            self.loaded = True
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._docs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._docs),
+                "turns": len(self._turn_len),
+                "terms": len(self._postings),
+                "journal_records": self._journal_records,
+            }
+
+    # ─────────────────────────────────────────────
+    #  ARAMA
+    # ─────────────────────────────────────────────
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Sorgu terimini (terim, ağırlık) listesine genişletir: tam eşleşme + önekler."""
+        out = [(term, 1.0)] if term in self._postings else []
+        if len(term) < 3:
+            return out
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        i = bisect.bisect_right(self._vocab, term)
+        while i < len(self._vocab) and len(out) < self.PREFIX_MAX_TERMS:
+            cand = self._vocab[i]
+            if not cand.startswith(term):
+                break
+            out.append((cand, self.PREFIX_WEIGHT))
+            i += 1
+        return out
+
+    def search(self, query: str, limit: int = 20, snippets_per_session: int = 3) -> List[Dict]:
+        """
+        Sorguyla eşleşen oturumları skora göre sıralı döndürür.
+
+        Returns:
+            [{"id", "title", "updated_at", "score", "matched_terms",
+              "matches": [{"role", "timestamp", "snippet"}]}]
+            snippet HTML-escape edilmiştir; eşleşen kelimeler <mark> ile işaretlenir.
+        """
+        q_terms = list(dict.fromkeys(tokenize(query)))
+        if not q_terms:
+            return []
+        with self._lock:
+            n_turns = len(self._turn_len) or 1
+            avg_len = (self._total_len / n_turns) or 1.0
+            turn_scores: Dict[TurnKey, float] = {}
+            session_terms: Dict[str, set] = {}
+            hit_terms: List[str] = []
+
+            for qi, q in enumerate(q_terms):
+                for term, weight in self._expand(q):
+                    hit_terms.append(term)
+                    posting = self._postings[term]
+                    idf = math.log(1 + (n_turns - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for key, tf in posting.items():
+                        norm = self.K1 * (1 - self.B + self.B * self._turn_len[key] / avg_len)
+                        turn_scores[key] = turn_scores.get(key, 0.0) + \
+                            weight * idf * tf * (self.K1 + 1) / (tf + norm)
+                        session_terms.setdefault(key[0], set()).add(qi)
+
+            # Başlık eşleşmeleri (turlar yoksa bile oturum bulunabilsin)
+            for sid, doc in self._docs.items():
+                title_terms = set(tokenize(doc["title"]))
+                for qi, q in enumerate(q_terms):
+                    if any(t == q or (len(q) >= 3 and t.startswith(q)) for t in title_terms):
+                        session_terms.setdefault(sid, set()).add(qi)
+
+            by_session: Dict[str, List[Tuple[float, float]]] = {}
+            for (sid, ts), score in turn_scores.items():
+                by_session.setdefault(sid, []).append((score, ts))
+
+            results = []
+            for sid, matched in session_terms.items():
+                doc = self._docs.get(sid)
+                if doc is None:
+                    continue
+                scored = sorted(by_session.get(sid, []), reverse=True)
+                score = (scored[0][0] if scored else 0.0) + 0.1 * sum(s for s, _ in scored[1:])
+                title_hits = sum(1 for t in tokenize(doc["title"]) if t in hit_terms)
+                score += 0.5 * title_hits
+                matches = []
+                for _, ts in scored[:snippets_per_session]:
+                    role, text = doc["turns"][ts]   # yalnızca kesit başı saklanır
+                    matches.append({
+                        "role": role,
+                        "timestamp": ts,
+                        "snippet": self._snippet(text, hit_terms),
+                    })
+                results.append({
+                    "id": sid,
+                    "title": doc["title"],
+                    "updated_at": doc["updated_at"],
+                    "score": round(score, 4),
+                    "matched_terms": len(matched),
+                    "matches": matches,
+                })
+
+        results.sort(key=lambda r: (r["matched_terms"], r["score"], r["updated_at"]), reverse=True)
+        return results[:limit]
+
+    def _snippet(self, text: str, terms: List[str]) -> str:
+        """
+        İlk eşleşmenin çevresinden HTML-güvenli, <mark> işaretli bir kesit üretir.
+        Eşleşme saklanan baş kısımda (EXCERPT_CHARS) değilse turun başı gösterilir.
+        """
+        folded = fold(text)
+        if len(folded) != len(text):
+            # Nadir: küçük harfe çevirme uzunluğu değiştirdi → konumlar eşleşmez
+            text = folded
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True)) + r")\w*")
+        first = pattern.search(folded)
+        center = first.start() if first else 0
+        start = max(0, center - self.SNIPPET_RADIUS)
+        end = min(len(text), center + self.SNIPPET_RADIUS * 2)
+        # Kelime ortasından başlamamak için en yakın boşluğa hizala
+        if start > 0:
+            space = text.find(" ", start, center)
+            start = space + 1 if space != -1 else start
+        parts = []
+        pos = start
+        for m in pattern.finditer(folded, start, end):
+            parts.append(html.escape(text[pos:m.start()]))
+            parts.append("<mark>" + html.escape(text[m.start():m.end()]) + "</mark>")
+            pos = m.end()
+        parts.append(html.escape(text[pos:end]))
+        snippet = " ".join("".join(parts).split())
+        return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
@@ -0,0 +1,160 @@
+"""
+Sidar Project - Token Sayacı
+Konuşma turları ve LLM mesajları için modele duyarlı token sayımı.
+
+Arka uçlar (öncelik sırasıyla, TOKENIZER_BACKEND="auto"):
+1. HuggingFace `tokenizers`: Aktif modelin gerçek tokenizer'ı (yalnızca yerel cache'ten)
+2. tiktoken (cl100k_base): Çoğu BPE modeline yakın genel amaçlı sayım
+3. Sezgisel: Kelime / noktalama / boşluk bazlı BPE yaklaşımı (bağımlılıksız)
+"""
+
+import logging
+import math
+import re
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ollama model ailesi → HuggingFace tokenizer deposu.
+# Model adının ':' öncesi kısmı bu öneklerle eşleştirilir (en uzun önek kazanır).
+_MODEL_TOKENIZER_REPOS: Dict[str, str] = {
+    "qwen2.5-coder": "Qwen/Qwen2.5-Coder-7B-Instruct",
+    "qwen2.5":       "Qwen/Qwen2.5-7B-Instruct",
+    "qwen2":         "Qwen/Qwen2-7B-Instruct",
+    "gemma2":        "google/gemma-2-9b-it",
+    "gemma":         "google/gemma-7b-it",
+    "llama3":        "meta-llama/Meta-Llama-3-8B-Instruct",
+    "mistral":       "mistralai/Mistral-7B-Instruct-v0.3",
+    "deepseek-coder": "deepseek-ai/deepseek-coder-6.7b-instruct",
+}
+
+# Sezgisel sayım: kelime, tek noktalama karakteri veya boşluk dizisi
+_PIECE_RE = re.compile(r"\w+|[^\w\s]|\s+", re.UNICODE)
+
+
+class TokenCounter:
+    """
+    Metin → token sayısı dönüştürücü.
+    `name` oturum dosyasına yazılır; farklı sayaçla yüklenen oturumlarda
+    kayıtlı sayımlar yeniden hesaplanır.
+    """
+
+    def __init__(self, name: str, fn: Callable[[str], int]) -> None:
+        self.name = name
+        self._fn = fn
+
+    def __call__(self, text: str) -> int:
+        if not text:
+            return 0
+        try:
+            return int(self._fn(text))
+        except Exception as exc:
+            logger.debug("Token sayımı başarısız (%s), sezgisele dönülüyor: %s", self.name, exc)
+            return heuristic_token_count(text)
+
+    def __repr__(self) -> str:
+        return f"<TokenCounter {self.name}>"
+
+
+def heuristic_token_count(text: str) -> int:
+    """
+    BPE davranışına yakın bağımlılıksız tahmin.
+
+    - ASCII kelimeler ~4 karakter/token, Türkçe vb. ASCII dışı kelimeler ~3 karakter/token
+    - Her noktalama/operatör karakteri ayrı token (kod ağırlıklı turlarda belirleyici)
+    - Tek boşluk sonraki kelimeyle birleşir; satır sonu ve girinti dizileri 1 token
+    """
+    count = 0
+    for piece in _PIECE_RE.findall(text):
+        first = piece[0]
+        if first.isspace():
+            if len(piece) > 1 or first != " ":
+                count += 1
+        elif first.isalnum() or first == "_":
+            per_token = 4 if piece.isascii() else 3
+            count += max(1, math.ceil(len(piece) / per_token))
+        else:
+            count += 1
+    return count
+
+
+def _resolve_repo(model: str) -> Optional[str]:
+    family = (model or "").split(":", 1)[0].lower()
+    best = None
+    for prefix, repo in _MODEL_TOKENIZER_REPOS.items():
+        if family.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, repo)
+    return best[1] if best else None
+
+
+def _load_hf_counter(model: str, allow_download: bool) -> Optional[TokenCounter]:
+    repo = _resolve_repo(model)
+    if not repo:
+        return None
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+    try:
+        if allow_download:
+            tok = Tokenizer.from_pretrained(repo)
+        else:
+            # Başlangıçta ağ erişimi yapma — yalnızca HF cache'inde varsa kullan
+            from huggingface_hub import try_to_load_from_cache
+            path = try_to_load_from_cache(repo, "tokenizer.json")
+            if not isinstance(path, str):
+                return None
+            tok = Tokenizer.from_file(path)
+    except Exception as exc:
+        logger.debug("HF tokenizer yüklenemedi (%s): %s", repo, exc)
+        return None
+    return TokenCounter(
+        f"hf:{repo}",
+        lambda text: len(tok.encode(text, add_special_tokens=False).ids),
+    )
+
+
+def _load_tiktoken_counter() -> Optional[TokenCounter]:
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+    return TokenCounter("tiktoken:cl100k_base", lambda text: len(enc.encode(text, disallowed_special=())))
+
+
+HEURISTIC_COUNTER = TokenCounter("heuristic", heuristic_token_count)
+
+_cache: Dict[tuple, TokenCounter] = {}
+_cache_lock = threading.Lock()
+
+
+def get_token_counter(model: str = "", backend: str = "auto") -> TokenCounter:
+    """
+    Model için en uygun token sayacını döndürür (süreç boyunca önbelleğe alınır).
+
+    backend: "auto" | "hf" | "tiktoken" | "heuristic"
+      auto → HF (yalnızca cache) → tiktoken → sezgisel
+      hf   → HF (gerekirse indirir) → sezgisel
+    """
+    backend = (backend or "auto").lower()
+    key = (model or "", backend)
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+
+    counter: Optional[TokenCounter] = None
+    if backend in ("auto", "hf"):
+        counter = _load_hf_counter(model, allow_download=(backend == "hf"))
+    if counter is None and backend in ("auto", "tiktoken"):
+        counter = _load_tiktoken_counter()
+    if counter is None:
+        if backend not in ("auto", "heuristic"):
+            logger.warning("⚠️ '%s' tokenizer arka ucu kullanılamıyor — sezgisel sayım kullanılacak.", backend)
+        counter = HEURISTIC_COUNTER
+
+    with _cache_lock:
+        _cache[key] = counter
+    logger.info("Token sayacı: model=%s → %s", model or "-", counter.name)
+    return counter
@@ -0,0 +1,190 @@
+"""
+Sidar Project - Araç Sonucu Önbelleği
+ReAct döngüsünde aynı oturum içinde aynı argümanla tekrar çağrılan salt-okunur
+araçların (read_file, list_dir, github_read, pypi, docs_search ...) sonucunu
+bellekte tutar; disk / ağ erişimi tekrarlanmaz.
+
+Anahtar: (oturum, araç, normalleştirilmiş argüman). Her aracın kendi TTL'i vardır
+(TOOL_CACHE_TTLS ile değiştirilebilir). Geçersiz kılma açıktır:
+  write_file / patch_file  → ilgili dosyanın read_file kaydı, üst dizinlerin list_dir
+                             kayıtları ve audit sonuçları (tüm oturumlarda)
+  execute_code             → tüm yerel dosya kayıtları (kod dosya yazmış olabilir)
+  github_write / branch / pr → tüm uzak GitHub okuma kayıtları
+  docs_add / docs_delete   → belge deposu arama / liste kayıtları
+Ayrıca get/put'a verilen `version` (ör. DocumentStore.version) kayıtla saklanır;
+sürüm değişmişse kayıt kullanılmaz — araç dışından yapılan değişiklikler
+(AutoHandle'ın URL'den belge eklemesi, web arayüzü yüklemeleri) de böyle yakalanır.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+
+# Araç → TTL (saniye); listede olmayan araçlar önbelleğe alınmaz
+DEFAULT_TTLS: Dict[str, float] = {
+    "read_file": 300,
+    "list_dir": 60,
+    "audit": 120,
+    "github_read": 300,
+    "github_list_files": 300,
+    "github_search_code": 300,
+    "github_info": 300,
+    "github_commits": 120,
+    "pypi": 3600,
+    "pypi_compare": 3600,
+    "npm": 3600,
+    "gh_releases": 1800,
+    "gh_latest": 1800,
+    "docs_search": 600,
+    "docs_list": 600,
+    "search_docs": 1800,
+}
+
+_LOCAL_FILE_TOOLS = ("read_file", "list_dir", "audit")
+_GITHUB_READ_TOOLS = ("github_read", "github_list_files", "github_search_code", "github_info", "github_commits")
+_DOCS_READ_TOOLS = ("docs_search", "docs_list")
+_WS_RE = re.compile(r"\s+")
+
+
+def parse_ttls(raw: str) -> Dict[str, float]:
+    """'read_file=60,pypi=0' → {araç: ttl}; 0 önbelleği o araç için kapatır."""
+    out: Dict[str, float] = {}
+    for part in (raw or "").split(","):
+        name, sep, value = part.strip().partition("=")
+        try:
+            if sep and name.strip():
+                out[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return out
+
+
+def _local_path(arg: str) -> str:
+    # CodeManager yolları Path(arg).resolve() ile çözer; anahtar da aynı biçimde olmalı
+    return str(Path(arg.strip() or ".").resolve())
+
+
+def normalize_argument(tool: str, arg: str) -> str:
+    arg = arg.strip()
+    if tool in _LOCAL_FILE_TOOLS:
+        return _local_path(arg)
+    if tool in ("pypi", "npm"):
+        return arg.lower().replace("_", "-")
+    if tool in ("github_read", "github_list_files"):
+        return "|||".join(p.strip().strip("/") for p in arg.split("|||"))
+    return _WS_RE.sub(" ", arg)
+
+
+class ToolResultCache:
+    """
+    ttls        : Araç başına TTL (DEFAULT_TTLS üzerine yazılır)
+    max_entries : Oturum başına en fazla kayıt (LRU)
+    """
+
+    MAX_SESSIONS = 64   # en uzun süredir kullanılmayan oturumun kayıtları atılır
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 256) -> None:
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # oturum → OrderedDict[(araç, argüman)] = (sonuç, son geçerlilik, durum sürümü)
+        self._sessions: "OrderedDict[str, OrderedDict[Tuple[str, str], Tuple[str, float, Hashable]]]" = OrderedDict()
+        self._tools: Dict[str, Dict[str, int]] = {}
+        self.invalidations = 0
+
+    def cacheable(self, tool: str) -> bool:
+        return self.ttls.get(tool, 0) > 0
+
+    def _counter(self, tool: str) -> Dict[str, int]:
+        c = self._tools.get(tool)
+        if c is None:
+            c = self._tools[tool] = {"hits": 0, "misses": 0, "evictions": 0}
+        return c
+
+    def get(self, session: str, tool: str, arg: str, version: Hashable = None) -> Optional[str]:
+        if not self.cacheable(tool):
+            return None
+        key = (tool, normalize_argument(tool, arg))
+        with self._lock:
+            entries = self._sessions.get(session)
+            hit = entries.get(key) if entries else None
+            if hit is not None and (hit[1] < time.monotonic() or hit[2] != version):
+                del entries[key]
+                hit = None
+            if hit is None:
+                self._counter(tool)["misses"] += 1
+                return None
+            entries.move_to_end(key)
+            self._counter(tool)["hits"] += 1
+            return hit[0]
+
+    def put(self, session: str, tool: str, arg: str, result: str, version: Hashable = None) -> None:
+        if not self.cacheable(tool):
+            return
+        key = (tool, normalize_argument(tool, arg))
+        with self._lock:
+            entries = self._sessions.setdefault(session, OrderedDict())
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+            entries[key] = (result, time.monotonic() + self.ttls[tool], version)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    # ─────────────────────────────────────────────
+    #  GEÇERSİZ KILMA
+    # ─────────────────────────────────────────────
+
+    def _evict(self, match) -> int:
+        removed = 0
+        with self._lock:
+            for entries in self._sessions.values():
+                for key in [k for k in entries if match(*k)]:
+                    del entries[key]
+                    self._counter(key[0])["evictions"] += 1
+                    removed += 1
+            self.invalidations += bool(removed)
+        return removed
+
+    def invalidate_after(self, tool: str, arg: str) -> int:
+        """Yan etkili bir araç çalıştıktan sonra etkilenen kayıtları siler; silinen sayıyı döndürür."""
+        if tool in ("write_file", "patch_file"):
+            path = _local_path(arg.split("|||", 1)[0])
+            parents = {str(p) for p in Path(path).parents}
+
+            def match(t: str, a: str) -> bool:
+                if t == "read_file":
+                    return a == path
+                if t in ("list_dir", "audit"):
+                    return a in parents
+                return False
+            return self._evict(match)
+        if tool == "execute_code":
+            return self._evict(lambda t, a: t in _LOCAL_FILE_TOOLS)
+        if tool in ("github_write", "github_create_branch", "github_create_pr"):
+            return self._evict(lambda t, a: t in _GITHUB_READ_TOOLS)
+        if tool in ("docs_add", "docs_delete"):
+            return self._evict(lambda t, a: t in _DOCS_READ_TOOLS)
+        return 0
+
+    def drop_session(self, session: str) -> None:
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tools = {}
+            for name, c in sorted(self._tools.items()):
+                total = c["hits"] + c["misses"]
+                tools[name] = dict(c, hit_rate=round(c["hits"] / total, 3) if total else 0.0)
+            return {
+                "entries": sum(len(e) for e in self._sessions.values()),
+                "sessions": len(self._sessions),
+                "invalidations": self.invalidations,
+                "tools": tools,
+            }
@@ -0,0 +1,388 @@
+"""
+Sidar Project - Span Tabanlı İzleme
+Yavaş bir /chat isteğinde sürenin nereye gittiğini (LLM üretimi, JSON düzeltme
+turları, araç I/O, bellek yazımı) gösteren span ağacı üretir.
+
+  respond                  → kök span (istek başına bir izleme / trace)
+    react.step             → ReAct adımı (adım no, istem baytı, araç, sonuç)
+      llm.chat             → LLMClient.chat (model, çağıran, token sayıları, TTFT)
+      tool                 → _execute_tool handler'ı (araç, önbellek, sonuç baytı)
+    memory.save            → oturum dosyası yazımı (bayt)
+
+Geçerli span bir ContextVar'da tutulur; asyncio görevleri ve asyncio.to_thread
+bağlamı kopyaladığı için paralel araçlar ve thread'deki bellek yazımı doğru
+üst span'a bağlanır. Kök span kapanınca açık kalan alt span'lar da aynı anda
+kapatılır ve izlemenin tamamı dışa aktarılır:
+
+  TRACE_OTLP_ENDPOINT boş → TRACE_FILE (dönen JSONL, satır başına bir span)
+  TRACE_OTLP_ENDPOINT=<url> → OTLP/HTTP JSON ({url}/v1/traces), arka plan thread'i
+
+TRACE_ENABLED=false iken tüm çağrılar paylaşılan boş bir span döndürür (ek yük yok).
+Şelale görünümü: python main.py --trace [izleme_id]
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Tek bir zamanlanmış işlem; `with` bloğu olarak veya start_span/end ile kullanılır."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "duration_ns",
+                 "attrs", "status", "_t0", "_tracer", "_trace", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attrs: Dict) -> None:
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = ""
+            self._trace: List["Span"] = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self._trace = parent._trace
+        self._trace.append(self)
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.attrs = attrs
+        self.status = "ok"
+        self._tracer = tracer
+        self._token = None
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def end(self, status: str = "", **attrs) -> None:
+        """Span'ı kapatır (birden fazla çağrı zararsızdır); kök span izlemeyi dışa aktarır."""
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:   # farklı bağlamda kapatıldı (ör. GC ile kapanan üreteç)
+                pass
+            self._token = None
+        if self.duration_ns is not None:   # zaten kapalı (veya kökle birlikte kapatıldı)
+            return
+        self.duration_ns = time.perf_counter_ns() - self._t0
+        self.attrs.update(attrs)
+        if status:
+            self.status = status
+        if not self.parent_id:
+            self._tracer._finish_trace(self)
+        elif self._trace and self._trace[0].duration_ns is not None:
+            # Kök çoktan kapandı (ör. arka plan görevi): span tek başına aktarılır
+            self._tracer._export([self])
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.end()
+        elif issubclass(exc_type, (GeneratorExit, KeyboardInterrupt)) or exc_type.__name__ == "CancelledError":
+            self.end("cancelled")
+        else:
+            self.end("error", error=exc_type.__name__)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.duration_ns or 0) / 1e6, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """İzleme kapalıyken dönen boş span."""
+
+    trace_id = ""
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    def end(self, status: str = "", **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("sidar_span", default=None)
+
+
+# ─────────────────────────────────────────────
+#  DIŞA AKTARICILAR
+# ─────────────────────────────────────────────
+
+class JsonlExporter:
+    """Span'ları satır başına bir JSON olarak dönen (rotating) dosyaya yazar."""
+
+    def __init__(self, path: Path, max_bytes: int = 10_485_760, backup_count: int = 3) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handler = RotatingFileHandler(self.path, maxBytes=max_bytes,
+                                            backupCount=backup_count, encoding="utf-8")
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            record = logging.LogRecord("sidar.trace", logging.INFO, "", 0,
+                                       json.dumps(span.to_dict(), ensure_ascii=False), None, None)
+            self._handler.handle(record)
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter:
+    """
+    OTLP/HTTP JSON dışa aktarıcı (opentelemetry paketi gerekmez).
+    İzlemeler kuyruğa alınır; arka plan thread'i toplu POST eder, istek
+    yolunda ağ beklenmez. Kuyruk doluysa izleme düşürülür ve sayılır.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "sidar", max_queue: int = 1000) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="sidar-otlp", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def payload(self, spans: List[Span]) -> Dict:
+        out = []
+        for s in spans:
+            item = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.start_ns + (s.duration_ns or 0)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attrs.items()],
+                "status": {"code": 2 if s.status == "error" else 1},
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            out.append(item)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "sidar"}, "spans": out}],
+        }]}
+
+    def _run(self) -> None:
+        import httpx
+        with httpx.Client(timeout=5) as client:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    return
+                while len(batch) < 512:   # bekleyen izlemeleri tek istekte topla
+                    try:
+                        more = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is None:
+                        self._queue.put(None)
+                        break
+                    batch = batch + more
+                try:
+                    client.post(self.url, json=self.payload(batch)).raise_for_status()
+                except Exception as exc:
+                    self.failures += 1
+                    logger.debug("OTLP dışa aktarımı başarısız: %s", exc)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+# ─────────────────────────────────────────────
+#  İZLEYİCİ
+# ─────────────────────────────────────────────
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.exporter = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"traces": 0, "spans": 0, "export_errors": 0}
+
+    def configure(self, config) -> None:
+        """TRACE_* ayarlarına göre dışa aktarıcıyı kurar (SidarAgent başlatılırken çağrılır)."""
+        self.shutdown()
+        self.enabled = getattr(config, "TRACE_ENABLED", False)
+        if not self.enabled:
+            return
+        endpoint = getattr(config, "TRACE_OTLP_ENDPOINT", "")
+        if endpoint:
+            self.exporter = OtlpExporter(endpoint, getattr(config, "TRACE_SERVICE_NAME", "sidar"))
+        else:
+            self.exporter = JsonlExporter(
+                trace_file(config),
+                max_bytes=getattr(config, "TRACE_MAX_BYTES", 10_485_760),
+                backup_count=getattr(config, "TRACE_BACKUP_COUNT", 3),
+            )
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+    def start_span(self, name: str, activate: bool = True, require_parent: bool = False, **attrs):
+        """
+        activate      : Span geçerli span olur (içinde açılanlar alt span'ı olur).
+                        Bitişi başka bir yerde olan span'lar (ör. LLM akışı) için False.
+        require_parent: Üst span yoksa izleme başlatılmaz (ör. istek dışı bellek yazımı).
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current.get()
+        if parent is None and require_parent:
+            return NOOP_SPAN
+        span = Span(self, name, parent, attrs)
+        if activate:
+            span._token = _current.set(span)
+        return span
+
+    span = start_span
+
+    def _finish_trace(self, root: Span) -> None:
+        with self._lock:
+            spans = list(root._trace)
+        for s in spans:
+            if s.duration_ns is None:      # kapanmamış alt span: kökle birlikte kapatılır
+                s.duration_ns = time.perf_counter_ns() - s._t0
+                s.attrs.setdefault("closed_by_root", True)
+        self.stats["traces"] += 1
+        self._export(spans)
+
+    def _export(self, spans: List[Span]) -> None:
+        self.stats["spans"] += len(spans)
+        try:
+            if self.exporter is not None:
+                self.exporter.export(spans)
+        except Exception as exc:
+            self.stats["export_errors"] += 1
+            logger.debug("İzleme dışa aktarılamadı: %s", exc)
+
+
+tracer = Tracer()
+start_span = tracer.start_span
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def trace_file(config) -> Path:
+    path = Path(getattr(config, "TRACE_FILE", "logs/traces.jsonl"))
+    return path if path.is_absolute() else Path(getattr(config, "BASE_DIR", ".")) / path
+
+
+# ─────────────────────────────────────────────
+#  ŞELALE GÖRÜNÜMÜ (CLI)
+# ─────────────────────────────────────────────
+
+def load_trace(path: Path, trace_id: str = "") -> List[Dict]:
+    """
+    JSONL dosyasından (ve dönmüş yedeklerinden) bir izlemenin span'larını okur.
+    trace_id boşsa en son kapanan kök span'ın izlemesi seçilir; önek de kabul edilir.
+    """
+    path = Path(path)
+    files = sorted(path.parent.glob(path.name + ".*"), reverse=True) + [path]
+    records = []
+    for f in files:
+        if not f.exists():
+            continue
+        with open(f, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    if not trace_id:
+        roots = [r for r in records if not r["parent_id"]]
+        if not roots:
+            return []
+        trace_id = roots[-1]["trace_id"]
+    return [r for r in records if r["trace_id"].startswith(trace_id)]
+
+
+_LABEL_ATTRS = ("step", "tool", "model", "caller")
+_DETAIL_ATTRS = ("prompt_tokens", "completion_tokens", "ttft_ms", "prompt_bytes", "result_bytes",
+                 "bytes", "outcome", "cache_hit", "error")
+
+
+def render_waterfall(spans: List[Dict], width: int = 40) -> str:
+    """Span'ları üst-alt sırasına göre girintili, zaman çubuklu bir tablo olarak biçimlendirir."""
+    if not spans:
+        return "İzleme bulunamadı."
+    t0 = min(s["start_ns"] for s in spans)
+    total_ms = max((s["start_ns"] - t0) / 1e6 + s["duration_ms"] for s in spans) or 1.0
+    children: Dict[str, List[Dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda x: x["start_ns"]):
+        parent = s["parent_id"] if s["parent_id"] in ids else ""
+        children.setdefault(parent, []).append(s)
+
+    root = children.get("", [spans[0]])[0]
+    lines = [f"İzleme {root['trace_id']} — {root['name']} {root['duration_ms'] / 1000:.3f} s ({len(spans)} span)",
+             f"{'span':<36} {'başlangıç':>9} {'süre':>9}  zaman çizelgesi",
+             "─" * (60 + width)]
+
+    def walk(parent: str, depth: int) -> None:
+        for s in children.get(parent, []):
+            start_ms = (s["start_ns"] - t0) / 1e6
+            a = s["attrs"]
+            label = " ".join([s["name"]] + [str(a[k]) for k in _LABEL_ATTRS if k in a])
+            label = ("  " * depth + label)[:36]
+            lo = int(start_ms / total_ms * width)
+            hi = max(lo + 1, int((start_ms + s["duration_ms"]) / total_ms * width))
+            bar = " " * lo + "█" * (min(hi, width) - lo)
+            detail = " ".join(f"{k}={a[k]}" for k in _DETAIL_ATTRS if k in a)
+            if s["status"] != "ok":
+                detail = f"[{s['status']}] {detail}"
+            lines.append(f"{label:<36} {start_ms:>7.0f}ms {s['duration_ms']:>7.0f}ms |{bar:<{width}}| {detail}".rstrip())
+            walk(s["span_id"], depth + 1)
+
+    walk("", 0)
+    return "\n".join(lines)
@@ -7,6 +7,7 @@ Kullanım:
     python main.py --status         # sistem durumunu göster
     python main.py -c "komut"       # tek komut çalıştır
     python main.py --level full     # erişim seviyesini geçici olarak ayarla
+    python main.py --migrate-sessions  # eski oturum dosyalarını v2 formatına dönüştür
 """
 
 import argparse
@@ -20,6 +21,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from config import Config
 from agent.sidar_agent import SidarAgent
+from core import tracing
 
 
 # ─────────────────────────────────────────────
@@ -124,6 +126,14 @@ async def _interactive_loop_async(agent: SidarAgent) -> None:
     print(f"  Belge Deposu    : {agent.docs.status()}")
     print(f"\n  '.help' yazarak komut listesini görebilirsiniz.\n")
 
+    # Oturum saklama politikası arka planda periyodik uygulanır
+    retention_task = None
+    interval = getattr(agent.cfg, "SESSION_RETENTION_INTERVAL", 0)
+    if interval > 0:
+        retention_task = asyncio.create_task(agent.retention.run_periodic(interval))
+    # Kullanıcı ilk mesajı yazarken modeller arka planda belleğe yüklenir
+    residency_task = asyncio.create_task(agent.llm.residency.run_periodic())
+
     while True:
         try:
             # input() senkron olduğu için event loop'u bloke etmemesi için thread'e itilir
@@ -180,6 +190,11 @@ async def _interactive_loop_async(agent: SidarAgent) -> None:
             print(f"\nSidar > ✗ Hata: {exc}\n")
             logging.exception("Ajan yanıt hatası")
 
+    if retention_task is not None:
+        retention_task.cancel()
+    residency_task.cancel()
+    await agent.llm.aclose()
+
 
 def interactive_loop(agent: SidarAgent) -> None:
     asyncio.run(_interactive_loop_async(agent))
@@ -196,6 +211,10 @@ def main() -> None:
     )
     parser.add_argument("-c", "--command", help="Tek komut çalıştır ve çık")
     parser.add_argument("--status", action="store_true", help="Sistem durumunu göster ve çık")
+    parser.add_argument(
+        "--migrate-sessions", action="store_true",
+        help="Eski (JSON/Fernet) oturum dosyalarını sıkıştırılmış v2 formatına dönüştür ve çık",
+    )
     parser.add_argument(
         "--level",
         choices=["restricted", "sandbox", "full"],
@@ -204,6 +223,10 @@ def main() -> None:
     parser.add_argument("--provider", choices=["ollama", "gemini"], help="AI sağlayıcısı")
     parser.add_argument("--model", help="Ollama model adı")
     parser.add_argument("--log", default="INFO", help="Log seviyesi (DEBUG/INFO/WARNING)")
+    parser.add_argument(
+        "--trace", nargs="?", const="", metavar="IZLEME_ID",
+        help="TRACE_FILE'daki bir isteğin span şelalesini göster ve çık (varsayılan: son istek)",
+    )
     args = parser.parse_args()
 
     _setup_logging(args.log)
@@ -219,12 +242,24 @@ def main() -> None:
     if args.model:
         cfg.CODING_MODEL = args.model
 
+    if args.trace is not None:
+        print(tracing.render_waterfall(tracing.load_trace(tracing.trace_file(cfg), args.trace)))
+        return
+
     agent = SidarAgent(cfg)
 
     if args.status:
         print(agent.status())
         return
 
+    if args.migrate_sessions:
+        stats = agent.memory.migrate_sessions()
+        print(
+            f"Oturum geçişi: {stats['migrated']} dönüştürüldü, {stats['skipped']} zaten v2, "
+            f"{stats['failed']} hatalı — {stats['bytes_before']} → {stats['bytes_after']} bayt"
+        )
+        return
+
     if args.command:
         # respond() async generator olduğu için asyncio.run() ile çalıştırılır
         async def _run_command() -> None:
@@ -232,6 +267,10 @@ def main() -> None:
             async for chunk in agent.respond(args.command):
                 print(chunk, end="", flush=True)
             print()
+            # asyncio.run() kapanmadan arka plan özetlemesi tamamlansın
+            await agent.flush_background_tasks()
+            await agent.llm.aclose()
+            tracing.tracer.shutdown()   # OTLP kuyruğu boşaltılır / JSONL dosyası kapanır
 
         asyncio.run(_run_command())
         return
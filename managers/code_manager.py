@@ -399,6 +399,11 @@ class CodeManager:
     #  METRİKLER
     # ─────────────────────────────────────────────
 
+    @property
+    def version(self) -> int:
+        """Okuma/yazma sayaçlarıyla birlikte artar (ajan bağlam önbelleği için sürüm)."""
+        return self._files_read + self._files_written
+
     def get_metrics(self) -> Dict[str, int]:
         with self._lock:
             return {
@@ -41,6 +41,7 @@ class GitHubManager:
         self._gh = None
         self._repo = None
         self._available = False
+        self.version = 0   # bağlantı / depo değişince artar (ajan bağlam önbelleği)
         self._init_client()
 
     # ─────────────────────────────────────────────
@@ -57,6 +58,7 @@ class GitHubManager:
             # Token doğrulama
             _ = self._gh.get_user().login
             self._available = True
+            self.version += 1
             logger.info("GitHub bağlantısı kuruldu.")
             if self.repo_name:
                 self._load_repo(self.repo_name)
@@ -72,6 +74,7 @@ class GitHubManager:
         try:
             self._repo = self._gh.get_repo(repo_name)
             self.repo_name = repo_name
+            self.version += 1
             logger.info("Depo yüklendi: %s", repo_name)
             return True
         except Exception as exc:
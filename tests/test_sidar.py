@@ -7,7 +7,9 @@ pytest-asyncio modu: pyproject.toml / pytest.ini'da
 """
 
 import asyncio
+import json
 import os
+import time
 from pathlib import Path
 
 import pytest
@@ -960,4 +962,2003 @@ def test_gpu_memory_optimize_gc_runs_on_error(tmp_path):
     # GPU devre dışı — hata verme, yalnızca GC çalışmalı
     result = health.optimize_gpu_memory()
     assert "GC" in result
-    assert isinstance(result, str)
\ No newline at end of file
+    assert isinstance(result, str)
+
+# ─────────────────────────────────────────────
+# 24. TUR BAŞINA TOKEN SAYIMI
+# ─────────────────────────────────────────────
+
+def test_heuristic_token_count_code_heavier_than_prose():
+    """heuristic_token_count: Noktalama yoğun kod, aynı uzunluktaki düz metinden fazla token üretir."""
+    from core.tokenizer import heuristic_token_count
+
+    prose = "Bu cümle sadece düz metinden oluşan uzunca bir açıklama içeriyor"
+    code = "x={'a':[1,2],'b':(3,4)};f(x[0]);y=x['a'][1]+2;z=(y*3)-1;q=[i]"
+    assert len(code) <= len(prose) + 5
+    assert heuristic_token_count(code) > heuristic_token_count(prose)
+    assert heuristic_token_count("") == 0
+
+
+def test_memory_token_total_is_running_sum(test_config):
+    """ConversationMemory: Token toplamı tur eklenirken, kırpılırken ve temizlenirken güncel kalır."""
+    from core.memory import ConversationMemory
+
+    calls = []
+
+    def counter(text):
+        calls.append(text)
+        return len(text)
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=2, token_counter=counter)
+    mem.create_session("Token")
+    for i in range(6):
+        mem.add("user", "x" * (i + 1))
+
+    # max_turns=2 → son 4 tur kalır: 3+4+5+6
+    assert mem.token_count() == 18
+    assert all("tokens" in t for t in mem.get_history())
+
+    # needs_summarization sayımı tekrar yapmaz
+    n_calls = len(calls)
+    mem.needs_summarization()
+    assert len(calls) == n_calls
+
+    mem.clear()
+    assert mem.token_count() == 0
+
+
+def test_memory_token_counts_persist_and_recount_on_tokenizer_change(test_config):
+    """ConversationMemory: Kayıtlı sayımlar yeniden kullanılır; tokenizer değişirse yeniden sayılır."""
+    from core.memory import ConversationMemory
+    from core.tokenizer import TokenCounter
+
+    mem = ConversationMemory(
+        file_path=test_config.MEMORY_FILE, max_turns=10,
+        token_counter=TokenCounter("sabit", lambda t: 7),
+    )
+    sid = mem.create_session("Kalıcı")
+    mem.add("user", "merhaba")
+    mem.add("assistant", "selam")
+
+    mem2 = ConversationMemory(
+        file_path=test_config.MEMORY_FILE, max_turns=10,
+        token_counter=TokenCounter("sabit", lambda t: 99),
+    )
+    mem2.load_session(sid)
+    assert mem2.token_count() == 14  # aynı tokenizer adı → dosyadaki sayımlar
+
+    mem3 = ConversationMemory(
+        file_path=test_config.MEMORY_FILE, max_turns=10,
+        token_counter=TokenCounter("baska", lambda t: 1),
+    )
+    mem3.load_session(sid)
+    assert mem3.token_count() == 2
+
+
+# ─────────────────────────────────────────────
+# 25. KAYAN (ROLLING) ÖZETLEME
+# ─────────────────────────────────────────────
+
+def test_memory_rolling_summary_keeps_recent_turns(test_config):
+    """ConversationMemory: Yalnızca en eski pencere özetlenir, son turlar aynen kalır."""
+    from core.memory import ConversationMemory
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=20)
+    sid = mem.create_session("Kayan")
+    for i in range(5):
+        mem.add("user", f"soru {i}")
+        mem.add("assistant", f"cevap {i}")
+
+    window = mem.get_summary_window(max_turns=5, keep_recent=4)
+    # Pencere çifti bölmez → 4 tur (assistant ile biter)
+    assert len(window) == 4
+    assert window[-1]["role"] == "assistant"
+
+    before = mem.token_count()
+    saved = mem.apply_rolling_summary("kısa özet", window, sid)
+    assert saved > 0
+    assert mem.token_count() == before - saved
+
+    history = mem.get_history()
+    assert len(history) == 6
+    assert history[0]["content"] == "soru 2"
+    msgs = mem.get_messages_for_llm()
+    assert "kısa özet" in msgs[1]["content"]
+    assert msgs[2]["content"] == "soru 2"
+
+    # Özet kalıcı olmalı
+    mem2 = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=20)
+    mem2.load_session(sid)
+    assert mem2.get_summary() == "kısa özet"
+
+
+def test_memory_rolling_summary_skips_stale_window(test_config):
+    """ConversationMemory: Özetleme sırasında geçmiş değiştiyse özet uygulanmaz."""
+    from core.memory import ConversationMemory
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=20)
+    sid = mem.create_session("Bayat")
+    for i in range(4):
+        mem.add("user", f"s{i}")
+        mem.add("assistant", f"c{i}")
+    window = mem.get_summary_window(max_turns=4, keep_recent=2)
+    mem.clear()
+    assert mem.apply_rolling_summary("özet", window, sid) == 0
+    assert mem.get_summary() == ""
+
+
+@pytest.mark.asyncio
+async def test_agent_background_summarization_records_stats(agent):
+    """SidarAgent: Özetleme arka planda çalışır ve süre/token metriklerini kaydeder."""
+    agent.cfg.MEMORY_SUMMARY_WINDOW = 4
+    agent.cfg.MEMORY_KEEP_RECENT = 2
+    for i in range(4):
+        agent.memory.add("user", f"uzun soru {i} " * 20)
+        agent.memory.add("assistant", f"uzun cevap {i} " * 20)
+
+    async def fake_chat(**kwargs):
+        return "özet"
+
+    agent.llm.chat = fake_chat
+    agent.memory.needs_summarization = lambda: True
+    agent._schedule_summarization()
+    await agent.flush_background_tasks()
+
+    assert agent.summary_stats["runs"] == 1
+    assert agent.summary_stats["last_tokens_saved"] > 0
+    assert agent.memory.get_summary() == "özet"
+    assert len(agent.memory) == 4
+
+
+# ─────────────────────────────────────────────
+# 26. SIKIŞTIRILMIŞ / PARÇALI OTURUM DEPOLAMA (v2)
+# ─────────────────────────────────────────────
+
+def test_session_v2_encrypted_roundtrip_and_tail_read(test_config):
+    """ConversationMemory: v2 şifreli dosya tam ve kısmi (son N tur) okunabilir."""
+    from cryptography.fernet import Fernet
+    from core.memory import ConversationMemory
+    from core.session_codec import CHUNK_TURNS, MAGIC
+
+    key = Fernet.generate_key().decode()
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=50, encryption_key=key)
+    sid = mem.create_session("Şifreli")
+    for i in range(CHUNK_TURNS + 5):
+        mem.add("user" if i % 2 == 0 else "assistant", f"mesaj {i} ğüşiöç")
+
+    raw = (test_config.DATA_DIR / "sessions" / f"{sid}.json").read_bytes()
+    assert raw.startswith(MAGIC)
+    assert "ğüşiöç".encode("utf-8") not in raw
+
+    tail = mem.read_session_turns(sid, CHUNK_TURNS + 2)
+    assert [t["content"] for t in tail["turns"]] == [f"mesaj {i} ğüşiöç" for i in range(CHUNK_TURNS + 2, CHUNK_TURNS + 5)]
+    assert tail["meta"]["turn_count"] == CHUNK_TURNS + 5
+
+    mem2 = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=50, encryption_key=key)
+    assert mem2.load_session(sid) is True
+    assert len(mem2.get_history()) == CHUNK_TURNS + 5
+
+
+def test_session_v2_tampered_file_is_quarantined(test_config):
+    """ConversationMemory: Kimlik doğrulaması bozulan v2 dosyası karantinaya alınır."""
+    from cryptography.fernet import Fernet
+    from core.memory import ConversationMemory
+
+    key = Fernet.generate_key().decode()
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10, encryption_key=key)
+    sid = mem.create_session("Kurcalanmış")
+    mem.add("user", "gizli")
+    path = test_config.DATA_DIR / "sessions" / f"{sid}.json"
+    raw = bytearray(path.read_bytes())
+    raw[-30] ^= 0xFF  # footer içindeki bir baytı boz
+    path.write_bytes(bytes(raw))
+
+    mem.get_all_sessions()
+    assert not path.exists()
+    assert path.with_suffix(".json.broken").exists()
+
+
+def test_session_v2_chunks_bound_to_session_id(tmp_path, monkeypatch):
+    """SessionCodec: Başka oturumun parçası aynı indekse eklenemez; VERSION 1 dosyaları okunmaya devam eder."""
+    import core.session_codec as sc
+    from cryptography.fernet import Fernet
+
+    codec = sc.SessionCodec(Fernet.generate_key().decode())
+    turns = [{"role": "user", "content": f"gizli {i}", "timestamp": float(i)} for i in range(sc.CHUNK_TURNS * 2)]
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    a.write_bytes(codec.encode({"id": "a", "turns": turns}))
+    b.write_bytes(codec.encode({"id": "b", "turns": turns}))
+    assert codec.read_turns(b)[1] == turns
+
+    with open(b, "rb") as fh:
+        _, _, footer = codec._read_footer(fh, "b")
+    offset, length, _, _ = footer["chunks"][0]
+    spliced = bytearray(b.read_bytes())
+    spliced[offset:offset + length] = a.read_bytes()[offset:offset + length]   # aynı boyut, aynı konum
+    b.write_bytes(bytes(spliced))
+    with pytest.raises(sc.SessionFormatError):
+        codec.read_turns(b)
+
+    (tmp_path / "c.json").write_bytes(a.read_bytes())     # dosyanın tamamı da başka ada taşınamaz
+    with pytest.raises(sc.SessionFormatError):
+        codec.read_meta(tmp_path / "c.json")
+
+    monkeypatch.setattr(sc, "VERSION", 1)                 # eski (oturum kimliği bağlanmamış) dosya
+    old = codec.encode({"id": "d", "turns": turns})
+    monkeypatch.setattr(sc, "VERSION", 2)
+    (tmp_path / "d.json").write_bytes(old)
+    assert codec.decode_file(tmp_path / "d.json")["turns"] == turns
+
+
+def test_session_migrate_legacy_fernet_file(test_config):
+    """ConversationMemory.migrate_sessions(): Eski tek parça Fernet dosyasını v2'ye dönüştürür."""
+    import json
+    from cryptography.fernet import Fernet
+    from core.memory import ConversationMemory
+    from core.session_codec import MAGIC
+
+    key = Fernet.generate_key().decode()
+    sessions_dir = test_config.DATA_DIR / "sessions"
+    sessions_dir.mkdir(parents=True, exist_ok=True)
+    legacy = {
+        "id": "eski-oturum", "title": "Eski", "updated_at": 1.0, "last_file": None,
+        "turns": [{"role": "user", "content": "merhaba", "timestamp": 1.0}],
+    }
+    path = sessions_dir / "eski-oturum.json"
+    path.write_bytes(Fernet(key.encode()).encrypt(json.dumps(legacy, indent=2).encode()))
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10, encryption_key=key)
+    stats = mem.migrate_sessions()
+    assert stats["migrated"] >= 1
+    assert path.read_bytes().startswith(MAGIC)
+    assert mem.load_session("eski-oturum") is True
+    assert mem.get_history()[0]["content"] == "merhaba"
+
+
+# ─────────────────────────────────────────────
+# 27. OTURUM SAKLAMA (RETENTION) MOTORU
+# ─────────────────────────────────────────────
+
+def test_retention_archives_cold_sessions_and_cleans_broken(test_config):
+    """SessionRetention: Soğuk oturumlar paketlenir, eski karantina dosyaları silinir, aktif oturum korunur."""
+    import os as _os
+    import time as _time
+    from core.memory import ConversationMemory
+    from core.retention import SessionRetention
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    cold = mem.create_session("Soğuk")
+    mem.add("user", "eski konuşma")
+    active = mem.create_session("Aktif")
+
+    old = _time.time() - 40 * 86400
+    cold_path = mem.sessions_dir / f"{cold}.json"
+    _os.utime(cold_path, (old, old))
+    broken = mem.sessions_dir / "x.json.broken"
+    broken.write_text("bozuk")
+    _os.utime(broken, (old, old))
+
+    ret = SessionRetention(mem, archive_after_days=30, broken_max_age_days=7)
+    result = ret.run_once()
+
+    assert result["archived"] >= 1
+    assert result["broken_removed"] == 1
+    assert not cold_path.exists()
+    assert (mem.sessions_dir / f"{active}.json").exists()
+    assert cold in ret.archived_session_ids()
+    assert ret.stats["runs"] == 1
+    assert ret.stats["last_run_duration_s"] >= 0
+
+    # Arşivden geri yükleme
+    assert ret.restore(cold) is True
+    assert mem.load_session(cold) is True
+    assert mem.get_history()[0]["content"] == "eski konuşma"
+
+
+def test_retention_enforces_disk_budget(test_config):
+    """SessionRetention: Bütçe aşılınca en eski oturumlar arşivlenir."""
+    import os as _os
+    from core.memory import ConversationMemory
+    from core.retention import SessionRetention
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=50)
+    ids = []
+    for i in range(5):
+        ids.append(mem.create_session(f"Oturum {i}"))
+        mem.add("user", os.urandom(4000).hex())  # sıkıştırılamaz içerik
+        p = mem.sessions_dir / f"{ids[-1]}.json"
+        _os.utime(p, (1000 + i, 1000 + i))
+
+    ret = SessionRetention(mem, archive_after_days=0, disk_budget_mb=0)
+    ret.disk_budget_bytes = ret.disk_usage() // 2
+    result = ret.run_once()
+
+    assert result["archived"] >= 1
+    assert not (mem.sessions_dir / f"{ids[0]}.json").exists()  # en eski gitti
+    assert (mem.sessions_dir / f"{ids[-1]}.json").exists()     # aktif kaldı
+
+
+def test_retention_compresses_outside_memory_lock(test_config, monkeypatch):
+    """Sıkıştırma bellek kilidi dışında yapılır; bu arada güncellenen oturum silinmez, geri yüklenen listeden düşer."""
+    import os as _os
+    import tarfile as _tarfile
+    from core.memory import ConversationMemory
+    from core.retention import SessionRetention
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    kept, moved = mem.create_session("Güncellenen"), mem.create_session("Arşivlenen")
+    mem.create_session("Aktif")
+    for sid in (kept, moved):
+        _os.utime(mem.sessions_dir / f"{sid}.json", (1000, 1000))
+
+    real_add = _tarfile.TarFile.add
+
+    def add(self, name, *args, **kwargs):
+        assert not mem._lock._is_owned()
+        real_add(self, name, *args, **kwargs)
+        if kept in str(name):   # sıkıştırma sırasında kullanıcı oturuma yazdı
+            _os.utime(name, None)
+
+    monkeypatch.setattr(_tarfile.TarFile, "add", add)
+    ret = SessionRetention(mem, archive_after_days=30)
+    assert SessionRetention(mem).archive_after_days == 0   # varsayılan: kapalı
+    assert ret.run_once()["archived"] == 1
+    assert (mem.sessions_dir / f"{kept}.json").exists()
+    assert ret.archived_session_ids() == [moved]
+    assert ret.restore(moved) and ret.archived_session_ids() == []
+    assert ret.restore("../dışarı") is False
+
+
+# ─────────────────────────────────────────────
+# 28. OTURUM TAM METİN ARAMA İNDEKSİ
+# ─────────────────────────────────────────────
+
+def test_session_search_ranks_and_highlights(test_config):
+    """SessionSearchIndex: add() ile indekslenen turlar aranır, kesitler <mark> ile vurgulanır."""
+    from core.memory import ConversationMemory
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    docker_id = mem.create_session("Docker")
+    mem.add("user", "Docker konteyneri neden İSTANBUL saat diliminde başlamıyor?")
+    mem.add("assistant", "TZ ortam değişkenini <ayarla> ve docker imajını yeniden oluştur.")
+    other_id = mem.create_session("Diğer")
+    mem.add("user", "Python listelerini nasıl sıralarım?")
+
+    results = mem.search_sessions("docker")
+    assert [r["id"] for r in results] == [docker_id]
+    snippets = [m["snippet"] for m in results[0]["matches"]]
+    assert "<mark>Docker</mark> konteyneri" in snippets[0]
+    assert "&lt;ayarla&gt; ve <mark>docker</mark>" in snippets[1]  # HTML güvenli
+
+    # Türkçe büyük harf katlama + önek eşleşmesi ("liste" → "listelerini")
+    assert mem.search_sessions("istanbul")[0]["id"] == docker_id
+    assert mem.search_sessions("liste")[0]["id"] == other_id
+    assert mem.search_sessions("   ") == []
+
+
+def test_session_search_tracks_deletes_and_persists(test_config):
+    """Silinen oturum sonuçlardan düşer; indeks yeniden açılışta dosya okumadan yüklenir."""
+    from core.memory import ConversationMemory
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    keep = mem.create_session("Kalan")
+    mem.add("user", "kubernetes pod yeniden başlatma")
+    gone = mem.create_session("Giden")
+    mem.add("user", "kubernetes ingress ayarı")
+    assert {r["id"] for r in mem.search_sessions("kubernetes")} == {keep, gone}
+
+    mem.delete_session(gone)
+    assert [r["id"] for r in mem.search_sessions("kubernetes")] == [keep]
+
+    mem2 = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    assert mem2.search_index.loaded is True
+    assert [r["id"] for r in mem2.search_sessions("kubernetes")] == [keep]
+
+
+def test_session_index_compacts_in_background_and_keeps_excerpts(tmp_path, monkeypatch):
+    """Sıkıştırma arka plan thread'inde, kilit dışında mühürler; tam metin değil kesit + terimler saklanır."""
+    import threading
+    from core.session_codec import SessionCodec
+    from core.session_index import SessionSearchIndex
+
+    idx = SessionSearchIndex(tmp_path)
+    idx.COMPACT_EVERY = 5
+    sealed = []
+    real_seal = SessionCodec.seal
+
+    def seal(self, obj, aad):
+        if aad == b"index-snapshot":
+            sealed.append((threading.current_thread().name, idx._lock._is_owned()))
+        return real_seal(self, obj, aad)
+
+    monkeypatch.setattr(SessionCodec, "seal", seal)
+    for i in range(6):
+        idx.add_turn("s", {"timestamp": float(i), "role": "user",
+                           "content": f"kubernetes {i} " + "dolgu " * 100 + "derinde"}, 1.0)
+    for _ in range(200):
+        if not idx._compacting:
+            break
+        time.sleep(0.01)
+    assert sealed == [("session-index-compact", False)]
+    assert len(idx._docs["s"]["turns"][0.0][1]) == idx.EXCERPT_CHARS
+    assert idx.search("derinde")[0]["matches"]        # kesit dışındaki terim de indekste
+
+    # Görüntü yazılmadan kesilen sıkıştırma: döndürülen günlük açılışta yeniden oynatılır
+    idx.add_turn("t", {"timestamp": 9.0, "role": "user", "content": "redis"}, 2.0)
+    idx._rotate_journal()
+    reopened = SessionSearchIndex(tmp_path)
+    assert reopened.stats()["turns"] == 7
+    assert [r["id"] for r in reopened.search("redis")] == ["t"]
+    assert reopened.search("derinde")[0]["id"] == "s"
+
+
+def test_session_search_rebuilds_missing_index(test_config):
+    """İndeks dosyaları yoksa mevcut oturumlardan yeniden kurulur; özetlenen turlar çıkarılır."""
+    import shutil
+    from core.memory import ConversationMemory
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    sid = mem.create_session("Özet")
+    mem.add("user", "eski redis sorusu")
+    mem.add("assistant", "redis yanıtı")
+    mem.add("user", "yeni postgres sorusu")
+    mem.add("assistant", "postgres yanıtı")
+    window = mem.get_summary_window(max_turns=2, keep_recent=2)
+    mem.apply_rolling_summary("özet", window, session_id=sid)
+    assert mem.search_sessions("redis") == []
+
+    shutil.rmtree(mem.sessions_dir / "index")
+    mem2 = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=10)
+    assert [r["id"] for r in mem2.search_sessions("postgres")] == [sid]
+
+
+# ─────────────────────────────────────────────
+# 29. SAYFALI OTURUM GEÇMİŞİ
+# ─────────────────────────────────────────────
+
+def test_history_pages_newest_first_with_cursor(test_config):
+    """read_history_page(): En yeni sayfa önce döner, imleçle eski sayfalar boşluksuz gelir."""
+    from core.memory import ConversationMemory
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=50)
+    sid = mem.create_session("Sayfalı")
+    for i in range(40):
+        mem.add("user" if i % 2 == 0 else "assistant", f"mesaj {i}")
+    mem.create_session("Başka")  # sayfalama aktif olmayan oturumda da çalışır
+
+    page = mem.read_history_page(sid, limit=16)
+    assert [t["content"] for t in page["turns"]] == [f"mesaj {i}" for i in range(24, 40)]
+    assert page["total"] == 40 and page["has_more"] is True
+
+    seen = page["turns"]
+    while page["next_cursor"]:
+        page = mem.read_history_page(sid, limit=16, before=page["next_cursor"])
+        seen = page["turns"] + seen
+    assert [t["content"] for t in seen] == [f"mesaj {i}" for i in range(40)]
+    assert page["has_more"] is False
+
+
+def test_history_page_reads_only_needed_chunks(test_config, monkeypatch):
+    """İlk sayfa yalnızca son parçaları çözer; bayat imleç ValueError verir."""
+    from core.memory import ConversationMemory
+    from core.session_codec import CHUNK_TURNS, SessionCodec
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=100)
+    sid = mem.create_session("Büyük")
+    for i in range(CHUNK_TURNS * 4):
+        mem.add("user" if i % 2 == 0 else "assistant", f"tur {i}")
+
+    calls = []
+    original = SessionCodec.unseal
+    monkeypatch.setattr(SessionCodec, "unseal",
+                        lambda self, blob, aad, encrypted=None: calls.append(aad) or original(self, blob, aad, encrypted))
+    page = mem.read_history_page(sid, limit=4)
+    assert len(page["turns"]) == 4
+    assert [a for a in calls if b":chunk:" in a] == [f"{sid}:chunk:3:48".encode()]
+
+    # Baş kırpılınca (kayan özet) eski imleç reddedilir
+    window = mem.get_summary_window(max_turns=10, keep_recent=4)
+    mem.apply_rolling_summary("özet", window, session_id=sid)
+    with pytest.raises(ValueError):
+        mem.read_history_page(sid, limit=4, before=page["next_cursor"])
+
+
+def test_load_session_page_reads_file_once(test_config, monkeypatch):
+    """load_session_page(): Oturum bir kez çözülür, ilk sayfa bellekten kurulur; imleç /history ile sürer."""
+    from core.memory import ConversationMemory
+
+    mem = ConversationMemory(file_path=test_config.MEMORY_FILE, max_turns=50)
+    sid = mem.create_session("Aktif")
+    for i in range(30):
+        mem.add("user" if i % 2 == 0 else "assistant", f"mesaj {i}")
+    mem.create_session("Başka")
+
+    reads = []
+    original = ConversationMemory._read_session_file
+    monkeypatch.setattr(ConversationMemory, "_read_session_file",
+                        lambda self, path: reads.append(path) or original(self, path))
+    page = mem.load_session_page(sid, limit=10)
+    assert len(reads) == 1 and mem.active_session_id == sid
+    assert [t["content"] for t in page["turns"]] == [f"mesaj {i}" for i in range(20, 30)]
+    assert page["total"] == 30 and page["start"] == 20
+    older = mem.read_history_page(sid, limit=10, before=page["next_cursor"])
+    assert [t["content"] for t in older["turns"]] == [f"mesaj {i}" for i in range(10, 20)]
+    assert mem.load_session_page("yok", limit=10) is None
+
+
+# ─────────────────────────────────────────────
+# 30. LLM HTTP BAĞLANTI HAVUZU
+# ─────────────────────────────────────────────
+
+@pytest.fixture
+def fake_ollama_server():
+    """Keep-alive destekli, /api/chat ve /api/tags yanıtlayan yerel sahte Ollama sunucusu."""
+    import json as _json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, body: dict) -> None:
+            raw = _json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            self._send({"models": [{"name": "qwen2.5-coder:7b"}]})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send({"message": {"content": '{"thought":"t","tool":"final_answer","argument":"ok"}'},
+                        "done": True, "prompt_eval_count": 12, "eval_count": 8, "eval_duration": 400_000_000})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api"
+    server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_reuses_pooled_connection(test_config, fake_ollama_server):
+    """LLMClient: Ardışık çağrılar ve sağlık yoklamaları tek TCP bağlantısını paylaşır."""
+    from core.llm_client import LLMClient
+
+    test_config.OLLAMA_URL = fake_ollama_server
+    test_config.USE_GPU = False
+    llm = LLMClient("ollama", test_config)
+    try:
+        for _ in range(3):
+            out = await llm.chat([{"role": "user", "content": "merhaba"}])
+            assert "final_answer" in out
+        assert await llm.is_ollama_available() is True
+        assert await llm.list_ollama_models() == ["qwen2.5-coder:7b"]
+
+        stats = llm.connection_stats()
+        assert stats["requests_total"] == 5
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 4
+        assert stats["clients_created"] == 1
+    finally:
+        await llm.aclose()
+    assert llm._http is None
+
+
+def test_llm_client_closes_client_of_previous_loop(test_config):
+    """LLMClient: Loop değişince eski AsyncClient kapatılır; sahibi başka thread'de çalışıyorsa orada."""
+    import threading
+    from core.llm_client import LLMClient
+
+    llm = LLMClient("ollama", test_config)
+
+    async def get():
+        return llm._get_http()
+
+    first = asyncio.run(get())
+
+    async def replace():
+        client = llm._get_http()
+        await asyncio.sleep(0.05)
+        return client
+
+    second = asyncio.run(replace())
+    assert first is not second and first.is_closed and not second.is_closed
+
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        third = asyncio.run_coroutine_threadsafe(get(), other).result(5)
+        fourth = asyncio.run(replace())
+        assert second.is_closed and third.is_closed and not fourth.is_closed
+        assert llm.http_stats["clients_created"] == 4
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
+        asyncio.run(llm.aclose())
+
+
+# ─────────────────────────────────────────────
+# 31. ARTIMLI final_answer AKIŞI
+# ─────────────────────────────────────────────
+
+def test_final_answer_streamer_handles_split_escapes():
+    """FinalAnswerStreamer: Kaçış dizileri ve surrogate çiftleri parça sınırında bölünse de doğru çözülür."""
+    import json as _json
+    from agent.stream_parser import FinalAnswerStreamer
+
+    answer = 'Satır 1\n**kalın** "alıntı" \\ 😀 ğüş'
+    raw = _json.dumps({"thought": "plan {x}", "tool": "final_answer", "argument": answer})
+    for size in (1, 2, 5):
+        p = FinalAnswerStreamer()
+        out = "".join(p.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+        assert out == answer
+        assert p.done and p.argument_complete
+
+    # argument, tool'dan önce gelirse tamponlanır; final_answer değilse hiç akıtılmaz
+    p = FinalAnswerStreamer()
+    assert p.feed('{"argument": "önce", "n": [1, {"a": "}"}], ') == ""
+    assert p.feed('"tool": "final_answer"}') == "önce"
+    p = FinalAnswerStreamer()
+    assert p.feed('{"thought": "t", "tool": "read_file", "argument": "a.py"}') == ""
+
+
+@pytest.mark.asyncio
+async def test_react_loop_streams_final_answer_before_llm_finishes(agent):
+    """_react_loop: final_answer argümanı LLM akışı bitmeden kullanıcıya iletilir; TTFT kaydedilir."""
+    chunks = ['{"thought": "t", "tool": "final', '_answer", "argument": "Mer', 'haba ', 'dünya"}']
+    consumed = []
+
+    async def fake_stream():
+        for c in chunks:
+            consumed.append(c)
+            yield c
+
+    async def fake_chat(**kwargs):
+        return fake_stream()
+
+    agent.llm.chat = fake_chat
+    seen = []
+    async for out in agent.respond("selam, nasılsın bugün?"):
+        seen.append((out, len(consumed)))
+
+    assert "".join(o for o, _ in seen) == "Merhaba dünya"
+    assert seen[0] == ("Mer", 2)  # ilk parça, akışın yalnızca yarısı okunmuşken geldi
+    assert agent.memory.get_history()[-1]["content"] == "Merhaba dünya"
+    assert agent.response_stats["responses"] == 1
+    assert agent.response_stats["ttft_last_s"] >= 0
+
+
+# ─────────────────────────────────────────────
+# 32. DOĞRUSAL ZAMANLI NDJSON AKIŞ ÇÖZÜCÜ
+# ─────────────────────────────────────────────
+
+def test_ndjson_decoder_byte_by_byte_multibyte():
+    """NDJSONDecoder: Akış bayt bayt gelse bile çok baytlı karakterler ve satırlar doğru çözülür."""
+    import json as _json
+    from core.llm_client import NDJSONDecoder
+
+    tokens = ["ş", "€", "😀", " merhaba", "\n", "İ"]
+    raw = "".join(
+        _json.dumps({"message": {"content": t}}, ensure_ascii=False) + "\n" for t in tokens
+    ).encode("utf-8")
+
+    dec = NDJSONDecoder()
+    out = []
+    for i in range(len(raw)):
+        out.extend(b["message"]["content"] for b in dec.feed(raw[i:i + 1]))
+    out.extend(b["message"]["content"] for b in dec.close())
+    assert out == tokens
+
+
+def test_ndjson_decoder_skips_bad_lines_and_flushes_tail():
+    """NDJSONDecoder: Bozuk satır atlanır; satır sonu olmadan biten son nesne close() ile alınır."""
+    from core.llm_client import NDJSONDecoder
+
+    dec = NDJSONDecoder()
+    first = dec.feed(b'{"message": {"content": "a"}}\nbozuk{\n\n{"message": {"con')
+    assert [b["message"]["content"] for b in first] == ["a"]
+    assert dec.feed(b'tent": "b"}, "done": true}') == []
+    assert dec.close() == [{"message": {"content": "b"}, "done": True}]
+
+
+# ─────────────────────────────────────────────
+# 33. LLM YANIT ÖNBELLEĞİ
+# ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_llm_cache_hits_and_skips_creative_calls(test_config, fake_ollama_server):
+    """LLMClient: Aynı deterministik çağrı önbellekten döner; yüksek sıcaklık önbelleğe alınmaz."""
+    from core.llm_client import LLMClient
+
+    test_config.OLLAMA_URL = fake_ollama_server
+    test_config.USE_GPU = False
+    test_config.LLM_CACHE_ENABLED = True
+    llm = LLMClient("ollama", test_config)
+    msgs = [{"role": "user", "content": "özetle"}]
+    try:
+        first = await llm.chat(msgs, temperature=0.1, json_mode=False, caller="summary")
+        second = await llm.chat(msgs, temperature=0.1, json_mode=False, caller="summary")
+        assert first == second
+        assert llm.http_stats["requests_total"] == 1
+
+        # Akış: yalnızca tamamı tüketildiğinde kaydedilir, sonra tek parça olarak yeniden oynatılır
+        await llm.chat(msgs, temperature=0.9, caller="react")
+        assert llm.http_stats["requests_total"] == 2
+        stats = llm.cache.stats()
+        assert stats["callers"]["summary"] == {"hits": 1, "misses": 1, "stores": 1, "hit_rate": 0.5}
+        assert "react" not in stats["callers"]
+    finally:
+        await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_stream_capture_ttl_and_budget(test_config):
+    """LLMResponseCache: Akış tam yakalanınca kaydedilir, TTL dolunca düşer, bütçe LRU ile uygulanır."""
+    from core.llm_cache import LLMResponseCache
+    from core.llm_client import LLMClient
+
+    test_config.LLM_CACHE_ENABLED = True
+    llm = LLMClient("ollama", test_config)
+    calls = []
+
+    async def fake_ollama(messages, model, temperature, stream, json_mode):
+        calls.append(stream)
+
+        async def gen():
+            yield '{"tool": "final_answer", '
+            yield '"argument": "ok", "thought": "t"}'
+        return gen()
+
+    llm._ollama_chat = fake_ollama
+    msgs = [{"role": "user", "content": "selam"}]
+    stream = await llm.chat(msgs, stream=True, caller="react")
+    assert "".join([c async for c in stream]).endswith('"t"}')
+    replay = await llm.chat(msgs, stream=True, caller="react")
+    assert [c async for c in replay] == ['{"tool": "final_answer", "argument": "ok", "thought": "t"}']
+    assert calls == [True]
+
+    cache = LLMResponseCache(test_config.DATA_DIR / "c2", ttl_s=0.0, max_bytes=0)
+    cache.put("k", "yanıt")
+    assert cache.get("k") is None and cache.stats()["entries"] == 0
+
+    cache = LLMResponseCache(test_config.DATA_DIR / "c3", ttl_s=60, max_bytes=10**6)
+    for i in range(3):
+        cache.put(f"k{i}", os.urandom(3000).hex())
+    cache.get("k0")                      # k0 en son kullanılan olur
+    cache.max_bytes = cache.stats()["bytes"] - 1
+    cache.put("k3", "kısa")
+    assert cache.get("k1") is None       # en eski erişilen çıkarıldı
+    assert cache.get("k0") is not None and cache.stats()["evictions"] >= 1
+
+
+# ─────────────────────────────────────────────
+# 34. LLM İSTEK ZAMANLAYICISI
+# ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_llm_scheduler_interactive_jumps_background_queue():
+    """LLMScheduler: Etkileşimli istek kuyrukta bekleyen arka plan isteğinin önüne geçer."""
+    from core.llm_scheduler import LLMScheduler
+
+    sched = LLMScheduler(max_in_flight=1, background_max=1)
+    await sched.acquire("interactive")
+    order = []
+
+    async def worker(priority):
+        await sched.acquire(priority)
+        order.append(priority)
+        sched.release(priority)
+
+    bg = asyncio.create_task(worker("background"))
+    await asyncio.sleep(0)
+    fg = asyncio.create_task(worker("interactive"))
+    await asyncio.sleep(0)
+    assert sched.stats()["classes"]["background"]["queued"] == 1
+    sched.release("interactive")
+    await asyncio.gather(bg, fg)
+    assert order == ["interactive", "background"]
+    assert sched.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_scheduler_background_cap_and_cancellation():
+    """LLMScheduler: Arka plan sınırı etkileşimliye slot bırakır; iptal edilen bekleyen slot sızdırmaz."""
+    from core.llm_scheduler import LLMScheduler
+
+    sched = LLMScheduler(max_in_flight=2, background_max=1)
+    await sched.acquire("background")
+    waiting_bg = asyncio.create_task(sched.acquire("background"))
+    await asyncio.sleep(0)
+    assert not waiting_bg.done()                       # arka plan sınırı dolu
+    await asyncio.wait_for(sched.acquire("interactive"), 1)   # ikinci slot hâlâ serbest
+
+    waiting_bg.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting_bg
+    sched.release("background")
+    sched.release("interactive")
+    stats = sched.stats()
+    assert stats["in_flight"] == 0
+    assert stats["classes"]["background"]["queued"] == 0
+    assert stats["classes"]["background"]["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_client_stream_holds_scheduler_slot(test_config):
+    """LLMClient.chat: Akış kapatılana kadar slot tutulur; kapatınca bekleyen istek ilerler."""
+    from contextlib import aclosing
+    from core.llm_client import LLMClient
+
+    test_config.LLM_MAX_IN_FLIGHT = 1
+    llm = LLMClient("ollama", test_config)
+
+    async def fake_ollama(messages, model, temperature, stream, json_mode):
+        if not stream:
+            return '{"tool": "final_answer", "argument": "özet", "thought": "t"}'
+
+        async def gen():
+            for part in ("a", "b", "c"):
+                yield part
+        return gen()
+
+    llm._ollama_chat = fake_ollama
+    msgs = [{"role": "user", "content": "selam"}]
+    stream = await llm.chat(msgs, stream=True)
+    summary = asyncio.create_task(llm.chat(msgs, stream=False, priority="background"))
+    await asyncio.sleep(0)
+    assert not summary.done()
+    async with aclosing(stream):
+        assert await stream.__anext__() == "a"    # akış yarıda bırakılıyor
+    assert "özet" in await asyncio.wait_for(summary, 1)
+    assert llm.scheduler.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_scheduler_stream_closed_before_iteration_releases_slot():
+    """hold_stream: Hiç okunmadan kapatılan (ya da çöpe giden) akış slotu bırakır ve alttaki akışı kapatır."""
+    import gc
+    from core.llm_scheduler import LLMScheduler
+
+    sched = LLMScheduler(max_in_flight=1)
+    closed = []
+
+    class Inner:
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            raise StopAsyncIteration
+
+        async def aclose(self):
+            closed.append(True)
+
+    await sched.acquire()
+    stream = sched.hold_stream(Inner(), "interactive")
+    await stream.aclose()
+    await stream.aclose()                      # ikinci kapatma slotu tekrar bırakmaz
+    assert sched.stats()["in_flight"] == 0 and closed == [True]
+    assert [c async for c in stream] == []
+
+    await sched.acquire()
+    stream = sched.hold_stream(Inner(), "interactive")
+    del stream
+    gc.collect()
+    assert sched.stats()["in_flight"] == 0
+    await asyncio.wait_for(sched.acquire(), 1)
+
+
+# ─────────────────────────────────────────────
+# 35. ÇOKLU OLLAMA UÇ NOKTASI
+# ─────────────────────────────────────────────
+
+def _closed_port_url() -> str:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/api"
+
+
+def test_ollama_pool_affinity_and_strategies():
+    """OllamaEndpointPool: Yüklü model yakınlığı, en az süren istek ve gecikme ağırlıklı seçim."""
+    from core.ollama_pool import OllamaEndpointPool, parse_endpoints
+
+    urls = parse_endpoints(" http://a:11434/api, http://b:11434/ ,http://a:11434")
+    assert urls == ["http://a:11434", "http://b:11434"]
+    pool = OllamaEndpointPool(urls)
+    a, b = pool.endpoints
+
+    b.loaded.add("qwen")
+    b.outstanding = 1
+    assert pool.pick("qwen") is b            # yakınlık, yükleme maliyetinden ucuz
+    b.outstanding = 3
+    assert pool.pick("qwen") is a            # yüklü uç nokta meşgul → soğuk yükleme daha ucuz
+    assert pool.pick("gemma") is a           # modeli kimse yüklememiş → en az süren istek
+    a.last_check = 1.0                       # yoklanmış ve modeli indirmemiş → son çare
+    assert pool.pick("qwen") is b
+    a.last_check = 0.0
+    b.healthy = False
+    assert pool.pick("qwen") is a            # sağlıksız uç nokta atlanır
+    assert pool.pick("qwen", exclude={a.url}) is b   # tek aday kaldıysa yine denenir
+    assert pool.pick("qwen", exclude={a.url, b.url}) is None
+
+    pool = OllamaEndpointPool(urls, strategy="latency")
+    a, b = pool.endpoints
+    a.latency_s, b.latency_s = 2.0, 0.5
+    b.outstanding = 2                         # 0.5 × 3 = 1.5 < 2.0 × 1
+    assert pool.pick() is b
+    b.outstanding = 4                         # 0.5 × 5 = 2.5 > 2.0
+    assert pool.pick() is a
+
+
+def test_ollama_pool_spreads_concurrent_requests_after_affinity():
+    """OllamaEndpointPool: Bir istek modeli yükledikten sonra eşzamanlı istekler tek uç noktaya yığılmaz."""
+    from core.ollama_pool import OllamaEndpointPool
+
+    for strategy in ("least_outstanding", "latency"):
+        pool = OllamaEndpointPool(["http://a", "http://b", "http://c"], strategy=strategy)
+        for ep in pool.endpoints:
+            ep.available, ep.latency_s = {"m"}, 0.5
+        first = pool.pick("m")
+        pool.end(first, pool.begin(first) - 0.6, "m")   # ilk isteği yavaş ölçülür
+        assert first.loaded == {"m"}
+
+        held = []
+        for _ in range(4):                    # dört istek aynı anda sürüyor
+            ep = pool.pick("m")
+            pool.begin(ep)
+            held.append(ep)
+        counts = [ep.outstanding for ep in pool.endpoints]
+        assert all(counts) and max(counts) <= 2, (strategy, counts)
+        assert held[0] is first
+
+
+@pytest.mark.asyncio
+async def test_llm_client_fails_over_dead_endpoint(test_config, fake_ollama_server):
+    """LLMClient: Bağlantı hatası veren uç nokta devre dışı kalır, istek diğerine aktarılır."""
+    from core.llm_client import LLMClient
+
+    dead = _closed_port_url()
+    test_config.OLLAMA_URL = f"{dead},{fake_ollama_server}"
+    test_config.USE_GPU = False
+    llm = LLMClient("ollama", test_config)
+    try:
+        assert "final_answer" in await llm.chat([{"role": "user", "content": "a"}])
+        dead_ep, live_ep = llm.ollama_pool.endpoints
+        assert not dead_ep.healthy and dead_ep.failures >= 1   # arka plan yoklaması da sayar
+        assert llm.ollama_pool.failovers == 1
+        assert test_config.CODING_MODEL in live_ep.loaded
+
+        # Sonraki istekler doğrudan sağlıklı uç noktaya gider
+        assert "final_answer" in await llm.chat([{"role": "user", "content": "b"}])
+        assert llm.ollama_pool.failovers == 1
+        assert live_ep.requests == 2 and live_ep.outstanding == 0
+
+        # Yoklama canlı uç noktanın modellerini öğrenir, ölü olanı devre dışı tutar
+        await llm.ollama_pool.probe_all(llm._get_http())
+        assert live_ep.available == {"qwen2.5-coder:7b"} and not dead_ep.healthy
+    finally:
+        await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_stream_fails_over_before_first_chunk(test_config, fake_ollama_server):
+    """LLMClient: Akış isteği ilk parçadan önce bağlantı hatası alırsa diğer uç noktaya geçer."""
+    from core.llm_client import LLMClient
+
+    test_config.OLLAMA_URL = f"{_closed_port_url()},{fake_ollama_server}"
+    test_config.USE_GPU = False
+    llm = LLMClient("ollama", test_config)
+    try:
+        stream = await llm.chat([{"role": "user", "content": "a"}], stream=True)
+        text = "".join([c async for c in stream])
+        assert '"argument":"ok"' in text and "[HATA]" not in text
+        assert llm.ollama_pool.failovers == 1
+        assert all(ep.outstanding == 0 for ep in llm.ollama_pool.endpoints)
+    finally:
+        await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_connect_timeout_fails_over_and_truncated_stream(test_config):
+    """ConnectTimeout de uç nokta değiştirir; done kaydı gelmeden biten akış uç noktayı başarılı saymaz."""
+    import httpx
+    from core.llm_client import LLMClient
+
+    truncate = {"on": False}
+
+    def handler(request):
+        if request.url.host == "a":
+            raise httpx.ConnectTimeout("paket düştü", request=request)
+        if request.url.path != "/api/chat":
+            return httpx.Response(200, json={"models": []})
+        lines = ['{"message": {"content": "{\\"tool\\":\\"final_answer\\",\\"argument\\":\\"ok\\"}"}}']
+        if not truncate["on"]:
+            lines.append('{"done": true, "message": {"content": ""}}')
+        return httpx.Response(200, content="\n".join(lines).encode())
+
+    test_config.OLLAMA_URL = "http://a:11434,http://b:11434"
+    test_config.USE_GPU = False
+    llm = LLMClient("ollama", test_config)
+    llm._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    llm._http_loop = asyncio.get_running_loop()
+    try:
+        dead_ep, live_ep = llm.ollama_pool.endpoints
+        assert "final_answer" in await llm.chat([{"role": "user", "content": "a"}])
+        assert not dead_ep.healthy and llm.ollama_pool.failovers >= 1
+
+        live_ep.loaded.clear()
+        truncate["on"] = True
+        stream = await llm.chat([{"role": "user", "content": "b"}], stream=True)
+        assert "ok" in "".join([c async for c in stream])
+        assert test_config.CODING_MODEL not in live_ep.loaded
+
+        truncate["on"] = False
+        stream = await llm.chat([{"role": "user", "content": "c"}], stream=True)
+        "".join([c async for c in stream])
+        assert test_config.CODING_MODEL in live_ep.loaded
+    finally:
+        await llm.aclose()
+
+
+# ─────────────────────────────────────────────
+# 36. LLM ÇAĞRI TELEMETRİSİ
+# ─────────────────────────────────────────────
+
+def test_llm_telemetry_histogram_buckets():
+    """Histogram: Kova sayımları, Prometheus birikimli listesi ve yaklaşık yüzdelikler."""
+    from core.llm_telemetry import Histogram
+
+    h = Histogram((1, 5, 10))
+    for v in (0.5, 2, 3, 4, 7, 50):
+        h.observe(v)
+    assert h.counts == [1, 3, 1, 1]
+    assert h.cumulative() == [("1", 1), ("5", 4), ("10", 5), ("+Inf", 6)]
+    summary = h.summary()
+    assert summary["count"] == 6 and summary["p50"] == 5 and summary["p95"] == 50 and summary["max"] == 50
+
+
+@pytest.mark.asyncio
+async def test_llm_telemetry_records_ollama_usage(test_config, fake_ollama_server):
+    """LLMClient: Ollama'nın eval sayaçları token ve token/saniye histogramlarına yazılır."""
+    from core.llm_client import LLMClient
+
+    test_config.OLLAMA_URL = fake_ollama_server
+    test_config.USE_GPU = False
+    llm = LLMClient("ollama", test_config)
+    try:
+        await llm.chat([{"role": "user", "content": "merhaba"}], caller="react")
+    finally:
+        await llm.aclose()
+    stats = llm.telemetry.stats()
+    assert stats["last_call"]["prompt_tokens"] == 12
+    assert stats["last_call"]["completion_tokens"] == 8
+    assert stats["last_call"]["tokens_per_s"] == 20.0       # 8 token / 0.4 s
+    (series,) = stats["series"]
+    assert (series["model"], series["caller"]) == (test_config.CODING_MODEL, "react")
+    assert series["latency_s"]["count"] == 1 and series["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_telemetry_stream_ttft_and_aborted(test_config):
+    """LLMClient: Akışta TTFT ilk parçada ölçülür; yarıda kapatılan akış hata sayılır."""
+    from contextlib import aclosing
+    from core.llm_client import LLMClient
+    from core.llm_telemetry import current_call
+
+    llm = LLMClient("ollama", test_config)
+
+    async def fake_ollama(messages, model, temperature, stream, json_mode):
+        record = current_call.get()
+
+        async def gen():
+            await asyncio.sleep(0.02)
+            yield "a"
+            await asyncio.sleep(0.02)
+            yield "b"
+            record.set_ollama_usage({"done": True, "eval_count": 2})
+        return gen()
+
+    llm._ollama_chat = fake_ollama
+    msgs = [{"role": "user", "content": "x"}]
+    stream = await llm.chat(msgs, stream=True, caller="react")
+    assert "".join([c async for c in stream]) == "ab"
+    last = llm.telemetry.last
+    assert last["ok"] and 0 < last["ttft_s"] < last["latency_s"]
+    assert last["tokens_per_s"] > 0           # eval_duration yok → ilk/son token arası süre
+
+    stream = await llm.chat(msgs, stream=True, caller="summary")
+    async with aclosing(stream):
+        await stream.__anext__()
+    by_caller = {s["caller"]: s for s in llm.telemetry.stats()["series"]}
+    assert by_caller["summary"]["errors"] == 1 and "ttft_s" not in by_caller["summary"]
+    assert by_caller["react"]["ttft_s"]["count"] == 1
+
+
+# ─────────────────────────────────────────────
+# 37. MODEL YERLEŞİMİ (KEEP-ALIVE / ÖN YÜKLEME)
+# ─────────────────────────────────────────────
+
+def _mock_ollama_llm(test_config, running):
+    """MockTransport ile Ollama'yı taklit eden LLMClient; gönderilen /api/chat gövdelerini toplar."""
+    import httpx
+    import json as _json
+    from core.llm_client import LLMClient
+
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/api/ps":
+            return httpx.Response(200, json={"models": running})
+        body = _json.loads(request.content)
+        sent.append(body)
+        return httpx.Response(200, json={
+            "model": body["model"], "done": True, "load_duration": 2_000_000_000,
+            "message": {"content": '{"thought":"t","tool":"final_answer","argument":"ok"}'},
+        })
+
+    llm = LLMClient("ollama", test_config)
+    llm._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    llm._http_loop = asyncio.get_running_loop()
+    return llm, sent
+
+
+@pytest.mark.asyncio
+async def test_model_residency_preload_and_fit_warnings(test_config):
+    """ModelResidencyManager: Modeller ön yüklenir, sığmayan/CPU'ya taşan modeller için uyarı üretilir."""
+    test_config.OLLAMA_RESIDENCY_POLICY = "pinned"
+    test_config.TEXT_MODEL = "gemma2"
+    test_config.CODING_MODEL = "qwen2.5-coder:7b"
+    test_config.USE_GPU = False
+    running = [{"name": "qwen2.5-coder:7b", "size": 100, "size_vram": 60}]
+    llm, sent = _mock_ollama_llm(test_config, running)
+    try:
+        result = await llm.residency.preload()
+        assert result["loaded"] == 2
+        assert [(b["model"], b["messages"], b["keep_alive"]) for b in sent] == [
+            ("gemma2", [], "-1"), ("qwen2.5-coder:7b", [], "-1"),
+        ]
+        warnings = " ".join(llm.residency.warnings)
+        assert "birlikte belleğe sığmıyor" in warnings and "gemma2 çıkarıldı" in warnings
+        assert "%60 GPU" in warnings
+        assert llm.ollama_pool.primary.loaded == {"qwen2.5-coder:7b"}
+
+        # Kullanıcı isteği: keep_alive iletilir, uzun load_duration soğuk yükleme sayılır
+        await llm.chat([{"role": "user", "content": "merhaba"}], model="gemma2")
+        assert sent[-1]["keep_alive"] == "-1"
+        assert llm.residency.cold_loads == 1
+        assert llm.residency.stats()["events"][-1]["kind"] == "cold_load"
+    finally:
+        await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_model_residency_off_policy(test_config):
+    """ModelResidencyManager: 'off' politikasında ön yükleme yapılmaz, keep_alive gönderilmez."""
+    test_config.OLLAMA_RESIDENCY_POLICY = "off"
+    test_config.USE_GPU = False
+    llm, sent = _mock_ollama_llm(test_config, [])
+    try:
+        assert (await llm.residency.preload()) == {"skipped": True}
+        await llm.chat([{"role": "user", "content": "merhaba"}])
+        assert len(sent) == 1 and "keep_alive" not in sent[0]
+    finally:
+        await llm.aclose()
+
+
+# ─────────────────────────────────────────────
+# 38. SABİT İSTEM ÖNEKİ (KV ÖNBELLEĞİ)
+# ─────────────────────────────────────────────
+
+def test_static_prompt_prefix_is_stable(agent):
+    """SidarAgent: Sistem istemi sayaçlar değişse de aynı kalır; değişken durum son kullanıcı mesajına eklenir."""
+    before = agent._static_system_prompt()
+    agent.code._files_read += 5
+    agent.memory.set_last_file("core/memory.py")
+    assert agent._static_system_prompt() == before
+    assert "Son dosya" not in before and "Okunan" not in before
+
+    msgs = agent._attach_runtime_state([{"role": "user", "content": "soru"}])
+    assert msgs[-1]["content"].startswith("soru\n\n[Güncel Durum]")
+    assert "core/memory.py" in msgs[-1]["content"]
+    assert "Son dosya" in agent._build_context() and "Güvenlik" in agent._build_context()
+
+
+@pytest.mark.asyncio
+async def test_react_loop_records_prompt_eval_per_step(agent):
+    """_react_loop: Adımlar aynı sistem istemini kullanır; prompt_eval_count ilk/sonraki adım olarak ayrılır."""
+    from core.llm_telemetry import CallRecord
+
+    replies = iter([
+        '{"thought": "bak", "tool": "list_dir", "argument": "."}',
+        '{"thought": "tamam", "tool": "final_answer", "argument": "bitti"}',
+    ])
+    evals = iter([3000, 120])
+    systems = []
+
+    async def fake_chat(**kwargs):
+        systems.append(kwargs["system_prompt"])
+        record = CallRecord("ollama", "m", "react")
+        record.prompt_tokens = next(evals)
+        kwargs["usage_sink"].append(record)
+        text = next(replies)
+
+        async def gen():
+            yield text
+        return gen()
+
+    agent.llm.chat = fake_chat
+    out = "".join([c async for c in agent.respond("bu proje hakkında ne düşünüyorsun acaba?") if not c.startswith("\x00")])
+    assert out == "bitti"
+    assert len(systems) == 2 and systems[0] == systems[1]
+    st = agent.prompt_stats
+    assert st["steps"] == 2 and st["first_step_avg"] == 3000 and st["followup_step_avg"] == 120
+    assert st["prefix_changes"] == 0
+
+
+# ─────────────────────────────────────────────
+# 39. BAĞLAM PENCERESİ BÜTÇELEYİCİ
+# ─────────────────────────────────────────────
+
+def _word_budgeter(ctx: int):
+    from core.context_budget import ContextBudgeter
+    return ContextBudgeter(lambda t: len(t.split()), default_ctx=ctx, response_reserve=10, tool_keep_tokens=5)
+
+
+def test_context_budgeter_trims_old_tool_output_first():
+    """ContextBudgeter: Önce eski araç çıktısı kırpılır, sonra en eski turlar düşer; özet ve tur korunur."""
+    big = "[ARAÇ:read_file:SONUÇ]\n" + "satır " * 200
+    history = [
+        {"role": "user", "content": "[Önceki konuşmaların özeti istendi]"},
+        {"role": "assistant", "content": "[KONUŞMA ÖZETİ]\nözet metni"},
+        {"role": "user", "content": "eski soru " * 20},
+        {"role": "assistant", "content": "eski yanıt " * 20},
+    ]
+    turn = [
+        {"role": "user", "content": "yeni soru"},
+        {"role": "assistant", "content": '{"tool": "read_file"}'},
+        {"role": "user", "content": big},
+        {"role": "assistant", "content": '{"tool": "read_file"}'},
+        {"role": "user", "content": "[ARAÇ:read_file:SONUÇ]\nkısa sonuç"},
+    ]
+    budgeter = _word_budgeter(ctx=200)
+    fitted, report = budgeter.fit("sistem", history + turn, "m", protect=len(turn))
+    assert report["trimmed"] > 0 and report["after"] <= report["budget"]
+    assert report["dropped_messages"] == 0                # araç çıktısını kırpmak yetti
+    assert "bağlam bütçesi" in fitted[6]["content"] and fitted[8]["content"].endswith("kısa sonuç")
+
+    fitted, report = _word_budgeter(ctx=90).fit("sistem", history + turn, "m", protect=len(turn))
+    assert report["dropped_messages"] == 2 and report["after"] <= report["budget"]
+    assert fitted[1]["content"].startswith("[KONUŞMA ÖZETİ]")
+    assert fitted[-len(turn)]["content"] == "yeni soru"
+
+
+def test_context_budgeter_drops_whole_turns():
+    """ContextBudgeter: Tur bütün olarak düşer; kullanıcı mesajı gidip asistan yanıtı/araç adımı kalmaz."""
+    history = [
+        {"role": "user", "content": "ilk soru " * 10},
+        {"role": "assistant", "content": '{"tool": "list_dir"}'},
+        {"role": "user", "content": "[ARAÇ:list_dir:SONUÇ]\na.py"},
+        {"role": "assistant", "content": "ilk yanıt " * 10},
+        {"role": "user", "content": "ikinci soru"},
+        {"role": "assistant", "content": "ikinci yanıt"},
+    ]
+    turn = [{"role": "user", "content": "yeni soru " * 5}]
+    fitted, report = _word_budgeter(ctx=80).fit("sistem", history + turn, "m", protect=len(turn))
+    assert report["dropped_messages"] == 4 and report["after"] <= report["budget"]
+    assert [m["content"] for m in fitted[:2]] == ["ikinci soru", "ikinci yanıt"]
+    assert fitted[0]["role"] == "user"
+
+
+def test_context_budgeter_noop_and_overrides():
+    """ContextBudgeter: Pencereye sığan liste değişmez; model başına pencere yapılandırmadan okunur."""
+    from core.context_budget import ContextBudgeter, parse_ctx_overrides
+
+    msgs = [{"role": "user", "content": "merhaba dünya"}]
+    fitted, report = _word_budgeter(ctx=100).fit("sistem", msgs, "m")
+    assert fitted == msgs and report["trimmed"] == 0
+
+    assert parse_ctx_overrides("qwen2.5-coder:7b=32768, gemma2:9b=8192,bozuk") == {
+        "qwen2.5-coder:7b": 32768, "gemma2:9b": 8192,
+    }
+
+    class Cfg:
+        OLLAMA_NUM_CTX = 4096
+        OLLAMA_NUM_CTX_OVERRIDES = "a:1=2048"
+        GEMINI_MODEL = "gemini-x"
+        GEMINI_CONTEXT_WINDOW = 100000
+
+    b = ContextBudgeter.from_config(Cfg, len)
+    assert (b.window("a:1"), b.window("zzz"), b.window("gemini-x")) == (2048, 4096, 100000)
+
+
+@pytest.mark.asyncio
+async def test_react_loop_applies_context_budget(agent, test_config):
+    """_react_loop: Uzun geçmiş pencereye sığdırılır; Ollama isteğine num_ctx açıkça eklenir."""
+    for i in range(10):
+        agent.memory.add("user", f"soru {i} " + "kelime " * 300)
+        agent.memory.add("assistant", f"yanıt {i} " + "kelime " * 300)
+    agent.budgeter.default_ctx = agent.budgeter.count(agent._static_system_prompt()) + 3000
+    seen = []
+
+    async def fake_chat(**kwargs):
+        seen.append(kwargs["messages"])
+
+        async def gen():
+            yield '{"thought": "t", "tool": "final_answer", "argument": "tamam"}'
+        return gen()
+
+    agent.llm.chat = fake_chat
+    out = "".join([c async for c in agent.respond("kısa bir özet verir misin lütfen?")])
+    assert out == "tamam"
+    assert len(seen[0]) < len(agent.memory.get_messages_for_llm())
+    assert seen[0][-1]["content"].startswith("kısa bir özet verir misin lütfen?")
+    assert agent.budget_stats["trimmed_total"] > 0 and agent.budget_stats["dropped_messages_total"] > 0
+
+    test_config.OLLAMA_NUM_CTX_OVERRIDES = f"{test_config.CODING_MODEL}=16384"
+    test_config.OLLAMA_RESIDENCY_POLICY = "off"
+    test_config.USE_GPU = False
+    llm, sent = _mock_ollama_llm(test_config, [])
+    try:
+        await llm.chat([{"role": "user", "content": "x"}])
+    finally:
+        await llm.aclose()
+    assert sent[0]["options"]["num_ctx"] == 16384
+
+
+# ─────────────────────────────────────────────
+# 40. GEMINI MODEL ÖNBELLEĞİ
+# ─────────────────────────────────────────────
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    """google.generativeai yerine çağrıları sayan sahte modül."""
+    import sys
+    import types
+
+    calls = {"configure": 0, "models": 0, "histories": []}
+
+    class Response:
+        text = '{"thought": "t", "tool": "final_answer", "argument": "ok"}'
+        usage_metadata = None
+
+    class Session:
+        def __init__(self, history):
+            calls["histories"].append(history)
+
+        async def send_message_async(self, prompt, stream=False):
+            return Response()
+
+    class GenerativeModel:
+        def __init__(self, model_name, system_instruction, generation_config):
+            calls["models"] += 1
+
+        def start_chat(self, history):
+            return Session(history)
+
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: calls.__setitem__("configure", calls["configure"] + 1)
+    genai.GenerativeModel = GenerativeModel
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_gemini_model_cached_and_history_reused(test_config, fake_genai):
+    """LLMClient(gemini): configure bir kez, model örneği önbellekten; history yalnızca yeni mesajlarla genişler."""
+    from core.llm_client import LLMClient
+
+    test_config.GEMINI_API_KEY = "anahtar"
+    llm = LLMClient("gemini", test_config)
+    msgs = [{"role": "user", "content": "soru"}]
+    for step in range(3):
+        out = await llm.chat(msgs, system_prompt="SİSTEM", temperature=0.3)
+        assert "final_answer" in out
+        msgs = msgs + [{"role": "assistant", "content": f"adım {step}"},
+                       {"role": "user", "content": f"[ARAÇ:x:SONUÇ] {step}"}]
+    assert fake_genai["configure"] == 1
+    assert fake_genai["models"] == 1
+    assert fake_genai["histories"][-1] == [
+        {"role": "user", "parts": ["soru"]},
+        {"role": "model", "parts": ["adım 0"]}, {"role": "user", "parts": ["[ARAÇ:x:SONUÇ] 0"]},
+        {"role": "model", "parts": ["adım 1"]},
+    ]
+    # Önbellekteki dönüştürülmüş girdiler yeniden kullanılır (aynı nesneler)
+    first, last = fake_genai["histories"][1], fake_genai["histories"][2]
+    assert last[0] is first[0]
+
+    # Farklı sistem istemi / json_mode → yeni model; geçmiş başka bir konuşmaya dönünce baştan çevrilir
+    await llm.chat([{"role": "user", "content": "başka"}], system_prompt="SİSTEM", json_mode=False)
+    assert fake_genai["models"] == 2 and fake_genai["histories"][-1] == []
+
+
+# ─────────────────────────────────────────────
+# 41. KAYIT / TEKRAR OYNATMA LLM TAŞIYICISI
+# ─────────────────────────────────────────────
+
+def _replay_config(test_config, scenario="tool_then_answer", **extra):
+    test_config.AI_PROVIDER = "ollama"
+    test_config.LLM_TRANSPORT = "replay"
+    test_config.LLM_REPLAY_SCENARIO = scenario
+    test_config.LLM_REPLAY_TOKEN_RATE = 0
+    test_config.LLM_REPLAY_TTFT_MS = 0
+    test_config.OLLAMA_RESIDENCY_POLICY = "off"
+    for key, value in extra.items():
+        setattr(test_config, key, value)
+    return test_config
+
+
+@pytest.mark.asyncio
+async def test_replay_transport_drives_react_loop_end_to_end(test_config):
+    """LLM_TRANSPORT=replay: respond() araç çağrısı + final_answer senaryosunu canlı model olmadan tamamlar."""
+    agent = SidarAgent(cfg=_replay_config(test_config, "multi_tool"))
+    chunks = [c async for c in agent.respond("bu projede yanıt süresini nasıl kısaltırız?")]
+    tools = [c for c in chunks if c.startswith("\x00TOOL:")]
+    assert [t.split(":")[1].strip("\x00") for t in tools] == ["read_file", "list_dir"]
+    assert "## Özet" in "".join(c for c in chunks if not c.startswith("\x00"))
+    series = agent.llm.telemetry.stats()["series"]
+    assert series[0]["caller"] == "react" and series[0]["latency_s"]["count"] == 3
+    assert series[0]["prompt_tokens"]["avg"] > 0
+    await agent.llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_replay_transport_paces_tokens():
+    """ReplayOllamaTransport: TTFT ve token hızı yapılandırılan değerlere uyar; son kayıt sayaçları taşır."""
+    import httpx
+    from core.llm_replay import ReplayOllamaTransport, ReplaySource
+
+    transport = ReplayOllamaTransport(ReplaySource("final_answer"), token_rate=2000, ttft_ms=80, jitter=0)
+    payload = {"model": "m", "messages": [{"role": "user", "content": "soru"}], "format": "json", "stream": True}
+    started = time.monotonic()
+    first_at, records = None, []
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("POST", "http://replay/api/chat", json=payload) as resp:
+            async for line in resp.aiter_lines():
+                first_at = first_at or time.monotonic() - started
+                records.append(json.loads(line))
+    last = records[-1]
+    assert 0.07 <= first_at < 0.5
+    assert last["done"] and last["eval_count"] == len(records) - 1
+    assert 1000 <= last["eval_count"] / (last["eval_duration"] / 1e9) <= 2500
+    text = "".join(r["message"]["content"] for r in records)
+    assert json.loads(text)["tool"] == "final_answer"
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_round_trip(tmp_path):
+    """RecordingTransport gerçek yanıtı JSONL'e yazar; ReplaySource aynı istek için onu birebir döndürür."""
+    import httpx
+    from core.llm_replay import RecordingTransport, ReplayOllamaTransport, ReplaySource
+
+    def upstream(request):
+        lines = [{"message": {"content": "mer"}, "done": False},
+                 {"message": {"content": "haba"}, "done": False},
+                 {"message": {"content": ""}, "done": True, "eval_count": 2}]
+        return httpx.Response(200, content="\n".join(json.dumps(x) for x in lines).encode())
+
+    records = tmp_path / "kayit.jsonl"
+    payload = {"model": "m", "messages": [{"role": "user", "content": "selam"}], "stream": True}
+    async with httpx.AsyncClient(transport=RecordingTransport(httpx.MockTransport(upstream), records)) as client:
+        async with client.stream("POST", "http://ollama/api/chat", json=payload) as resp:
+            await resp.aread()
+    rec = json.loads(records.read_text(encoding="utf-8"))
+    assert rec["response"] == "merhaba" and rec["json_mode"] is False
+
+    replay = ReplayOllamaTransport(ReplaySource(records_file=records), token_rate=0, ttft_ms=0)
+    async with httpx.AsyncClient(transport=replay) as client:
+        resp = await client.post("http://x/api/chat", json=dict(payload, stream=False))
+    assert resp.json()["message"]["content"] == "merhaba"
+
+
+# ─────────────────────────────────────────────
+# 42. PARALEL ARAÇ ÇAĞRILARI
+# ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_parallel_tool_batch_runs_read_only_concurrently(agent):
+    """_run_tool_batch: Salt-okunur araçlar eşzamanlı çalışır, yazma aracı bariyerdir; sonuçlar sırayla tek mesajda."""
+    from agent.sidar_agent import ToolStep
+
+    events = []
+
+    async def fake_execute(name, arg):
+        events.append(("start", name, arg))
+        await asyncio.sleep(0.05)
+        events.append(("end", name, arg))
+        return None if name == "yok" else f"{name}({arg})"
+
+    agent._execute_tool = fake_execute
+    calls = [ToolStep(tool="read_file", argument="a.py"), ToolStep(tool="read_file", argument="b.py"),
+             ToolStep(tool="write_file", argument="c.py|||x"), ToolStep(tool="list_dir", argument="."),
+             ToolStep(tool="yok"), ToolStep(tool="web_search", argument="atlanır")]
+    feedback = await agent._run_tool_batch(calls, limit=5)
+
+    # a ve b birlikte başlar; write_file ikisi bitmeden başlamaz, list_dir ondan sonra başlar
+    assert [e[0] for e in events[:2]] == ["start", "start"]
+    w = events.index(("start", "write_file", "c.py|||x"))
+    assert events.index(("end", "read_file", "b.py")) < w < events.index(("start", "list_dir", "."))
+    assert feedback.index("read_file(a.py)") < feedback.index("read_file(b.py)") < feedback.index("list_dir(.)")
+    assert "[ARAÇ:yok:HATA]" in feedback and "atlananlar: web_search" in feedback
+    assert feedback.endswith("Devam gerekiyorsa sonraki aracı çağır.")
+    assert agent.tool_stats["batches"] == 1 and agent.tool_stats["round_trips_saved"] == 4
+
+
+@pytest.mark.asyncio
+async def test_react_loop_parallel_step_single_round_trip(agent):
+    """_react_loop: 'parallel' adımı tek LLM turunda üç aracı çalıştırır; per-tool sınır aşılmaz."""
+    agent.TOOL_CONCURRENCY = {"read_file": 1}
+    running = {"read_file": 0, "max": 0}
+
+    async def fake_execute(name, arg):
+        if name == "read_file":
+            running["read_file"] += 1
+            running["max"] = max(running["max"], running["read_file"])
+        await asyncio.sleep(0.02)
+        if name == "read_file":
+            running["read_file"] -= 1
+        return f"içerik:{arg}"
+
+    replies = iter([
+        json.dumps({"thought": "birlikte", "tool": "parallel", "argument": "",
+                    "calls": [{"tool": "read_file", "argument": "a"}, {"tool": "read_file", "argument": "b"},
+                              {"tool": "web_search", "argument": "q"}]}),
+        '{"thought": "tamam", "tool": "final_answer", "argument": "bitti"}',
+    ])
+    seen = []
+
+    async def fake_chat(**kwargs):
+        seen.append(kwargs["messages"])
+        text = next(replies)
+
+        async def gen():
+            yield text
+        return gen()
+
+    agent._execute_tool = fake_execute
+    agent.llm.chat = fake_chat
+    chunks = [c async for c in agent.respond("bu proje hakkında ne düşünüyorsun acaba?")]
+    assert chunks[-1] == "bitti"
+    assert [c for c in chunks if c.startswith("\x00")] == [
+        "\x00TOOL:read_file\x00", "\x00TOOL:read_file\x00", "\x00TOOL:web_search\x00"]
+    assert len(seen) == 2
+    feedback = seen[1][-1]["content"]
+    assert feedback.count("[ARAÇ:") == 3 and "içerik:q" in feedback
+    assert running["max"] == 1
+
+
+# ─────────────────────────────────────────────
+# 43. ARAÇ SONUCU ÖNBELLEĞİ
+# ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_tool_cache_hits_and_write_invalidation(agent, monkeypatch):
+    """_execute_tool: Aynı read_file/list_dir tekrar diske gitmez; write_file ilgili kayıtları siler."""
+    target = agent.cfg.TEMP_DIR / "onbellek.py"
+    target.write_text("x = 1\n", encoding="utf-8")
+    monkeypatch.chdir(agent.cfg.BASE_DIR)
+    reads = []
+    real_read = agent.code.read_file
+    agent.code.read_file = lambda p: (reads.append(p), real_read(p))[1]
+
+    first = await agent._execute_tool("read_file", str(target))
+    again = await agent._execute_tool("read_file", f"  {target}  ")
+    assert first == again and "x = 1" in first and len(reads) == 1
+    listing = await agent._execute_tool("list_dir", "temp")
+    assert "onbellek.py" in listing
+
+    await agent._execute_tool("write_file", "temp/onbellek.py|||x = 2\n")
+    assert "x = 2" in await agent._execute_tool("read_file", str(target))
+    assert len(reads) == 2
+    st = agent.tool_cache.stats()
+    assert st["tools"]["read_file"]["hits"] == 1 and st["tools"]["read_file"]["evictions"] == 1
+    assert st["tools"]["list_dir"]["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tool_cache_skips_failed_results(agent, monkeypatch):
+    """Bulunamayan dosya ve ağ hatası önbelleğe yazılmaz; dosya oluşturulunca hemen okunur."""
+    monkeypatch.chdir(agent.cfg.BASE_DIR)
+    target = agent.cfg.TEMP_DIR / "sonra_olusacak.py"
+    missing = await agent._execute_tool("read_file", str(target))
+    target.write_text("y = 3\n", encoding="utf-8")
+    assert "y = 3" not in missing
+    assert "y = 3" in await agent._execute_tool("read_file", str(target))
+
+    calls = []
+
+    async def pypi_down(name):
+        calls.append(name)
+        return False, "✗ PyPI bağlantı hatası"
+
+    agent.pkg.pypi_info = pypi_down
+    await agent._execute_tool("pypi", "requests")
+    await agent._execute_tool("pypi", "requests")
+    assert len(calls) == 2 and agent.tool_cache.stats()["entries"] == 1
+
+
+def test_tool_cache_ttl_sessions_and_remote_invalidation(monkeypatch):
+    """ToolResultCache: TTL dolunca kayıt düşer, oturumlar ayrıdır, github_write uzak okumaları siler."""
+    from core import tool_cache as tc
+
+    cache = tc.ToolResultCache(tc.parse_ttls("pypi=10,web_search=0,hatalı=x"))
+    now = [100.0]
+    monkeypatch.setattr(tc.time, "monotonic", lambda: now[0])
+    cache.put("s1", "pypi", "Requests_Toolbelt", "1.0")
+    cache.put("s1", "web_search", "q", "sonuç")
+    assert cache.get("s1", "pypi", "requests-toolbelt") == "1.0"
+    assert cache.get("s2", "pypi", "requests-toolbelt") is None
+    assert cache.get("s1", "web_search", "q") is None
+    now[0] += 11
+    assert cache.get("s1", "pypi", "requests-toolbelt") is None
+
+    cache.put("s1", "github_read", "/README.md", "uzak")
+    cache.put("s2", "github_list_files", "src|||main", "liste")
+    cache.put("s1", "docs_search", "asyncio  lock", "belge")
+    assert cache.get("s1", "github_read", "README.md") == "uzak"
+    assert cache.invalidate_after("github_write", "README.md|||yeni|||mesaj") == 2
+    assert cache.get("s1", "github_read", "README.md") is None
+    assert cache.get("s1", "docs_search", "asyncio lock") == "belge"
+    cache.put("s1", "docs_list", "", "3 belge", version=4)
+    assert cache.get("s1", "docs_list", "", version=4) == "3 belge"
+    assert cache.get("s1", "docs_list", "", version=5) is None   # depo araç dışında değişti
+
+
+# ─────────────────────────────────────────────
+# 44. ReAct MESAJ OLUŞTURUCU
+# ─────────────────────────────────────────────
+
+def test_react_messages_appends_in_place_and_collapses_old_outputs():
+    """ReActMessages: Liste kopyalanmaz; en son N araç çıktısı tam kalır, eskiler önizlemeye indirgenir."""
+    from agent.react_messages import ReActMessages
+
+    base = [{"role": "user", "content": "eski"}, {"role": "user", "content": "soru"}]
+    msgs = ReActMessages(base, keep_full=2, preview_chars=20, min_chars=100)
+    outputs = [f"[ARAÇ:read_file:SONUÇ]\n===\n{'ç' * 50}{i}{'x' * 400}\n===\n" for i in range(3)]
+    for out in outputs:
+        msgs.add_step('{"tool": "read_file"}', out)
+    msgs.add_step("bozuk", "[Sistem Hatası] kısa")
+
+    assert msgs.messages is base and len(base) == 10 and msgs.protected == 9
+    assert base[3]["content"].startswith("[ARAÇ:read_file:ÖZET] 1. adımın çıktısı")
+    assert len(base[3]["content"]) < 200
+    assert base[5]["content"] == outputs[1] and base[7]["content"] == outputs[2]
+    assert msgs.collapsed == 1
+    assert msgs.bytes == sum(len(m["content"].encode("utf-8")) for m in base)
+
+
+@pytest.mark.asyncio
+async def test_react_loop_records_payload_bytes(agent):
+    """_react_loop: Adım başına gönderilen bayt kaydedilir; eski araç çıktıları sonraki adımlarda kısalır."""
+    big = "satır\n" * 400
+    replies = iter([json.dumps({"thought": "oku", "tool": t, "argument": a})
+                    for t, a in [("read_file", "a"), ("list_dir", "b"), ("read_file", "c")]]
+                   + ['{"thought": "tamam", "tool": "final_answer", "argument": "bitti"}'])
+    sent = []
+
+    async def fake_execute(name, arg):
+        return f"{name}:{arg}\n{big}"
+
+    async def fake_chat(**kwargs):
+        sent.append([m["content"] for m in kwargs["messages"]])
+        text = next(replies)
+
+        async def gen():
+            yield text
+        return gen()
+
+    agent._execute_tool = fake_execute
+    agent.llm.chat = fake_chat
+    chunks = [c async for c in agent.respond("bu proje hakkında ne düşünüyorsun acaba?")]
+    assert chunks[-1] == "bitti"
+    assert any(c.startswith("[ARAÇ:read_file:ÖZET]") for c in sent[3])
+    st = agent.payload_stats
+    assert st["steps"] == 4 and st["collapsed_results_total"] == 1
+    assert st["bytes_last"] == len(agent._static_system_prompt().encode()) + sum(len(c.encode()) for c in sent[3])
+
+
+# ─────────────────────────────────────────────
+# 45. BAĞLAM ANLIK GÖRÜNTÜSÜ
+# ─────────────────────────────────────────────
+
+def test_context_snapshot_rebuilds_only_on_version_change(agent):
+    """ContextSnapshot: Durum değişmedikçe aynı metin nesnesi döner; alt sistem sürümü artınca yenilenir."""
+    calls = {"status": 0}
+    real_status = agent.docs.status
+
+    def counting_status():
+        calls["status"] += 1
+        return real_status()
+
+    agent.docs.status = counting_status
+    agent.context.invalidate()
+    first = agent.context.get("runtime")
+    assert agent.context.get("runtime") is first and calls["status"] == 1
+    assert agent._static_system_prompt() is agent._static_system_prompt()
+
+    agent.memory.set_last_file("core/rag.py")
+    second = agent.context.get("runtime")
+    assert second is not first and "core/rag.py" in second and calls["status"] == 2
+    agent.memory.set_last_file("core/rag.py")   # aynı değer: sürüm değişmez
+    assert agent.context.get("runtime") is second
+
+    agent.docs.add_document("Başlık", "içerik " * 20)
+    assert "1 belge" in agent.context.get("runtime") and calls["status"] == 3
+    agent.code._files_written += 1
+    assert "Yazılan: 1" in agent.context.get("runtime")
+    assert agent.context.stats["hits"] >= 3
+
+
+# ─────────────────────────────────────────────
+# 46. REACT_TIMEOUT SÜRE SINIRI
+# ─────────────────────────────────────────────
+
+def _scripted_chat(replies, delays=None):
+    """Sırayla yanıt veren sahte llm.chat; delays[i] saniye parça arası bekler."""
+    replies = iter(replies)
+    delays = iter(delays or [])
+
+    async def fake_chat(**kwargs):
+        text, delay = next(replies), next(delays, 0)
+
+        async def gen():
+            for piece in (text[:20], text[20:]):
+                await asyncio.sleep(delay)
+                yield piece
+        return gen()
+    return fake_chat
+
+
+@pytest.mark.asyncio
+async def test_react_timeout_hung_tool_then_answer(agent):
+    """Takılan araç kalan süreden türetilen sınırla kesilir; model yine de final_answer verebilir."""
+    agent.cfg.REACT_TIMEOUT = 1
+    agent.cfg.REACT_ANSWER_RESERVE = 0.6
+
+    async def hung(name, arg):
+        await asyncio.sleep(30)
+
+    agent._execute_tool = hung
+    agent.llm.chat = _scripted_chat([
+        '{"thought": "bak", "tool": "list_dir", "argument": "."}',
+        '{"thought": "süre az", "tool": "final_answer", "argument": "kısa yanıt"}',
+    ])
+    started = time.monotonic()
+    chunks = [c async for c in agent.respond("bu proje hakkında ne düşünüyorsun acaba?")]
+    assert time.monotonic() - started < 1.0
+    assert "".join(c for c in chunks if not c.startswith("\x00")) == "kısa yanıt"
+    assert agent.timeout_stats["tool"] == 1 and agent.timeout_stats["llm"] == 0
+
+
+@pytest.mark.asyncio
+async def test_react_timeout_slow_llm_gives_partial_answer(agent):
+    """Yavaş model: akış yarıda kesilir, son araç sonucuyla kısmi yanıt üretilip belleğe yazılır."""
+    agent.cfg.REACT_TIMEOUT = 0.5
+
+    async def fast(name, arg):
+        return "dosya_a.py\ndosya_b.py"
+
+    agent._execute_tool = fast
+    agent.llm.chat = _scripted_chat([
+        '{"thought": "bak", "tool": "list_dir", "argument": "."}',
+        '{"thought": "yaz", "tool": "final_answer", "argument": "asla gelmez"}',
+    ], delays=[0, 5])
+    chunks = [c async for c in agent.respond("bu proje hakkında ne düşünüyorsun acaba?")]
+    answer = chunks[-1]
+    assert answer.startswith("⏱") and "dosya_b.py" in answer and "`list_dir`" in answer
+    assert agent.timeout_stats == {"llm": 1, "tool": 0, "deadline": 0, "partial_answers": 1}
+    assert agent.memory.get_messages_for_llm()[-1]["content"] == answer
+
+
+@pytest.mark.asyncio
+async def test_react_timeout_write_tool_still_invalidates(agent):
+    """Süresi dolan yazma aracı: sürüm artar, önbellek temizlenir, geç biten yazım yeniden temizler."""
+    from core.tool_cache import ToolResultCache
+    agent.tool_cache = ToolResultCache()
+    session = agent.memory.active_session_id or ""
+    agent.tool_cache.put(session, "read_file", "a.py", "eski içerik")
+    done = asyncio.Event()
+
+    async def slow_write(arg):
+        await asyncio.sleep(0.2)
+        done.set()
+        return "✓ yazıldı"
+
+    agent._tool_write_file = slow_write
+    before = agent.state_epochs["files"]
+    loop = asyncio.get_running_loop()
+    msg = await agent._execute_tool_until("write_file", "a.py|||yeni", loop.time() + 0.05)
+    assert msg.startswith("⏱") and "uygulanmış olabilir" in msg
+    assert agent.state_epochs["files"] == before + 1
+    assert agent.tool_cache.get(session, "read_file", "a.py") is None
+    # Yazım bitmeden önbelleğe düşen eski içerik, yazım tamamlanınca yeniden silinir
+    agent.tool_cache.put(session, "read_file", "a.py", "eski içerik")
+    await asyncio.wait_for(done.wait(), 1)
+    await asyncio.sleep(0)
+    assert agent.state_epochs["files"] == before + 2
+    assert agent.tool_cache.get(session, "read_file", "a.py") is None
+
+
+# ─────────────────────────────────────────────
+# 47. ANLAMSAL YANIT ÖNBELLEĞİ
+# ─────────────────────────────────────────────
+
+def test_answer_cache_ngram_similarity():
+    """Büyük/küçük harf ve noktalama farkı eşleşir; farklı dosya adı eşiğin altında kalır."""
+    from core.answer_cache import cosine, ngram_embedding as emb
+    assert cosine(emb("Sistem sağlığı nedir?"), emb("sistem sağlığı nedir")) > 0.99
+    assert cosine(emb("main.py dosyasını oku"), emb("config.py dosyasını oku")) < 0.9
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_hit_skips_react_loop(agent):
+    """Benzer soru ikinci kez sorulunca LLM çağrılmaz; CACHE sentinel'i ve yanıt akıtılır."""
+    from core.answer_cache import SemanticAnswerCache
+    agent.answer_cache = SemanticAnswerCache(threshold=0.9)
+    agent.llm.chat = _scripted_chat(['{"thought": "bil", "tool": "final_answer", "argument": "Katmanlı mimari."}'])
+    first = [c async for c in agent.respond("Projenin mimarisini kısaca anlatır mısın?")]
+    assert not any(c.startswith("\x00CACHE:") for c in first)
+
+    async def boom(**kwargs):
+        raise AssertionError("LLM çağrılmamalıydı")
+
+    agent.llm.chat = boom
+    second = [c async for c in agent.respond("projenin mimarisini kısaca anlatır mısın")]
+    assert second[0].startswith("\x00CACHE:1.000") and second[-1] == "Katmanlı mimari."
+    assert agent.memory.get_messages_for_llm()[-1]["content"] == "Katmanlı mimari."
+    assert agent.answer_cache.snapshot()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_skips_side_effects_and_stale_reads(agent):
+    """Yazma aracı kullanan tur saklanmaz; read_file'a dayanan yanıt yazmadan sonra geçersizdir."""
+    from core.answer_cache import SemanticAnswerCache
+    agent.answer_cache = SemanticAnswerCache(threshold=0.9)
+    agent.tool_cache = None
+
+    async def fake_read(arg):
+        return "içerik"
+
+    async def fake_write(arg):
+        return "yazıldı"
+
+    agent._tool_read_file = fake_read
+    agent._tool_write_file = fake_write
+    agent.llm.chat = _scripted_chat([
+        '{"thought": "yaz", "tool": "write_file", "argument": "a.txt|||x"}',
+        '{"thought": "tamam", "tool": "final_answer", "argument": "Dosya yazıldı."}',
+        '{"thought": "oku", "tool": "read_file", "argument": "a.txt"}',
+        '{"thought": "tamam", "tool": "final_answer", "argument": "Dosyada içerik var."}',
+    ])
+    [c async for c in agent.respond("a.txt dosyasına x yazar mısın lütfen")]
+    assert agent.answer_cache.snapshot()["stores"] == 0
+    assert agent.answer_cache.stats["skipped_side_effects"] == 1
+
+    [c async for c in agent.respond("a.txt dosyasında ne yazıyor acaba")]
+    assert agent.answer_cache.snapshot()["entries"] == 1
+    versions = agent.answer_versions()
+    assert await agent.answer_cache.lookup("a.txt dosyasında ne yazıyor acaba", agent._answer_namespace(), versions)
+
+    await agent._execute_tool("write_file", "a.txt|||y")
+    assert await agent.answer_cache.lookup(
+        "a.txt dosyasında ne yazıyor acaba", agent._answer_namespace(), agent.answer_versions()) is None
+    assert agent.answer_cache.stats["stale"] == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_near_miss_numbers_versions_paths():
+    """Sayı, sürüm veya dosya adı farklı olan benzer sorular eşleşmez; aynıları eşleşir."""
+    from core.answer_cache import SemanticAnswerCache
+    cache = SemanticAnswerCache(threshold=0.9)
+    pairs = [
+        ("github deposundaki son 20 commiti listele", "github deposundaki son 25 commiti listele"),
+        ("python 3.11 ile asyncio timeout nasıl kullanılır", "python 3.12 ile asyncio timeout nasıl kullanılır"),
+        ("core/rag.py dosyasını özetle", "core/memory.py dosyasını özetle"),
+    ]
+    for stored, asked in pairs:
+        await cache.store(stored, "ns", f"yanıt: {stored}", deps={}, tools=[], side_effects=False)
+        assert await cache.lookup(asked, "ns", {}) is None
+        assert (await cache.lookup(stored + "?", "ns", {}))[0] == f"yanıt: {stored}"
+    assert cache.stats["anchor_mismatches"] >= 2   # ilk ikisi n-gram eşiğini geçiyordu
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_volatile_tools_shorten_or_skip():
+    """health kullanan yanıt saklanmaz; web_search kısa TTL alır; bilinmeyen araç saklanmaz."""
+    from core.answer_cache import SemanticAnswerCache
+    cache = SemanticAnswerCache(ttl_s=3600, tool_ttls={"pypi": 0})
+    assert not await cache.store("sistem sağlığı nedir", "ns", "CPU %3", deps={}, tools=["health"], side_effects=False)
+    assert not await cache.store("requests son sürüm", "ns", "2.32", deps={}, tools=["pypi"], side_effects=False)
+    assert not await cache.store("yeni araç sorusu", "ns", "x", deps={}, tools=["yeni_arac"], side_effects=False)
+    assert cache.stats["skipped_volatile"] == 3
+    assert cache.entry_ttl(["read_file", "web_search"]) == 300
+    assert cache.entry_ttl(["get_config"]) == 3600
+
+
+def test_answer_cache_rejects_context_dependent_questions():
+    """Önceki tura atıf yapan veya çok kısa sorular önbelleğe alınmaz."""
+    from core.answer_cache import SemanticAnswerCache
+    cache = SemanticAnswerCache(min_chars=8)
+    assert not cache.cacheable_question("bunu daha kısa anlat")
+    assert not cache.cacheable_question("evet")
+    assert cache.cacheable_question("sistem sağlığı nedir")
+
+
+# ─────────────────────────────────────────────
+# 48. SPAN TABANLI İZLEME
+# ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_tracing_react_turn_span_tree(test_config, tmp_path):
+    """respond → react.step → llm.chat / tool span ağacı JSONL'e yazılır ve şelale olarak çizilir."""
+    from core import tracing
+    trace_path = tmp_path / "traces.jsonl"
+    agent = SidarAgent(cfg=_replay_config(test_config, "multi_tool", TRACE_ENABLED=True, TRACE_FILE=str(trace_path)))
+    try:
+        [c async for c in agent.respond("bu projede yanıt süresini nasıl kısaltırız?")]
+        spans = tracing.load_trace(trace_path)
+    finally:
+        tracing.tracer.enabled = False
+        tracing.tracer.shutdown()
+        await agent.llm.aclose()
+
+    by_id = {s["span_id"]: s for s in spans}
+    names = [s["name"] for s in spans]
+    assert names.count("respond") == 1 and names.count("react.step") == 3 and names.count("llm.chat") == 3
+    assert [s["attrs"]["tool"] for s in spans if s["name"] == "tool"] == ["read_file", "list_dir"]
+    for s in spans:
+        if s["name"] in ("llm.chat", "tool"):
+            assert by_id[s["parent_id"]]["name"] == "react.step"
+    assert all(s["attrs"]["prompt_tokens"] > 0 for s in spans if s["name"] == "llm.chat")
+    assert any(s["name"] == "memory.save" and s["attrs"]["bytes"] > 0 for s in spans)
+    chart = tracing.render_waterfall(spans)
+    assert "react.step 0" in chart and "tool read_file" in chart
+
+
+def test_tracing_disabled_and_parentless_spans_are_noop():
+    """İzleme kapalıyken ve require_parent span'ı üst span'sız açılırken boş span döner."""
+    from core import tracing
+    t = tracing.Tracer()
+    assert t.start_span("respond") is tracing.NOOP_SPAN
+    t.enabled = True
+    assert t.start_span("memory.save", require_parent=True) is tracing.NOOP_SPAN
+    exported = []
+    t.exporter = type("E", (), {"export": lambda self, spans: exported.extend(spans), "close": lambda self: None})()
+    with t.start_span("respond") as root:
+        with t.start_span("tool", tool="read_file"):
+            pass
+        open_step = t.start_span("react.step", step=0)
+    assert [s.name for s in exported] == ["respond", "tool", "react.step"]
+    assert open_step.attrs["closed_by_root"] and exported[1].parent_id == root.span_id
+    assert tracing.current_span() is tracing.NOOP_SPAN
+
+
+def test_otlp_payload_shape():
+    """OTLP/HTTP JSON gövdesi: hex kimlikler, nanosaniye zamanlar, tipli öznitelikler."""
+    from core import tracing
+    t = tracing.Tracer()
+    t.enabled = True
+    exporter = tracing.OtlpExporter("http://127.0.0.1:9", service_name="sidar-test")
+    try:
+        with t.start_span("respond") as root:
+            child = t.start_span("llm.chat", activate=False, prompt_tokens=12, stream=True)
+            child.end()
+        body = exporter.payload([root, child])
+    finally:
+        exporter.close()
+    spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans[0]["traceId"]) == 32 and "parentSpanId" not in spans[0]
+    assert spans[1]["parentSpanId"] == root.span_id
+    attrs = {a["key"]: a["value"] for a in spans[1]["attributes"]}
+    assert attrs == {"prompt_tokens": {"intValue": "12"}, "stream": {"boolValue": True}}
+    assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
\ No newline at end of file
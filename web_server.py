@@ -15,6 +15,7 @@ import re
 import subprocess
 import time
 from collections import defaultdict
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
 
 try:
@@ -30,6 +31,7 @@ from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Streamin
 
 from config import Config
 from agent.sidar_agent import SidarAgent
+from core import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -56,11 +58,34 @@ async def get_agent() -> SidarAgent:
     return _agent
 
 
+# ─────────────────────────────────────────────
+#  YAŞAM DÖNGÜSÜ (arka plan görevleri)
+# ─────────────────────────────────────────────
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    """Sunucu açılışında arka plan görevlerini başlatır, kapanışta iptal eder."""
+    background: list[asyncio.Task] = []
+    agent = await get_agent()
+    interval = getattr(cfg, "SESSION_RETENTION_INTERVAL", 0)
+    if interval > 0:
+        background.append(asyncio.create_task(agent.retention.run_periodic(interval)))
+    # Modeller arka planda ön yüklenir; sunucu açılışı beklemez
+    background.append(asyncio.create_task(agent.llm.residency.run_periodic()))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await agent.llm.aclose()
+
+
 # ─────────────────────────────────────────────
 #  FASTAPI UYGULAMASI
 # ─────────────────────────────────────────────
 
-app = FastAPI(title="Sidar Web UI", docs_url=None, redoc_url=None)
+app = FastAPI(title="Sidar Web UI", docs_url=None, redoc_url=None, lifespan=_lifespan)
 
 # CORS: Yalnızca localhost'tan gelen isteklere izin ver (port cfg.WEB_PORT'tan okunur)
 _ALLOWED_ORIGINS = [
@@ -233,19 +258,29 @@ async def chat(request: Request):
 
             # Ajanın asenkron stream yanıtını bekle ve akıt
             _TOOL_SENTINEL = re.compile(r'^\x00TOOL:(.+)\x00$')
-            async for chunk in agent.respond(user_message):
-                try:
-                    disconnected = await request.is_disconnected()
-                except Exception:
-                    disconnected = True  # Bağlantı durumu alınamazsa güvenli tarafta kal
-                if disconnected:
-                    logger.info("İstemci bağlantıyı kesti, stream durduruluyor.")
-                    return
-                m = _TOOL_SENTINEL.match(chunk)
-                if m:
-                    yield f"data: {json.dumps({'tool_call': m.group(1)})}\n\n"
-                else:
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+            _CACHE_SENTINEL = re.compile(r'^\x00CACHE:([0-9.]+)\x00$')
+            # aclosing: bağlantı koparsa ajan akışı hemen kapatılır; süren LLM
+            # akışı kapanır ve zamanlayıcıdaki slot bekleyen isteklere geçer
+            responder = agent.respond(user_message)
+            async with aclosing(responder):
+                async for chunk in responder:
+                    try:
+                        disconnected = await request.is_disconnected()
+                    except Exception:
+                        disconnected = True  # Bağlantı durumu alınamazsa güvenli tarafta kal
+                    if disconnected:
+                        logger.info("İstemci bağlantıyı kesti, stream durduruluyor.")
+                        return
+                    m = _TOOL_SENTINEL.match(chunk)
+                    if m:
+                        yield f"data: {json.dumps({'tool_call': m.group(1)})}\n\n"
+                        continue
+                    m = _CACHE_SENTINEL.match(chunk)
+                    if m:
+                        # Yanıt anlamsal önbellekten geldi (ReAct döngüsü atlandı)
+                        yield f"data: {json.dumps({'cache_hit': True, 'similarity': float(m.group(1))})}\n\n"
+                    else:
+                        yield f"data: {json.dumps({'chunk': chunk})}\n\n"
 
             # Akış başarıyla tamamlandı
             yield f"data: {json.dumps({'done': True})}\n\n"
@@ -332,6 +367,26 @@ async def metrics(request: Request):
         "rate_limit_requests_in_window": rl_total,
         "provider":                      agent.cfg.AI_PROVIDER,
         "gpu_enabled":                   agent.cfg.USE_GPU,
+        "active_session_tokens":         agent.memory.token_count(),
+        "memory_summary":                dict(agent.summary_stats),
+        "session_retention":             dict(agent.retention.stats),
+        "session_search_index":          agent.memory.search_index.stats(),
+        "llm_http":                      agent.llm.connection_stats(),
+        "response_latency":              dict(agent.response_stats),
+        "prompt_eval":                   dict(agent.prompt_stats),
+        "context_budget":                dict(agent.budget_stats),
+        "parallel_tools":                dict(agent.tool_stats),
+        "react_payload":                 dict(agent.payload_stats),
+        "context_snapshot":              dict(agent.context.stats),
+        "react_timeouts":                dict(agent.timeout_stats),
+        "tool_cache":                    agent.tool_cache.stats() if agent.tool_cache else None,
+        "answer_cache":                  agent.answer_cache.snapshot() if agent.answer_cache else None,
+        "tracing":                       dict(tracing.tracer.stats, enabled=tracing.tracer.enabled),
+        "llm_cache":                     agent.llm.cache.stats() if agent.llm.cache else None,
+        "llm_scheduler":                 agent.llm.scheduler.stats(),
+        "ollama_endpoints":              agent.llm.ollama_pool.stats(),
+        "llm_telemetry":                 agent.llm.telemetry.stats(),
+        "model_residency":               agent.llm.residency.stats(),
     }
 
     # Prometheus formatı: istemci açıkça talep ederse VE kütüphane kuruluysa sun
@@ -348,6 +403,77 @@ async def metrics(request: Request):
             Gauge("sidar_rag_documents_total", "RAG belge sayısı",               registry=reg).set(rag_docs)
             Gauge("sidar_active_turns",        "Aktif oturum tur sayısı",        registry=reg).set(len(agent.memory))
             Gauge("sidar_rate_limit_requests", "Rate limit penceredeki istek",   registry=reg).set(rl_total)
+            Gauge("sidar_memory_summary_runs", "Kayan özetleme çalışma sayısı",  registry=reg).set(agent.summary_stats["runs"])
+            Gauge("sidar_memory_summary_last_duration_seconds", "Son özetleme süresi (s)",
+                  registry=reg).set(agent.summary_stats["last_duration_s"])
+            Gauge("sidar_memory_summary_tokens_saved_total", "Özetleme ile kazanılan toplam token",
+                  registry=reg).set(agent.summary_stats["tokens_saved_total"])
+            rs = agent.retention.stats
+            Gauge("sidar_sessions_archived_total", "Arşivlenen toplam oturum",  registry=reg).set(rs["sessions_archived_total"])
+            Gauge("sidar_sessions_bytes_reclaimed_total", "Saklama ile kazanılan bayt",
+                  registry=reg).set(rs["bytes_reclaimed_total"])
+            Gauge("sidar_sessions_retention_last_duration_seconds", "Son saklama çalıştırma süresi (s)",
+                  registry=reg).set(rs["last_run_duration_s"])
+            Gauge("sidar_response_ttft_seconds", "Son yanıtta ilk görünür metne kadar geçen süre (s)",
+                  registry=reg).set(agent.response_stats["ttft_last_s"])
+            Gauge("sidar_response_ttft_avg_seconds", "Ortalama ilk görünür metin süresi (s)",
+                  registry=reg).set(agent.response_stats["ttft_avg_s"])
+            pe = Gauge("sidar_react_prompt_eval_step_avg", "ReAct ilk/sonraki adım ortalama prompt_eval_count",
+                       ["step"], registry=reg)
+            pe.labels(step="first").set(agent.prompt_stats["first_step_avg"])
+            pe.labels(step="followup").set(agent.prompt_stats["followup_step_avg"])
+            Gauge("sidar_context_trimmed_tokens_total", "Bağlam bütçesi ile kırpılan toplam token",
+                  registry=reg).set(agent.budget_stats["trimmed_total"])
+            Gauge("sidar_context_trimmed_tokens_last", "Son ReAct adımında kırpılan token",
+                  registry=reg).set(agent.budget_stats["trimmed_last"])
+            Gauge("sidar_prompt_prefix_changes_total", "Statik istem önekinin değiştiği tur sayısı",
+                  registry=reg).set(agent.prompt_stats["prefix_changes"])
+            Gauge("sidar_react_prompt_bytes_last", "Son ReAct adımında gönderilen istem baytı",
+                  registry=reg).set(agent.payload_stats["bytes_last"])
+            Gauge("sidar_react_prompt_bytes_avg", "ReAct adımı başına ortalama istem baytı",
+                  registry=reg).set(agent.payload_stats["bytes_avg"])
+            timeouts = Gauge("sidar_react_timeouts_total", "REACT_TIMEOUT aşımları (adım türüne göre)",
+                             ["step"], registry=reg)
+            for kind in ("llm", "tool", "deadline"):
+                timeouts.labels(step=kind).set(agent.timeout_stats[kind])
+            Gauge("sidar_react_round_trips_saved_total", "Paralel araç gruplarıyla kazanılan LLM turu",
+                  registry=reg).set(agent.tool_stats["round_trips_saved"])
+            if agent.llm.cache is not None:
+                cache_hits = Gauge("sidar_llm_cache_hit_rate", "LLM yanıt önbelleği isabet oranı",
+                                   ["caller"], registry=reg)
+                for name, c in agent.llm.cache.stats()["callers"].items():
+                    cache_hits.labels(caller=name).set(c["hit_rate"])
+            if agent.tool_cache is not None:
+                tool_hits = Gauge("sidar_tool_cache_hits_total", "Araç sonucu önbelleği isabet sayısı",
+                                  ["tool"], registry=reg)
+                for name, c in agent.tool_cache.stats()["tools"].items():
+                    tool_hits.labels(tool=name).set(c["hits"])
+            if agent.answer_cache is not None:
+                ac = agent.answer_cache.snapshot()
+                Gauge("sidar_answer_cache_hits_total", "Anlamsal yanıt önbelleği isabet sayısı",
+                      registry=reg).set(ac["hits"])
+                Gauge("sidar_answer_cache_hit_rate", "Anlamsal yanıt önbelleği isabet oranı",
+                      registry=reg).set(ac["hit_rate"])
+            sched = Gauge("sidar_llm_queue_wait_avg_seconds", "LLM zamanlayıcı ortalama kuyruk bekleme (s)",
+                          ["priority"], registry=reg)
+            queued = Gauge("sidar_llm_queued_requests", "LLM zamanlayıcıda bekleyen istek", ["priority"], registry=reg)
+            for cls, st in agent.llm.scheduler.stats()["classes"].items():
+                sched.labels(priority=cls).set(st["wait_avg_s"])
+                queued.labels(priority=cls).set(st["queued"])
+            up = Gauge("sidar_ollama_endpoint_healthy", "Ollama uç noktası sağlıklı mı (1/0)", ["endpoint"], registry=reg)
+            busy = Gauge("sidar_ollama_endpoint_outstanding", "Ollama uç noktasında süren istek", ["endpoint"], registry=reg)
+            for ep in agent.llm.ollama_pool.endpoints:
+                up.labels(endpoint=ep.url).set(1 if ep.healthy else 0)
+                busy.labels(endpoint=ep.url).set(ep.outstanding)
+            reg.register(_LLMTelemetryCollector(agent.llm.telemetry))
+            Gauge("sidar_llm_cold_loads_total", "Kullanıcı isteğinde gözlenen model yüklemesi",
+                  registry=reg).set(agent.llm.residency.cold_loads)
+            hs = agent.llm.http_stats
+            Gauge("sidar_llm_http_requests_total", "LLM HTTP istek sayısı",        registry=reg).set(hs["requests_total"])
+            Gauge("sidar_llm_http_connections_opened_total", "Açılan yeni TCP bağlantısı",
+                  registry=reg).set(hs["connections_opened"])
+            Gauge("sidar_llm_http_connections_reused_total", "Havuzdan yeniden kullanılan bağlantı",
+                  registry=reg).set(hs["connections_reused"])
             return _PromeResp(generate_latest(reg), media_type=CONTENT_TYPE_LATEST)
         except ImportError:
             pass  # prometheus_client kurulu değil — JSON ile devam et
@@ -355,10 +481,31 @@ async def metrics(request: Request):
     return JSONResponse(payload)
 
 
+class _LLMTelemetryCollector:
+    """LLMTelemetry histogramlarını (model × çağıran) Prometheus histogramı olarak sunar."""
+
+    def __init__(self, telemetry) -> None:
+        self.telemetry = telemetry
+
+    def collect(self):
+        from prometheus_client.core import HistogramMetricFamily
+        from core.llm_telemetry import METRICS
+
+        series = self.telemetry.series()
+        for name, (_, doc, metric) in METRICS.items():
+            family = HistogramMetricFamily(metric, doc, labels=["model", "caller"])
+            for model, caller, hists in series:
+                h = hists[name]
+                family.add_metric([model, caller], buckets=h.cumulative(), sum_value=h.sum)
+            yield family
+
+
 # ─────────────────────────────────────────────
 #  ÇOKLU SOHBET (SESSIONS) ROTALARI
 # ─────────────────────────────────────────────
 
+_HISTORY_PAGE_SIZE = 50  # Geçmiş sayfası başına tur sayısı
+
 @app.get("/sessions")
 async def get_sessions():
     """Tüm oturumların listesini döndürür."""
@@ -368,13 +515,95 @@ async def get_sessions():
         "sessions": agent.memory.get_all_sessions()
     })
 
+@app.get("/sessions/search")
+async def search_sessions(q: str = "", limit: int = 20):
+    """
+    Tüm oturumlarda tam metin arama. Sonuçlar skora göre sıralıdır;
+    her oturum için eşleşen tur kesitleri (HTML-escape edilmiş, <mark> ile vurgulu) döner.
+    Arama bellek içi indeks üzerinden yapılır, oturum dosyası açılmaz.
+    """
+    agent = await get_agent()
+    q = q.strip()
+    if not q:
+        return JSONResponse({"query": q, "results": []})
+    limit = max(1, min(limit, 100))
+    results = await asyncio.to_thread(agent.memory.search_sessions, q, limit)
+    return JSONResponse({"query": q, "results": results})
+
+@app.get("/sessions/archived")
+async def archived_sessions():
+    """Saklama motorunun arşivlediği (listeden çıkan) oturumların kimlikleri."""
+    agent = await get_agent()
+    ids = await asyncio.to_thread(agent.retention.archived_session_ids)
+    return JSONResponse({"sessions": ids})
+
+@app.post("/sessions/{session_id}/restore")
+async def restore_session(session_id: str):
+    """Arşivlenmiş bir oturumu geri yükler; oturum yeniden /sessions listesinde ve aramada görünür."""
+    agent = await get_agent()
+    if not await asyncio.to_thread(agent.retention.restore, session_id):
+        return JSONResponse({"success": False, "error": "Arşivde oturum bulunamadı."}, status_code=404)
+    return JSONResponse({"success": True, "session_id": session_id})
+
 @app.get("/sessions/{session_id}")
-async def load_session(session_id: str):
-    """Belirli bir oturumu yükler ve geçmişini döndürür."""
+async def load_session(session_id: str, limit: int = _HISTORY_PAGE_SIZE):
+    """
+    Belirli bir oturumu aktif yapar ve geçmişin en yeni sayfasını döndürür.
+    Etkinleştirme oturumun tamamını çözer (ajan bağlamı için gerekli); bu iş
+    event loop dışında yapılır ve sayfa bellekteki turlardan kurulur. Seçerek
+    okuma yalnızca /sessions/{id}/history için geçerlidir; daha eski sayfalar
+    oradan ?before=<next_cursor> ile alınır.
+    limit=0 tüm geçmişi tek yanıtta döndürür (dışa aktarma).
+    """
     agent = await get_agent()
-    if agent.memory.load_session(session_id):
+    if limit <= 0:
+        if not await asyncio.to_thread(agent.memory.load_session, session_id):
+            return JSONResponse({"success": False, "error": "Oturum bulunamadı."}, status_code=404)
         return JSONResponse({"success": True, "history": agent.memory.get_history()})
-    return JSONResponse({"success": False, "error": "Oturum bulunamadı."}, status_code=404)
+    page = await asyncio.to_thread(agent.memory.load_session_page, session_id, min(limit, 500))
+    if page is None:
+        return JSONResponse({"success": False, "error": "Oturum bulunamadı."}, status_code=404)
+    return JSONResponse({"success": True, "history": page.pop("turns"), **page})
+
+@app.get("/sessions/{session_id}/history")
+async def session_history(session_id: str, before: str = "", limit: int = _HISTORY_PAGE_SIZE,
+                          stream: bool = False):
+    """
+    İmleç tabanlı geçmiş sayfalama (en yeniden eskiye); oturum aktif yapılmaz
+    ve yalnızca sayfanın düştüğü kayıt parçaları okunur.
+
+    stream=true: `before` imlecinden başlayarak tüm eski sayfalar NDJSON
+    (satır başına bir sayfa) olarak akıtılır.
+    """
+    agent = await get_agent()
+    limit = max(1, min(limit, 500))
+    try:
+        page = await asyncio.to_thread(agent.memory.read_history_page, session_id, limit, before or None)
+    except ValueError as exc:
+        return JSONResponse({"success": False, "error": str(exc), "cursor_stale": True}, status_code=409)
+    if page is None:
+        return JSONResponse({"success": False, "error": "Oturum bulunamadı."}, status_code=404)
+
+    if not stream:
+        return JSONResponse({"success": True, "history": page.pop("turns"), **page})
+
+    async def _pages():
+        current = page
+        while True:
+            yield json.dumps({"history": current.pop("turns"), **current}, ensure_ascii=False) + "\n"
+            if not current["next_cursor"]:
+                return
+            try:
+                current = await asyncio.to_thread(
+                    agent.memory.read_history_page, session_id, limit, current["next_cursor"]
+                )
+            except ValueError as exc:
+                yield json.dumps({"error": str(exc), "cursor_stale": True}, ensure_ascii=False) + "\n"
+                return
+            if current is None:
+                return
+
+    return StreamingResponse(_pages(), media_type="application/x-ndjson")
 
 @app.post("/sessions/new")
 async def new_session():
@@ -388,6 +617,8 @@ async def delete_session(session_id: str):
     """Belirli bir oturumu siler."""
     agent = await get_agent()
     if agent.memory.delete_session(session_id):
+        if agent.tool_cache is not None:
+            agent.tool_cache.drop_session(session_id)
         return JSONResponse({
             "success": True, 
             "active_session": agent.memory.active_session_id